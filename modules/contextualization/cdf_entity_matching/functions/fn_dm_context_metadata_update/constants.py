@@ -1,10 +1,17 @@
-# Limit used when listing instances: -1 means fetch all matches, letting the SDK
-# paginate internally. A positive value is not supported, as get_new_items has no
-# cursor and would re-read the first page on every pass.
-BATCH_SIZE = -1
+# Instances read per page. Pages are read with a keyset cursor on externalId, and
+# each page is processed and written before the next one is read, so memory stays
+# bounded by the page size.
+PAGE_SIZE = 1000
+PAGE_MAX_RETRIES = 5
+PAGE_RETRY_BACKOFF_SECONDS = 2
+# HTTP status codes below 500 a page read is retried on (5xx are always retried)
+RETRYABLE_STATUS_CODES = frozenset({408, 429})
 MANAGED_ASSET_TAG_PREFIX = "root:"
 # Literal value an earlier version of this function wrote instead of a root tag.
 # Stripped from asset tags whenever encountered.
 INVALID_ASSET_TAG = "tag"
 TS_NODE = "timeseries"
 ASSET_NODE = "assets"
+STAT_STORE_VALUE = "value"
+STAT_STORE_TIMESERIES_SYNC = "state_timeseries_sync"  # incremental mode: timeseries view sync cursor
+STAT_STORE_ASSET_SYNC = "state_asset_sync"  # incremental mode: asset view sync cursor
@@ -8,9 +8,8 @@ performance, reduce memory usage, and enhance reliability.
 import gc
 import re
 import time
-from collections.abc import Callable
+from collections.abc import Callable, Sequence
 from contextlib import contextmanager
-from functools import lru_cache
 
 from cognite.client import CogniteClient
 from cognite.client.data_classes.data_modeling import Node, NodeApply, NodeOrEdgeData, ViewId
@@ -107,13 +106,40 @@ class BatchProcessor:
             raise
 
 
+# ===== ALIAS ENGINE =====
+
+class AliasEngine:
+    """
+    Generates the managed aliases of a whole column of names at once.
+
+    Each distinct name in the column is searched once with the precompiled pattern,
+    so repeated names in a page cost a dict lookup. Results are immutable tuples:
+    nothing handed out can be changed by a caller and leak into other instances.
+    """
+
+    def __init__(self, pattern: re.Pattern[str] = ALIAS_PATTERN, separator: str = "_"):
+        self._search = pattern.search
+        self._join = separator.join
+
+    def managed_aliases(self, names: Sequence[str]) -> tuple[str | None, ...]:
+        """The managed alias of each name, or None where the name holds no tag."""
+        search = self._search
+        join = self._join
+        generated: dict[str, str | None] = {}
+        for name in dict.fromkeys(names):
+            match = search(name)
+            generated[name] = join(match.groups()) if match else None
+        return tuple(map(generated.__getitem__, names))
+
+
 # ===== OPTIMIZED METADATA PROCESSOR =====
 
 class OptimizedMetadataProcessor:
-    """Optimized metadata processing with caching and batch operations"""
+    """Optimized metadata processing with batch alias generation"""
     
-    def __init__(self, logger: CogniteFunctionLogger):
+    def __init__(self, logger: CogniteFunctionLogger, alias_engine: AliasEngine | None = None):
         self.logger = logger
+        self.alias_engine = alias_engine or AliasEngine()
         self.stats = {
             'processed': 0,
             'updated': 0,
@@ -127,30 +153,88 @@ class OptimizedMetadataProcessor:
         update_all: bool = False,
     ) -> NodeApply | None:
         """Process timeseries metadata with optimizations"""
-        
+        return self.process_timeseries_batch([node], view_id, node_space, update_all)[0]
+
+    def process_timeseries_batch(
+        self,
+        nodes: Sequence[Node],
+        view_id: ViewId,
+        node_space: str,
+        update_all: bool = False,
+    ) -> list[NodeApply | None]:
+        """Process a page of timeseries; the update (or None) of each node, in order"""
+        properties = [self._view_properties(node, view_id, "timeseries") for node in nodes]
+        managed_aliases = self.alias_engine.managed_aliases([_name(props) for props in properties])
+        return [
+            self._timeseries_update(node, props, managed_alias, view_id, node_space, update_all) if props else None
+            for node, props, managed_alias in zip(nodes, properties, managed_aliases, strict=True)
+        ]
+
+    def process_asset_metadata(
+        self,
+        node: Node,
+        view_id: ViewId,
+        node_space: str,
+        update_all: bool = False,
+    ) -> NodeApply | None:
+        """Process asset metadata with optimizations"""
+        return self.process_asset_batch([node], view_id, node_space, update_all)[0]
+
+    def process_asset_batch(
+        self,
+        nodes: Sequence[Node],
+        view_id: ViewId,
+        node_space: str,
+        update_all: bool = False,
+    ) -> list[NodeApply | None]:
+        """Process a page of assets; the update (or None) of each node, in order"""
+        properties = [self._view_properties(node, view_id, "asset") for node in nodes]
+        managed_aliases = self.alias_engine.managed_aliases([_name(props) for props in properties])
+        return [
+            self._asset_update(node, props, managed_alias, view_id, node_space, update_all) if props else None
+            for node, props, managed_alias in zip(nodes, properties, managed_aliases, strict=True)
+        ]
+
+    def _view_properties(self, node: Node, view_id: ViewId, kind: str) -> dict | None:
+        # Skip rather than recompute from an empty payload, which under updateAll
+        # would overwrite the managed properties with empty values.
         try:
-            ext_id = node.external_id
-            # Skip rather than recompute from an empty payload, which under updateAll
-            # would overwrite the managed properties with empty values.
             properties = node.properties.get(view_id) if node.properties else None
-            if not properties:
-                self.logger.warning(f"No properties for view {view_id} on timeseries: {ext_id}")
-                return None
+        except Exception as e:
+            self.logger.error(f"Error processing {kind} {node.external_id}: {e}")
+            return None
+        if not properties:
+            self.logger.warning(f"No properties for view {view_id} on {kind}: {node.external_id}")
+            return None
+        return properties
 
-            name = str(properties.get("name", ""))
+    def _timeseries_update(
+        self,
+        node: Node,
+        properties: dict,
+        managed_alias: str | None,
+        view_id: ViewId,
+        node_space: str,
+        update_all: bool,
+    ) -> NodeApply | None:
+        try:
+            ext_id = node.external_id
+            name = _name(properties)
             aliases_raw = properties.get("aliases", [])
             org_aliases = (
                 [str(x) for x in aliases_raw] if isinstance(aliases_raw, list) else []
             )
             # Only the generated aliases are rebuilt; hand-curated ones are preserved.
-            aliases = _unmanaged_aliases(org_aliases) if update_all else org_aliases.copy()
+            aliases = _unmanaged_aliases(org_aliases) if update_all else org_aliases
 
-            upd_aliases = self._get_timeseries_alias_list_optimized(name, tuple(aliases))
+            upd_aliases = list(_with_alias(tuple(aliases), managed_alias))
 
             update_needed = False
             properties_dict = {}
 
-            if update_all or upd_aliases != org_aliases:
+            # A full rebuild only rewrites aliases that really differ from the stored
+            # ones, regardless of order; unchanged instances are skipped.
+            if _differs(upd_aliases, org_aliases):
                 properties_dict["aliases"] = upd_aliases
                 update_needed = True
             
@@ -177,25 +261,17 @@ class OptimizedMetadataProcessor:
             self.logger.error(f"Error processing timeseries {node.external_id}: {e}")
             return None
     
-    def process_asset_metadata(
+    def _asset_update(
         self,
         node: Node,
+        properties: dict,
+        managed_alias: str | None,
         view_id: ViewId,
         node_space: str,
-        update_all: bool = False,
+        update_all: bool,
     ) -> NodeApply | None:
-        """Process asset metadata with optimizations"""
-        
         try:
             ext_id = node.external_id
-            # Skip rather than recompute from an empty payload, which under updateAll
-            # would overwrite the managed properties with empty values.
-            properties = node.properties.get(view_id) if node.properties else None
-            if not properties:
-                self.logger.warning(f"No properties for view {view_id} on asset: {ext_id}")
-                return None
-
-            name = str(properties.get("name", ""))
             aliases_raw = properties.get("aliases", [])
             tags_raw = properties.get("tags", [])
             org_aliases = (
@@ -203,34 +279,33 @@ class OptimizedMetadataProcessor:
             )
             org_tags = [str(x) for x in tags_raw] if isinstance(tags_raw, list) else []
             # Only the generated aliases are rebuilt; hand-curated ones are preserved.
-            aliases = _unmanaged_aliases(org_aliases) if update_all else org_aliases.copy()
+            aliases = _unmanaged_aliases(org_aliases) if update_all else org_aliases
             # Managed tags are always rebuilt so a changed or removed root relation
             # cannot leave a stale root:* tag behind.
-            tags = [
+            upd_tags = [
                 tag
                 for tag in org_tags
                 if not tag.startswith(MANAGED_ASSET_TAG_PREFIX) and tag != INVALID_ASSET_TAG
             ]
 
+            upd_aliases = list(_with_alias(tuple(aliases), managed_alias))
             root_external_id = _direct_relation_external_id(properties.get("root"))
-            upd_tags, upd_aliases = self._parse_asset_tag_optimized(
-                name, aliases, root_external_id, tags
-            )
+            if root_external_id:
+                managed_tag = f"{MANAGED_ASSET_TAG_PREFIX}{root_external_id}"
+                if managed_tag not in upd_tags:
+                    upd_tags.append(managed_tag)
 
             update_needed = False
             properties_dict = {}
 
-            if update_all:
+            # A full rebuild only rewrites the managed properties that really differ
+            # from the stored ones, regardless of order; unchanged instances are skipped.
+            if _differs(upd_aliases, org_aliases):
                 properties_dict["aliases"] = upd_aliases
+                update_needed = True
+            if _differs(upd_tags, org_tags) if update_all else set(upd_tags) != set(org_tags):
                 properties_dict["tags"] = upd_tags
                 update_needed = True
-            else:
-                if upd_aliases != org_aliases:
-                    properties_dict["aliases"] = upd_aliases
-                    update_needed = True
-                if set(upd_tags) != set(org_tags):
-                    properties_dict["tags"] = upd_tags
-                    update_needed = True
             
             self.stats['processed'] += 1
             
@@ -255,58 +330,12 @@ class OptimizedMetadataProcessor:
             self.logger.error(f"Error processing asset {node.external_id}: {e}")
             return None
     
-    def _parse_asset_tag_optimized(
-        self,
-        name: str,
-        aliases: list[str],
-        root_external_id: str,
-        tags: list[str],
-    ) -> tuple[list[str], list[str]]:
-        """Build asset aliases and root tag from the root relation external id."""
-        upd_aliases = self._get_asset_alias_list_optimized(name, tuple(aliases))
-
-        if root_external_id:
-            managed_tag = f"{MANAGED_ASSET_TAG_PREFIX}{root_external_id}"
-            if managed_tag not in tags:
-                tags.append(managed_tag)
-
-        return tags, upd_aliases
-
-    @staticmethod
-    @lru_cache(maxsize=5000)
-    def _get_timeseries_alias_list_optimized(name: str, aliases_tuple: tuple[str, ...] = ()) -> list[str]:
-        """Optimized timeseries alias generation with caching"""
-        aliases = list(aliases_tuple)
-
-        match = ALIAS_PATTERN.search(name)
-
-        cleaned_value = None if not match else "_".join(match.groups())
-
-        if cleaned_value and cleaned_value not in aliases:
-            aliases.append(cleaned_value)
-
-        return aliases
-    
-    @staticmethod
-    @lru_cache(maxsize=5000)
-    def _get_asset_alias_list_optimized(name: str, aliases_tuple: tuple[str, ...]) -> list[str]:
-        """Optimized asset alias generation with caching"""
-        aliases = list(aliases_tuple)
-
-        match = ALIAS_PATTERN.search(name)
-
-        cleaned_value = None if not match else "_".join(match.groups())
-
-        if cleaned_value and cleaned_value not in aliases:
-            aliases.append(cleaned_value)
-        
-        return aliases
-    
     def get_stats(self) -> dict[str, float | int]:
         """Get processing statistics"""
         return {
             'processed': self.stats['processed'],
             'updated': self.stats['updated'],
+            'unchanged': self.stats['processed'] - self.stats['updated'],
             'update_rate': self.stats['updated'] / self.stats['processed'] if self.stats['processed'] > 0 else 0,
         }
 
@@ -353,6 +382,22 @@ class PerformanceBenchmark:
 
 # ===== UTILITY FUNCTIONS =====
 
+def _name(properties: dict | None) -> str:
+    return str(properties.get("name", "")) if properties else ""
+
+
+def _with_alias(aliases: tuple[str, ...], alias: str | None) -> tuple[str, ...]:
+    """``aliases`` with ``alias`` appended, unless it is None or already there."""
+    if alias is None or alias in aliases:
+        return aliases
+    return (*aliases, alias)
+
+
+def _differs(rebuilt: list[str], current: list[str]) -> bool:
+    """True if ``rebuilt`` holds other values than ``current``; order is ignored, duplicates count."""
+    return len(rebuilt) != len(current) or sorted(rebuilt) != sorted(current)
+
+
 def _unmanaged_aliases(aliases: list[str]) -> list[str]:
     """Return the aliases this function did not generate, preserving their order."""
     return [alias for alias in aliases if not MANAGED_ALIAS_PATTERN.fullmatch(alias)]
@@ -391,6 +436,7 @@ def optimize_metadata_processing():
 # ===== EXPORT MAIN CLASSES =====
 
 __all__ = [
+    'AliasEngine',
     'BatchProcessor',
     'OptimizedMetadataProcessor',
     'PerformanceBenchmark',
@@ -6,15 +6,19 @@ with improved performance, caching, batch processing, and error handling.
 """
 
 import sys
+import time
 import traceback
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any
 
 from cognite.client import CogniteClient
 from cognite.client import data_modeling as dm
-from cognite.client.data_classes import ExtractionPipelineRun
+from cognite.client.data_classes import ExtractionPipelineRun, Row
 from cognite.client.data_classes.data_modeling import (
     Node,
+    NodeApply,
     NodeList,
     ViewId,
 )
@@ -24,9 +28,16 @@ from cognite.client.utils._text import shorten
 from config import Config, ViewPropertyConfig
 from constants import (
     ASSET_NODE,
-    BATCH_SIZE,
+    PAGE_MAX_RETRIES,
+    PAGE_RETRY_BACKOFF_SECONDS,
+    PAGE_SIZE,
+    RETRYABLE_STATUS_CODES,
+    STAT_STORE_ASSET_SYNC,
+    STAT_STORE_TIMESERIES_SYNC,
+    STAT_STORE_VALUE,
     TS_NODE,
 )
+from incremental_sync import SyncCursorExpiredError, dump_cursor, load_cursor, sync_view
 from logger import CogniteFunctionLogger
 
 # Import optimizations
@@ -42,18 +53,28 @@ from metadata_optimizations import (
 
 sys.path.append(str(Path(__file__).parent))
 
+NODE_EXTERNAL_ID = ["node", "externalId"]
+
 
 def effective_run_all(config: Config) -> bool:
     """Return whether to fetch all instances (not only those missing aliases)."""
     return config.parameters.run_all or config.parameters.update_all
 
 
+def uses_sync(config: Config) -> bool:
+    """Return whether instances are read with DMS sync cursors (`incremental`; not in debug mode)."""
+    return config.parameters.incremental and not config.parameters.debug
+
+
 def describe_processing_mode(config: Config) -> str:
     """Human-readable description of the configured fetch/update mode."""
+    sync_reset = ", sync cursors reset" if uses_sync(config) else ""
     if config.parameters.update_all:
-        return "updateAll — all instances, managed metadata reset before recompute"
+        return f"updateAll — all instances, managed metadata reset before recompute{sync_reset}"
     if config.parameters.run_all:
-        return "runAll — all instances, merge with existing metadata"
+        return f"runAll — all instances, merge with existing metadata{sync_reset}"
+    if uses_sync(config):
+        return "incremental (sync) — instances created or changed since the last run"
     return "incremental — instances without aliases only"
 
 
@@ -88,64 +109,52 @@ def metadata_update(
         
         # Process configuration
         with time_operation("Configuration processing", logger):
-            # Initialize processors. BATCH_SIZE is the instance fetch limit, not an
-            # apply batch size, so BatchProcessor keeps its own default.
-            metadata_processor = OptimizedMetadataProcessor(logger)
+            # Initialize processors. Items are read in pages of PAGE_SIZE; each
+            # page's updates are applied in batches of the BatchProcessor size.
             if config.parameters.debug:
                 logger.debug("Debug mode enabled - processing limited data")
                 batch_processor = BatchProcessor(batch_size=100)
             else:
                 batch_processor = BatchProcessor()
-        
-        # Process timeseries
-        with time_operation("Timeseries processing", logger):
-            ts_updates = benchmark.benchmark_function(
-                "Process timeseries metadata",
-                _process_timeseries_optimized,
-                client, logger, config, metadata_processor, batch_processor
-            )
-            
-            if ts_updates > 0:
-                msg = (
-                    f"Timeseries metadata finished — {ts_updates} instance(s) updated "
-                    f"({describe_processing_mode(config)})"
-                )
-                update_pipeline_run(client, logger, pipeline_ext_id, "success", msg)
-            else:
-                msg = (
-                    f"Timeseries metadata finished — no updates required "
-                    f"({describe_processing_mode(config)})"
+
+        # Timeseries and assets are different views and instances: process them concurrently
+        passes = {
+            "Timeseries": _process_timeseries_optimized,
+            "Asset": _process_assets_optimized,
+        }
+        with time_operation("Timeseries and asset processing", logger), ThreadPoolExecutor(
+            max_workers=len(passes), thread_name_prefix="metadata-update"
+        ) as executor:
+            futures = {
+                label: executor.submit(
+                    _run_pass, label, process, client, logger, config, batch_processor, benchmark
                 )
-                update_pipeline_run(client, logger, pipeline_ext_id, "success", msg)
-        
-        # Process assets
-        with time_operation("Asset processing", logger):
-            asset_updates = benchmark.benchmark_function(
-                "Process asset metadata",
-                _process_assets_optimized,
-                client, logger, config, metadata_processor, batch_processor
-            )
-            
-            if asset_updates > 0:
+                for label, process in passes.items()
+            }
+
+        errors = []
+        for label, future in futures.items():
+            try:
+                updates, unchanged = future.result()
+            except Exception as e:
+                logger.error(f"{label} metadata failed: {e!s}")
+                errors.append(e)
+                continue
+
+            if updates > 0:
                 msg = (
-                    f"Asset metadata finished — {asset_updates} instance(s) updated "
-                    f"({describe_processing_mode(config)})"
+                    f"{label} metadata finished — {updates} instance(s) updated, "
+                    f"{unchanged} unchanged skipped ({describe_processing_mode(config)})"
                 )
-                update_pipeline_run(client, logger, pipeline_ext_id, "success", msg)
             else:
                 msg = (
-                    f"Asset metadata finished — no updates required "
-                    f"({describe_processing_mode(config)})"
+                    f"{label} metadata finished — no updates required, "
+                    f"{unchanged} unchanged skipped ({describe_processing_mode(config)})"
                 )
-                update_pipeline_run(client, logger, pipeline_ext_id, "success", msg)
-        
-        # Log performance statistics
-        processor_stats = metadata_processor.get_stats()
-        logger.info(
-            f"📊 Processing Stats: {processor_stats['processed']} processed, "
-            f"{processor_stats['updated']} updated, "
-            f"{processor_stats['update_rate']:.2%} update rate"
-        )
+            update_pipeline_run(client, logger, pipeline_ext_id, "success", msg)
+
+        if errors:
+            raise errors[0]
         
         # Final cleanup and monitoring
         cleanup_memory()
@@ -159,129 +168,140 @@ def metadata_update(
         raise
 
 
-def _process_timeseries_optimized(
+def _run_pass(
+    label: str,
+    process: Callable[..., int],
     client: CogniteClient,
     logger: CogniteFunctionLogger,
     config: Config,
-    metadata_processor: OptimizedMetadataProcessor,
-    batch_processor: BatchProcessor
-) -> int:
-    """Process timeseries metadata with optimizations"""
-
-    total_updates = 0
-    mode = describe_processing_mode(config)
-    run_all = effective_run_all(config)
-
-    logger.info(f"Starting timeseries metadata — mode: {mode}")
-
-    ts_view_id = config.data.job.timeseries_view.as_view_id()
-
-    # BATCH_SIZE is -1, so a single call returns every instance in scope.
-    with time_operation("Fetch timeseries", logger):
-        new_timeseries = get_new_items(client, logger, ts_view_id, config, TS_NODE)
-
-    if not new_timeseries:
-        logger.info("Timeseries complete — no instances returned")
-        return total_updates
+    batch_processor: BatchProcessor,
+    benchmark: PerformanceBenchmark,
+) -> tuple[int, int]:
+    """
+    Run the timeseries or asset pass with its own processor, stats and memory reporting.
+    Returns the number of instances updated and the number skipped as unchanged.
+    """
 
-    batch_count = len(new_timeseries)
-    fetch_scope = "all instances in scope" if run_all else "instances missing aliases"
-    logger.info(f"Timeseries: fetched {batch_count} instances ({fetch_scope})")
+    # Memory is process-wide; the readings are taken at the start and end of each pass
+    monitor_memory_usage(logger, f"{label} start")
+    metadata_processor = OptimizedMetadataProcessor(logger)
 
-    with time_operation(f"Process {batch_count} timeseries", logger):
-        updates = []
+    with time_operation(f"{label} processing", logger):
+        updates = benchmark.benchmark_function(
+            f"Process {label.lower()} metadata",
+            process,
+            client, logger, config, metadata_processor, batch_processor
+        )
 
-        for node in new_timeseries:
-            update = metadata_processor.process_timeseries_metadata(
-                node,
-                ts_view_id,
-                config.data.job.timeseries_view.instance_space,
-                update_all=config.parameters.update_all,
-            )
-            if update:
-                updates.append(update)
+    processor_stats = metadata_processor.get_stats()
+    logger.info(
+        f"📊 {label} Processing Stats: {processor_stats['processed']} processed, "
+        f"{processor_stats['updated']} updated, "
+        f"{processor_stats['unchanged']} unchanged (not written), "
+        f"{processor_stats['update_rate']:.2%} update rate"
+    )
+    monitor_memory_usage(logger, f"{label} end")
 
-        if updates:
-            total_updates = batch_processor.apply_updates_in_batches(
-                client, updates, logger
-            )
-            logger.info(
-                f"Timeseries: applied {total_updates} updates "
-                f"({len(updates)} of {batch_count} examined instances changed)"
-            )
-        else:
-            logger.info(
-                f"Timeseries: no metadata changes needed ({batch_count} instances examined)"
-            )
+    return updates, processor_stats['unchanged']
 
-    cleanup_memory()
 
-    logger.info(
-        f"Timeseries complete — {mode}: {batch_count} examined, {total_updates} updated"
+def _process_timeseries_optimized(
+    client: CogniteClient,
+    logger: CogniteFunctionLogger,
+    config: Config,
+    metadata_processor: OptimizedMetadataProcessor,
+    batch_processor: BatchProcessor,
+) -> int:
+    """Process timeseries metadata with optimizations"""
+    return _process_in_pages(
+        client, logger, config, TS_NODE, "Timeseries", config.data.job.timeseries_view,
+        metadata_processor.process_timeseries_batch, batch_processor,
     )
 
-    return total_updates
-
 
 def _process_assets_optimized(
     client: CogniteClient,
     logger: CogniteFunctionLogger,
     config: Config,
     metadata_processor: OptimizedMetadataProcessor,
-    batch_processor: BatchProcessor
+    batch_processor: BatchProcessor,
 ) -> int:
     """Process asset metadata with optimizations"""
+    return _process_in_pages(
+        client, logger, config, ASSET_NODE, "Assets", config.data.job.asset_view,
+        metadata_processor.process_asset_batch, batch_processor,
+    )
 
-    total_updates = 0
-    mode = describe_processing_mode(config)
-    run_all = effective_run_all(config)
-
-    logger.info(f"Starting asset metadata — mode: {mode}")
 
-    asset_view_id = config.data.job.asset_view.as_view_id()
+def _process_in_pages(
+    client: CogniteClient,
+    logger: CogniteFunctionLogger,
+    config: Config,
+    node_type: str,
+    label: str,
+    view_config: ViewPropertyConfig,
+    process_page: Callable[..., list[NodeApply | None]],
+    batch_processor: BatchProcessor,
+) -> int:
+    """
+    Read the items page by page and apply each page's updates before reading the next,
+    so writes start after the first page and only one page is held in memory.
+    """
 
-    # BATCH_SIZE is -1, so a single call returns every instance in scope.
-    with time_operation("Fetch assets", logger):
-        new_assets = get_new_items(client, logger, asset_view_id, config, ASSET_NODE)
+    total_updates = 0
+    examined = 0
+    changed = 0
+    mode = describe_processing_mode(config)
+    if effective_run_all(config):
+        fetch_scope = "all instances in scope"
+    elif uses_sync(config):
+        fetch_scope = "changed instances"
+    else:
+        fetch_scope = "instances missing aliases"
 
-    if not new_assets:
-        logger.info("Assets complete — no instances returned")
-        return total_updates
+    logger.info(f"Starting {label.lower()} metadata — mode: {mode}")
 
-    batch_count = len(new_assets)
-    fetch_scope = "all instances in scope" if run_all else "instances missing aliases"
-    logger.info(f"Assets: fetched {batch_count} instances ({fetch_scope})")
+    view_id = view_config.as_view_id()
 
-    with time_operation(f"Process {batch_count} assets", logger):
-        updates = []
+    with time_operation(f"Process {label.lower()}", logger):
+        if uses_sync(config):
+            pages = iter_changed_items(client, logger, config, node_type)
+        else:
+            pages = iter_new_items(client, logger, view_id, config, node_type)
+        for page_number, page in enumerate(pages, start=1):
+            # Aliases are generated for the whole page at once
+            updates = [
+                update
+                for update in process_page(
+                    page,
+                    view_id,
+                    view_config.instance_space,
+                    update_all=config.parameters.update_all,
+                )
+                if update
+            ]
 
-        for node in new_assets:
-            update = metadata_processor.process_asset_metadata(
-                node,
-                asset_view_id,
-                config.data.job.asset_view.instance_space,
-                update_all=config.parameters.update_all,
-            )
-            if update:
-                updates.append(update)
+            if updates:
+                total_updates += batch_processor.apply_updates_in_batches(
+                    client, updates, logger
+                )
 
-        if updates:
-            total_updates = batch_processor.apply_updates_in_batches(
-                client, updates, logger
-            )
-            logger.info(
-                f"Assets: applied {total_updates} updates "
-                f"({len(updates)} of {batch_count} examined instances changed)"
-            )
-        else:
+            examined += len(page)
+            changed += len(updates)
             logger.info(
-                f"Assets: no metadata changes needed ({batch_count} instances examined)"
+                f"{label}: page {page_number} — {len(page)} {fetch_scope} examined, "
+                f"{len(updates)} changed ({examined} examined so far)"
             )
 
     cleanup_memory()
 
+    if not examined:
+        logger.info(f"{label} complete — no instances returned")
+        return total_updates
+
     logger.info(
-        f"Assets complete — {mode}: {batch_count} examined, {total_updates} updated"
+        f"{label} complete — {mode}: {examined} examined, {changed} changed, "
+        f"{examined - changed} unchanged or skipped, {total_updates} updated"
     )
 
     return total_updates
@@ -320,6 +340,199 @@ def update_pipeline_run(
 
 
 
+def iter_new_items(
+    client: CogniteClient,
+    logger: CogniteFunctionLogger,
+    view_id: ViewId,
+    config: Config,
+    node_type: str,
+    page_size: int = PAGE_SIZE,
+) -> Iterator[NodeList[Node]]:
+    """
+    Yield the items to update in pages of at most ``page_size`` nodes.
+
+    Pages are sorted by externalId and each page is read with ``externalId > last
+    externalId of the previous page``, so updates applied between pages (which drop
+    items out of the incremental filter) do not shift the pages still to come.
+    """
+
+    logger.debug(f"Getting new {node_type} from view: {view_id} ")
+
+    # Set the filter for the query
+    if node_type == TS_NODE:
+        view_config = config.data.job.timeseries_view
+        debug_item = config.parameters.debug_timeseries if config.parameters.debug else None
+        filter_query = get_ts_filter(
+            view_config, debug_item, effective_run_all(config), logger
+        )
+    else:  # ASSET_NODE
+        view_config = config.data.job.asset_view
+        filter_query = get_asset_filter(view_config, logger, effective_run_all(config))
+
+    last_external_id: str | None = None
+    while True:
+        page_filter = filter_query
+        if last_external_id is not None:
+            page_filter = dm.filters.And(
+                filter_query, dm.filters.Range(NODE_EXTERNAL_ID, gt=last_external_id)
+            )
+
+        page = _list_page(
+            client, logger, view_config, view_id, page_filter, page_size, node_type, last_external_id
+        )
+        logger.debug(f"Query returned {len(page)} {node_type} instances after externalId: {last_external_id}")
+        if not page:
+            return
+
+        yield page
+
+        if len(page) < page_size:
+            return
+        last_external_id = page[-1].external_id
+
+
+def iter_changed_items(
+    client: CogniteClient,
+    logger: CogniteFunctionLogger,
+    config: Config,
+    node_type: str,
+) -> Iterator[list[Node]]:
+    """
+    Yield the items created or changed since the last run, page by page (`incremental` mode).
+
+    Items are read with a DMS sync query from the cursor in the state store; runAll and
+    updateAll sync from scratch, which returns every instance. The cursor after a page is
+    stored when the next page is requested, i.e. once the caller has applied the page, so a
+    failed or stopped run continues after the last applied page. Deleted instances are
+    skipped.
+    """
+
+    if node_type == TS_NODE:
+        view_config, state_key = config.data.job.timeseries_view, STAT_STORE_TIMESERIES_SYNC
+    else:  # ASSET_NODE
+        view_config, state_key = config.data.job.asset_view, STAT_STORE_ASSET_SYNC
+
+    cursor = None
+    if not effective_run_all(config):
+        cursor = load_cursor(read_state_store(client, config, logger, state_key), view_config)
+    if cursor is None:
+        logger.info(f"No sync cursor for {node_type} (or a full rebuild was requested), syncing all instances")
+
+    saved_cursor = cursor
+    for page, page_cursor in _sync_with_restart(client, logger, view_config, cursor):
+        changed = [node for node in page if not node.deleted_time]
+        logger.debug(f"Sync returned {len(page)} {node_type} changes, {len(changed)} to process")
+        if changed:
+            yield changed
+        if page_cursor != saved_cursor:
+            update_state_store(client, config, logger, dump_cursor(page_cursor, view_config), state_key)
+            saved_cursor = page_cursor
+
+
+def _sync_with_restart(
+    client: CogniteClient,
+    logger: CogniteFunctionLogger,
+    view_config: ViewPropertyConfig,
+    cursor: str | None,
+) -> Iterator[tuple[list[Node], str | None]]:
+    """`sync_view` pages; if the cursor has expired, sync the view from scratch."""
+    try:
+        yield from sync_view(client, view_config, cursor)
+    except SyncCursorExpiredError as e:
+        logger.warning(f"Sync cursor for {view_config.as_view_id()} expired, syncing from scratch ({e})")
+        yield from sync_view(client, view_config, None)
+
+
+def read_state_store(
+    client: CogniteClient,
+    config: Config,
+    logger: CogniteFunctionLogger,
+    key: str,
+) -> str:
+    value = None
+    db = config.parameters.raw_db
+    table = config.parameters.raw_table_state
+
+    logger.debug(f"Read state from DB: {db} Table: {table} Key: {key}")
+
+    create_table(client, db, table)
+
+    row_list = client.raw.rows.list(db_name=db, table_name=table, columns=[STAT_STORE_VALUE], limit=-1)
+    for row in row_list:
+        if row.key == key and row.columns:
+            value = row.columns[STAT_STORE_VALUE]
+
+    return value or ""
+
+
+def update_state_store(
+    client: CogniteClient,
+    config: Config,
+    logger: CogniteFunctionLogger,
+    value: str,
+    key: str,
+) -> None:
+    logger.debug(f"Update state {key} in DB: {config.parameters.raw_db} Table: {config.parameters.raw_table_state}")
+    state_row = Row(key, {STAT_STORE_VALUE: value})
+    client.raw.rows.insert(config.parameters.raw_db, config.parameters.raw_table_state, state_row, ensure_parent=True)
+
+
+def create_table(client: CogniteClient, raw_db: str, tbl: str) -> None:
+    try:
+        client.raw.databases.create(raw_db)
+    except Exception:
+        # Resource may already exist when the pipeline is re-run.
+        pass
+
+    try:
+        client.raw.tables.create(raw_db, tbl)
+    except Exception:
+        # Resource may already exist when the pipeline is re-run.
+        pass
+
+
+def _is_retryable(error: CogniteAPIError) -> bool:
+    return error.code in RETRYABLE_STATUS_CODES or (error.code or 0) >= 500
+
+
+def _list_page(
+    client: CogniteClient,
+    logger: CogniteFunctionLogger,
+    view_config: ViewPropertyConfig,
+    view_id: ViewId,
+    page_filter: dm.filters.Filter,
+    page_size: int,
+    node_type: str,
+    cursor: str | None,
+) -> NodeList[Node]:
+    """List one page of items sorted by externalId, retrying throttling and server errors with backoff."""
+    for attempt in range(PAGE_MAX_RETRIES + 1):
+        try:
+            return client.data_modeling.instances.list(
+                instance_type="node",
+                space=view_config.instance_space,
+                sources=[view_id],
+                filter=page_filter,
+                sort=dm.InstanceSort(NODE_EXTERNAL_ID, direction="ascending"),
+                limit=page_size,
+            )
+        except CogniteAPIError as e:
+            if not _is_retryable(e) or attempt >= PAGE_MAX_RETRIES:
+                logger.error(
+                    f"Failed to fetch {node_type} page after {attempt + 1} attempt(s). "
+                    f"Last externalId: {cursor}. Error: {e}"
+                )
+                raise
+
+            sleep_seconds = PAGE_RETRY_BACKOFF_SECONDS * (2 ** attempt)
+            logger.warning(
+                f"API error (attempt {attempt + 1}/{PAGE_MAX_RETRIES + 1}) fetching {node_type} page, "
+                f"retrying in {sleep_seconds}s: {e}"
+            )
+            time.sleep(sleep_seconds)
+    return NodeList([])
+
+
 def get_new_items(
     client: CogniteClient,
     logger: CogniteFunctionLogger,
@@ -328,46 +541,16 @@ def get_new_items(
     node_type: str,
 ) -> NodeList[Node] | None:
     """
-    Get new items with enhanced error handling and retry logic
+    Get all new items in one list. Holds every item in memory; the pipeline uses
+    `iter_new_items` instead.
     """
     
     try:
-        logger.debug(f"Getting new {node_type} from view: {view_id} ")
-        
-        # Set the filter for the query
-        if node_type == TS_NODE:
-            view_config = config.data.job.timeseries_view
-            debug_item = config.parameters.debug_timeseries if config.parameters.debug else None
-            filter_query = get_ts_filter(
-                view_config, debug_item, effective_run_all(config), logger
-            )
-        else:  # ASSET_NODE
-            view_config = config.data.job.asset_view
-            filter_query = get_asset_filter(view_config, logger, effective_run_all(config))
-        
-        # Query with retry logic
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                result = client.data_modeling.instances.list(
-                    instance_type="node",
-                    space=view_config.instance_space,
-                    sources=[view_id],
-                    filter=filter_query,
-                    limit=BATCH_SIZE
-                )
-                
-                logger.debug(f"Query returned {len(result)} {node_type} instances")
-                return result
-                
-            except CogniteAPIError as e:
-                if e.code == 400 and attempt < max_retries - 1:
-                    logger.warning(f"API error (attempt {attempt + 1}): {e}")
-                    continue
-                else:
-                    raise
-        
-        return None
+        return NodeList([
+            node
+            for page in iter_new_items(client, logger, view_id, config, node_type)
+            for node in page
+        ])
         
     except Exception as e:
         logger.error(f"Failed to get new items: {e}")
@@ -432,6 +615,9 @@ __all__ = [
     'get_asset_filter',
     'get_new_items',
     'get_ts_filter',
+    'iter_changed_items',
+    'iter_new_items',
     'metadata_update',
-    'update_pipeline_run'
+    'update_pipeline_run',
+    'uses_sync'
 ]
\ No newline at end of file
@@ -0,0 +1,86 @@
+"""Tests for the metadata update sync cursor helpers."""
+
+import sys
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.append(str(Path(__file__).parent))
+
+from cognite.client.exceptions import CogniteAPIError
+from config import ViewPropertyConfig
+from incremental_sync import (
+    SYNC_RESULT_KEY,
+    SyncCursorExpiredError,
+    dump_cursor,
+    load_cursor,
+    sync_view,
+)
+
+
+def _view(**kwargs) -> ViewPropertyConfig:
+    values = {"schemaSpace": "cdf_cdm", "instanceSpace": "inst_location", "externalId": "CogniteTimeSeries", "version": "v1"}
+    values.update(kwargs)
+    return ViewPropertyConfig(**values)
+
+
+class FakeSync:
+    """
+    In-memory `instances.sync` over a change log; the cursor is the position in the log.
+
+    Each cursor in ``expired`` is rejected once.
+    """
+
+    def __init__(self, changes: list, expired: tuple[str, ...] = ()):
+        self.changes = changes
+        self.expired = set(expired)
+        self.queries = []
+
+    def sync(self, query):
+        self.queries.append(query)
+        cursor = query.cursors[SYNC_RESULT_KEY]
+        if cursor in self.expired:
+            self.expired.discard(cursor)
+            raise CogniteAPIError("Cursor has expired", code=400)
+        start = int(cursor or 0)
+        page = self.changes[start:start + query.with_[SYNC_RESULT_KEY].limit]
+        return SimpleNamespace(
+            get=lambda key: page,
+            cursors={SYNC_RESULT_KEY: str(start + len(page))},
+        )
+
+
+class TestSyncCursor(unittest.TestCase):
+    def test_cursor_round_trip(self) -> None:
+        view = _view()
+        self.assertEqual(load_cursor(dump_cursor("abc", view), view), "abc")
+        self.assertIsNone(load_cursor("", view))
+        self.assertIsNone(load_cursor("not json", view))
+
+    def test_changed_view_configuration_invalidates_cursor(self) -> None:
+        state = dump_cursor("abc", _view())
+        self.assertIsNone(load_cursor(state, _view(instanceSpace="other_space")))
+        self.assertIsNone(load_cursor(state, _view(version="v2")))
+
+
+class TestSyncView(unittest.TestCase):
+    def test_pages_until_empty_and_resumes_from_cursor(self) -> None:
+        instances = FakeSync(list(range(5)))
+        client = SimpleNamespace(data_modeling=SimpleNamespace(instances=instances))
+
+        pages = list(sync_view(client, _view(), None, page_size=2))
+
+        self.assertEqual([page for page, _ in pages], [[0, 1], [2, 3], [4], []])
+        self.assertEqual(pages[-1][1], "5")
+        instances.changes.append(5)
+        self.assertEqual([page for page, _ in sync_view(client, _view(), pages[-1][1])], [[5], []])
+
+    def test_expired_cursor(self) -> None:
+        client = SimpleNamespace(data_modeling=SimpleNamespace(instances=FakeSync([1], expired=("3",))))
+        with self.assertRaises(SyncCursorExpiredError):
+            list(sync_view(client, _view(), "3"))
+        self.assertEqual([page for page, _ in sync_view(client, _view(), None)], [[1], []])
+
+
+if __name__ == "__main__":
+    unittest.main()
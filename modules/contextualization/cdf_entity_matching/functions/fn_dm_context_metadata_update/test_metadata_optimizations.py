@@ -18,6 +18,8 @@ from cognite.client.data_classes.data_modeling import NodeApply, ViewId
 
 from logger import CogniteFunctionLogger  # isort: skip
 from metadata_optimizations import (  # isort: skip
+    ALIAS_PATTERN,
+    AliasEngine,
     BatchProcessor,
     OptimizedMetadataProcessor,
     PerformanceBenchmark,
@@ -182,9 +184,9 @@ class TestOptimizedMetadataProcessor(unittest.TestCase):
 
         print("✅ Timeseries updateAll unmanaged alias test passed")
 
-    def test_timeseries_update_all_applies_even_when_aliases_already_correct(self) -> None:
-        """Test updateAll writes managed metadata even when values already match"""
-        print("🧪 Testing timeseries updateAll re-apply...")
+    def test_timeseries_update_all_skips_when_aliases_already_correct(self) -> None:
+        """Test updateAll does not rewrite managed metadata that already matches"""
+        print("🧪 Testing timeseries updateAll skip unchanged...")
 
         node = MagicMock()
         node.external_id = "pi:160004"
@@ -199,10 +201,53 @@ class TestOptimizedMetadataProcessor(unittest.TestCase):
             node, self.view_id, "inst_location", update_all=True
         )
 
+        self.assertIsNone(result)
+        self.assertEqual(self.processor.get_stats()["unchanged"], 1)
+
+        print("✅ Timeseries updateAll skip unchanged test passed")
+
+    def test_timeseries_update_all_ignores_alias_order(self) -> None:
+        """Test updateAll compares rebuilt aliases with the stored ones regardless of order"""
+        print("🧪 Testing timeseries updateAll alias order...")
+
+        node = MagicMock()
+        node.external_id = "pi:160006"
+        node.properties = {
+            self.view_id: {
+                "name": "VAL_23-KA-9101:X.Value",
+                "aliases": ["23_KA_9101", "operator note"],
+            }
+        }
+
+        result = self.processor.process_timeseries_metadata(
+            node, self.view_id, "inst_location", update_all=True
+        )
+
+        self.assertIsNone(result)
+
+        print("✅ Timeseries updateAll alias order test passed")
+
+    def test_timeseries_update_all_removes_duplicate_managed_alias(self) -> None:
+        """Test updateAll still writes when the stored aliases hold a duplicate"""
+        print("🧪 Testing timeseries updateAll duplicate alias...")
+
+        node = MagicMock()
+        node.external_id = "pi:160007"
+        node.properties = {
+            self.view_id: {
+                "name": "VAL_23-KA-9101:X.Value",
+                "aliases": ["23_KA_9101", "23_KA_9101"],
+            }
+        }
+
+        result = self.processor.process_timeseries_metadata(
+            node, self.view_id, "inst_location", update_all=True
+        )
+
         self.assertIsNotNone(result)
         self.assertEqual(result.sources[0].properties["aliases"], ["23_KA_9101"])
 
-        print("✅ Timeseries updateAll re-apply test passed")
+        print("✅ Timeseries updateAll duplicate alias test passed")
 
     def test_asset_update_all_replaces_stale_managed_alias(self) -> None:
         """Test updateAll drops managed aliases but keeps unmanaged ones"""
@@ -237,9 +282,9 @@ class TestOptimizedMetadataProcessor(unittest.TestCase):
 
         print("✅ Asset updateAll test passed")
 
-    def test_asset_update_all_applies_even_when_metadata_already_correct(self) -> None:
-        """Test updateAll writes managed asset metadata even when values already match"""
-        print("🧪 Testing asset updateAll re-apply...")
+    def test_asset_update_all_skips_when_metadata_already_correct(self) -> None:
+        """Test updateAll does not rewrite asset metadata that already matches, in any order"""
+        print("🧪 Testing asset updateAll skip unchanged...")
 
         asset_view_id = ViewId(space="cdf_cdm", external_id="CogniteAsset", version="v1")
         node = MagicMock()
@@ -248,7 +293,32 @@ class TestOptimizedMetadataProcessor(unittest.TestCase):
             asset_view_id: {
                 "name": "23-KA-9101",
                 "aliases": ["23_KA_9101"],
-                "tags": ["discipline:KA", "root:VAL-PH"],
+                "tags": ["root:VAL-PH", "discipline:KA"],
+                "root": {"space": "inst_location", "externalId": "VAL-PH"},
+            }
+        }
+
+        result = self.processor.process_asset_metadata(
+            node, asset_view_id, "inst_location", update_all=True
+        )
+
+        self.assertIsNone(result)
+        self.assertEqual(self.processor.get_stats()["unchanged"], 1)
+
+        print("✅ Asset updateAll skip unchanged test passed")
+
+    def test_asset_update_all_writes_only_changed_properties(self) -> None:
+        """Test updateAll writes the tags when only the root tag changed"""
+        print("🧪 Testing asset updateAll changed tags only...")
+
+        asset_view_id = ViewId(space="cdf_cdm", external_id="CogniteAsset", version="v1")
+        node = MagicMock()
+        node.external_id = "23-KA-9101"
+        node.properties = {
+            asset_view_id: {
+                "name": "23-KA-9101",
+                "aliases": ["23_KA_9101"],
+                "tags": ["discipline:KA", "root:old_root"],
                 "root": {"space": "inst_location", "externalId": "VAL-PH"},
             }
         }
@@ -259,10 +329,10 @@ class TestOptimizedMetadataProcessor(unittest.TestCase):
 
         self.assertIsNotNone(result)
         properties = result.sources[0].properties
-        self.assertEqual(properties["aliases"], ["23_KA_9101"])
-        self.assertIn("root:VAL-PH", properties["tags"])
+        self.assertNotIn("aliases", properties)
+        self.assertEqual(properties["tags"], ["discipline:KA", "root:VAL-PH"])
 
-        print("✅ Asset updateAll re-apply test passed")
+        print("✅ Asset updateAll changed tags only test passed")
 
     def test_asset_incremental_adds_root_tag_from_relation(self) -> None:
         """Test incremental asset processing adds root tag from relation external id"""
@@ -432,32 +502,28 @@ class TestOptimizedMetadataProcessor(unittest.TestCase):
 
         print("✅ Timeseries skip on None properties test passed")
 
-    def test_alias_generation_caching(self) -> None:
-        """Test alias generation with caching"""
-        print("🧪 Testing alias generation caching...")
-
-        tag = "VAL_23-KA-9101:X.Value"
+    def test_batch_matches_single_node_processing(self) -> None:
+        """Test page processing gives the same updates as processing node by node"""
+        print("🧪 Testing batch processing...")
 
-        # Test timeseries alias generation
-        aliases1 = self.processor._get_timeseries_alias_list_optimized(
-            tag, ("existing",)
-        )
-        aliases2 = self.processor._get_timeseries_alias_list_optimized(
-            tag, ("existing",)
-        )  # Should use cache
+        nodes = []
+        for i, name in enumerate(["VAL_23-KA-9101:X.Value", "VAL_23-KA-9101:X.Value", "no tag", "VAL_45-PT-10001"]):
+            node = MagicMock()
+            node.external_id = f"ts_{i}"
+            node.properties = {self.view_id: {"name": name, "aliases": ["existing"] if i % 2 else []}}
+            nodes.append(node)
 
-        self.assertEqual(aliases1, aliases2)
-        self.assertIn("existing", aliases1)
-        self.assertIn("23_KA_9101", aliases1)
+        batch = self.processor.process_timeseries_batch(nodes, self.view_id, "inst_location")
+        single = [self.processor.process_timeseries_metadata(node, self.view_id, "inst_location") for node in nodes]
 
-        # Test asset alias generation
-        asset_aliases = self.processor._get_asset_alias_list_optimized(
-            "23-KA-9101", ("existing",)
+        self.assertEqual(
+            [update.dump() if update else None for update in batch],
+            [update.dump() if update else None for update in single],
         )
-        self.assertIn("existing", asset_aliases)
-        self.assertIn("23_KA_9101", asset_aliases)
+        self.assertEqual(batch[1].sources[0].properties["aliases"], ["existing", "23_KA_9101"])
+        self.assertIsNone(batch[2])
 
-        print("✅ Alias generation caching test passed")
+        print("✅ Batch processing test passed")
 
     def test_processing_statistics(self) -> None:
         """Test processing statistics collection"""
@@ -476,6 +542,46 @@ class TestOptimizedMetadataProcessor(unittest.TestCase):
         print("✅ Processing statistics test passed")
 
 
+class TestAliasEngine(unittest.TestCase):
+    """Test batch alias generation"""
+
+    def test_managed_aliases_for_a_column_of_names(self) -> None:
+        engine = AliasEngine()
+
+        aliases = engine.managed_aliases(["VAL_23-KA-9101:X.Value", "no tag", "45.PT.10001"])
+
+        self.assertEqual(aliases, ("23_KA_9101", None, "45_PT_10001"))
+
+    def test_repeated_names_are_searched_once(self) -> None:
+        pattern = MagicMock(wraps=ALIAS_PATTERN)
+        engine = AliasEngine(pattern=pattern)
+
+        aliases = engine.managed_aliases(["23-KA-9101", "23-KA-9101", "no tag", "23-KA-9101"])
+
+        self.assertEqual(aliases, ("23_KA_9101", "23_KA_9101", None, "23_KA_9101"))
+        self.assertEqual(pattern.search.call_count, 2)
+
+    def test_results_cannot_leak_between_instances(self) -> None:
+        """Changing one node's update must not change another node's update with the same name"""
+        processor = OptimizedMetadataProcessor(CogniteFunctionLogger("ERROR"))
+        view_id = ViewId(space="cdf_cdm", external_id="CogniteTimeSeries", version="v1")
+        nodes = []
+        for i in range(2):
+            node = MagicMock()
+            node.external_id = f"ts_{i}"
+            node.properties = {view_id: {"name": "VAL_23-KA-9101", "aliases": []}}
+            nodes.append(node)
+
+        first, second = processor.process_timeseries_batch(nodes, view_id, "inst_location")
+        first.sources[0].properties["aliases"].append("changed")
+
+        self.assertEqual(second.sources[0].properties["aliases"], ["23_KA_9101"])
+        self.assertEqual(
+            processor.process_timeseries_metadata(nodes[0], view_id, "inst_location").sources[0].properties["aliases"],
+            ["23_KA_9101"],
+        )
+
+
 class TestPerformanceBenchmark(unittest.TestCase):
     """Test performance benchmarking"""
 
@@ -578,17 +684,15 @@ class TestIntegrationScenarios(unittest.TestCase):
         start_time = time.time()
 
         for i in range(1000):
-            # Test cached operations
-            aliases = processor._get_timeseries_alias_list_optimized(
-                f"test-item-{i % 10}", ("existing",)  # Reuse names to test caching
-            )
-            self.assertIsInstance(aliases, list)
+            # Repeated names are generated once per page
+            aliases = processor.alias_engine.managed_aliases([f"VAL_23-KA-{9100 + i % 10}"])
+            self.assertEqual(aliases, (f"23_KA_{9100 + i % 10}",))
 
         end_time = time.time()
         processing_time = end_time - start_time
 
         print(f"   Processed 1000 items in {processing_time:.3f}s")
-        self.assertLess(processing_time, 1.0)  # Should be very fast due to caching
+        self.assertLess(processing_time, 1.0)  # Should be very fast
 
         print("✅ Large dataset simulation test passed")
 
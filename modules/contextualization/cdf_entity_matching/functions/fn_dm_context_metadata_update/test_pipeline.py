@@ -1,6 +1,7 @@
 """Tests for metadata update pipeline helpers."""
 
 import sys
+import threading
 import unittest
 from pathlib import Path
 from unittest.mock import MagicMock, patch
@@ -8,7 +9,9 @@ from unittest.mock import MagicMock, patch
 sys.path.append(str(Path(__file__).parent))
 
 from cognite.client import data_modeling as dm
+from cognite.client.exceptions import CogniteAPIError
 from config import Config, ConfigData, JobConfig, Parameters, ViewPropertyConfig
+from incremental_sync import dump_cursor
 from logger import CogniteFunctionLogger
 from pipeline import (
     _process_assets_optimized,
@@ -17,6 +20,9 @@ from pipeline import (
     effective_run_all,
     get_asset_filter,
     get_ts_filter,
+    iter_changed_items,
+    iter_new_items,
+    metadata_update,
 )
 
 
@@ -81,15 +87,15 @@ class TestPipelineHelpers(unittest.TestCase):
         filter_query = get_asset_filter(self.view_config, self.logger, run_all=True)
         self.assertIsInstance(filter_query, dm.filters.HasData)
 
-    def test_process_timeseries_fetches_once_in_incremental_mode(self) -> None:
-        """Incremental mode must fetch once; get_new_items already returns every match."""
+    def test_process_timeseries_reads_items_once_in_incremental_mode(self) -> None:
+        """Incremental mode must read once; iter_new_items already pages through every match."""
         config = self._config(run_all=False, update_all=False)
         processor = MagicMock()
-        processor.process_timeseries_metadata.return_value = MagicMock()
+        processor.process_timeseries_batch.side_effect = lambda nodes, *args, **kwargs: [MagicMock() for _ in nodes]
         batch_processor = MagicMock()
         batch_processor.apply_updates_in_batches.return_value = 2
 
-        with patch("pipeline.get_new_items", return_value=[MagicMock(), MagicMock()]) as fetch:
+        with patch("pipeline.iter_new_items", return_value=iter([[MagicMock(), MagicMock()]])) as fetch:
             total = _process_timeseries_optimized(
                 MagicMock(), self.logger, config, processor, batch_processor
             )
@@ -97,15 +103,15 @@ class TestPipelineHelpers(unittest.TestCase):
         self.assertEqual(fetch.call_count, 1)
         self.assertEqual(total, 2)
 
-    def test_process_assets_fetches_once_in_incremental_mode(self) -> None:
-        """Incremental mode must fetch once; get_new_items already returns every match."""
+    def test_process_assets_reads_items_once_in_incremental_mode(self) -> None:
+        """Incremental mode must read once; iter_new_items already pages through every match."""
         config = self._config(run_all=False, update_all=False)
         processor = MagicMock()
-        processor.process_asset_metadata.return_value = MagicMock()
+        processor.process_asset_batch.side_effect = lambda nodes, *args, **kwargs: [MagicMock() for _ in nodes]
         batch_processor = MagicMock()
         batch_processor.apply_updates_in_batches.return_value = 2
 
-        with patch("pipeline.get_new_items", return_value=[MagicMock(), MagicMock()]) as fetch:
+        with patch("pipeline.iter_new_items", return_value=iter([[MagicMock(), MagicMock()]])) as fetch:
             total = _process_assets_optimized(
                 MagicMock(), self.logger, config, processor, batch_processor
             )
@@ -116,13 +122,222 @@ class TestPipelineHelpers(unittest.TestCase):
     def test_process_timeseries_handles_empty_fetch(self) -> None:
         config = self._config(run_all=False, update_all=False)
 
-        with patch("pipeline.get_new_items", return_value=None):
+        with patch("pipeline.iter_new_items", return_value=iter([])):
             total = _process_timeseries_optimized(
                 MagicMock(), self.logger, config, MagicMock(), MagicMock()
             )
 
         self.assertEqual(total, 0)
 
+    def test_process_timeseries_applies_each_page_before_reading_the_next(self) -> None:
+        config = self._config(run_all=False, update_all=False)
+        processor = MagicMock()
+        processor.process_timeseries_batch.side_effect = lambda nodes, *args, **kwargs: [MagicMock() for _ in nodes]
+        batch_processor = MagicMock()
+        events = []
+
+        def pages(*args, **kwargs):
+            for page in ([MagicMock(), MagicMock()], [MagicMock()]):
+                events.append(f"read {len(page)}")
+                yield page
+
+        batch_processor.apply_updates_in_batches.side_effect = (
+            lambda client, updates, logger: events.append(f"apply {len(updates)}") or len(updates)
+        )
+        with patch("pipeline.iter_new_items", side_effect=pages):
+            total = _process_timeseries_optimized(
+                MagicMock(), self.logger, config, processor, batch_processor
+            )
+
+        self.assertEqual(events, ["read 2", "apply 2", "read 1", "apply 1"])
+        self.assertEqual(total, 3)
+
+
+class TestIterNewItems(unittest.TestCase):
+    def setUp(self) -> None:
+        self.logger = CogniteFunctionLogger("DEBUG")
+        view = ViewPropertyConfig(
+            schemaSpace="cdf_cdm",
+            instanceSpace="inst_location",
+            externalId="CogniteTimeSeries",
+            version="v1",
+        )
+        self.config = Config(
+            parameters=Parameters(debug=False, runAll=True, rawDb="db", rawTableState="state"),
+            data=ConfigData(job=JobConfig(timeseriesView=view, assetView=view)),
+        )
+        self.view_id = view.as_view_id()
+
+    @staticmethod
+    def _nodes(*external_ids: str) -> list[MagicMock]:
+        return [MagicMock(external_id=external_id) for external_id in external_ids]
+
+    def test_pages_with_external_id_cursor(self) -> None:
+        client = MagicMock()
+        client.data_modeling.instances.list.side_effect = [self._nodes("a", "b"), self._nodes("c")]
+
+        pages = list(iter_new_items(client, self.logger, self.view_id, self.config, "timeseries", page_size=2))
+
+        self.assertEqual([[node.external_id for node in page] for page in pages], [["a", "b"], ["c"]])
+        calls = client.data_modeling.instances.list.call_args_list
+        self.assertEqual(len(calls), 2)
+        self.assertIsInstance(calls[0].kwargs["filter"], dm.filters.HasData)
+        self.assertIn({"range": {"property": ["node", "externalId"], "gt": "b"}}, calls[1].kwargs["filter"].dump()["and"])
+        self.assertEqual(calls[1].kwargs["limit"], 2)
+
+    def test_stops_on_empty_page(self) -> None:
+        client = MagicMock()
+        client.data_modeling.instances.list.side_effect = [self._nodes("a", "b"), []]
+
+        pages = list(iter_new_items(client, self.logger, self.view_id, self.config, "timeseries", page_size=2))
+
+        self.assertEqual(len(pages), 1)
+        self.assertEqual(client.data_modeling.instances.list.call_count, 2)
+
+    def test_retries_throttling_and_server_errors(self) -> None:
+        client = MagicMock()
+        client.data_modeling.instances.list.side_effect = [
+            CogniteAPIError("throttled", code=429),
+            CogniteAPIError("unavailable", code=503),
+            self._nodes("a"),
+        ]
+
+        with patch("pipeline.time.sleep") as sleep:
+            pages = list(iter_new_items(client, self.logger, self.view_id, self.config, "timeseries", page_size=2))
+
+        self.assertEqual(len(pages), 1)
+        self.assertEqual(sleep.call_count, 2)
+
+    def test_does_not_retry_client_errors(self) -> None:
+        client = MagicMock()
+        client.data_modeling.instances.list.side_effect = CogniteAPIError("bad request", code=400)
+
+        with patch("pipeline.time.sleep") as sleep, self.assertRaises(CogniteAPIError):
+            list(iter_new_items(client, self.logger, self.view_id, self.config, "timeseries"))
+
+        sleep.assert_not_called()
+        self.assertEqual(client.data_modeling.instances.list.call_count, 1)
+
+
+class TestIterChangedItems(unittest.TestCase):
+    def setUp(self) -> None:
+        self.logger = CogniteFunctionLogger("ERROR")
+        self.view = ViewPropertyConfig(
+            schemaSpace="cdf_cdm",
+            instanceSpace="inst_location",
+            externalId="CogniteTimeSeries",
+            version="v1",
+        )
+
+    def _config(self, run_all: bool = False) -> Config:
+        return Config(
+            parameters=Parameters(debug=False, runAll=run_all, incremental=True, rawDb="db", rawTableState="state"),
+            data=ConfigData(job=JobConfig(timeseriesView=self.view, assetView=self.view)),
+        )
+
+    @staticmethod
+    def _node(external_id: str, deleted: bool = False) -> MagicMock:
+        return MagicMock(external_id=external_id, deleted_time=1 if deleted else None)
+
+    def _iter(self, config: Config, pages: list, stored: str = "") -> tuple[list, MagicMock, MagicMock]:
+        sync = MagicMock(return_value=iter(pages))
+        with patch("pipeline.sync_view", sync), \
+                patch("pipeline.read_state_store", return_value=stored), \
+                patch("pipeline.update_state_store") as update:
+            items = [[node.external_id for node in page] for page in iter_changed_items(MagicMock(), self.logger, config, "timeseries")]
+        return items, sync, update
+
+    def test_skips_deleted_and_stores_cursor_per_page(self) -> None:
+        pages = [
+            ([self._node("a"), self._node("b", deleted=True)], "c1"),
+            ([self._node("b", deleted=True)], "c2"),
+            ([], "c2"),
+        ]
+
+        items, sync, update = self._iter(self._config(), pages, stored=dump_cursor("c0", self.view))
+
+        self.assertEqual(items, [["a"]])
+        self.assertEqual(sync.call_args.args[2], "c0")
+        self.assertEqual(
+            [call.args[3] for call in update.call_args_list],
+            [dump_cursor("c1", self.view), dump_cursor("c2", self.view)],
+        )
+
+    def test_cursor_stored_only_after_the_page_is_consumed(self) -> None:
+        sync = MagicMock(return_value=iter([([self._node("a")], "c1"), ([], "c1")]))
+        with patch("pipeline.sync_view", sync), \
+                patch("pipeline.read_state_store", return_value=""), \
+                patch("pipeline.update_state_store") as update:
+            pages = iter_changed_items(MagicMock(), self.logger, self._config(), "timeseries")
+            next(pages)
+            update.assert_not_called()
+            list(pages)
+
+        update.assert_called_once()
+
+    def test_run_all_syncs_from_scratch(self) -> None:
+        _items, sync, _update = self._iter(self._config(run_all=True), [([], "c9")], stored=dump_cursor("c0", self.view))
+
+        self.assertIsNone(sync.call_args.args[2])
+
+    def test_process_uses_sync_when_incremental(self) -> None:
+        processor = MagicMock()
+        processor.process_timeseries_batch.side_effect = lambda nodes, *args, **kwargs: [None for _ in nodes]
+
+        with patch("pipeline.iter_changed_items", return_value=iter([[MagicMock()]])) as changed, \
+                patch("pipeline.iter_new_items") as full:
+            _process_timeseries_optimized(MagicMock(), self.logger, self._config(), processor, MagicMock())
+
+        changed.assert_called_once()
+        full.assert_not_called()
+
+
+class TestMetadataUpdate(unittest.TestCase):
+    def setUp(self) -> None:
+        self.logger = CogniteFunctionLogger("ERROR")
+        view = ViewPropertyConfig(
+            schemaSpace="cdf_cdm",
+            instanceSpace="inst_location",
+            externalId="CogniteTimeSeries",
+            version="v1",
+        )
+        self.config = Config(
+            parameters=Parameters(debug=False, runAll=False, rawDb="db", rawTableState="state"),
+            data=ConfigData(job=JobConfig(timeseriesView=view, assetView=view)),
+        )
+        self.data = {"ExtractionPipelineExtId": "ep_metadata"}
+
+    def _statuses(self, client: MagicMock) -> list[str]:
+        return [call.args[0].status for call in client.extraction_pipelines.runs.create.call_args_list]
+
+    @patch("pipeline.optimize_metadata_processing")
+    def test_timeseries_and_assets_run_concurrently(self, _optimize: MagicMock) -> None:
+        """Each pass waits for the other to start, which only completes if they run at the same time."""
+        barrier = threading.Barrier(2, timeout=5)
+        client = MagicMock()
+
+        def process(*args) -> int:
+            barrier.wait()
+            return 1
+
+        with patch("pipeline._process_timeseries_optimized", side_effect=process), \
+                patch("pipeline._process_assets_optimized", side_effect=process):
+            metadata_update(client, self.logger, self.data, self.config)
+
+        self.assertEqual(self._statuses(client), ["success", "success"])
+
+    @patch("pipeline.optimize_metadata_processing")
+    def test_failed_pass_does_not_stop_the_other(self, _optimize: MagicMock) -> None:
+        client = MagicMock()
+
+        with patch("pipeline._process_timeseries_optimized", side_effect=RuntimeError("boom")), \
+                patch("pipeline._process_assets_optimized", return_value=3) as assets, \
+                self.assertRaises(RuntimeError):
+            metadata_update(client, self.logger, self.data, self.config)
+
+        assets.assert_called_once()
+        self.assertEqual(self._statuses(client), ["success", "failure"])
+
 
 if __name__ == "__main__":
     unittest.main()
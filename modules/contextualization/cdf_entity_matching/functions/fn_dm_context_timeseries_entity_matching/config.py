@@ -1,4 +1,6 @@
 
+from typing import Literal
+
 import yaml
 from cognite.client import CogniteClient
 from cognite.client import data_modeling as dm
@@ -21,6 +23,9 @@ class Parameters(BaseModel, alias_generator=to_camel):
     raw_tale_ctx_manual: str = None
     raw_tale_ctx_rule: str = None
     auto_approval_threshold: float = Field(gt=0.0, le=1.0)
+    matching_engine: Literal["cdf", "local"] = "cdf"
+    incremental: bool = False
+    raw_table_target_snapshot: str = "contextualization_target_snapshot"
 
 
 class ViewPropertyConfig(BaseModel, alias_generator=to_camel):
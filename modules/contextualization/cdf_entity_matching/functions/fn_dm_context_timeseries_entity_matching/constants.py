@@ -1,8 +1,17 @@
-STAT_STORE_MATCH_MODEL_ID = "state_match_model_id"
+STAT_STORE_MATCH_MODELS = "state_match_models"  # registry of fitted models (kept when runAll resets the state)
+STAT_STORE_TARGET_PARTITIONS = "state_target_partitions"  # externalId split points from the last target read
+STAT_STORE_PREDICT_JOBS = "state_predict_jobs"  # prediction jobs still pending (resumed by the next run)
+STAT_STORE_TARGET_SYNC = "state_target_sync"  # incremental mode: target view sync cursor
+STAT_STORE_ENTITY_SYNC = "state_entity_sync"  # incremental mode: entity view sync cursor
+STAT_STORE_RUN_CHECKPOINT = "state_run_checkpoint"  # entity watermark of an unfinished run
+STAT_STORE_LEGACY_MATCH_MODEL_ID = "state_match_model_id"  # single model ID of earlier versions (deleted once)
 STAT_STORE_VALUE = "value"
 FUNCTION_ID = "entity_matching"
 ML_MODEL_FEATURE_TYPE = "bigram-combo"
+MATCHING_ENGINE_CDF = "cdf"  # entity matching API in CDF (fit + prediction jobs)
+MATCHING_ENGINE_LOCAL = "local"  # in-process TF-IDF matcher (local_matcher.py)
 COL_MATCH_KEY = "name"
+MATCH_FIELDS = [(COL_MATCH_KEY, COL_MATCH_KEY)]
 
 # Manual mapping column names in RAW table
 COL_KEY_MAN_MAPPING_ENTITY = "TsExternalId"  # ExternalID for TS not mapped related to manual mapping
@@ -36,20 +45,51 @@ BATCH_SIZE_ENTITIES = 5000
 MATCHING_LIMIT_SOURCES_TARGETS = 10000
 MAX_LINKS_PER_ENTITY = 1000
 SCORE_MANUAL_RULE_MATCH = 1
-BATCH_SIZE_API_SUBMIT = 1000
+BATCH_SIZE_API_SUBMIT = 1000  # NodeApply items per data model write
+
+# Data model writes (background writer, see instance_writer.py)
+WRITE_WORKERS = 4  # chunks written at the same time
+MAX_PENDING_WRITE_CHUNKS = 8  # queued chunks before matching waits for the writer
+
+# RAW match tables (rows uploaded in the background as the matching stages produce them)
+RAW_UPLOAD_QUEUE_SIZE = 10000  # queued rows that trigger an upload
+RAW_UPLOAD_INTERVAL_SECONDS = 30  # queued rows are uploaded at least this often
+
+# Run checkpoint (an unfinished run is resumed by the next call, see run_checkpoint.py)
+CHECKPOINT_INTERVAL_SECONDS = 60  # minimum time between checkpoints while matching
+CHECKPOINT_MAX_AGE_SECONDS = 24 * 3600  # older checkpoints are ignored and the run starts over
+
+# Model registry (fitted models reused by fit parameters and target similarity)
+MODEL_REUSE_MIN_SIMILARITY = 0.95  # estimated Jaccard similarity of target sets needed to reuse a model
+MAX_CACHED_MODELS = 5  # least recently used models beyond this are deleted
+
+# Prediction jobs (sources split in chunks, run as concurrent jobs)
+PREDICT_CHUNK_SIZE = 20000  # sources per prediction job
+MAX_CONCURRENT_PREDICT_JOBS = 4
+PREDICT_POLL_INTERVAL_SECONDS = 5
+PREDICT_JOB_MAX_RETRIES = 1  # resubmissions of a failed prediction job before its sources are skipped
+
+# Target loading (externalId-partitioned, concurrent)
+TARGET_PAGE_SIZE = 1000
+TARGET_PAGE_MAX_RETRIES = 4
+TARGET_PAGE_RETRY_BACKOFF_SECONDS = 2
+TARGET_PARTITIONS = 32  # externalId ranges per target read (empty ranges cost one request)
+MAX_CONCURRENT_TARGET_PARTITIONS = 8  # ranges fetched at the same time
+
+# Target snapshot columns (incremental mode, one RAW row per target keyed by externalId)
+SNAPSHOT_COL_NAME = "name"
+SNAPSHOT_COL_MATCH_VALUES = "matchValues"
 
 # Query filter types for get_query_filter
 QUERY_FILTER_TYPE_TARGETS = "assets"  # assets property name in the asset view
 QUERY_FILTER_TYPE_ENTITIES = "entities"  # entities property name in the entity view
 
 # Match dict keys (internal structures and CDF entity matching API response)
-KEY_RULE_KEYS = "rule_keys"
 KEY_RULE = "key"
 KEY_ENTITY_EXT_ID = "entity_ext_id"
 KEY_TARGET_EXT_ID = "asset_ext_id"
 KEY_ORG_NAME = "org_name"
 KEY_NAME = "name"
-KEY_TARGET_LINKS = "assets"
 KEY_MATCH_TYPE = "match_type"
 KEY_SCORE = "score"
 KEY_SOURCE = "source"
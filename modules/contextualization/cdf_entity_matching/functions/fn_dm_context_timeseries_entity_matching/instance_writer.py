@@ -0,0 +1,166 @@
+"""
+Instance Writer Module
+
+Background writer for the data model updates of a matching run.
+
+The matching steps hand their `NodeApply` items to an `InstanceWriter`
+instead of applying them inline. Items are grouped into chunks of
+``BATCH_SIZE_API_SUBMIT`` and put on a bounded queue that a few worker
+threads drain, so matching continues while earlier results are written.
+When the queue is full, `add` blocks until a worker frees a slot, which
+keeps memory bounded if writing is slower than matching.
+
+Each chunk is applied with the retry policy of `RobustAPIClient`. A chunk
+that still fails is recorded and logged, and the other chunks are written
+as usual. `drain` waits until everything added so far is written (e.g.
+before a checkpoint), `close` also stops the workers and returns
+`WriteStats` (items, chunks, failures and per-chunk latency).
+"""
+
+import queue
+import threading
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+
+from cognite.client import CogniteClient
+from cognite.client.data_classes.data_modeling import NodeApply
+from constants import BATCH_SIZE_API_SUBMIT, MAX_PENDING_WRITE_CHUNKS, WRITE_WORKERS
+from logger import CogniteFunctionLogger
+from pipeline_optimizations import RobustAPIClient
+
+_STOP = None  # queue sentinel, one per worker
+
+
+@dataclass
+class WriteStats:
+    """Outcome of the writes of one `InstanceWriter`."""
+
+    items: int = 0
+    chunks: int = 0
+    failed_items: int = 0
+    failed_chunks: int = 0
+    skipped_items: int = 0
+    latencies: list[float] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)
+
+    def summary(self) -> str:
+        written = self.chunks - self.failed_chunks
+        text = f"{self.items - self.failed_items} items written in {written} chunks"
+        if self.latencies:
+            latencies = sorted(self.latencies)
+            text += f" (chunk latency avg {sum(latencies) / len(latencies):.2f}s, max {latencies[-1]:.2f}s)"
+        if self.failed_chunks:
+            text += f", {self.failed_items} items in {self.failed_chunks} chunks FAILED"
+        if self.skipped_items:
+            text += f", {self.skipped_items} items not written (dmUpdate: False or debug)"
+        return text
+
+
+class InstanceWriter:
+    """Applies `NodeApply` items in chunks on background threads."""
+
+    def __init__(
+        self,
+        client: CogniteClient,
+        logger: CogniteFunctionLogger,
+        enabled: bool = True,
+        chunk_size: int = BATCH_SIZE_API_SUBMIT,
+        workers: int = WRITE_WORKERS,
+        max_pending_chunks: int = MAX_PENDING_WRITE_CHUNKS,
+        apply: Callable[[list[NodeApply]], object] | None = None,
+    ) -> None:
+        self.logger = logger
+        self.enabled = enabled
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.stats = WriteStats()
+        if apply is None:
+            robust_client = RobustAPIClient(client, logger)
+            apply = lambda chunk: robust_client.robust_api_call(client.data_modeling.instances.apply, chunk)  # noqa: E731
+        self._apply = apply
+        self._buffer: list[NodeApply] = []
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending_chunks)
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __enter__(self) -> "InstanceWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def add(self, items: Iterable[NodeApply]) -> None:
+        """Queue ``items`` for writing; blocks while the queue is full."""
+        if self._closed:
+            raise RuntimeError("InstanceWriter is closed")
+        if not self.enabled:
+            self.stats.skipped_items += sum(1 for _ in items)
+            return
+        self._buffer.extend(items)
+        while len(self._buffer) >= self.chunk_size:
+            chunk, self._buffer = self._buffer[:self.chunk_size], self._buffer[self.chunk_size:]
+            self._submit(chunk)
+
+    def flush(self) -> None:
+        """Queue the buffered items as a (smaller) chunk."""
+        if self._buffer:
+            chunk, self._buffer = self._buffer, []
+            self._submit(chunk)
+
+    def drain(self) -> None:
+        """Write the buffered items and wait until all queued chunks are written."""
+        self.flush()
+        self._queue.join()
+
+    def close(self) -> WriteStats:
+        """Write the remaining items, wait for all chunks and stop the workers (idempotent)."""
+        if self._closed:
+            return self.stats
+        self.flush()
+        self._closed = True
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        if self.stats.chunks or self.stats.skipped_items:
+            log = self.logger.error if self.stats.failed_chunks else self.logger.info
+            log(f"Data model writes: {self.stats.summary()}")
+        return self.stats
+
+    def _submit(self, chunk: list[NodeApply]) -> None:
+        if len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"instance-writer-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self._queue.put(chunk)
+
+    def _work(self) -> None:
+        while (chunk := self._queue.get()) is not _STOP:
+            try:
+                self._write(chunk)
+            finally:
+                self._queue.task_done()
+        self._queue.task_done()
+
+    def _write(self, chunk: list[NodeApply]) -> None:
+        start = time.perf_counter()
+        try:
+            self._apply(chunk)
+            error = None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        latency = time.perf_counter() - start
+        with self._lock:
+            self.stats.chunks += 1
+            self.stats.items += len(chunk)
+            self.stats.latencies.append(latency)
+            if error:
+                self.stats.failed_chunks += 1
+                self.stats.failed_items += len(chunk)
+                self.stats.errors.append(error)
+        if error:
+            self.logger.error(f"Data model write of {len(chunk)} items failed after retries ({latency:.2f}s): {error}")
+        else:
+            self.logger.debug(f"Data model write of {len(chunk)} items took {latency:.2f}s")
@@ -0,0 +1,109 @@
+"""
+Local Matcher Module
+
+In-process alternative to the CDF entity matching API (`matchingEngine: local`).
+Names are compared as character n-gram TF-IDF vectors: every target name is
+split into overlapping n-grams (of the lower-cased name padded with spaces),
+weighted by inverse document frequency and L2-normalised. For each source,
+cosine similarities are accumulated over an inverted index from n-gram to
+targets. Candidates are collected from the postings of the source's less
+common n-grams only (at most ``MAX_CANDIDATE_POSTINGS`` targets each) and
+then scored on all n-grams, which keeps the search sparse when many names
+share a prefix such as a plant or unit code. The top ``num_matches`` are
+returned. As in scikit-learn's ``TfidfVectorizer``, n-grams no target has are
+ignored in the source vector.
+
+`LocalMatcher.predict` returns the same structure as the items of a CDF
+prediction job, ``{"source": ..., "matches": [{"score": ..., "target": ...}]}``,
+so the rest of the pipeline does not depend on the engine. No model is
+fitted or stored: the index is built from the targets of the current run.
+"""
+
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any
+
+from constants import COL_MATCH_KEY, KEY_MATCHES, KEY_SCORE, KEY_SOURCE, KEY_TARGET
+
+NGRAM_SIZE = 3
+MAX_CANDIDATE_POSTINGS = 1000  # n-grams shared by more targets only score candidates, they don't add any
+_NON_ALPHANUMERIC = re.compile(r"[\W_]+")
+
+
+def char_ngrams(name: str, n: int = NGRAM_SIZE) -> Counter:
+    """Character n-gram counts of a name, ignoring case and punctuation."""
+    text = " " + _NON_ALPHANUMERIC.sub(" ", str(name).lower()).strip() + " "
+    if len(text) <= n:
+        return Counter([text]) if text.strip() else Counter()
+    return Counter(text[i:i + n] for i in range(len(text) - n + 1))
+
+
+class LocalMatcher:
+    """Character n-gram TF-IDF index over the targets, with top-k cosine search."""
+
+    def __init__(self, targets: list[dict[str, Any]], match_field: str = COL_MATCH_KEY, ngram_size: int = NGRAM_SIZE) -> None:
+        self.targets = targets
+        self.match_field = match_field
+        self.ngram_size = ngram_size
+
+        target_grams = [char_ngrams(target.get(match_field, ""), ngram_size) for target in targets]
+        document_frequency: Counter = Counter()
+        for grams in target_grams:
+            document_frequency.update(grams.keys())
+        num_targets = len(targets)
+        # Smoothed idf (as in scikit-learn), so n-grams present in every target still count
+        self.idf = {gram: math.log((1 + num_targets) / (1 + df)) + 1 for gram, df in document_frequency.items()}
+
+        self.vectors = [self._weights(grams) for grams in target_grams]
+        self.postings: dict[str, list[tuple[int, float]]] = defaultdict(list)
+        for idx, vector in enumerate(self.vectors):
+            for gram, weight in vector.items():
+                self.postings[gram].append((idx, weight))
+
+    def _weights(self, grams: Counter) -> dict[str, float]:
+        """L2-normalised TF-IDF weights of the n-grams known to the index."""
+        weights = {gram: count * self.idf[gram] for gram, count in grams.items() if gram in self.idf}
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+        return {gram: w / norm for gram, w in weights.items()} if norm else {}
+
+    def top_matches(self, name: str, num_matches: int = 1) -> list[tuple[float, int]]:
+        """(cosine similarity, target index) of the ``num_matches`` targets most similar to ``name``."""
+        weights = self._weights(char_ngrams(name, self.ngram_size))
+        if not weights:
+            return []
+        postings = self.postings
+        rare = {gram for gram in weights if len(postings[gram]) <= MAX_CANDIDATE_POSTINGS}
+        if not rare:
+            rare = {min(weights, key=lambda gram: len(postings[gram]))}
+
+        # Candidates and their partial scores from the rare n-grams' postings ...
+        scores: dict[int, float] = defaultdict(float)
+        for gram in rare:
+            weight = weights[gram]
+            for idx, target_weight in postings[gram]:
+                scores[idx] += weight * target_weight
+        # ... completed with the common n-grams, looked up in the candidates' own vectors
+        common = [(gram, weight) for gram, weight in weights.items() if gram not in rare]
+        if common:
+            vectors = self.vectors
+            for idx in scores:
+                vector = vectors[idx]
+                scores[idx] += sum(weight * vector.get(gram, 0.0) for gram, weight in common)
+
+        best = heapq.nlargest(num_matches, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [(min(score, 1.0), idx) for idx, score in best]
+
+    def predict(self, sources: list[dict[str, Any]], num_matches: int = 1) -> list[dict[str, Any]]:
+        """Matches for each source, in the structure of a CDF entity matching prediction job result."""
+        return [
+            {
+                KEY_SOURCE: source,
+                KEY_MATCHES: [
+                    {KEY_SCORE: round(score, 6), KEY_TARGET: self.targets[idx]}
+                    for score, idx in self.top_matches(source.get(self.match_field, ""), num_matches)
+                ],
+            }
+            for source in sources
+        ]
@@ -0,0 +1,160 @@
+"""
+Match Store Module
+
+Columnar stores for the targets and new entities of a matching run.
+
+Every instance can have several match values (aliases), and a dict per alias
+repeats the instance's external ID, name and rule keys. Here the per-instance
+data is stored once, in parallel lists, and the aliases are a list of values
+plus an index array pointing at their instance. Strings are interned, so a
+name that is also an alias (no search property) or a rule key shared by many
+instances is one object. Existing target links of entities are kept as
+``(space, externalId)`` tuples.
+
+Rule-based matching uses the stores directly (`TargetStore.rule_index`). Only
+the matching engines get the dict format the entity matching API needs, from
+`records()`, with the fields listed in `TargetStore.records` /
+`EntityStore.records`.
+"""
+
+import sys
+from array import array
+from collections.abc import Iterable
+from typing import Any
+
+from constants import (
+    KEY_ENTITY_EXT_ID,
+    KEY_NAME,
+    KEY_ORG_NAME,
+    KEY_TARGET_EXT_ID,
+    PROP_COL_EXTERNAL_ID,
+    PROP_COL_SPACE,
+)
+
+Link = tuple[str, str]  # (space, externalId) of a linked target
+
+_intern = sys.intern
+
+
+def _intern_all(values: Iterable[Any]) -> tuple[str, ...]:
+    return tuple(_intern(str(value)) for value in values)
+
+
+class _InstanceStore:
+    """Instances (external ID, name, rule keys) with their aliases, in insertion order."""
+
+    _id_key = KEY_TARGET_EXT_ID
+
+    def __init__(self) -> None:
+        self.external_ids: list[str] = []
+        self.names: list[str] = []
+        self.rule_keys: list[tuple[str, ...]] = []
+        self.alias_values: list[str] = []
+        self.alias_instance = array("I")  # alias -> index of its instance
+        self._positions: dict[str, int] | None = None
+
+    def _add(self, external_id: str, name: str, match_values: Iterable[Any], rule_keys: Iterable[str] | None) -> int:
+        idx = len(self.external_ids)
+        self.external_ids.append(_intern(external_id))
+        self.names.append(_intern(name))
+        self.rule_keys.append(_intern_all(rule_keys or ()))
+        aliases = _intern_all(match_values)
+        self.alias_values.extend(aliases)
+        self.alias_instance.extend([idx] * len(aliases))
+        self._positions = None
+        return idx
+
+    def __len__(self) -> int:
+        """Number of aliases (match sources / targets)."""
+        return len(self.alias_values)
+
+    @property
+    def instance_count(self) -> int:
+        return len(self.external_ids)
+
+    def position(self, external_id: str) -> int | None:
+        """Index of the (first) instance with ``external_id``."""
+        if self._positions is None:
+            positions: dict[str, int] = {}
+            for idx, ext_id in enumerate(self.external_ids):
+                positions.setdefault(ext_id, idx)
+            self._positions = positions
+        return self._positions.get(external_id)
+
+    def first_alias(self) -> array:
+        """Index of the first alias of every instance (-1 if it has none)."""
+        first = array("i", [-1]) * self.instance_count
+        for alias_idx in range(len(self.alias_instance) - 1, -1, -1):
+            first[self.alias_instance[alias_idx]] = alias_idx
+        return first
+
+    def records(self) -> list[dict[str, Any]]:
+        """One dict per alias, ``{<id key>, name, org_name}``: the format of the matching engines."""
+        external_ids, names, id_key = self.external_ids, self.names, self._id_key
+        return [
+            {id_key: external_ids[idx], KEY_ORG_NAME: names[idx], KEY_NAME: value}
+            for value, idx in zip(self.alias_values, self.alias_instance, strict=True)
+        ]
+
+
+class TargetStore(_InstanceStore):
+    """Matching targets; `records` gives ``{asset_ext_id, org_name, name}`` per alias."""
+
+    _id_key = KEY_TARGET_EXT_ID
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._rule_index: dict[str, array] | None = None
+
+    def add(self, external_id: str, name: str, match_values: Iterable[Any], rule_keys: Iterable[str] | None = None) -> int:
+        self._rule_index = None
+        return self._add(external_id, name, match_values, rule_keys)
+
+    def name_of(self, external_id: str) -> str | None:
+        idx = self.position(external_id)
+        return None if idx is None else self.names[idx]
+
+    def rule_index(self) -> dict[str, array]:
+        """Rule key -> indices of the instances with that key (built once)."""
+        if self._rule_index is None:
+            index: dict[str, array] = {}
+            for idx, keys in enumerate(self.rule_keys):
+                for key in keys:
+                    index.setdefault(key, array("I")).append(idx)
+            self._rule_index = index
+        return self._rule_index
+
+
+class EntityStore(_InstanceStore):
+    """New entities to match, with their existing target links; `records` gives ``{entity_ext_id, org_name, name}``."""
+
+    _id_key = KEY_ENTITY_EXT_ID
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.links: list[tuple[Link, ...]] = []
+
+    def add(
+        self,
+        external_id: str,
+        name: str,
+        match_values: Iterable[Any],
+        rule_keys: Iterable[str] | None = None,
+        links: Iterable[Link] = (),
+    ) -> int:
+        self.links.append(tuple((_intern(space), _intern(ext_id)) for space, ext_id in links))
+        return self._add(external_id, name, match_values, rule_keys)
+
+    def links_of(self, external_id: str) -> tuple[Link, ...]:
+        idx = self.position(external_id)
+        return () if idx is None else self.links[idx]
+
+
+def links_from_property(links_property: list[dict[str, Any]] | None) -> tuple[Link, ...]:
+    """``(space, externalId)`` links from a direct relation list property value."""
+    return tuple((link[PROP_COL_SPACE], link[PROP_COL_EXTERNAL_ID]) for link in links_property or ())
+
+
+def links_to_property(links: Iterable[Link]) -> list[dict[str, str]]:
+    """Direct relation list property value (as in DMS responses and the RAW match tables) for ``links``."""
+    return [{PROP_COL_SPACE: space, PROP_COL_EXTERNAL_ID: ext_id} for space, ext_id in links]
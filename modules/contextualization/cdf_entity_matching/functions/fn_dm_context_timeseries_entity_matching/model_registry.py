@@ -0,0 +1,132 @@
+"""
+Model Registry Module
+
+Keeps track of the entity matching models fitted by the pipeline, keyed by
+what they were fitted on: the fit parameters (feature type, match fields)
+and the target set. The target set is summarised by a `TargetSignature`:
+an exact digest plus a bottom-k MinHash sketch, from which the Jaccard
+similarity of two target sets can be estimated without storing the targets.
+
+A model is reused when the fit parameters are the same and its targets are
+similar enough to the current ones; otherwise a new model is fitted and
+registered. Only the most recently used models are kept, the rest are
+returned for deletion.
+
+The registry is stored as JSON in the state table (see `pipeline.py`).
+"""
+
+import hashlib
+import heapq
+import json
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+from constants import KEY_NAME, KEY_TARGET_EXT_ID
+
+SKETCH_SIZE = 128  # MinHash values kept per target set (estimate error ~ 1/sqrt(SKETCH_SIZE))
+
+
+@dataclass(frozen=True)
+class TargetSignature:
+    """Exact digest, size and bottom-k MinHash sketch of a set of matching targets."""
+
+    digest: str
+    count: int
+    sketch: tuple[int, ...]
+
+    @classmethod
+    def from_targets(cls, match_to: list[dict[str, Any]], sketch_size: int = SKETCH_SIZE) -> "TargetSignature":
+        digest = hashlib.sha1(usedforsecurity=False)
+        hashes = set()
+        for target in match_to:
+            key = f"{target[KEY_TARGET_EXT_ID]}\x00{target[KEY_NAME]}".encode()
+            digest.update(key + b"\n")
+            hashes.add(int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "big"))
+        return cls(digest.hexdigest(), len(match_to), tuple(heapq.nsmallest(sketch_size, hashes)))
+
+    def similarity(self, other: "TargetSignature") -> float:
+        """Estimated Jaccard similarity of the two target sets (1.0 if the digests are equal)."""
+        if self.digest == other.digest:
+            return 1.0
+        if not self.sketch or not other.sketch:
+            return 0.0
+        mine, theirs = set(self.sketch), set(other.sketch)
+        union_sketch = heapq.nsmallest(min(len(mine), len(theirs)), mine | theirs)
+        return sum(1 for value in union_sketch if value in mine and value in theirs) / len(union_sketch)
+
+
+def fit_parameters_key(feature_type: str, match_fields: list[tuple[str, str]]) -> str:
+    """Stable key for the parameters a model is fitted with."""
+    return json.dumps({"feature_type": feature_type, "match_fields": [list(pair) for pair in match_fields]}, sort_keys=True)
+
+
+@dataclass
+class RegisteredModel:
+    model_id: int
+    parameters: str
+    signature: TargetSignature
+    last_used: float = field(default_factory=time.time)
+
+    def dump(self) -> dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def load(cls, data: dict[str, Any]) -> "RegisteredModel":
+        signature = data["signature"]
+        return cls(
+            model_id=int(data["model_id"]),
+            parameters=data["parameters"],
+            signature=TargetSignature(signature["digest"], int(signature["count"]), tuple(signature["sketch"])),
+            last_used=float(data.get("last_used", 0)),
+        )
+
+
+class ModelRegistry:
+    """Fitted models by fit parameters and target signature, most recently used first."""
+
+    def __init__(self, models: list[RegisteredModel] | None = None) -> None:
+        self.models: list[RegisteredModel] = sorted(models or [], key=lambda m: m.last_used, reverse=True)
+
+    @classmethod
+    def loads(cls, value: str) -> "ModelRegistry":
+        """Parse the stored registry; an empty or unreadable value gives an empty registry."""
+        try:
+            return cls([RegisteredModel.load(item) for item in json.loads(value)]) if value else cls()
+        except (ValueError, KeyError, TypeError):
+            return cls()
+
+    def dumps(self) -> str:
+        return json.dumps([model.dump() for model in self.models])
+
+    def find(self, parameters: str, signature: TargetSignature, min_similarity: float) -> tuple[RegisteredModel | None, float]:
+        """Most similar model fitted with ``parameters``, if its similarity is at least ``min_similarity``."""
+        best, best_similarity = None, 0.0
+        for model in self.models:
+            if model.parameters != parameters:
+                continue
+            similarity = signature.similarity(model.signature)
+            if similarity > best_similarity:
+                best, best_similarity = model, similarity
+        if best is None or best_similarity < min_similarity:
+            return None, best_similarity
+        return best, best_similarity
+
+    def touch(self, model: RegisteredModel) -> None:
+        """Mark ``model`` as used now."""
+        model.last_used = time.time()
+        self.models.sort(key=lambda m: m.last_used, reverse=True)
+
+    def register(self, model_id: int, parameters: str, signature: TargetSignature) -> RegisteredModel:
+        model = RegisteredModel(model_id, parameters, signature)
+        self.models.insert(0, model)
+        return model
+
+    def remove(self, model_id: int) -> None:
+        self.models = [model for model in self.models if model.model_id != model_id]
+
+    def evict(self, max_models: int) -> list[int]:
+        """Drop all but the ``max_models`` most recently used models and return the dropped model IDs."""
+        evicted = [model.model_id for model in self.models[max_models:]]
+        self.models = self.models[:max_models]
+        return evicted
@@ -4,7 +4,8 @@ import re
 import sys
 import time
 import traceback
-from collections import defaultdict
+from collections.abc import Callable, Collection, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import TYPE_CHECKING, Any
 
@@ -14,17 +15,19 @@ if TYPE_CHECKING:
 from cognite.client import CogniteClient
 from cognite.client import data_modeling as dm
 from cognite.client.data_classes import ExtractionPipelineRun, Row
+from cognite.client.data_classes.contextualization import ContextualizationJob, EntityMatchingModel, JobStatus
 from cognite.client.data_classes.data_modeling import (
     DirectRelationReference,
+    Node,
     NodeApply,
     NodeOrEdgeData,
 )
-from cognite.client.exceptions import CogniteAPIError
+from cognite.client.exceptions import CogniteAPIError, CogniteNotFoundError
 from cognite.client.utils._text import shorten
 from config import Config, ViewPropertyConfig
 from constants import (
-    BATCH_SIZE_API_SUBMIT,
     BATCH_SIZE_ENTITIES,
+    CHECKPOINT_INTERVAL_SECONDS,
     COL_KEY_MAN_CONTEXTUALIZED,
     COL_KEY_MAN_MAPPING_ENTITY,
     COL_KEY_MAN_MAPPING_TARGET,
@@ -45,45 +48,73 @@ from constants import (
     KEY_NAME,
     KEY_ORG_NAME,
     KEY_RULE,
-    KEY_RULE_KEYS,
     KEY_SCORE,
     KEY_SOURCE,
     KEY_TARGET,
     KEY_TARGET_EXT_ID,
-    KEY_TARGET_LINKS,
     KEY_TARGET_MATCH_VALUE,
     KEY_TARGET_NAME,
     KEY_TARGET_RULE_KEYS,
     KEY_TARGET_VIEW_ID,
     LOG_LEVEL_DEBUG,
     LOG_LEVEL_INFO,
+    MATCH_FIELDS,
     MATCH_TYPE_ENTITY,
     MATCH_TYPE_MANUAL,
     MATCH_TYPE_RULE,
+    MATCHING_ENGINE_CDF,
+    MATCHING_ENGINE_LOCAL,
     MATCHING_LIMIT_SOURCES_TARGETS,
+    MAX_CACHED_MODELS,
+    MAX_CONCURRENT_PREDICT_JOBS,
+    MAX_CONCURRENT_TARGET_PARTITIONS,
     MAX_LINKS_PER_ENTITY,
     ML_MODEL_FEATURE_TYPE,
+    MODEL_REUSE_MIN_SIMILARITY,
     PLACEHOLDER_NO_MATCH,
     PLACEHOLDER_NO_MATCH_TARGET,
+    PREDICT_CHUNK_SIZE,
+    PREDICT_JOB_MAX_RETRIES,
+    PREDICT_POLL_INTERVAL_SECONDS,
     PROP_COL_EXTERNAL_ID,
     PROP_COL_LINK_NAME,
     PROP_COL_NAME,
-    PROP_COL_SPACE,
     QUERY_FILTER_TYPE_ENTITIES,
     QUERY_FILTER_TYPE_TARGETS,
+    RAW_UPLOAD_INTERVAL_SECONDS,
+    RAW_UPLOAD_QUEUE_SIZE,
     SCORE_MANUAL_RULE_MATCH,
-    STAT_STORE_MATCH_MODEL_ID,
+    SNAPSHOT_COL_MATCH_VALUES,
+    SNAPSHOT_COL_NAME,
+    STAT_STORE_ENTITY_SYNC,
+    STAT_STORE_LEGACY_MATCH_MODEL_ID,
+    STAT_STORE_MATCH_MODELS,
+    STAT_STORE_PREDICT_JOBS,
+    STAT_STORE_RUN_CHECKPOINT,
+    STAT_STORE_TARGET_PARTITIONS,
+    STAT_STORE_TARGET_SYNC,
     STAT_STORE_VALUE,
     STATUS_FAILURE,
     STATUS_SUCCESS,
+    TARGET_PAGE_MAX_RETRIES,
+    TARGET_PAGE_RETRY_BACKOFF_SECONDS,
+    TARGET_PAGE_SIZE,
+    TARGET_PARTITIONS,
 )
+from incremental_sync import SyncCursorExpiredError, dump_cursor, load_cursor, matches_filter, sync_view
+from instance_writer import InstanceWriter, WriteStats
+from local_matcher import LocalMatcher
 from logger import CogniteFunctionLogger
+from match_store import EntityStore, Link, TargetStore, links_from_property, links_to_property
+from model_registry import ModelRegistry, TargetSignature, fit_parameters_key
 from pipeline_optimizations import (
     RobustAPIClient,
     cleanup_memory,
     monitor_memory_usage,
     time_operation,
 )
+from rule_engine import RuleSet
+from run_checkpoint import EntityWatermark, RunCheckpoint, config_key
 
 sys.path.append(str(Path(__file__).parent))
 
@@ -106,6 +137,15 @@ def _retry_apply(
     )
 
 
+def new_instance_writer(
+    client: CogniteClient,
+    config: Config,
+    logger: CogniteFunctionLogger,
+) -> InstanceWriter:
+    """Background data model writer; only writes when dmUpdate is true and debug is off."""
+    return InstanceWriter(client, logger, enabled=not config.parameters.debug and config.parameters.dm_update)
+
+
 def entity_matching(
     client: CogniteClient,
     logger: CogniteFunctionLogger,
@@ -123,15 +163,14 @@ def entity_matching(
     Raises:
         Exception: Exception
     """
-    good_matches = []
     len_good_matches, len_bad_matches = 0, 0
+    raw_uploader = None
 
     pipeline_ext_id = data["ExtractionPipelineExtId"]
     try:
         logger.info(f"Starting entity matching function: {FUNCTION_ID} with loglevel = {data.get('logLevel', LOG_LEVEL_INFO)},  reading parameters from extraction pipeline config: {pipeline_ext_id}")
 
         not_matches_count, match_count = 0, 0
-        matching_model_id = None
         if config.parameters.debug:
             logger = CogniteFunctionLogger(LOG_LEVEL_DEBUG)
             logger.debug("**** Write debug messages and only process one entity *****")
@@ -139,17 +178,33 @@ def entity_matching(
         logger.debug("Initiate RAW upload queue used to store output from entity matching")
         from cognite.extractorutils.uploader import RawUploadQueue
 
-        raw_uploader = RawUploadQueue(cdf_client=client, max_queue_size=500000, trigger_log_level=LOG_LEVEL_INFO)
-        
+        # Match rows are uploaded in the background, when the queue is full and every RAW_UPLOAD_INTERVAL_SECONDS
+        raw_uploader = RawUploadQueue(
+            cdf_client=client,
+            max_queue_size=RAW_UPLOAD_QUEUE_SIZE,
+            max_upload_interval=RAW_UPLOAD_INTERVAL_SECONDS,
+            trigger_log_level=LOG_LEVEL_INFO,
+        )
+        raw_uploader.start()
+
+        checkpoint = read_checkpoint(client, config, logger)
+        delete_legacy_matching_model(client, config, logger)
+
         # Check if we should run all entities (then delete state content in RAW) or just new entities
-        if config.parameters.run_all:
+        # A resumed run keeps what the stopped run wrote
+        if config.parameters.run_all and checkpoint is None:
             logger.debug("Run all entities, delete state content in RAW since we are rerunning based on all input")
+            # Fitted models stay valid for the same targets, keep the model registry across the reset
+            model_registry = read_state_store(client, config, logger, STAT_STORE_MATCH_MODELS)
             delete_table(client, config.parameters.raw_db, config.parameters.raw_tale_ctx_bad)
             delete_table(client, config.parameters.raw_db, config.parameters.raw_tale_ctx_good)
             delete_table(client, config.parameters.raw_db, config.parameters.raw_table_state)
-        else:
-            logger.debug("Get entity entity matching model ID from state store")
-            matching_model_id = read_state_store(client, config, logger, STAT_STORE_MATCH_MODEL_ID)
+            if model_registry:
+                update_state_store(client, config, logger, model_registry, STAT_STORE_MATCH_MODELS)
+        if not config.parameters.debug:
+            logger.info(f"Create DB / Table for DB: {config.parameters.raw_db}  Tables: {config.parameters.raw_tale_ctx_bad} and {config.parameters.raw_tale_ctx_good} if it does not exist")
+            create_table(client, config.parameters.raw_db, config.parameters.raw_tale_ctx_bad)
+            create_table(client, config.parameters.raw_db, config.parameters.raw_tale_ctx_good)
 
         monitor_memory_usage(logger, "Pipeline start")
 
@@ -161,9 +216,27 @@ def entity_matching(
             logger.info(f"Read rule mappings to be used in entity matching, NOTE: Uses '{PROP_COL_NAME}' property for rule based matches")
             rule_mappings = read_rule_mappings(client, logger, config)
 
+        incremental = config.parameters.incremental
+        # Incremental mode: sync cursors, stored once the entities of the run are processed
+        sync_states: dict[str, str] = {}
+        changed_entities = None
         with time_operation("Read targets", logger):
             logger.info(f"Read all {QUERY_FILTER_TYPE_TARGETS} that are input for matching ( based on TAG filtering IF given in config)")
-            targets = get_all_targets(client, logger, config, rule_mappings)
+            if incremental:
+                targets_changed, sync_states[STAT_STORE_TARGET_SYNC] = sync_target_snapshot(client, config, logger)
+                changed_entities, sync_states[STAT_STORE_ENTITY_SYNC] = sync_changed_entities(client, config, logger)
+                if targets_changed or checkpoint is not None:
+                    # Entities left unmatched by earlier runs may match the new or changed targets: read all
+                    # entities without links. A resumed run does too, the changes it resumes are not known.
+                    changed_entities = None
+                elif not (changed_entities or manual_mappings):
+                    logger.info(f"No changed {QUERY_FILTER_TYPE_TARGETS}, entities or manual mappings since the last run, nothing to match")
+                    _store_sync_states(client, config, logger, sync_states)
+                    update_pipeline_run(client, logger, pipeline_ext_id, STATUS_SUCCESS, match_count, not_matches_count, None)
+                    return
+                targets = read_target_snapshot(client, config, logger, rule_mappings)
+            else:
+                targets = get_all_targets(client, logger, config, rule_mappings)
         monitor_memory_usage(logger, "After targets loaded")
 
         if len(targets) == 0:
@@ -171,45 +244,107 @@ def entity_matching(
             update_pipeline_run(client, logger, pipeline_ext_id, STATUS_SUCCESS, match_count, not_matches_count, None)
             return
 
-        with time_operation("Apply manual mappings", logger):
-            logger.info("Start by applying manual mappings")
-            good_matches, cnt_manual_mappings = apply_manual_mappings(client, logger, config, raw_uploader, manual_mappings, manual_mappings_input, good_matches, targets)
-
-        with time_operation("Read new entities", logger):
-            logger.info("Read new entities (ex: time series) that has been updated since last run")
-            list_good_matches = [match[KEY_ENTITY_EXT_ID] for match in good_matches]
-            new_entities = get_new_entities(client, config, logger, list_good_matches, rule_mappings)
-        monitor_memory_usage(logger, "After new entities loaded")
-        cleanup_memory()
-
-        logger.info(f"Start processing of new entities ({len(new_entities)})")
-        if len(new_entities) == 0:
-            logger.info("No new entities to process, we are done - just update pipeline run")
-            update_pipeline_run(client, logger, pipeline_ext_id, STATUS_SUCCESS, match_count, not_matches_count, None)
-            return
-
-        with time_operation("Apply rule based mappings", logger):
-            logger.info(f"Applying rule based mappings - using provided reg expressions to match entities to {QUERY_FILTER_TYPE_TARGETS}")
-            good_matches, cnt_rule_mappings = apply_rule_mappings(client, config, logger, good_matches, targets, new_entities)  # type: ignore
-
-        with time_operation("Run entity matching model", logger):
-            logger.info("NOTE: the matching runs in CDF, and the process could here be split into two steps to avoid long running jobs")
-            match_results = get_matches(client, config, logger, matching_model_id or "", targets, new_entities)  # type: ignore
-
-        with time_operation("Select and apply matches", logger):
-            good_matches, bad_matches, cnt_entity_matching = select_and_apply_matches(client, config, logger, good_matches, match_results)  # type: ignore
+        checkpoint = checkpoint or RunCheckpoint(config_key(config))
+        # Matching results are written to the data model in the background while matching continues
+        with new_instance_writer(client, config, logger) as dm_writer:
+            # Manual and rule mappings are applied again when resuming (same updates); they are
+            # needed to skip the entities they match
+            save_checkpoint(client, config, logger, checkpoint)
+            # Only the "target_entity" keys and entity IDs of the good matches are kept across the stages
+            # (to skip matches already made); each stage's match rows are dropped once queued for RAW
+            good_match_keys: set[str] = set()
+            matched_entity_ids: set[str] = set()
+            with time_operation("Apply manual mappings", logger):
+                logger.info("Start by applying manual mappings")
+                manual_matches, cnt_manual_mappings = apply_manual_mappings(client, logger, config, raw_uploader, manual_mappings, manual_mappings_input, [], targets, dm_writer)
+                write_mapping_to_raw(client, config, raw_uploader, manual_matches, [], logger)
+                good_match_keys.update(f"{match[KEY_TARGET_EXT_ID]}_{match[KEY_ENTITY_EXT_ID]}" for match in manual_matches)
+                matched_entity_ids.update(match[KEY_ENTITY_EXT_ID] for match in manual_matches)
+                del manual_matches
+
+            with time_operation("Read new entities", logger):
+                logger.info("Read new entities (ex: time series) that has been updated since last run")
+                if changed_entities is not None:
+                    new_entities = _build_entities(client, config, logger, changed_entities, matched_entity_ids, rule_mappings, checkpoint.watermark)
+                else:
+                    new_entities = get_new_entities(client, config, logger, matched_entity_ids, rule_mappings, checkpoint.watermark)
+            monitor_memory_usage(logger, "After new entities loaded")
+            cleanup_memory()
+
+            logger.info(f"Start processing of new entities ({len(new_entities)})")
+            if len(new_entities) == 0:
+                logger.info("No new entities to process, we are done - just update pipeline run")
+                _store_sync_states(client, config, logger, sync_states)
+                write_message = _write_message(dm_writer.close())
+                save_checkpoint(client, config, logger, None)
+                update_pipeline_run(client, logger, pipeline_ext_id, STATUS_SUCCESS, match_count, not_matches_count, write_message)
+                return
+
+            with time_operation("Apply rule based mappings", logger):
+                logger.info(f"Applying rule based mappings - using provided reg expressions to match entities to {QUERY_FILTER_TYPE_TARGETS}")
+                rule_matches, cnt_rule_mappings = apply_rule_mappings(
+                    client, config, logger, [], targets, new_entities, dm_writer, good_match_keys, matched_entity_ids,
+                )
+                write_mapping_to_raw(client, config, raw_uploader, rule_matches, [], logger)
+                del rule_matches
+
+            with time_operation("Run entity matching model and apply matches", logger):
+                logger.info("NOTE: the matching runs in CDF as chunked prediction jobs, results are applied as each job finishes")
+                cnt_entity_matching = 0
+                watermark = EntityWatermark(new_entities.external_ids[idx] for idx in new_entities.alias_instance)
+                for match_results in get_matches(client, config, logger, targets, new_entities):  # type: ignore
+                    try:
+                        # The match sets are updated in place by every chunk
+                        chunk_good_matches, chunk_bad_matches, chunk_cnt = select_and_apply_matches(
+                            client, config, logger, [], match_results, new_entities, dm_writer,
+                            good_match_keys, matched_entity_ids,
+                        )
+                    except Exception as e:
+                        # The chunk's entities are not marked done, so the watermark stops before them
+                        logger.error(f"Skipping {len(match_results)} match results that could not be applied: {type(e).__name__}({e})")
+                        continue
+                    # The chunk's rows are dropped once queued, only their keys are kept (to skip matched entities)
+                    write_mapping_to_raw(client, config, raw_uploader, chunk_good_matches, chunk_bad_matches, logger)
+                    del chunk_good_matches
+                    len_bad_matches += len(chunk_bad_matches)
+                    cnt_entity_matching += chunk_cnt
+
+                    watermark.done(match[KEY_SOURCE][KEY_ENTITY_EXT_ID] for match in match_results)
+                    if (
+                        watermark.value
+                        and not dm_writer.stats.failed_chunks
+                        and time.time() - checkpoint.updated_at >= CHECKPOINT_INTERVAL_SECONDS
+                    ):
+                        checkpoint.watermark = watermark.value
+                        save_checkpoint(client, config, logger, checkpoint, dm_writer, raw_uploader)
+                # Entities of failed prediction jobs, or of results that could not be applied, are not done
+                not_predicted = watermark.pending
+                if not_predicted:
+                    logger.error(f"{len(not_predicted)} entities were not matched: their prediction jobs failed or their results could not be applied")
+        write_stats = dm_writer.stats
 
         with time_operation("Write mapping to RAW", logger):
-            write_mapping_to_raw(client, config, raw_uploader, good_matches, bad_matches, logger)
+            raw_uploader.stop()
+            raw_uploader = None
         cleanup_memory()
         monitor_memory_usage(logger, "Pipeline end")
 
+        if not (not_predicted or write_stats.failed_chunks):
+            # Only now are the changed entities processed: a failed run syncs the same changes again
+            _store_sync_states(client, config, logger, sync_states)
+        elif sync_states:
+            logger.warning("Sync cursors not advanced, the next run syncs the same changes to match the skipped entities")
+        save_checkpoint(client, config, logger, None)
+
         len_good_matches = cnt_manual_mappings + cnt_rule_mappings + cnt_entity_matching
-        len_bad_matches = len(bad_matches)
         if config.parameters.dm_update:
             msg = "Relationships updated in the DM (dmUpdate: True)"
+            if write_stats.failed_chunks:
+                msg += f", {_write_message(write_stats)}"
         else:
             msg = "Relationships NOT updated in DM, only updated the RAW tables (dmUpdate: False)"
+        if not_predicted:
+            msg += f", {len(not_predicted)} entities not matched (prediction jobs failed or results not applied), retried by the next run"
         update_pipeline_run(client, logger, pipeline_ext_id, STATUS_SUCCESS, len_good_matches, len_bad_matches, msg)
 
     except Exception as e:
@@ -217,6 +352,29 @@ def entity_matching(
         update_pipeline_run(client, logger, pipeline_ext_id, STATUS_FAILURE, len_good_matches, len_bad_matches, msg)
         raise
 
+    finally:
+        # Upload the rows still queued, so the results of an early return or a failed run are kept
+        if raw_uploader is not None:
+            raw_uploader.stop()
+
+
+def _store_sync_states(
+    client: CogniteClient,
+    config: Config,
+    logger: CogniteFunctionLogger,
+    sync_states: dict[str, str],
+) -> None:
+    """Store the sync cursors of an incremental run (state key -> sync state)."""
+    for key, value in sync_states.items():
+        update_state_store(client, config, logger, value, key)
+
+
+def _write_message(write_stats: WriteStats) -> str | None:
+    """Pipeline run message for failed data model writes, None if all writes succeeded."""
+    if not write_stats.failed_chunks:
+        return None
+    return f"{write_stats.failed_items} relationship updates failed to write to the DM"
+
 
 def update_pipeline_run(
     client: CogniteClient,
@@ -294,6 +452,58 @@ def update_state_store(
     logger.debug(f"Update state store DB: {config.parameters.raw_db} Table: {config.parameters.raw_table_state} Key: {type} Value: {value}")
 
 
+def read_checkpoint(
+    client: CogniteClient,
+    config: Config,
+    logger: CogniteFunctionLogger,
+) -> RunCheckpoint | None:
+    """Checkpoint of an unfinished run with the same configuration, if this run should resume it."""
+    if config.parameters.debug:
+        return None
+    checkpoint = RunCheckpoint.loads(read_state_store(client, config, logger, STAT_STORE_RUN_CHECKPOINT))
+    if checkpoint is None:
+        return None
+    if not checkpoint.resumes(config_key(config)):
+        logger.info("Not resuming the unfinished previous run: its configuration changed or its checkpoint expired")
+        return None
+    logger.info(
+        f"Resuming the run started at {time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(checkpoint.started_at))} UTC "
+        f"from entities after: {checkpoint.watermark!r}"
+    )
+    return checkpoint
+
+
+def save_checkpoint(
+    client: CogniteClient,
+    config: Config,
+    logger: CogniteFunctionLogger,
+    checkpoint: RunCheckpoint | None,
+    dm_writer: InstanceWriter | None = None,
+    raw_uploader: "RawUploadQueue | None" = None,
+) -> None:
+    """
+    Store ``checkpoint``, or remove the checkpoint if None (the run is done).
+
+    The pending data model writes and RAW rows are written first, so the checkpoint never
+    covers results that are not stored yet. Once a data model write has failed the checkpoint
+    is no longer moved forward: the stored one stays before the entities of the failed chunk.
+    """
+    if config.parameters.debug:
+        return
+    if dm_writer is not None:
+        dm_writer.drain()
+    if raw_uploader is not None:
+        raw_uploader.upload()
+    if checkpoint is None:
+        update_state_store(client, config, logger, "", STAT_STORE_RUN_CHECKPOINT)
+        return
+    if dm_writer is not None and dm_writer.stats.failed_chunks:
+        logger.warning(f"Checkpoint not advanced to {checkpoint.watermark!r}: {_write_message(dm_writer.stats)}")
+        return
+    update_state_store(client, config, logger, checkpoint.dumps(), STAT_STORE_RUN_CHECKPOINT)
+    logger.debug(f"Checkpoint: entities done up to: {checkpoint.watermark!r}")
+
+
 def manual_table_exists(
     client: CogniteClient, 
     config: Config
@@ -371,18 +581,18 @@ def apply_manual_mappings(
     manual_mappings: list[Row],
     manual_mappings_input: dict[str, dict[str, Any]],
     good_matches: list[dict[str, Any]] | None = None,
-    targets: list[dict[str, Any]] | None = None,
+    targets: TargetStore | None = None,
+    writer: InstanceWriter | None = None,
 ) -> list[dict[str, Any]]:
     good_matches = [] if good_matches is None else list(good_matches)
-    targets = [] if targets is None else list(targets)
+    targets = TargetStore() if targets is None else targets
+    own_writer = writer is None
+    writer = new_instance_writer(client, config, logger) if own_writer else writer
 
     entity_view_id = config.data.entity_view.as_view_id()
-    item_update = []
-    clean_target_list = []
-    cnt = 0
+    cnt, queued = 0, 0
 
     try:
-        targets_lookup = {target[KEY_TARGET_EXT_ID]: target for target in targets}
         entity_list = [mapping[COL_KEY_MAN_MAPPING_ENTITY] for mapping in manual_mappings]
         lookup_mapping = {mapping[COL_KEY_MAN_MAPPING_ENTITY]: mapping[COL_KEY_MAN_MAPPING_TARGET] for mapping in manual_mappings}
         key_lookup = {mapping[COL_KEY_MAN_MAPPING_ENTITY]: mapping[KEY_RULE] for mapping in manual_mappings}
@@ -427,21 +637,21 @@ def apply_manual_mappings(
                     links_property = entity.properties[entity_view_id][PROP_COL_LINK_NAME]
                     if links_property:
                         entity_targets = get_links_from_entity(links_property)
-                else:
-                    clean_target_list = clean_links(config, entity.external_id, clean_target_list)
+                # else: the update below replaces the old links. No separate clean-up write, it could be
+                # applied after the update by another writer thread.
 
                 entity_targets = [*entity_targets, target_ext_id]
 
-                item_update = add_to_items(config, 
-                                           logger, 
-                                           item_update,
-                                           entity_targets,
-                                           entity.external_id,
-                                           entity_view_id)
+                writer.add(add_to_items(config,
+                                        logger,
+                                        [],
+                                        entity_targets,
+                                        entity.external_id,
+                                        entity_view_id))
+                queued += 1
 
-                if target_ext_id in targets_lookup:
-                    target = targets_lookup[target_ext_id]
-                    target_name = target[KEY_ORG_NAME]
+                target_name = targets.name_of(target_ext_id)
+                if target_name is not None:
                     target_view_id = str(config.data.target_view.as_view_id())
                 else:
                     target_name = PLACEHOLDER_NO_MATCH_TARGET
@@ -463,36 +673,21 @@ def apply_manual_mappings(
                     }
                 )
 
-                mapping = {}
-                row_key = key_lookup[entity.external_id]
-                mapping = manual_mappings_input[row_key].copy()
-                mapping[COL_KEY_MAN_CONTEXTUALIZED] = True
-                raw_uploader.add_to_upload_queue(config.parameters.raw_db, config.parameters.raw_tale_ctx_manual, Row(row_key, mapping))
-            
-                # Apply the updates to the data model in batches of BATCH_SIZE_API_SUBMIT
-                if not config.parameters.debug and config.parameters.dm_update and cnt % BATCH_SIZE_API_SUBMIT == 0:
-                    _retry_apply(client, logger, clean_target_list)
-                    clean_target_list = []
-
-                    logger.info(f"==> Mapping table based matching - Adding batch of {len(item_update)} items to data model, total count/matches: {cnt} / {len(manual_mappings)}")
-                    _retry_apply(client, logger, item_update)
-                    item_update = []  # Reset item_update after applying
+                if writer.enabled:
+                    # Mark the mapping as contextualized (uploaded in the background)
+                    row_key = key_lookup[entity.external_id]
+                    mapping = manual_mappings_input[row_key].copy()
+                    mapping[COL_KEY_MAN_CONTEXTUALIZED] = True
+                    raw_uploader.add_to_upload_queue(config.parameters.raw_db, config.parameters.raw_tale_ctx_manual, Row(row_key, mapping))
 
             if num_batches > 1:
                 logger.info(f"Completed batch {batch_num}/{num_batches}")
 
-        if not config.parameters.debug and config.parameters.dm_update:
-            _retry_apply(client, logger, clean_target_list)
-
-            # Apply the updates to the data model
-            _retry_apply(client, logger, item_update)
-            if len(item_update) > 0:
-                if cnt == 0:
-                    logger.info("==> Mapping table based matching - No items added to data model based on new items found and manual mappings")
-                else:
-                    logger.info(f"==> Mapping table based matching - Adding batch of {len(item_update)} items to data model, total count/matches: {cnt} / {len(manual_mappings)}")
-
-            raw_uploader.upload()
+        if writer.enabled:
+            if cnt == 0:
+                logger.info("==> Mapping table based matching - No items added to data model based on new items found and manual mappings")
+            else:
+                logger.info(f"==> Mapping table based matching - Queued {queued} items for the data model, total count/matches: {cnt} / {len(manual_mappings)}")
 
         return good_matches, cnt
 
@@ -500,6 +695,10 @@ def apply_manual_mappings(
         logger.error(f"ERROR: Not able run manual mapping for {manual_mappings} - error: {e}")
         return good_matches, cnt
 
+    finally:
+        if own_writer:
+            writer.close()
+
 
 def get_links_from_entity(
     links_property: list[dict[str, Any]]
@@ -565,11 +764,10 @@ def read_rule_mappings(
     """Read rule-based mapping definitions from RAW.
 
     Each rule's entity/target regex is compiled once here and stored as a
-    `re.Pattern` in the resulting dict, so the per-target / per-entity inner
-    loops can call `pattern.search(name)` directly instead of re-compiling
-    (or relying on `re`'s LRU cache) on every name. For pipelines with
-    thousands of entities and a handful of rules this is a measurable hot
-    path.
+    `re.Pattern` in the resulting dict. `get_all_targets` and
+    `get_new_entities` build a `rule_engine.RuleSet` per side from these, so
+    each name is only run through the rules whose required literal it
+    contains.
     """
     rule_mappings: list[dict[str, Any]] = []
 
@@ -611,31 +809,62 @@ def read_rule_mappings(
     return rule_mappings
 
 
-def get_all_targets(
+def _and_filters(filters: list[dm.filters.Filter]) -> dm.filters.Filter | None:
+    if not filters:
+        return None
+    if len(filters) == 1:
+        return filters[0]
+    return dm.filters.And(*filters)
+
+
+def _list_targets_page(
     client: CogniteClient,
     logger: CogniteFunctionLogger,
     config: Config,
-    rule_mappings: list[Row] | None = None
-) -> list[dict[str, Any]]:
+    page_filter: dm.filters.Filter | None,
+    limit: int = TARGET_PAGE_SIZE,
+    direction: str = "ascending",
+    cursor_msg: str | None = None,
+) -> list:
+    """List one page of targets sorted by externalId, retrying with exponential backoff."""
+    target_view = config.data.target_view
+    for retry in range(TARGET_PAGE_MAX_RETRIES + 1):
+        try:
+            return client.data_modeling.instances.list(
+                space=target_view.instance_space,
+                sources=[target_view.as_view_id()],
+                filter=page_filter,
+                sort=dm.InstanceSort(FILTER_PATH_NODE_EXTERNAL_ID, direction=direction),
+                limit=limit,
+            )
+        except Exception as e:
+            if retry >= TARGET_PAGE_MAX_RETRIES:
+                logger.error(
+                    f"Failed to fetch {QUERY_FILTER_TYPE_TARGETS} page after {TARGET_PAGE_MAX_RETRIES + 1} attempts. "
+                    f"Last cursor externalId: {cursor_msg}. Error: {type(e)}({e})"
+                )
+                raise
 
-    targets = []
-    job_config = config.data
-    search_property = job_config.target_view.search_property
+            sleep_seconds = TARGET_PAGE_RETRY_BACKOFF_SECONDS * (2 ** retry)
+            logger.warning(
+                f"Retry {retry + 1}/{TARGET_PAGE_MAX_RETRIES} for {QUERY_FILTER_TYPE_TARGETS} page failed. "
+                f"Sleeping {sleep_seconds}s before retry. "
+                f"Cursor externalId: {cursor_msg}. Error: {type(e)}({e})"
+            )
+            time.sleep(sleep_seconds)
+    return []
 
-    # `instances.list(..., sources=[view])` already scopes to instances with data in the view.
-    # Skipping extra HasData in the filter significantly reduces graph query load.
-    is_selected = get_query_filter(
-        QUERY_FILTER_TYPE_TARGETS,
-        job_config.target_view,
-        config.parameters.run_all,
-        logger,
-        include_has_data=False,
-    )
 
-    batch_size = 1000
-    max_page_retries = 4
-    retry_backoff_seconds = 2
-    all_targets = []
+def _fetch_target_range(
+    client: CogniteClient,
+    logger: CogniteFunctionLogger,
+    config: Config,
+    is_selected: dm.filters.Filter | None,
+    lower: str | None,
+    upper: str | None,
+) -> list:
+    """Read all targets with lower <= externalId < upper (open ends = unbounded), page by page."""
+    range_targets = []
     last_external_id: str | None = None
 
     while True:
@@ -649,87 +878,196 @@ def get_all_targets(
             page_filters.append(is_selected)
         if last_external_id is not None:
             page_filters.append(dm.filters.Range(FILTER_PATH_NODE_EXTERNAL_ID, gt=last_external_id))
-
-        page_filter = None
-        if len(page_filters) == 1:
-            page_filter = page_filters[0]
-        elif len(page_filters) > 1:
-            page_filter = dm.filters.And(*page_filters)
-
-        page = None
-        for retry in range(max_page_retries + 1):
-            try:
-                page = client.data_modeling.instances.list(
-                    space=job_config.target_view.instance_space,
-                    sources=[job_config.target_view.as_view_id()],
-                    filter=page_filter,
-                    sort=dm.InstanceSort(FILTER_PATH_NODE_EXTERNAL_ID, direction="ascending"),
-                    limit=batch_size,
-                )
-                break
-            except Exception as e:
-                if retry >= max_page_retries:
-                    logger.error(
-                        f"Failed to fetch {QUERY_FILTER_TYPE_TARGETS} page after {max_page_retries + 1} attempts. "
-                        f"Last cursor externalId: {last_external_id}. Error: {type(e)}({e})"
-                    )
-                    raise
-
-                sleep_seconds = retry_backoff_seconds * (2 ** retry)
-                logger.warning(
-                    f"Retry {retry + 1}/{max_page_retries} for {QUERY_FILTER_TYPE_TARGETS} page failed. "
-                    f"Sleeping {sleep_seconds}s before retry. "
-                    f"Cursor externalId: {last_external_id}. Error: {type(e)}({e})"
-                )
-                time.sleep(sleep_seconds)
-
+        elif lower is not None:
+            page_filters.append(dm.filters.Range(FILTER_PATH_NODE_EXTERNAL_ID, gte=lower))
+        if upper is not None:
+            page_filters.append(dm.filters.Range(FILTER_PATH_NODE_EXTERNAL_ID, lt=upper))
+
+        page = _list_targets_page(
+            client, logger, config, _and_filters(page_filters),
+            cursor_msg=last_external_id or lower,
+        )
         if not page:
             break
 
-        all_targets.extend(page)
+        range_targets.extend(page)
         last_external_id = page[-1].external_id
 
         logger.debug(
-            f"Fetched {len(page)} {QUERY_FILTER_TYPE_TARGETS} in batch, "
-            f"total so far: {len(all_targets)}, last externalId cursor: {last_external_id}"
+            f"Fetched {len(page)} {QUERY_FILTER_TYPE_TARGETS} in batch [{lower}, {upper}), "
+            f"total in range: {len(range_targets)}, last externalId cursor: {last_external_id}"
         )
 
-        if len(page) < batch_size:
+        if len(page) < TARGET_PAGE_SIZE:
             break
 
-    logger.info(f"Number of {QUERY_FILTER_TYPE_TARGETS} to process: {len(all_targets)}, NOTE: Rule based regular expressions are applied to the '{PROP_COL_NAME}' property")
-    for target in all_targets:
-        org_name = str(target.properties[job_config.target_view.as_view_id()][PROP_COL_NAME])
-
-        rule_keys = []
-        if rule_mappings:
-            for rule in rule_mappings:
-                # Pattern was pre-compiled in read_rule_mappings (re.Pattern object).
-                pattern = rule[COL_KEY_RULE_REGEXP_TARGET]
-                match = pattern.search(org_name)
-
-                if match:
-                    # Concatenate the captured groups directly
-                    cleaned_value = rule[KEY_RULE] + "_" + "".join(match.groups())  # groups() returns a tuple of all captured groups
-                    logger.debug(f"Cleaned value (using capture groups): {cleaned_value}")
-                    rule_keys.append(cleaned_value)
-
-        if search_property in target.properties[job_config.target_view.as_view_id()]:
-            match_properties = target.properties[job_config.target_view.as_view_id()][search_property]
-            if not isinstance(match_properties, list):
-                match_properties = [match_properties]
-        else:
-            match_properties = [org_name]  
+    return range_targets
 
-        for match_property in match_properties:
-            targets.append(
-                {
-                    KEY_TARGET_EXT_ID: target.external_id,
-                    KEY_ORG_NAME: org_name,
-                    KEY_NAME: match_property,
-                    KEY_RULE_KEYS: rule_keys if rule_keys else None,
-                }
-            )
+
+def estimate_external_id_boundaries(
+    first: str,
+    last: str,
+    num_partitions: int,
+    width: int = 3,
+) -> list[str]:
+    """
+    Guess split points between the smallest and largest externalId.
+
+    The characters after the common prefix are read as a base-128 number
+    (``width`` ASCII characters) and the interval is split evenly. Used when no
+    split points from an earlier run are available; uneven key distributions
+    only give uneven (still disjoint and complete) ranges.
+    """
+    prefix_len = 0
+    while prefix_len < min(len(first), len(last)) and first[prefix_len] == last[prefix_len]:
+        prefix_len += 1
+    prefix = first[:prefix_len]
+
+    def to_number(value: str) -> int:
+        tail = value[prefix_len:prefix_len + width].ljust(width, "\x00")
+        number = 0
+        for char in tail:
+            number = number * 128 + min(ord(char), 127)
+        return number
+
+    def to_string(number: int) -> str:
+        chars = []
+        for _ in range(width):
+            number, code = divmod(number, 128)
+            chars.append(chr(code))
+        return prefix + "".join(reversed(chars)).rstrip("\x00")
+
+    low, high = to_number(first), to_number(last)
+    boundaries = []
+    for k in range(1, num_partitions):
+        boundary = to_string(low + (high - low) * k // num_partitions)
+        if first < boundary <= last and (not boundaries or boundary > boundaries[-1]):
+            boundaries.append(boundary)
+    return boundaries
+
+
+def external_id_quantiles(external_ids: list[str], num_partitions: int) -> list[str]:
+    """Split points that cut an externalId-sorted list into ``num_partitions`` equal ranges."""
+    boundaries: list[str] = []
+    step = len(external_ids) / num_partitions
+    for k in range(1, num_partitions):
+        boundary = external_ids[int(k * step)]
+        if boundary != external_ids[0] and (not boundaries or boundary > boundaries[-1]):
+            boundaries.append(boundary)
+    return boundaries
+
+
+def plan_target_partitions(
+    client: CogniteClient,
+    logger: CogniteFunctionLogger,
+    config: Config,
+    is_selected: dm.filters.Filter | None,
+) -> list[str]:
+    """
+    Pick the externalId split points for a target read.
+
+    Split points saved by the previous run (quantiles of the targets it read)
+    are reused; otherwise they are estimated from the smallest and largest
+    externalId. Stale split points still give disjoint ranges covering every
+    target, only less evenly sized.
+    """
+    saved = read_state_store(client, config, logger, STAT_STORE_TARGET_PARTITIONS)
+    if saved:
+        try:
+            boundaries = json.loads(saved)
+            if boundaries == sorted(set(boundaries)):
+                logger.debug(f"Using {len(boundaries)} saved {QUERY_FILTER_TYPE_TARGETS} externalId split points")
+                return boundaries
+        except ValueError:
+            logger.warning(f"Ignoring unreadable saved {QUERY_FILTER_TYPE_TARGETS} split points")
+
+    first_page = _list_targets_page(client, logger, config, is_selected, limit=1)
+    last_page = _list_targets_page(client, logger, config, is_selected, limit=1, direction="descending")
+    if not first_page or not last_page:
+        return []
+    return estimate_external_id_boundaries(first_page[0].external_id, last_page[0].external_id, TARGET_PARTITIONS)
+
+
+def _log_rule_set(logger: CogniteFunctionLogger, side: str, rule_set: RuleSet) -> None:
+    if len(rule_set):
+        logger.debug(f"Rule set for {side}: {rule_set.prefiltered_count} of {len(rule_set)} rules prefiltered by literal")
+
+
+def get_all_targets(
+    client: CogniteClient,
+    logger: CogniteFunctionLogger,
+    config: Config,
+    rule_mappings: list[Row] | None = None
+) -> TargetStore:
+
+    job_config = config.data
+
+    # `instances.list(..., sources=[view])` already scopes to instances with data in the view.
+    # Skipping extra HasData in the filter significantly reduces graph query load.
+    is_selected = get_query_filter(
+        QUERY_FILTER_TYPE_TARGETS,
+        job_config.target_view,
+        config.parameters.run_all,
+        logger,
+        include_has_data=False,
+    )
+
+    # Split the target view into disjoint externalId ranges and read them concurrently;
+    # concatenating the ranges in order gives the same externalId-sorted list as one keyset scan.
+    boundaries = plan_target_partitions(client, logger, config, is_selected)
+    ranges = list(zip([None, *boundaries], [*boundaries, None], strict=True))
+    logger.info(f"Reading {QUERY_FILTER_TYPE_TARGETS} in {len(ranges)} externalId ranges, up to {MAX_CONCURRENT_TARGET_PARTITIONS} at a time")
+
+    with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_TARGET_PARTITIONS, len(ranges))) as executor:
+        range_results = list(executor.map(
+            lambda bounds: _fetch_target_range(client, logger, config, is_selected, *bounds),
+            ranges,
+        ))
+
+    all_targets = []
+    seen_targets: set[tuple[str, str]] = set()
+    for range_targets in range_results:
+        for target in range_targets:
+            key = (target.space, target.external_id)
+            if key not in seen_targets:
+                seen_targets.add(key)
+                all_targets.append(target)
+    del range_results
+
+    if all_targets:
+        new_boundaries = external_id_quantiles([t.external_id for t in all_targets], TARGET_PARTITIONS)
+        if new_boundaries != boundaries:
+            update_state_store(client, config, logger, json.dumps(new_boundaries), STAT_STORE_TARGET_PARTITIONS)
+
+    view_id = job_config.target_view.as_view_id()
+    records = [(target.external_id, *_target_match_values(target.properties[view_id], job_config.target_view)) for target in all_targets]
+    return _build_targets(logger, records, rule_mappings)
+
+
+def _target_match_values(properties: dict[str, Any], view_config: ViewPropertyConfig) -> tuple[str, list[Any]]:
+    """Name (used by rules) and match values (search property, or the name) of a target."""
+    org_name = str(properties[PROP_COL_NAME])
+    if view_config.search_property in properties:
+        match_properties = properties[view_config.search_property]
+        if not isinstance(match_properties, list):
+            match_properties = [match_properties]
+    else:
+        match_properties = [org_name]
+    return org_name, match_properties
+
+
+def _build_targets(
+    logger: CogniteFunctionLogger,
+    records: list[tuple[str, str, list[Any]]],
+    rule_mappings: list[Row] | None = None,
+) -> TargetStore:
+    """Matching targets from (external ID, name, match values) records."""
+    targets = TargetStore()
+    logger.info(f"Number of {QUERY_FILTER_TYPE_TARGETS} to process: {len(records)}, NOTE: Rule based regular expressions are applied to the '{PROP_COL_NAME}' property")
+    target_rules = RuleSet.from_rule_mappings(rule_mappings, COL_KEY_RULE_REGEXP_TARGET)
+    _log_rule_set(logger, QUERY_FILTER_TYPE_TARGETS, target_rules)
+    for external_id, org_name, match_properties in records:
+        targets.add(external_id, org_name, match_properties, target_rules.keys(org_name) if target_rules else None)
     logger.debug(f"Number {QUERY_FILTER_TYPE_TARGETS} added as entities: {len(targets)}")
 
     return targets
@@ -739,17 +1077,19 @@ def get_new_entities(
     client: CogniteClient,
     config: Config,
     logger: CogniteFunctionLogger,
-    list_good_entities: list[str] | None = None,
-    rule_mappings: list[Row] | None = None
-) -> list[dict[str, Any]]:
-
-    entities_source = []
+    list_good_entities: Collection[str] | None = None,
+    rule_mappings: list[Row] | None = None,
+    after: str | None = None,
+) -> EntityStore:
 
     entity_view_config= config.data.entity_view
     entity_view_id = entity_view_config.as_view_id()
 
     logger.debug(f"Get new entities from view: {entity_view_id}, based on config: {entity_view_config}")
     is_selected = get_query_filter(QUERY_FILTER_TYPE_ENTITIES, entity_view_config, config.parameters.run_all, logger)
+    if after is not None:
+        # Resumed run: the entities up to the checkpoint watermark are done
+        is_selected = _and_filters([f for f in (is_selected, dm.filters.Range(FILTER_PATH_NODE_EXTERNAL_ID, gt=after)) if f is not None])
 
     new_entities = client.data_modeling.instances.list(
         space=entity_view_config.instance_space,
@@ -757,58 +1097,56 @@ def get_new_entities(
         filter=is_selected,
         limit=-1
     )
- 
-    item_update = []
+    return _build_entities(client, config, logger, new_entities, list_good_entities, rule_mappings, after)
 
 
+def _build_entities(
+    client: CogniteClient,
+    config: Config,
+    logger: CogniteFunctionLogger,
+    new_entities: list[Node],
+    list_good_entities: Collection[str] | None = None,
+    rule_mappings: list[Row] | None = None,
+    after: str | None = None,
+) -> EntityStore:
+    """Matching sources (one per search value) from entity nodes, skipping entities just matched (and up to ``after``)."""
+    entities_source = EntityStore()
+    entity_view_config = config.data.entity_view
+    entity_view_id = entity_view_config.as_view_id()
+    item_update = []
+    just_matched = set(list_good_entities or ())
+
     logger.info(f"Number of new entities to process: {len(new_entities)} NOTE: Rule based regular expressions are applied to the '{PROP_COL_NAME}' property")
+    entity_rules = RuleSet.from_rule_mappings(rule_mappings, COL_KEY_RULE_REGEXP_ENTITY)
+    _log_rule_set(logger, QUERY_FILTER_TYPE_ENTITIES, entity_rules)
     for entity in new_entities:
         # test if just matched and skip if so
-        if list_good_entities and entity.external_id in list_good_entities:
+        if entity.external_id in just_matched:
             logger.debug(f"Entity: {entity.external_id} just matched, skipping")
             continue
+        if after is not None and entity.external_id <= after:
+            continue
         # Rule based matching uses the name property to match entities to targets
-        org_name = str(entity.properties[entity_view_id][PROP_COL_NAME])
-
-        rule_keys = []
-        if rule_mappings:
-            for rule in rule_mappings:
-                # Pattern was pre-compiled in read_rule_mappings (re.Pattern object).
-                pattern = rule[COL_KEY_RULE_REGEXP_ENTITY]
-                match = pattern.search(org_name)
-
-                if match:
-                    # Concatenate the captured groups directly
-                    cleaned_value = rule[KEY_RULE] + "_" + "".join(match.groups())  # groups() returns a tuple of all captured groups
-                    logger.debug(f"Cleaned value (using capture groups): {cleaned_value}")
-                    rule_keys.append(cleaned_value)
-                    
-        targets = []
+        properties = entity.properties[entity_view_id]
+        org_name = str(properties[PROP_COL_NAME])
+
+        rule_keys = entity_rules.keys(org_name) if entity_rules else None
+        links: tuple[Link, ...] = ()
         if not config.parameters.remove_old_links or not config.parameters.dm_update: # if dmUpdate is False, keep old target links    
             # keep old target links
-            targets = entity.properties[entity_view_id][PROP_COL_LINK_NAME]
+            links = links_from_property(properties.get(PROP_COL_LINK_NAME))
         else:
             item_update = clean_links(config, entity.external_id, item_update)
 
         # add entities for files used to match between file references in P&ID to other files
         search_prop = entity_view_config.search_property
-        if search_prop in entity.properties[entity_view_id]:
-            prop_value = entity.properties[entity_view_id][search_prop]
+        if search_prop in properties:
+            prop_value = properties[search_prop]
             entity_names = prop_value if isinstance(prop_value, list) else [str(prop_value)]
         else:
             entity_names = [org_name]
-        for entity_name in entity_names: 
-            
-            entities_source.append(
-                {
-                    KEY_ENTITY_EXT_ID: entity.external_id,
-                    KEY_NAME: entity_name,
-                    KEY_ORG_NAME: org_name,
-                    KEY_TARGET_LINKS: json.dumps(targets),
-                    KEY_RULE_KEYS: rule_keys if rule_keys else None,
-                }
-            )
-            logger.debug(f"Entity: {entity.external_id} - {entity_name} ({org_name})")
+        entities_source.add(entity.external_id, org_name, entity_names, rule_keys, links)
+        logger.debug(f"Entity: {entity.external_id} - {entity_names} ({org_name})")
 
     logger.info(f"Num new entities: {len(entities_source)} from view: {entity_view_id}")
 
@@ -819,6 +1157,127 @@ def get_new_entities(
     return entities_source
 
 
+def _sync_with_restart(
+    client: CogniteClient,
+    logger: CogniteFunctionLogger,
+    view_config: ViewPropertyConfig,
+    cursor: str | None,
+    on_restart: Callable[[], None],
+) -> Iterator[tuple[list[Node], str | None]]:
+    """`sync_view` pages; if the cursor has expired, call ``on_restart`` and sync the view from scratch."""
+    try:
+        yield from sync_view(client, view_config, cursor)
+    except SyncCursorExpiredError as e:
+        logger.warning(f"Sync cursor for {view_config.as_view_id()} expired, syncing from scratch ({e})")
+        on_restart()
+        yield from sync_view(client, view_config, None)
+
+
+def sync_target_snapshot(
+    client: CogniteClient,
+    config: Config,
+    logger: CogniteFunctionLogger,
+) -> tuple[int, str]:
+    """
+    Bring the RAW target snapshot up to date with the changes to the target view since the last sync
+
+    The snapshot holds the match values of every selected target (one row per target, keyed by
+    externalId). Without a valid cursor the snapshot is rebuilt from a full sync. The new cursor is
+    returned, not stored: applying the same changes again gives the same snapshot, so a failed run
+    sees them (and re-evaluates the unmatched entities) again.
+
+    Returns:
+        number of targets upserted or removed, sync state to store under STAT_STORE_TARGET_SYNC
+    """
+    db, table = config.parameters.raw_db, config.parameters.raw_table_target_snapshot
+    view_config = config.data.target_view
+    view_id = view_config.as_view_id()
+    cursor = load_cursor(read_state_store(client, config, logger, STAT_STORE_TARGET_SYNC), view_config)
+
+    def reset_snapshot() -> None:
+        delete_table(client, db, table)
+        create_table(client, db, table)
+
+    if cursor is None:
+        logger.info(f"No valid sync cursor for {QUERY_FILTER_TYPE_TARGETS}, rebuilding target snapshot {db}/{table}")
+        reset_snapshot()
+
+    upserted = removed = 0
+    for page, page_cursor in _sync_with_restart(client, logger, view_config, cursor, reset_snapshot):
+        cursor = page_cursor
+        rows: dict[str, dict[str, Any]] = {}
+        remove: list[str] = []
+        for node in page:
+            properties = node.properties.get(view_id) if node.properties else None
+            if node.deleted_time or not properties or not matches_filter(properties, view_config):
+                remove.append(node.external_id)
+                continue
+            org_name, match_values = _target_match_values(properties, view_config)
+            rows[node.external_id] = {SNAPSHOT_COL_NAME: org_name, SNAPSHOT_COL_MATCH_VALUES: match_values}
+        if rows:
+            client.raw.rows.insert(db, table, rows, ensure_parent=True)
+        if remove:
+            client.raw.rows.delete(db, table, key=remove)
+        upserted += len(rows)
+        removed += len(remove)
+
+    logger.info(f"Target snapshot synced: {upserted} {QUERY_FILTER_TYPE_TARGETS} upserted, {removed} removed")
+    return upserted + removed, dump_cursor(cursor, view_config)
+
+
+def read_target_snapshot(
+    client: CogniteClient,
+    config: Config,
+    logger: CogniteFunctionLogger,
+    rule_mappings: list[Row] | None = None,
+) -> TargetStore:
+    """Matching targets from the RAW target snapshot (see `sync_target_snapshot`), in externalId order."""
+    rows = client.raw.rows.list(config.parameters.raw_db, config.parameters.raw_table_target_snapshot, limit=-1)
+    records = sorted(
+        (row.key, row.columns[SNAPSHOT_COL_NAME], row.columns[SNAPSHOT_COL_MATCH_VALUES])
+        for row in rows
+        if row.columns
+    )
+    return _build_targets(logger, records, rule_mappings)
+
+
+def sync_changed_entities(
+    client: CogniteClient,
+    config: Config,
+    logger: CogniteFunctionLogger,
+) -> tuple[list[Node], str]:
+    """
+    Entities created or updated since the last sync that are selected for matching
+
+    Selection is as in `get_new_entities`: the configured filter, and (unless runAll) no existing
+    target links. The new cursor is returned, not stored: the caller stores it once the entities
+    have been processed, so a failed run sees the same changes again.
+
+    Returns:
+        changed entities, sync state to store under STAT_STORE_ENTITY_SYNC
+    """
+    view_config = config.data.entity_view
+    view_id = view_config.as_view_id()
+    cursor = load_cursor(read_state_store(client, config, logger, STAT_STORE_ENTITY_SYNC), view_config)
+    changed: dict[str, Node] = {}
+    for page, page_cursor in _sync_with_restart(client, logger, view_config, cursor, changed.clear):
+        cursor = page_cursor
+        for node in page:
+            properties = node.properties.get(view_id) if node.properties else None
+            if (
+                node.deleted_time
+                or not properties
+                or not matches_filter(properties, view_config)
+                or (not config.parameters.run_all and properties.get(PROP_COL_LINK_NAME))
+            ):
+                changed.pop(node.external_id, None)
+                continue
+            changed[node.external_id] = node
+
+    logger.info(f"Number of changed entities to process: {len(changed)}")
+    return list(changed.values()), dump_cursor(cursor, view_config)
+
+
 def clean_links(
     config: Config,
     entity_ext_id: str,
@@ -883,44 +1342,269 @@ def get_query_filter(
     return dm.filters.And(*filters)
 
 
-def get_matches(
-    client: CogniteClient, 
+def _save_predict_jobs(
+    client: CogniteClient,
+    config: Config,
+    logger: CogniteFunctionLogger,
+    model_id: int,
+    targets_fingerprint: str,
+    job_ids: list[int],
+) -> None:
+    value = json.dumps({"model_id": model_id, "targets": targets_fingerprint, "jobs": job_ids}) if job_ids else ""
+    update_state_store(client, config, logger, value, STAT_STORE_PREDICT_JOBS)
+
+
+def _resume_predict_jobs(
+    client: CogniteClient,
+    config: Config,
+    logger: CogniteFunctionLogger,
+    model_id: int,
+    targets_fingerprint: str,
+) -> dict[int, ContextualizationJob]:
+    """Prediction jobs left pending by a previous (timed out) run with the same model and targets."""
+    raw_state = read_state_store(client, config, logger, STAT_STORE_PREDICT_JOBS)
+    if not raw_state:
+        return {}
+    try:
+        state = json.loads(raw_state)
+    except ValueError:
+        logger.warning("Ignoring unreadable prediction job state")
+        return {}
+    if state.get("model_id") != model_id or state.get("targets") != targets_fingerprint:
+        logger.info("Saved prediction jobs were run with another model or other targets, not resuming them")
+        return {}
+
+    jobs = {}
+    for job_id in state.get("jobs", []):
+        job = ContextualizationJob(
+            job_id=job_id,
+            model_id=model_id,
+            status_path=f"{EntityMatchingModel._RESOURCE_PATH}/jobs/",
+            cognite_client=client,
+        )
+        try:
+            status = JobStatus(job.update_status())
+        except CogniteAPIError as e:
+            logger.warning(f"Could not resume prediction job {job_id}, its entities are predicted again. Error: {e}")
+            continue
+        if status is JobStatus.FAILED:
+            logger.warning(f"Prediction job {job_id} failed ({job.error_message}), its entities are predicted again")
+            continue
+        jobs[job_id] = job
+    logger.info(f"Resuming {len(jobs)} prediction jobs from previous run")
+    return jobs
+
+
+def _collect_predict_jobs(
+    client: CogniteClient,
+    config: Config,
+    logger: CogniteFunctionLogger,
+    model: EntityMatchingModel,
+    targets_fingerprint: str,
+    running: dict[int, ContextualizationJob],
+    source_chunks: list[list[dict[str, Any]]],
+    match_to: list[dict[str, Any]],
+) -> Iterator[list[dict[str, Any]]]:
+    """
+    Submit prediction jobs for ``source_chunks`` (at most MAX_CONCURRENT_PREDICT_JOBS running) and
+    yield the result items of each job, in order of completion.
+
+    The IDs of the running jobs are kept in the state store; a job is only removed after its
+    results have been consumed, so a run that times out can pick them up again.
+
+    A failed job is resubmitted up to PREDICT_JOB_MAX_RETRIES times; after that its sources are
+    skipped and the other chunks continue. Skipped sources get no results, so the caller sees them
+    as not done. A failed job resumed from ``running`` is dropped, the caller predicts its sources again.
+    """
+    pending = [(chunk, 0) for chunk in reversed(source_chunks)]
+    submitted_chunks: dict[int, tuple[list[dict[str, Any]], int]] = {}
+    while pending or running:
+        submitted = False
+        while pending and len(running) < MAX_CONCURRENT_PREDICT_JOBS:
+            chunk, retries = pending.pop()
+            job = model.predict(sources=chunk, targets=match_to, num_matches=1)
+            running[job.job_id] = job
+            submitted_chunks[job.job_id] = (chunk, retries)
+            submitted = True
+            logger.debug(f"Submitted prediction job {job.job_id}, {len(pending)} chunks waiting")
+        if submitted:
+            _save_predict_jobs(client, config, logger, model.id, targets_fingerprint, list(running))
+
+        finished = [job for job in running.values() if JobStatus(job.update_status()).is_finished()]
+        if not finished:
+            time.sleep(PREDICT_POLL_INTERVAL_SECONDS)
+            continue
+        for job in finished:
+            del running[job.job_id]
+            chunk, retries = submitted_chunks.pop(job.job_id, (None, 0))
+            if JobStatus(job.status) is JobStatus.FAILED:
+                if chunk is None:
+                    logger.warning(f"Resumed prediction job {job.job_id} failed ({job.error_message}), its entities are predicted again")
+                elif retries < PREDICT_JOB_MAX_RETRIES:
+                    logger.warning(f"Prediction job {job.job_id} failed ({job.error_message}), resubmitting its {len(chunk)} sources")
+                    pending.append((chunk, retries + 1))
+                else:
+                    logger.error(f"Prediction job {job.job_id} failed ({job.error_message}), skipping its {len(chunk)} sources")
+                continue
+            yield job.result[JOB_RESULT_ITEMS]
+        _save_predict_jobs(client, config, logger, model.id, targets_fingerprint, list(running))
+
+
+def get_matching_model(
+    client: CogniteClient,
     config: Config,
     logger: CogniteFunctionLogger,
-    matching_model_id: str,
-    match_to: list[dict[str, Any]], 
+    signature: TargetSignature,
+    match_to: list[dict[str, Any]],
     match_from: list[dict[str, Any]],
-) -> list[dict[str, Any]]:
+) -> EntityMatchingModel:
     """
-    Create / Update entity matching model and run job to get matches
+    Get a matching model for the targets from the model registry, or fit (and register) a new one
 
-    Returns:
-        list of matches
+    A registered model is reused if it was fitted with the same parameters on targets with an
+    estimated similarity of at least MODEL_REUSE_MIN_SIMILARITY. Models beyond the
+    MAX_CACHED_MODELS most recently used are deleted.
     """
-    try:
-        if matching_model_id:
-            logger.debug(f"Get existing matching model: {matching_model_id}")
-            model = client.entity_matching.retrieve(id=int(matching_model_id))
+    parameters = fit_parameters_key(ML_MODEL_FEATURE_TYPE, MATCH_FIELDS)
+    registry = ModelRegistry.loads(read_state_store(client, config, logger, STAT_STORE_MATCH_MODELS))
+
+    model = None
+    entry, similarity = registry.find(parameters, signature, MODEL_REUSE_MIN_SIMILARITY)
+    if entry:
+        try:
+            model = client.entity_matching.retrieve(id=entry.model_id)
+        except CogniteAPIError as e:
+            logger.warning(f"Could not retrieve matching model {entry.model_id}. Error: {e}")
+        if model:
+            registry.touch(entry)
+            logger.info(f"Reusing matching model: {model.id} (target similarity {similarity:.2f})")
         else:
-            model = client.entity_matching.fit(
-                sources=match_from[:MATCHING_LIMIT_SOURCES_TARGETS],
-                targets=match_to[:MATCHING_LIMIT_SOURCES_TARGETS],
-                match_fields=[(COL_MATCH_KEY, COL_MATCH_KEY)],
-                feature_type=ML_MODEL_FEATURE_TYPE,
-            )
-            logger.info(f"Created new matching model: {model.id}")
-            update_state_store(client, config, logger, str(model.id), STAT_STORE_MATCH_MODEL_ID)
-
+            registry.remove(entry.model_id)
+
+    if not model:
+        model = client.entity_matching.fit(
+            sources=match_from[:MATCHING_LIMIT_SOURCES_TARGETS],
+            targets=match_to[:MATCHING_LIMIT_SOURCES_TARGETS],
+            match_fields=MATCH_FIELDS,
+            feature_type=ML_MODEL_FEATURE_TYPE,
+        )
         if not model:
             raise Exception("Failed to create or retrieve matching model")
+        registry.register(model.id, parameters, signature)
+        logger.info(f"Created new matching model: {model.id} (closest registered model had target similarity {similarity:.2f})")
 
-        job = model.predict(
-            sources=match_from, 
-            targets=match_to, 
-            num_matches=1
-        )
+    for model_id in registry.evict(MAX_CACHED_MODELS):
+        try:
+            client.entity_matching.delete(id=model_id)
+            logger.debug(f"Deleted least recently used matching model: {model_id}")
+        except CogniteAPIError as e:
+            logger.warning(f"Could not delete matching model {model_id}. Error: {e}")
+
+    update_state_store(client, config, logger, registry.dumps(), STAT_STORE_MATCH_MODELS)
+    return model
+
+
+def delete_legacy_matching_model(
+    client: CogniteClient,
+    config: Config,
+    logger: CogniteFunctionLogger,
+) -> None:
+    """
+    Delete the matching model stored under the single model ID key of earlier versions, and clear the key
 
-        return job.result[JOB_RESULT_ITEMS]
+    The targets that model was fitted on are unknown, so it cannot be registered in the model
+    registry. If the delete fails the key is kept and the next run tries again.
+    """
+    legacy_model_id = read_state_store(client, config, logger, STAT_STORE_LEGACY_MATCH_MODEL_ID)
+    if not legacy_model_id:
+        return
+    try:
+        client.entity_matching.delete(id=int(legacy_model_id))
+        logger.info(f"Deleted matching model {legacy_model_id} stored by an earlier version of the function")
+    except (CogniteNotFoundError, ValueError):
+        logger.debug(f"Matching model {legacy_model_id!r} stored by an earlier version no longer exists")
+    except CogniteAPIError as e:
+        logger.warning(f"Could not delete matching model {legacy_model_id} stored by an earlier version. Error: {e}")
+        return
+    update_state_store(client, config, logger, "", STAT_STORE_LEGACY_MATCH_MODEL_ID)
+
+
+def _get_cdf_matches(
+    client: CogniteClient,
+    config: Config,
+    logger: CogniteFunctionLogger,
+    match_to: list[dict[str, Any]],
+    match_from: list[dict[str, Any]],
+) -> Iterator[list[dict[str, Any]]]:
+    """
+    Get a matching model (see `get_matching_model`) and run prediction jobs in CDF
+
+    Sources are predicted in chunks of PREDICT_CHUNK_SIZE, as concurrent jobs (at most
+    MAX_CONCURRENT_PREDICT_JOBS at a time). Jobs left pending by a previous run that
+    timed out are resumed first; only the sources they don't cover are submitted again.
+    """
+    signature = TargetSignature.from_targets(match_to)
+    model = get_matching_model(client, config, logger, signature, match_to, match_from)
+    targets_fingerprint = signature.digest
+    entity_ids = {source[KEY_ENTITY_EXT_ID] for source in match_from}
+
+    resumed = _resume_predict_jobs(client, config, logger, model.id, targets_fingerprint)
+    predicted_ids: set[str] = set()
+    for items in _collect_predict_jobs(client, config, logger, model, targets_fingerprint, resumed, [], match_to):
+        # Entities may have been matched (or removed) since the job was submitted
+        items = [item for item in items if item[KEY_SOURCE].get(KEY_ENTITY_EXT_ID) in entity_ids]
+        predicted_ids.update(item[KEY_SOURCE][KEY_ENTITY_EXT_ID] for item in items)
+        yield items
+
+    sources = [source for source in match_from if source[KEY_ENTITY_EXT_ID] not in predicted_ids]
+    source_chunks = [sources[i:i + PREDICT_CHUNK_SIZE] for i in range(0, len(sources), PREDICT_CHUNK_SIZE)]
+    logger.info(f"Predicting {len(sources)} sources in {len(source_chunks)} jobs, up to {MAX_CONCURRENT_PREDICT_JOBS} at a time")
+    yield from _collect_predict_jobs(client, config, logger, model, targets_fingerprint, {}, source_chunks, match_to)
+
+
+def _get_local_matches(
+    client: CogniteClient,
+    config: Config,
+    logger: CogniteFunctionLogger,
+    match_to: list[dict[str, Any]],
+    match_from: list[dict[str, Any]],
+) -> Iterator[list[dict[str, Any]]]:
+    """Match in-process with `local_matcher.LocalMatcher` (character n-gram TF-IDF, cosine similarity)."""
+    with time_operation("Build local matching index", logger):
+        matcher = LocalMatcher(match_to, match_field=COL_MATCH_KEY)
+    logger.info(f"Matching {len(match_from)} sources locally against {len(match_to)} {QUERY_FILTER_TYPE_TARGETS}")
+    for start in range(0, len(match_from), PREDICT_CHUNK_SIZE):
+        yield matcher.predict(match_from[start:start + PREDICT_CHUNK_SIZE], num_matches=1)
+
+
+# Matching engines by `matchingEngine` parameter; each yields lists of {source, matches: [{score, target}]}
+MATCHING_ENGINES = {
+    MATCHING_ENGINE_CDF: _get_cdf_matches,
+    MATCHING_ENGINE_LOCAL: _get_local_matches,
+}
+
+
+def get_matches(
+    client: CogniteClient, 
+    config: Config,
+    logger: CogniteFunctionLogger,
+    match_to: TargetStore,
+    match_from: EntityStore,
+) -> Iterator[list[dict[str, Any]]]:
+    """
+    Match new entities to targets with the configured matching engine (`matchingEngine`)
+
+    The engines get one dict per target / entity match value (see `TargetStore.records`).
+
+    Yields:
+        list of matches ({source, matches: [{score, target}]}) per chunk of sources, as chunks finish
+    """
+    try:
+        engine = MATCHING_ENGINES[config.parameters.matching_engine]
+        logger.debug(f"Using matching engine: {config.parameters.matching_engine}")
+        # Sources in externalId order, so that finished chunks move the checkpoint watermark forward
+        sources = sorted(match_from.records(), key=lambda source: source[KEY_ENTITY_EXT_ID])
+        yield from engine(client, config, logger, match_to.records(), sources)
 
     except Exception as e:
         logger.error(f"ERROR: Failed to get matching model and run prediction. Error: {type(e)}({e})")
@@ -932,122 +1616,112 @@ def apply_rule_mappings(
     config: Config, 
     logger: CogniteFunctionLogger,
     good_matches: list[dict[str, Any]],
-    target_dest: list[dict[str, Any]], 
-    new_entities: list[dict[str, Any]],
-) -> list[dict[str, Any]]:
+    target_dest: TargetStore,
+    new_entities: EntityStore,
+    writer: InstanceWriter | None = None,
+    good_match_keys: set[str] | None = None,
+    matched_entity_ids: set[str] | None = None,
+) -> tuple[list[dict[str, Any]], int]:
+    """
+    Match entities to targets sharing a rule key, appending the matches to ``good_matches``.
 
+    ``good_match_keys`` ("target_entity" keys) and ``matched_entity_ids`` are the
+    good matches so far; they are built from ``good_matches`` if not given,
+    and updated in place with the rule matches.
+    """
     # Use set instead of list for O(1) lookups
-    good_matches_set = {f"{match[KEY_TARGET_EXT_ID]}_{match[KEY_ENTITY_EXT_ID]}"
-                        for match in good_matches}
-    matched_entity_ids = {match[KEY_ENTITY_EXT_ID] for match in good_matches}
+    if good_match_keys is None:
+        good_match_keys = {f"{match[KEY_TARGET_EXT_ID]}_{match[KEY_ENTITY_EXT_ID]}" for match in good_matches}
+    if matched_entity_ids is None:
+        matched_entity_ids = {match[KEY_ENTITY_EXT_ID] for match in good_matches}
 
-    key_field = KEY_RULE_KEYS  # The field in the dictionaries that contains the rule keys
     cnt = 0
-    
+    matches: dict[str, list[str]] = {}
+    own_writer = writer is None
+    writer = new_instance_writer(client, config, logger) if own_writer else writer
+    entity_view_id = str(config.data.entity_view.as_view_id())
+    target_view_id = str(config.data.target_view.as_view_id())
+
     try:
-        # Build an inverted index for target_dest
-        # Format: { 'rule_key_value': [dict_from_target_dest_1, dict_from_target_dest_2, ...] }
-        index1 = defaultdict(list)
-        matches = defaultdict(list)  # defaultdict(lambda: [[], []])
-
-        for d1 in target_dest:
-            if not d1.get(key_field, []):  # Ensure the key_field exists
-                continue  # Skip if no rule keys are present
-            for r_key in d1.get(key_field, []): # Use .get() for safety
-                index1[r_key].append(d1)
-
-        # To avoid duplicate matches (e.g., if A1 matches B1, we don't want B1 matching A1 back)
-        # or to handle cases where multiple rule_keys cause the same pair to match,
+        # Inverted index over the targets: { 'rule_key_value': [target index, ...] }
+        index1 = target_dest.rule_index()
+        target_first_alias = target_dest.first_alias()
+        entity_first_alias = new_entities.first_alias()
+
+        # To avoid duplicate matches when multiple rule_keys cause the same pair to match,
         # we use a set of unique pairs.
         unique_matches_tracker = set()
+        cnt = len(new_entities)
 
-        for d2 in new_entities:
-            cnt = len(new_entities)
-            if not d2.get(key_field, []):  # Ensure the key_field exists
-                continue  # Skip if no rule keys are present
-            set2 = set(d2.get(key_field, [])) # Convert to set once
+        for e_idx, entity_id in enumerate(new_entities.external_ids):
+            entity_keys = new_entities.rule_keys[e_idx]
+            if not entity_keys or entity_first_alias[e_idx] < 0:
+                continue  # Skip if no rule keys (or no match values) are present
 
             # Skip if entity already has been matched
-            if d2[KEY_ENTITY_EXT_ID] in matched_entity_ids:
-                logger.debug(f"Entity: {d2['entity_ext_id']} already has been matched manually, skipping")
+            if entity_id in matched_entity_ids:
+                logger.debug(f"Entity: {entity_id} already has been matched manually, skipping")
                 continue
-        
-            for r_key_from_d2 in set2:
-                if r_key_from_d2 in index1:
-                    for d1_match in index1[r_key_from_d2]:
-                        # Create a canonical tuple for uniqueness tracking
-                        # Ensure consistent order (e.g., by ID)
-                        pair = tuple(sorted((d2[KEY_ENTITY_EXT_ID], d1_match[KEY_TARGET_EXT_ID])))
-
-                        if pair not in unique_matches_tracker:
-                            match_key = f"{d1_match[KEY_TARGET_EXT_ID]}_{d2[KEY_ENTITY_EXT_ID]}"
-                            if match_key in good_matches_set:
-                                logger.debug(f"Match already exists in good matches: {d1_match[KEY_TARGET_EXT_ID]} - {d2[KEY_ENTITY_EXT_ID]}")
-                                continue
-                            good_matches_set.add(match_key)
-
-                            entity_id = d2[KEY_ENTITY_EXT_ID]
-                            unique_target_list = list(set(matches.get(entity_id, ())))
-                            if d1_match[KEY_TARGET_EXT_ID] and d1_match[KEY_TARGET_EXT_ID] not in unique_target_list:
-                                unique_target_list = [*unique_target_list, d1_match[KEY_TARGET_EXT_ID]]
-                                good_matches.append(
-                                    {
-                                        KEY_MATCH_TYPE: MATCH_TYPE_RULE,
-                                        KEY_ENTITY_EXT_ID: d2[KEY_ENTITY_EXT_ID],
-                                        KEY_ENTITY_NAME: d2[KEY_ORG_NAME],
-                                        KEY_ENTITY_MATCH_VALUE: d2[KEY_NAME],
-                                        KEY_ENTITY_VIEW_ID: str(config.data.entity_view.as_view_id()),
-                                        KEY_ENTITY_EXISTING_TARGETS: d2[KEY_TARGET_LINKS],
-                                        KEY_ENTITY_RULE_KEYS: json.dumps(d2[KEY_RULE_KEYS]),
-                                        KEY_SCORE: SCORE_MANUAL_RULE_MATCH,
-                                        KEY_TARGET_NAME: d1_match[KEY_ORG_NAME],
-                                        KEY_TARGET_MATCH_VALUE: d1_match[KEY_NAME],
-                                        KEY_TARGET_EXT_ID: d1_match[KEY_TARGET_EXT_ID],
-                                        KEY_TARGET_VIEW_ID: str(config.data.target_view.as_view_id()),
-                                        KEY_TARGET_RULE_KEYS: json.dumps(d1_match[KEY_RULE_KEYS]),
-                                    }
-                                )
-
-                            existing_target_list = json.loads(d2[KEY_TARGET_LINKS])
-                            if len(existing_target_list) > 0:
-                                for target in existing_target_list:
-                                    if PROP_COL_EXTERNAL_ID in target and target[PROP_COL_EXTERNAL_ID] not in unique_target_list:
-                                        unique_target_list = [
-                                            *unique_target_list,
-                                            target[PROP_COL_EXTERNAL_ID],
-                                        ]
-
-                            matches[entity_id] = unique_target_list
-                            unique_matches_tracker.add(pair)
-
-        item_update = []
-        
-        # Iterate through the matches and prepare the item updates
-        
+
+            for r_key_from_d2 in dict.fromkeys(entity_keys):
+                for t_idx in index1.get(r_key_from_d2, ()):
+                    if target_first_alias[t_idx] < 0:
+                        continue
+                    target_ext_id = target_dest.external_ids[t_idx]
+                    pair = (entity_id, target_ext_id)
+                    if pair in unique_matches_tracker:
+                        continue
+
+                    match_key = f"{target_ext_id}_{entity_id}"
+                    if match_key in good_match_keys:
+                        logger.debug(f"Match already exists in good matches: {target_ext_id} - {entity_id}")
+                        continue
+                    good_match_keys.add(match_key)
+
+                    unique_target_list = matches.get(entity_id, [])
+                    if target_ext_id and target_ext_id not in unique_target_list:
+                        unique_target_list = [*unique_target_list, target_ext_id]
+                        good_matches.append(
+                            {
+                                KEY_MATCH_TYPE: MATCH_TYPE_RULE,
+                                KEY_ENTITY_EXT_ID: entity_id,
+                                KEY_ENTITY_NAME: new_entities.names[e_idx],
+                                KEY_ENTITY_MATCH_VALUE: new_entities.alias_values[entity_first_alias[e_idx]],
+                                KEY_ENTITY_VIEW_ID: entity_view_id,
+                                KEY_ENTITY_EXISTING_TARGETS: links_to_property(new_entities.links[e_idx]),
+                                KEY_ENTITY_RULE_KEYS: json.dumps(list(entity_keys)),
+                                KEY_SCORE: SCORE_MANUAL_RULE_MATCH,
+                                KEY_TARGET_NAME: target_dest.names[t_idx],
+                                KEY_TARGET_MATCH_VALUE: target_dest.alias_values[target_first_alias[t_idx]],
+                                KEY_TARGET_EXT_ID: target_ext_id,
+                                KEY_TARGET_VIEW_ID: target_view_id,
+                                KEY_TARGET_RULE_KEYS: json.dumps(list(target_dest.rule_keys[t_idx])),
+                            }
+                        )
+
+                    for _space, linked_ext_id in new_entities.links[e_idx]:
+                        if linked_ext_id not in unique_target_list:
+                            unique_target_list = [*unique_target_list, linked_ext_id]
+
+                    matches[entity_id] = unique_target_list
+                    unique_matches_tracker.add(pair)
+
+        # Queue the item updates, the writer applies them in chunks of BATCH_SIZE_API_SUBMIT
         for entity_ext_id in matches:
             target_ext_ids = matches[entity_ext_id] # Assuming the first target is the one to match with
 
-            item_update = add_to_items(config, 
-                                    logger, 
-                                    item_update,
+            writer.add(add_to_items(config,
+                                    logger,
+                                    [],
                                     target_ext_ids,
                                     entity_ext_id,
-                                    config.data.entity_view.as_view_id())
-            
-            # Apply the updates to the data model in batches of BATCH_SIZE_API_SUBMIT
-            if not config.parameters.debug and config.parameters.dm_update and cnt % BATCH_SIZE_API_SUBMIT == 0:
-                logger.info(f"==> Rule based matching - Adding batch of {len(item_update)} items to data model, total count/matches: {cnt} / {len(matches)}")
-                _retry_apply(client, logger, item_update)
-                item_update = []  # Reset item_update after applying
-
-        if not config.parameters.debug and config.parameters.dm_update:
-            # Apply the updates to the data model
-            _retry_apply(client, logger, item_update)
- 
+                                    config.data.entity_view.as_view_id()))
+
+        if writer.enabled:
             if cnt == 0:
                 logger.info("==> Rule based matching - No items added to data model based on new items found and rule based mappings")
             else:
-                logger.info(f"==> Rule based matching - Adding batch of {len(item_update)} items to data model, total count/matches: {cnt} / {len(matches)}")
+                logger.info(f"==> Rule based matching - Queued {len(matches)} items for the data model, total count/matches: {cnt} / {len(matches)}")
 
         return good_matches, len(matches)
 
@@ -1055,6 +1729,12 @@ def apply_rule_mappings(
         logger.error(f"ERROR: Not able run rule based mapping - error: {e}")
         return good_matches, len(matches)
 
+    finally:
+        # Entities matched by a rule are skipped by the entity matching model
+        matched_entity_ids.update(matches)
+        if own_writer:
+            writer.close()
+
 
 
 
@@ -1064,7 +1744,11 @@ def select_and_apply_matches(
     logger: CogniteFunctionLogger,
     good_matches: list[dict[str, Any]],
     match_results: list[dict[str, Any]],
-) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    new_entities: EntityStore | None = None,
+    writer: InstanceWriter | None = None,
+    good_match_keys: set[str] | None = None,
+    matched_entity_ids: set[str] | None = None,
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]], int]:
     """
     Select and apply matches based on filtering threshold. Matches with score above threshold are updating time series
     with target ID When matches are updated, metadata property with information about the match is added to time series
@@ -1073,25 +1757,36 @@ def select_and_apply_matches(
     Args:
         client: Instance of CogniteClient
         config: Instance of ContextConfig
+        good_matches: good matches so far, the new good matches are appended to it
         match_results: list of matches from entity matching
-        entity_meta_dict: dictionary with time series id and metadata
+        new_entities: the matched entities, for their existing target links
+        writer: data model writer for the updates (a new one, closed on return, if not given)
+        good_match_keys: "target_entity" keys of the good matches so far, updated in place (built from
+            ``good_matches`` if not given)
+        matched_entity_ids: entity IDs of the good matches so far, updated in place (built from
+            ``good_matches`` if not given)
 
     Returns:
-        list of good matches
+        list of good matches (``good_matches`` with the new ones appended)
         list of bad matches
+        number of new good matches
     """
     bad_matches = []
-    item_update = []
     cnt = 0
+    own_writer = writer is None
+    writer = new_instance_writer(client, config, logger) if own_writer else writer
 
     entity_view_id = config.data.entity_view.as_view_id()
     target_view_id = config.data.target_view.as_view_id()
 
-    # Use set instead of list for O(1) lookups
-    good_matches_set = {f"{match[KEY_TARGET_EXT_ID]}_{match[KEY_ENTITY_EXT_ID]}"
-                        for match in good_matches}
-    matched_entity_ids = {match[KEY_ENTITY_EXT_ID] for match in good_matches}
+    # Use set instead of list for O(1) lookups; callers applying several chunks pass the sets in
+    if good_match_keys is None:
+        good_match_keys = {f"{match[KEY_TARGET_EXT_ID]}_{match[KEY_ENTITY_EXT_ID]}" for match in good_matches}
+    if matched_entity_ids is None:
+        matched_entity_ids = {match[KEY_ENTITY_EXT_ID] for match in good_matches}
     new_good_matches = []
+    chunk_keys: set[str] = set()  # Added to good_match_keys once the chunk is applied
+    new_entities = EntityStore() if new_entities is None else new_entities
     try:
         for match in match_results:
             # Skip if entity already has been matched
@@ -1104,17 +1799,17 @@ def select_and_apply_matches(
                     target_ext_id = match[KEY_MATCHES][0][KEY_TARGET][KEY_TARGET_EXT_ID]
 
                     match_key = f"{target_ext_id}_{entity_ext_id}"
-                    if match_key in good_matches_set:
+                    if match_key in good_match_keys or match_key in chunk_keys:
                         logger.debug(f"Match already exists in good matches: {target_ext_id} - {entity_ext_id}")
                         continue
                     else:
-                        good_matches_set.add(match_key)
+                        chunk_keys.add(match_key)
 
-                    new_good_matches.append(add_to_dict(match, str(entity_view_id), str(target_view_id)))
+                    new_good_matches.append(add_to_dict(match, str(entity_view_id), str(target_view_id), new_entities))
                 else:
-                    bad_matches.append(add_to_dict(match, str(entity_view_id), str(target_view_id)))
+                    bad_matches.append(add_to_dict(match, str(entity_view_id), str(target_view_id), new_entities))
             else:
-                bad_matches.append(add_to_dict(match, str(entity_view_id), str(target_view_id)))
+                bad_matches.append(add_to_dict(match, str(entity_view_id), str(target_view_id), new_entities))
 
         logger.info(f"Got {len(new_good_matches)} matches with score >= {config.parameters.auto_approval_threshold}")
         logger.info(f"Got {len(bad_matches)} matches with score < {config.parameters.auto_approval_threshold}")
@@ -1124,35 +1819,36 @@ def select_and_apply_matches(
         for match in new_good_matches:
             entity_ext_id = match[KEY_ENTITY_EXT_ID]
             target_ext_id = match[KEY_TARGET_EXT_ID]
-            entity_targets = match[KEY_ENTITY_EXISTING_TARGETS]
- 
-            item_update = add_to_items(config, 
-                                       logger, 
-                                       item_update,
-                                       [target_ext_id],
-                                       entity_ext_id,
-                                       entity_view_id,
-                                       entity_targets)
-
-            # Apply the updates to the data model in batches of BATCH_SIZE_API_SUBMIT
-            if not config.parameters.debug and config.parameters.dm_update and cnt % BATCH_SIZE_API_SUBMIT == 0:
-                logger.info(f"==> Entity matching - Adding batch of {len(item_update)} items to data model, total count/matches: {cnt} / {len(new_good_matches)}")
-                _retry_apply(client, logger, item_update)
-                item_update = []  # Reset item_update after applying
-
-        if not config.parameters.debug and config.parameters.dm_update:
-            _retry_apply(client, logger, item_update)
+            entity_targets = new_entities.links_of(entity_ext_id)
+
+            writer.add(add_to_items(config,
+                                    logger,
+                                    [],
+                                    [target_ext_id],
+                                    entity_ext_id,
+                                    entity_view_id,
+                                    entity_targets))
+
+        if writer.enabled:
             if cnt == 0:
                 logger.info("==> Entity matching - No items added to data model based on new items found and entity matching")
             else:
-                logger.info(f"==> Entity matching - Adding batch of {len(item_update)} items to data model, total count/matches: {cnt} / {len(new_good_matches)}")
+                logger.info(f"==> Entity matching - Queued {len(new_good_matches)} items for the data model, total count/matches: {cnt} / {len(new_good_matches)}")
 
 
-        return good_matches + new_good_matches, bad_matches, len(new_good_matches)
+        # Pairs and entities matched in this chunk are skipped by the next ones
+        good_match_keys.update(chunk_keys)
+        matched_entity_ids.update(match[KEY_ENTITY_EXT_ID] for match in new_good_matches)
+        good_matches.extend(new_good_matches)
+        return good_matches, bad_matches, len(new_good_matches)
 
     except Exception as e:
-        print(f"ERROR: Failed to parse results from entity matching - error: {type(e)}({e})")
-        return good_matches, [], len(new_good_matches)  # type: ignore
+        logger.error(f"ERROR: Failed to parse results from entity matching - error: {type(e)}({e})")
+        raise
+
+    finally:
+        if own_writer:
+            writer.close()
 
 def add_to_items(
     config: Config,
@@ -1161,16 +1857,11 @@ def add_to_items(
     target_ext_ids: list[str],
     entity_ext_id: str,
     entity_view_id: dm.ViewId,
-    entity_targets: str | None = None  
+    entity_targets: tuple[Link, ...] = ()
 ) -> list[NodeApply]:
 
-    targets = []
-
-    if entity_targets:
-        entity_targets_array = json.loads(entity_targets)
-        if len(entity_targets_array) > 0:  # Check if there are existing targets
-            for target in entity_targets_array:
-                targets.append(DirectRelationReference(space=target[PROP_COL_SPACE], external_id=target[PROP_COL_EXTERNAL_ID]))
+    # Keep the existing target links of the entity
+    targets = [DirectRelationReference(space=space, external_id=ext_id) for space, ext_id in entity_targets]
 
     # Add new targets to the entity
     for target_ext_id in target_ext_ids:  
@@ -1214,12 +1905,14 @@ def add_to_dict(
         match: dict[str, Any],
         entity_view_id: str,
         target_view_id: str,
+        new_entities: EntityStore,
 ) -> dict[str, Any]:
     """
     Add match to dictionary
 
     Args:
         match: dictionary with match information
+        new_entities: the matched entities, for their existing target links
     Returns:
         dictionary with match information
     """
@@ -1242,7 +1935,7 @@ def add_to_dict(
         KEY_ENTITY_NAME: source[KEY_ORG_NAME],
         KEY_ENTITY_MATCH_VALUE: source[KEY_NAME],
         KEY_ENTITY_VIEW_ID: str(entity_view_id),
-        KEY_ENTITY_EXISTING_TARGETS: source[KEY_TARGET_LINKS],
+        KEY_ENTITY_EXISTING_TARGETS: links_to_property(new_entities.links_of(source[KEY_ENTITY_EXT_ID])),
         KEY_SCORE: round(score, 2),
         KEY_TARGET_NAME: target_name,
         KEY_TARGET_MATCH_VALUE: target_match_value,
@@ -1260,42 +1953,39 @@ def write_mapping_to_raw(
     logger: CogniteFunctionLogger
 ) -> None:
     """
-    Write matching results to RAW DB
+    Queue matching results for the RAW good / bad tables. Called for the results of each matching stage;
+    rows are keyed by entity externalId, so reruns and incremental runs upsert them. In incremental runs
+    the queue is uploaded before newly matched entities are deleted from the BAD table.
 
     Args:
         client: Instance of CogniteClient
         config: Instance of ContextConfig
-        raw_uploader : Instance of RawUploadQueue
-        good_matches: list of good matches
-        bad_matches: list of bad matches
+        raw_uploader : Instance of RawUploadQueue (uploads in the background)
+        good_matches: list of new good matches
+        bad_matches: list of new bad matches
     """
+    if config.parameters.debug or not (good_matches or bad_matches):
+        return
 
     raw_db = config.parameters.raw_db
     raw_tale_ctx_bad = config.parameters.raw_tale_ctx_bad
     raw_tale_ctx_good = config.parameters.raw_tale_ctx_good
 
     try:
-        if config.parameters.run_all and not config.parameters.debug:
-            logger.info(f"Clean up BAD table: {raw_db}/{raw_tale_ctx_bad} before writing new status")
-            delete_table(client, raw_db, raw_tale_ctx_bad)
-
-            logger.info(f"Clean up GOOD table: {raw_db}/{raw_tale_ctx_good} before writing new status")
-            delete_table(client, raw_db, raw_tale_ctx_good)
-
-            logger.info(f"Create DB / Table for DB: {raw_db}  Tables: {raw_tale_ctx_bad} and {raw_tale_ctx_good} if it does not exist")
-            create_table(client, raw_db, raw_tale_ctx_bad)
-            create_table(client, raw_db, raw_tale_ctx_good)
-
-            for match in good_matches:
-                raw_uploader.add_to_upload_queue(raw_db, raw_tale_ctx_good, Row(match[KEY_ENTITY_EXT_ID], match))  # type: ignore
-                logger.debug(f"Added matched entity: {match[KEY_ENTITY_EXT_ID]} to {raw_db}/{raw_tale_ctx_good}")
+        if not config.parameters.run_all and good_matches:
+            # The BAD table is kept between runs; entities matched now no longer belong there.
+            # Rows still queued are uploaded first, so a BAD row queued by an earlier chunk
+            # cannot be written after the delete and bring the entity back
+            raw_uploader.upload()
+            client.raw.rows.delete(raw_db, raw_tale_ctx_bad, list({match[KEY_ENTITY_EXT_ID] for match in good_matches}))
 
-            for not_match in bad_matches:
-                raw_uploader.add_to_upload_queue(raw_db, raw_tale_ctx_bad, Row(not_match[KEY_ENTITY_EXT_ID], not_match))  # type: ignore
-                logger.debug(f"Added NOT matched entity: {not_match[KEY_ENTITY_EXT_ID]} to {raw_db}/{raw_tale_ctx_bad}")
+        for match in good_matches:
+            raw_uploader.add_to_upload_queue(raw_db, raw_tale_ctx_good, Row(match[KEY_ENTITY_EXT_ID], match))  # type: ignore
+            logger.debug(f"Added matched entity: {match[KEY_ENTITY_EXT_ID]} to {raw_db}/{raw_tale_ctx_good}")
 
-            # Upload any remaining RAW cols in queue
-            raw_uploader.upload()
+        for not_match in bad_matches:
+            raw_uploader.add_to_upload_queue(raw_db, raw_tale_ctx_bad, Row(not_match[KEY_ENTITY_EXT_ID], not_match))  # type: ignore
+            logger.debug(f"Added NOT matched entity: {not_match[KEY_ENTITY_EXT_ID]} to {raw_db}/{raw_tale_ctx_bad}")
     except Exception as e:
         logger.error(f"ERROR: Failed to write mapping to RAW DB - error: {type(e)}({e})")
         raise Exception(f"Failed to write mapping to RAW DB - error: {type(e)}({e})") from e
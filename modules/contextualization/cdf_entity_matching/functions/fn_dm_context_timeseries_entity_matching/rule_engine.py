@@ -0,0 +1,174 @@
+"""
+Rule Engine Module
+
+Compiled rule sets for rule-based entity matching. Each rule's regex is
+applied to the name of every target and every entity, so running every
+pattern on every name costs O(rules x names) regex calls. `RuleSet` instead
+extracts a literal every match must contain from each pattern and indexes
+those literals in an Aho-Corasick automaton: one pass over a name yields the
+rules that can possibly match, and only those regexes are run. Patterns
+without a usable literal (e.g. `^(\\w+)-(\\d+)$` or case-insensitive ones)
+are always run.
+
+The same class is used for the target side and the entity side, so both
+produce rule keys the same way: `<rule key>_<concatenated capture groups>`.
+"""
+
+import re
+from collections import deque
+from collections.abc import Iterable
+from re import _parser as sre_parse  # Python 3.11+ (the function runtime); same parser `re.compile` uses
+from typing import Any
+
+from constants import KEY_RULE
+
+_LITERAL = sre_parse.LITERAL
+_SUBPATTERN = sre_parse.SUBPATTERN
+_AT = sre_parse.AT
+_REPEATS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, getattr(sre_parse, "POSSESSIVE_REPEAT", None)} - {None}
+
+
+def _collect_literal_runs(items, runs: list[str], current: list[str]) -> None:
+    """Append runs of consecutive literal characters that every match must contain."""
+
+    def flush() -> None:
+        if current:
+            runs.append("".join(current))
+            current.clear()
+
+    for op, av in items:
+        if op is _LITERAL:
+            current.append(chr(av))
+        elif op is _AT:
+            continue  # Anchors are zero-width: literals on either side stay adjacent
+        elif op is _SUBPATTERN:
+            _group, add_flags, _del_flags, sub = av
+            if add_flags & re.IGNORECASE:
+                flush()
+                continue
+            _collect_literal_runs(sub, runs, current)  # A group is part of the concatenation
+        elif op in _REPEATS:
+            flush()
+            low, _high, sub = av
+            if low >= 1:
+                _collect_literal_runs(sub, runs, current)
+                flush()
+        else:
+            flush()
+
+
+def required_literal(pattern: re.Pattern) -> str | None:
+    """
+    Longest literal substring every match of ``pattern`` contains.
+
+    Returns None when no such literal is found (or the pattern is case-insensitive),
+    meaning the pattern cannot be prefiltered.
+    """
+    if not isinstance(pattern.pattern, str) or pattern.flags & re.IGNORECASE:
+        return None
+    try:
+        parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+    except Exception:
+        return None
+    runs: list[str] = []
+    current: list[str] = []
+    _collect_literal_runs(parsed, runs, current)
+    if current:
+        runs.append("".join(current))
+    return max(runs, key=len) if runs else None
+
+
+class _LiteralIndex:
+    """Aho-Corasick automaton mapping literals to the rules that require them."""
+
+    def __init__(self, literals: dict[str, list[int]]) -> None:
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        self.out: list[tuple[int, ...]] = [()]
+
+        for literal, rule_indices in literals.items():
+            state = 0
+            for char in literal:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(())
+                state = next_state
+            self.out[state] += tuple(rule_indices)
+
+        # Breadth-first: fail links point to the longest proper suffix that is also a trie path
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                self.out[next_state] += self.out[self.fail[next_state]]
+
+    def search(self, text: str) -> set[int]:
+        """Indices of all rules whose literal occurs in ``text``."""
+        goto, fail, out = self.goto, self.fail, self.out
+        hits: set[int] = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                hits.update(out[state])
+        return hits
+
+
+class RuleSet:
+    """
+    Rule patterns compiled once, with a literal prefilter.
+
+    ``keys(name)`` returns the same rule keys, in the same rule order, as
+    running every pattern's ``search`` on ``name``.
+    """
+
+    def __init__(self, rules: Iterable[tuple[str, re.Pattern]]) -> None:
+        self.rules: list[tuple[str, re.Pattern]] = list(rules)
+        literals: dict[str, list[int]] = {}
+        always: list[int] = []
+        for idx, (_key, pattern) in enumerate(self.rules):
+            literal = required_literal(pattern)
+            if literal:
+                literals.setdefault(literal, []).append(idx)
+            else:
+                always.append(idx)
+        self.always = frozenset(always)
+        self._always_sorted = always
+        self.prefiltered_count = len(self.rules) - len(always)
+        self._index = _LiteralIndex(literals) if literals else None
+
+    @classmethod
+    def from_rule_mappings(cls, rule_mappings: list[dict[str, Any]] | None, pattern_key: str) -> "RuleSet":
+        """Build the rule set for one side (entity or target pattern) of `read_rule_mappings` output."""
+        return cls((rule[KEY_RULE], rule[pattern_key]) for rule in rule_mappings or [])
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def candidates(self, name: str) -> list[int]:
+        """Indices (in rule order) of the rules that may match ``name``."""
+        if self._index is None:
+            return self._always_sorted
+        return sorted(self.always.union(self._index.search(name)))
+
+    def keys(self, name: str) -> list[str]:
+        """Rule keys (``<rule>_<captured groups>``) of all rules matching ``name``."""
+        rule_keys = []
+        for idx in self.candidates(name):
+            rule_key, pattern = self.rules[idx]
+            match = pattern.search(name)
+            if match:
+                rule_keys.append(rule_key + "_" + "".join(group for group in match.groups() if group))
+        return rule_keys
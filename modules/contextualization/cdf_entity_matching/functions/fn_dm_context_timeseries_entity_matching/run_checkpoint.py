@@ -0,0 +1,98 @@
+"""
+Run Checkpoint Module
+
+Checkpoint of a matching run, so that a run stopped before it finishes (e.g.
+at the function time limit) is resumed by the next call instead of starting
+over.
+
+The checkpoint records an entity watermark: every new entity with an
+externalId up to the watermark has been matched by all stages and its updates
+are written. A resumed run keeps what the stopped run wrote (no `runAll`
+reset) and only reads and matches the entities after the watermark.
+Prediction jobs left running are resumed separately, from the
+`state_predict_jobs` row (see `pipeline.py`).
+
+A checkpoint only applies to a run with the same configuration, and expires
+after `CHECKPOINT_MAX_AGE_SECONDS`. It is stored as JSON in the state table.
+"""
+
+import hashlib
+import json
+import time
+from collections import Counter
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+from config import Config
+from constants import CHECKPOINT_MAX_AGE_SECONDS
+
+
+def config_key(config: Config) -> str:
+    """Digest of the configuration a run is started with; a checkpoint only resumes the same configuration."""
+    return hashlib.sha1(config.model_dump_json().encode(), usedforsecurity=False).hexdigest()
+
+
+@dataclass
+class RunCheckpoint:
+    config_key: str
+    watermark: str | None = None  # new entities with externalId <= watermark are done
+    started_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    @classmethod
+    def loads(cls, value: str) -> "RunCheckpoint | None":
+        """Parse the stored checkpoint; None if there is none or it is unreadable."""
+        if not value:
+            return None
+        try:
+            data: dict[str, Any] = json.loads(value)
+            return cls(
+                config_key=data["config_key"],
+                watermark=data.get("watermark"),
+                started_at=float(data["started_at"]),
+                updated_at=float(data["updated_at"]),
+            )
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    def dumps(self) -> str:
+        self.updated_at = time.time()
+        return json.dumps(asdict(self))
+
+    def resumes(self, key: str, max_age: float = CHECKPOINT_MAX_AGE_SECONDS) -> bool:
+        """True if a run with configuration ``key`` should continue from this checkpoint."""
+        return self.config_key == key and time.time() - self.updated_at <= max_age
+
+
+class EntityWatermark:
+    """
+    Highest externalId up to which all entities are done, as match results come in out of order.
+
+    Entities are counted once per match value (source), and an entity is done when the results for
+    all its sources are in.
+    """
+
+    def __init__(self, source_entity_ids: Iterable[str]) -> None:
+        self._remaining = Counter(source_entity_ids)
+        self._order = sorted(self._remaining)
+        self._position = 0
+
+    @property
+    def value(self) -> str | None:
+        return self._order[self._position - 1] if self._position else None
+
+    @property
+    def pending(self) -> list[str]:
+        """Entities that still have sources without results, in externalId order."""
+        return [entity_id for entity_id in self._order[self._position:] if self._remaining[entity_id]]
+
+    def done(self, source_entity_ids: Iterable[str]) -> str | None:
+        """Count one source done for each ID (IDs not being tracked are ignored) and return the watermark."""
+        for entity_id in source_entity_ids:
+            if self._remaining.get(entity_id, 0) > 0:
+                self._remaining[entity_id] -= 1
+        while self._position < len(self._order) and self._remaining[self._order[self._position]] == 0:
+            del self._remaining[self._order[self._position]]
+            self._position += 1
+        return self.value
@@ -0,0 +1,99 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from cognite.client.exceptions import CogniteAPIError
+
+# Add the current directory to the path so we can import the modules
+sys.path.append(str(Path(__file__).parent))
+
+from config import ViewPropertyConfig
+from incremental_sync import (
+    SYNC_RESULT_KEY,
+    SyncCursorExpiredError,
+    dump_cursor,
+    load_cursor,
+    matches_filter,
+    sync_view,
+)
+
+
+def _view(**kwargs) -> ViewPropertyConfig:
+    return ViewPropertyConfig(
+        schemaSpace="cdf_cdm", instanceSpace="asset_space", externalId="CogniteAsset", version="v1", **kwargs
+    )
+
+
+class FakeSync:
+    """In-memory `instances.sync` over a change log; the cursor is the position in the log.
+
+    Each cursor in ``expired`` is rejected once.
+    """
+
+    def __init__(self, changes: list, expired: tuple[str, ...] = ()):
+        self.changes = changes
+        self.expired = set(expired)
+        self.queries = []
+
+    def sync(self, query):
+        self.queries.append(query)
+        cursor = query.cursors[SYNC_RESULT_KEY]
+        if cursor in self.expired:
+            self.expired.discard(cursor)
+            raise CogniteAPIError("Cursor has expired", code=400)
+        start = int(cursor or 0)
+        page = self.changes[start:start + query.with_[SYNC_RESULT_KEY].limit]
+        return SimpleNamespace(
+            get=lambda key: page,
+            cursors={SYNC_RESULT_KEY: str(start + len(page))},
+        )
+
+
+class TestSyncCursor:
+    """Test suite for storing sync cursors."""
+
+    def test_cursor_round_trip(self):
+        view = _view(searchProperty="aliases")
+        assert load_cursor(dump_cursor("abc", view), view) == "abc"
+        assert load_cursor("", view) is None
+        assert load_cursor("not json", view) is None
+
+    def test_changed_view_configuration_invalidates_cursor(self):
+        state = dump_cursor("abc", _view(filterProperty="tags", filterValues=["a", "b"]))
+        assert load_cursor(state, _view(filterProperty="tags", filterValues=["b", "a"])) == "abc"
+        assert load_cursor(state, _view(filterProperty="tags", filterValues=["a"])) is None
+        assert load_cursor(state, _view(searchProperty="aliases")) is None
+
+
+class TestMatchesFilter:
+    """Test suite for the client-side filter."""
+
+    def test_filter(self):
+        view = _view(filterProperty="tags", filterValues=["pump"])
+        assert matches_filter({"tags": "pump"}, view)
+        assert matches_filter({"tags": ["valve", "pump"]}, view)
+        assert not matches_filter({"tags": ["valve"]}, view)
+        assert not matches_filter({}, view)
+        assert matches_filter({}, _view())
+
+
+class TestSyncView:
+    """Test suite for paging through view changes."""
+
+    def test_pages_until_empty_and_resumes_from_cursor(self):
+        instances = FakeSync(list(range(5)))
+        client = SimpleNamespace(data_modeling=SimpleNamespace(instances=instances))
+
+        pages = list(sync_view(client, _view(), None, page_size=2))
+
+        assert [page for page, _ in pages] == [[0, 1], [2, 3], [4], []]
+        assert pages[-1][1] == "5"
+        instances.changes.append(5)
+        assert [page for page, _ in sync_view(client, _view(), pages[-1][1])] == [[5], []]
+
+    def test_expired_cursor(self):
+        client = SimpleNamespace(data_modeling=SimpleNamespace(instances=FakeSync([1], expired=("3",))))
+        with pytest.raises(SyncCursorExpiredError):
+            list(sync_view(client, _view(), "3"))
+        assert [page for page, _ in sync_view(client, _view(), None)] == [[1], []]
@@ -0,0 +1,76 @@
+import sys
+import threading
+from pathlib import Path
+
+from cognite.client.testing import CogniteClientMock
+
+# Add the current directory to the path so we can import the modules
+sys.path.append(str(Path(__file__).parent))
+
+from instance_writer import InstanceWriter
+from logger import CogniteFunctionLogger
+
+
+class FakeApply:
+    """Records applied chunks; fails the chunks that contain an item in ``fail_on``."""
+
+    def __init__(self, fail_on=()):
+        self.fail_on = set(fail_on)
+        self.chunks: list[list] = []
+        self.lock = threading.Lock()
+
+    def __call__(self, chunk):
+        if self.fail_on.intersection(chunk):
+            raise RuntimeError("write failed")
+        with self.lock:
+            self.chunks.append(list(chunk))
+
+
+def _writer(apply, **kwargs) -> InstanceWriter:
+    return InstanceWriter(CogniteClientMock(), CogniteFunctionLogger("ERROR"), apply=apply, **kwargs)
+
+
+class TestInstanceWriter:
+    """Test suite for the background data model writer."""
+
+    def test_items_are_written_in_chunks(self):
+        apply = FakeApply()
+        with _writer(apply, chunk_size=3, workers=2, max_pending_chunks=1) as writer:
+            for item in range(5):
+                writer.add([item])
+            writer.add([5, 6])
+
+        assert sorted(len(chunk) for chunk in apply.chunks) == [1, 3, 3]
+        assert sorted(item for chunk in apply.chunks for item in chunk) == list(range(7))
+        assert (writer.stats.items, writer.stats.chunks, writer.stats.failed_chunks) == (7, 3, 0)
+        assert len(writer.stats.latencies) == 3
+
+    def test_drain_waits_for_all_added_items(self):
+        apply = FakeApply()
+        writer = _writer(apply, chunk_size=2)
+        writer.add(range(5))
+        writer.drain()
+
+        assert sorted(item for chunk in apply.chunks for item in chunk) == list(range(5))
+        writer.add([5])
+        assert writer.close().items == 6
+
+    def test_failed_chunk_does_not_stop_the_other_chunks(self):
+        apply = FakeApply(fail_on={4})
+        writer = _writer(apply, chunk_size=2)
+        writer.add(range(6))
+        stats = writer.close()
+
+        assert sorted(item for chunk in apply.chunks for item in chunk) == [0, 1, 2, 3]
+        assert (stats.failed_chunks, stats.failed_items) == (1, 2)
+        assert stats.errors == ["RuntimeError: write failed"]
+        assert "FAILED" in stats.summary()
+
+    def test_disabled_writer_only_counts(self):
+        apply = FakeApply()
+        writer = _writer(apply, enabled=False)
+        writer.add(range(4))
+
+        assert writer.close().skipped_items == 4
+        assert apply.chunks == []
+        assert writer.close() is writer.stats  # close is idempotent
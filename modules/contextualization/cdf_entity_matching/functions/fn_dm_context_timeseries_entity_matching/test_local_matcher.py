@@ -0,0 +1,57 @@
+import sys
+from pathlib import Path
+
+# Add the current directory to the path so we can import the modules
+sys.path.append(str(Path(__file__).parent))
+
+import local_matcher
+from local_matcher import LocalMatcher, char_ngrams
+
+TARGETS = [
+    {"asset_ext_id": "a1", "name": "21-PT-1001"},
+    {"asset_ext_id": "a2", "name": "21-PT-1002"},
+    {"asset_ext_id": "a3", "name": "21-TT-1001"},
+    {"asset_ext_id": "a4", "name": "Main Pump"},
+]
+
+
+class TestCharNgrams:
+    """Test suite for n-gram extraction."""
+
+    def test_case_and_punctuation_are_ignored(self):
+        assert char_ngrams("21-PT_1001") == char_ngrams("21 pt 1001")
+        assert char_ngrams("ab") == {" ab": 1, "ab ": 1}
+        assert char_ngrams("--") == {}
+
+
+class TestLocalMatcher:
+    """Test suite for the local TF-IDF matcher."""
+
+    def test_predict_returns_prediction_job_structure(self):
+        sources = [{"entity_ext_id": "ts1", "name": "21_PT_1002"}]
+        result = LocalMatcher(TARGETS).predict(sources)
+
+        assert result == [{"source": sources[0], "matches": [{"score": 1.0, "target": TARGETS[1]}]}]
+
+    def test_closest_name_ranks_first(self):
+        matches = LocalMatcher(TARGETS).predict([{"name": "21-PT-1001.PV"}], num_matches=3)[0]["matches"]
+
+        assert [m["target"]["asset_ext_id"] for m in matches][:1] == ["a1"]
+        assert matches[0]["score"] > matches[1]["score"] >= matches[2]["score"]
+        assert all(0 < m["score"] <= 1 for m in matches)
+
+    def test_no_shared_ngrams_gives_no_match(self):
+        assert LocalMatcher(TARGETS).predict([{"name": "xyz"}, {"name": ""}]) == [
+            {"source": {"name": "xyz"}, "matches": []},
+            {"source": {"name": ""}, "matches": []},
+        ]
+
+    def test_common_ngrams_do_not_change_the_best_match(self, monkeypatch):
+        targets = [{"asset_ext_id": f"a{i}", "name": f"UNIT-{i:04d}"} for i in range(300)]
+        sources = [{"name": f"unit {i:04d}"} for i in range(0, 300, 7)]
+        exact = [m["matches"][0]["target"] for m in LocalMatcher(targets).predict(sources)]
+
+        monkeypatch.setattr(local_matcher, "MAX_CANDIDATE_POSTINGS", 5)
+        pruned = [m["matches"][0]["target"] for m in LocalMatcher(targets).predict(sources)]
+
+        assert pruned == exact == targets[::7]
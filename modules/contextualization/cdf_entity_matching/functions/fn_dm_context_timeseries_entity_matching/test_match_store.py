@@ -0,0 +1,59 @@
+import sys
+from pathlib import Path
+
+# Add the current directory to the path so we can import the modules
+sys.path.append(str(Path(__file__).parent))
+
+from match_store import EntityStore, TargetStore, links_from_property, links_to_property
+
+
+class TestTargetStore:
+    """Test suite for the columnar target store."""
+
+    def setup_method(self):
+        self.targets = TargetStore()
+        self.targets.add("a1", "21-PT-1001", ["21-PT-1001", "PT1001"], ["r0_1001"])
+        self.targets.add("a2", "Main Pump", [], None)
+        self.targets.add("a3", "21-PT-1002", ["21-PT-1002"], ["r0_1002", "r1_21"])
+
+    def test_records_have_one_dict_per_alias(self):
+        assert len(self.targets) == 3
+        assert self.targets.instance_count == 3
+        assert self.targets.records() == [
+            {"asset_ext_id": "a1", "org_name": "21-PT-1001", "name": "21-PT-1001"},
+            {"asset_ext_id": "a1", "org_name": "21-PT-1001", "name": "PT1001"},
+            {"asset_ext_id": "a3", "org_name": "21-PT-1002", "name": "21-PT-1002"},
+        ]
+
+    def test_strings_are_interned(self):
+        other = TargetStore()
+        other.add("".join(["a", "1"]), "".join(["21-PT-", "1001"]), ["".join(["PT", "1001"])])
+        assert other.external_ids[0] is self.targets.external_ids[0]
+        assert other.names[0] is self.targets.alias_values[0]
+        assert other.alias_values[0] is self.targets.alias_values[1]
+
+    def test_lookups(self):
+        assert self.targets.name_of("a3") == "21-PT-1002"
+        assert self.targets.name_of("missing") is None
+        assert {key: list(idx) for key, idx in self.targets.rule_index().items()} == {
+            "r0_1001": [0],
+            "r0_1002": [2],
+            "r1_21": [2],
+        }
+        assert list(self.targets.first_alias()) == [0, -1, 2]
+
+
+class TestEntityStore:
+    """Test suite for the entity store and its target links."""
+
+    def test_links(self):
+        links_property = [{"space": "s", "externalId": "a1"}, {"space": "s", "externalId": "a2"}]
+        entities = EntityStore()
+        entities.add("ts1", "TS 1", ["ts1"], links=links_from_property(links_property))
+        entities.add("ts2", "TS 2", ["ts2"], links=links_from_property(None))
+
+        assert entities.links_of("ts1") == (("s", "a1"), ("s", "a2"))
+        assert entities.links_of("ts2") == ()
+        assert entities.links_of("missing") == ()
+        assert links_to_property(entities.links_of("ts1")) == links_property
+        assert entities.records()[0] == {"entity_ext_id": "ts1", "org_name": "TS 1", "name": "ts1"}
@@ -0,0 +1,63 @@
+import sys
+from pathlib import Path
+
+# Add the current directory to the path so we can import the modules
+sys.path.append(str(Path(__file__).parent))
+
+from model_registry import ModelRegistry, TargetSignature, fit_parameters_key
+
+
+def _targets(ids):
+    return [{"asset_ext_id": f"asset_{i}", "name": f"NAME {i}"} for i in ids]
+
+
+class TestTargetSignature:
+    """Test suite for target set signatures."""
+
+    def test_identical_targets_have_the_same_digest(self):
+        first = TargetSignature.from_targets(_targets(range(100)))
+        assert first == TargetSignature.from_targets(_targets(range(100)))
+        assert first.similarity(TargetSignature.from_targets(_targets(range(100)))) == 1.0
+        assert first.count == 100
+
+    def test_similarity_estimates_jaccard(self):
+        base = TargetSignature.from_targets(_targets(range(10000)))
+        half = TargetSignature.from_targets(_targets(range(5000, 15000)))  # Jaccard 1/3
+        disjoint = TargetSignature.from_targets(_targets(range(20000, 30000)))
+
+        assert 0.2 < base.similarity(half) < 0.45
+        assert base.similarity(disjoint) == 0.0
+
+    def test_empty_targets(self):
+        empty = TargetSignature.from_targets([])
+        assert empty.similarity(TargetSignature.from_targets(_targets(range(3)))) == 0.0
+
+
+class TestModelRegistry:
+    """Test suite for the model registry."""
+
+    def test_find_requires_same_parameters_and_similar_targets(self):
+        parameters = fit_parameters_key("bigram", [("name", "name")])
+        registry = ModelRegistry()
+        registry.register(1, parameters, TargetSignature.from_targets(_targets(range(1000))))
+
+        signature = TargetSignature.from_targets(_targets(range(990)))
+        assert registry.find(parameters, signature, 0.9)[0].model_id == 1
+        assert registry.find(fit_parameters_key("simple", [("name", "name")]), signature, 0.9)[0] is None
+        assert registry.find(parameters, TargetSignature.from_targets(_targets(range(500, 1500))), 0.9)[0] is None
+
+    def test_round_trip_and_eviction_keep_most_recently_used(self):
+        registry = ModelRegistry()
+        for model_id in range(4):
+            registry.register(model_id, "p", TargetSignature.from_targets(_targets([model_id])))
+        registry.touch(registry.models[-1])  # model 0
+
+        loaded = ModelRegistry.loads(registry.dumps())
+        assert [m.model_id for m in loaded.models] == [0, 3, 2, 1]
+        assert loaded.models[0].signature == registry.models[0].signature
+        assert loaded.evict(2) == [2, 1]
+        assert [m.model_id for m in loaded.models] == [0, 3]
+
+    def test_unreadable_registry_is_empty(self):
+        assert ModelRegistry.loads("").models == []
+        assert ModelRegistry.loads("{not json").models == []
@@ -0,0 +1,737 @@
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from cognite.client.exceptions import CogniteAPIError
+from cognite.client.testing import CogniteClientMock
+
+# Add the current directory to the path so we can import the modules
+sys.path.append(str(Path(__file__).parent))
+
+from config import Config, ConfigData, Parameters, ViewPropertyConfig
+from constants import (
+    MAX_CACHED_MODELS,
+    STAT_STORE_ENTITY_SYNC,
+    STAT_STORE_LEGACY_MATCH_MODEL_ID,
+    STAT_STORE_MATCH_MODELS,
+    STAT_STORE_PREDICT_JOBS,
+    STAT_STORE_RUN_CHECKPOINT,
+    STAT_STORE_TARGET_PARTITIONS,
+    STAT_STORE_TARGET_SYNC,
+    STAT_STORE_VALUE,
+    TARGET_PAGE_SIZE,
+)
+from instance_writer import InstanceWriter
+from logger import CogniteFunctionLogger
+from match_store import EntityStore, TargetStore
+from model_registry import ModelRegistry, TargetSignature
+from pipeline import (
+    apply_rule_mappings,
+    delete_legacy_matching_model,
+    entity_matching,
+    estimate_external_id_boundaries,
+    external_id_quantiles,
+    get_all_targets,
+    get_matches,
+    get_matching_model,
+    read_checkpoint,
+    read_target_snapshot,
+    save_checkpoint,
+    select_and_apply_matches,
+    sync_changed_entities,
+    sync_target_snapshot,
+    write_mapping_to_raw,
+)
+from run_checkpoint import RunCheckpoint, config_key
+from test_incremental_sync import FakeSync
+
+
+def _config() -> Config:
+    return Config(
+        parameters=Parameters(
+            debug=False,
+            dmUpdate=False,
+            runAll=False,
+            removeOldLinks=False,
+            rawDb="db",
+            rawTableState="state",
+            rawTaleCtxGood="good",
+            rawTaleCtxBad="bad",
+            autoApprovalThreshold=0.85,
+        ),
+        data=ConfigData(
+            entityView=ViewPropertyConfig(
+                schemaSpace="cdf_cdm", instanceSpace="ts_space", externalId="CogniteTimeSeries", version="v1"
+            ),
+            targetView=ViewPropertyConfig(
+                schemaSpace="cdf_cdm", instanceSpace="asset_space", externalId="CogniteAsset", version="v1"
+            ),
+        ),
+    )
+
+
+def _targets(names: dict[str, str]) -> TargetStore:
+    targets = TargetStore()
+    for external_id, name in names.items():
+        targets.add(external_id, name, [name])
+    return targets
+
+
+def _entities(names: dict[str, str]) -> EntityStore:
+    entities = EntityStore()
+    for external_id, name in names.items():
+        entities.add(external_id, name, [name])
+    return entities
+
+
+def _state_client(state: dict) -> CogniteClientMock:
+    """Mock client whose RAW state table is the ``state`` dict."""
+    client = CogniteClientMock()
+
+    def list_rows(db_name=None, table_name=None, **kwargs):
+        return [SimpleNamespace(key=k, columns={STAT_STORE_VALUE: v}) for k, v in state.items()]
+
+    def insert_row(db, table, row):
+        state[row.key] = row.columns[STAT_STORE_VALUE]
+
+    client.raw.rows.list.side_effect = list_rows
+    client.raw.rows.insert.side_effect = insert_row
+    return client
+
+
+def _matches(flt: dict, external_id: str) -> bool:
+    """Evaluate the subset of DMS filters used on targets (And / Range on node.externalId)."""
+    if "and" in flt:
+        return all(_matches(f, external_id) for f in flt["and"])
+    if "range" in flt:
+        bounds = flt["range"]
+        return (
+            ("gt" not in bounds or external_id > bounds["gt"])
+            and ("gte" not in bounds or external_id >= bounds["gte"])
+            and ("lt" not in bounds or external_id < bounds["lt"])
+        )
+    return True
+
+
+class FakeInstances:
+    """In-memory `instances.list` over nodes sorted by externalId."""
+
+    def __init__(self, nodes: list, fail_first: int = 0):
+        self.nodes = sorted(nodes, key=lambda n: n.external_id)
+        self.calls = 0
+        self.fail_first = fail_first
+
+    def list(self, space=None, sources=None, filter=None, sort=None, limit=25, **kwargs):
+        self.calls += 1
+        if self.fail_first:
+            self.fail_first -= 1
+            raise RuntimeError("transient")
+        flt = filter.dump() if filter is not None else {}
+        items = [n for n in self.nodes if _matches(flt, n.external_id)]
+        if sort is not None and sort.direction == "descending":
+            items.reverse()
+        return items[:limit]
+
+
+class TestGetAllTargets:
+    """Test suite for partitioned target loading."""
+
+    def setup_method(self):
+        self.logger = CogniteFunctionLogger("WARNING")
+        self.config = _config()
+        self.view_id = self.config.data.target_view.as_view_id()
+
+    def _node(self, external_id: str) -> SimpleNamespace:
+        return SimpleNamespace(
+            space="asset_space",
+            external_id=external_id,
+            properties={self.view_id: {"name": external_id.upper()}},
+        )
+
+    def _client(self, nodes: list, state: dict | None = None, fail_first: int = 0) -> CogniteClientMock:
+        client = _state_client({} if state is None else state)
+        client.data_modeling.instances = FakeInstances(nodes, fail_first)
+        return client
+
+    def test_partitioned_read_returns_all_targets_in_order(self):
+        ids = [f"asset:{i:06d}" for i in range(2 * TARGET_PAGE_SIZE + 321)]
+        client = self._client([self._node(i) for i in reversed(ids)])
+
+        targets = get_all_targets(client, self.logger, self.config)
+
+        assert [t["asset_ext_id"] for t in targets.records()] == ids
+        assert targets.names[0] == ids[0].upper()
+
+    def test_saved_split_points_are_reused_and_refreshed(self):
+        ids = [f"A{i:05d}" for i in range(500)]
+        state = {STAT_STORE_TARGET_PARTITIONS: json.dumps(["A00100", "A00200"])}
+        client = self._client([self._node(i) for i in ids], state)
+
+        targets = get_all_targets(client, self.logger, self.config)
+
+        assert [t["asset_ext_id"] for t in targets.records()] == ids
+        saved = json.loads(state[STAT_STORE_TARGET_PARTITIONS])
+        assert saved == sorted(saved)
+        assert len(saved) > 2
+
+    def test_unsorted_saved_split_points_fall_back_to_estimate(self):
+        ids = [f"B{i:04d}" for i in range(50)]
+        state = {STAT_STORE_TARGET_PARTITIONS: json.dumps(["B0040", "B0010"])}
+        client = self._client([self._node(i) for i in ids], state)
+
+        targets = get_all_targets(client, self.logger, self.config)
+
+        assert [t["asset_ext_id"] for t in targets.records()] == ids
+
+    def test_page_failures_are_retried(self):
+        client = self._client([self._node("x1"), self._node("x2")], fail_first=1)
+        with patch("pipeline.time.sleep") as sleep:
+            targets = get_all_targets(client, self.logger, self.config)
+
+        assert [t["asset_ext_id"] for t in targets.records()] == ["x1", "x2"]
+        sleep.assert_called_once()
+
+    def test_no_targets(self):
+        assert len(get_all_targets(self._client([]), self.logger, self.config)) == 0
+
+
+class FakePredictJob:
+    """Prediction job that completes (or fails) on its second status poll."""
+
+    def __init__(self, model: "FakeModel", job_id: int, sources: list, fail: bool = False) -> None:
+        self.model = model
+        self.job_id = job_id
+        self.status = "Queued"
+        self.error_message = None
+        self.polls = 0
+        self.fail = fail
+        self.result = {"items": [{"source": s, "matches": []} for s in sources]}
+
+    def update_status(self) -> str:
+        self.polls += 1
+        if self.polls >= 2 and self.status == "Queued":
+            self.status = "Failed" if self.fail else "Completed"
+            self.error_message = "boom" if self.fail else None
+            self.model.running -= 1
+        return self.status
+
+
+class FakeModel:
+    def __init__(self, model_id: int = 7, failing: tuple[int, ...] = ()) -> None:
+        self.id = model_id
+        self.failing = failing  # submissions (1-based) whose job fails
+        self.submitted: list[list[str]] = []
+        self.running = 0
+        self.max_running = 0
+
+    def predict(self, sources, targets, num_matches):
+        self.submitted.append([s["entity_ext_id"] for s in sources])
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        return FakePredictJob(self, 1000 + len(self.submitted), sources, fail=len(self.submitted) in self.failing)
+
+
+class TestGetMatches:
+    """Test suite for chunked, concurrent prediction jobs."""
+
+    def setup_method(self):
+        self.logger = CogniteFunctionLogger("WARNING")
+        self.config = _config()
+        self.targets = _targets({"a1": "A1"})
+        self.sources = _entities({f"e{i}": f"E{i}" for i in range(10)})
+
+    def _run(self, client, model):
+        client.entity_matching.fit.return_value = model
+        with patch("pipeline.PREDICT_CHUNK_SIZE", 3), patch("pipeline.MAX_CONCURRENT_PREDICT_JOBS", 2), \
+                patch("pipeline.time.sleep"):
+            return list(get_matches(client, self.config, self.logger, self.targets, self.sources))
+
+    def test_sources_are_predicted_in_bounded_concurrent_chunks(self):
+        state = {}
+        model = FakeModel()
+        chunks = self._run(_state_client(state), model)
+
+        assert model.submitted == [["e0", "e1", "e2"], ["e3", "e4", "e5"], ["e6", "e7", "e8"], ["e9"]]
+        assert model.max_running == 2
+        assert sorted(item["source"]["entity_ext_id"] for items in chunks for item in items) == sorted(
+            self.sources.external_ids
+        )
+        assert state[STAT_STORE_PREDICT_JOBS] == ""
+
+    def test_pending_jobs_of_previous_run_are_resumed(self):
+        model = FakeModel()
+        state = {
+            STAT_STORE_PREDICT_JOBS: json.dumps(
+                {"model_id": model.id, "targets": TargetSignature.from_targets(self.targets.records()).digest, "jobs": [55]}
+            )
+        }
+        client = _state_client(state)
+        client.entity_matching._get.return_value.json.return_value = {
+            "status": "Completed",
+            "items": [
+                {"source": {"entity_ext_id": "e0"}, "matches": []},
+                {"source": {"entity_ext_id": "gone"}, "matches": []},
+            ],
+        }
+
+        chunks = self._run(client, model)
+
+        assert chunks[0] == [{"source": {"entity_ext_id": "e0"}, "matches": []}]
+        assert "e0" not in {ext_id for submitted in model.submitted for ext_id in submitted}
+        assert sum(len(submitted) for submitted in model.submitted) == 9
+        assert state[STAT_STORE_PREDICT_JOBS] == ""
+
+    def test_failed_job_is_resubmitted_once(self):
+        model = FakeModel(failing=(2,))
+        chunks = self._run(_state_client({}), model)
+
+        assert model.submitted.count(["e3", "e4", "e5"]) == 2
+        assert sorted(item["source"]["entity_ext_id"] for items in chunks for item in items) == sorted(
+            self.sources.external_ids
+        )
+
+    def test_job_failing_again_is_skipped_and_the_run_continues(self):
+        state = {}
+        model = FakeModel(failing=(1, 3))  # e0-e2 fails, is resubmitted after e3-e5, and fails again
+        chunks = self._run(_state_client(state), model)
+
+        predicted = sorted(item["source"]["entity_ext_id"] for items in chunks for item in items)
+        assert predicted == [f"e{i}" for i in range(3, 10)]
+        assert state[STAT_STORE_PREDICT_JOBS] == ""
+
+    def test_local_engine_matches_in_process(self):
+        self.config.parameters.matching_engine = "local"
+        self.targets = _targets({"a1": "E3"})
+        client = _state_client({})
+
+        chunks = self._run(client, FakeModel())
+
+        client.entity_matching.fit.assert_not_called()
+        assert [len(items) for items in chunks] == [3, 3, 3, 1]
+        scores = {item["source"]["entity_ext_id"]: item["matches"][0]["score"] for items in chunks for item in items if item["matches"]}
+        assert scores == {"e3": 1.0}
+
+    def test_jobs_of_another_model_are_not_resumed(self):
+        model = FakeModel()
+        state = {STAT_STORE_PREDICT_JOBS: json.dumps({"model_id": 1, "targets": "x", "jobs": [55]})}
+        client = _state_client(state)
+
+        self._run(client, model)
+
+        client.entity_matching._get.assert_not_called()
+        assert sum(len(submitted) for submitted in model.submitted) == 10
+
+
+class TestGetMatchingModel:
+    """Test suite for reusing fitted models from the model registry."""
+
+    def setup_method(self):
+        self.logger = CogniteFunctionLogger("WARNING")
+        self.config = _config()
+        self.targets = [{"asset_ext_id": f"a{i}", "name": f"A{i}"} for i in range(1000)]
+        self.sources = [{"entity_ext_id": "e1", "name": "A1"}]
+
+    def _get_model(self, client, targets):
+        return get_matching_model(
+            client, self.config, self.logger, TargetSignature.from_targets(targets), targets, self.sources
+        )
+
+    def test_model_is_fitted_once_and_reused_for_similar_targets(self):
+        state = {}
+        client = _state_client(state)
+        client.entity_matching.fit.return_value = SimpleNamespace(id=1)
+        client.entity_matching.retrieve.side_effect = lambda id: SimpleNamespace(id=id)
+
+        assert self._get_model(client, self.targets).id == 1
+        assert self._get_model(client, self.targets[:-10]).id == 1  # 1% of the targets removed
+
+        client.entity_matching.fit.assert_called_once()
+        assert [m.model_id for m in ModelRegistry.loads(state[STAT_STORE_MATCH_MODELS]).models] == [1]
+
+    def test_changed_targets_are_refitted_and_old_models_evicted(self):
+        state = {}
+        client = _state_client(state)
+        client.entity_matching.retrieve.side_effect = lambda id: SimpleNamespace(id=id)
+        for model_id in range(1, MAX_CACHED_MODELS + 2):
+            client.entity_matching.fit.return_value = SimpleNamespace(id=model_id)
+            targets = [{"asset_ext_id": f"m{model_id}_{i}", "name": "x"} for i in range(100)]
+            assert self._get_model(client, targets).id == model_id
+
+        assert client.entity_matching.fit.call_count == MAX_CACHED_MODELS + 1
+        client.entity_matching.delete.assert_called_once_with(id=1)
+        assert len(ModelRegistry.loads(state[STAT_STORE_MATCH_MODELS]).models) == MAX_CACHED_MODELS
+
+    def test_deleted_model_is_refitted(self):
+        state = {}
+        client = _state_client(state)
+        client.entity_matching.fit.return_value = SimpleNamespace(id=1)
+        self._get_model(client, self.targets)
+
+        client.entity_matching.retrieve.return_value = None
+        client.entity_matching.fit.return_value = SimpleNamespace(id=2)
+        assert self._get_model(client, self.targets).id == 2
+        assert [m.model_id for m in ModelRegistry.loads(state[STAT_STORE_MATCH_MODELS]).models] == [2]
+
+    def test_legacy_model_is_deleted_once(self):
+        state = {STAT_STORE_LEGACY_MATCH_MODEL_ID: "7"}
+        client = _state_client(state)
+
+        delete_legacy_matching_model(client, self.config, self.logger)
+        delete_legacy_matching_model(client, self.config, self.logger)
+
+        client.entity_matching.delete.assert_called_once_with(id=7)
+        assert state[STAT_STORE_LEGACY_MATCH_MODEL_ID] == ""
+
+    def test_legacy_model_key_is_kept_if_the_delete_fails(self):
+        state = {STAT_STORE_LEGACY_MATCH_MODEL_ID: "7"}
+        client = _state_client(state)
+        client.entity_matching.delete.side_effect = CogniteAPIError("unavailable", code=503)
+
+        delete_legacy_matching_model(client, self.config, self.logger)
+
+        assert state[STAT_STORE_LEGACY_MATCH_MODEL_ID] == "7"
+
+
+class TestApplyRuleMappings:
+    """Test suite for rule-based matching on the target / entity stores."""
+
+    def setup_method(self):
+        self.logger = CogniteFunctionLogger("WARNING")
+        self.config = _config()
+
+    def test_rule_keys_link_entities_to_targets(self):
+        targets = TargetStore()
+        targets.add("a1", "21-PT-1001", ["21-PT-1001", "PT1001"], ["r0_1001"])
+        targets.add("a2", "21-PT-1002", ["21-PT-1002"], ["r0_1002"])
+        entities = EntityStore()
+        entities.add("ts1", "21PT1001.PV", ["21PT1001.PV"], ["r0_1001"], links=[("asset_space", "a0")])
+        entities.add("ts2", "21PT1002.PV", ["21PT1002.PV"], ["r0_1002"])
+        entities.add("ts3", "21PT1003.PV", ["21PT1003.PV"], ["r0_1003"])
+        manual = [{"entity_ext_id": "ts2", "asset_ext_id": "a9"}]
+
+        good_matches, count = apply_rule_mappings(CogniteClientMock(), self.config, self.logger, manual, targets, entities)
+
+        assert count == 1  # ts2 is already matched manually, ts3 has no target with its key
+        rule_match = good_matches[-1]
+        assert (rule_match["entity_ext_id"], rule_match["asset_ext_id"]) == ("ts1", "a1")
+        assert rule_match["asset_match_value"] == "21-PT-1001"
+        assert rule_match["entity_existing_assets"] == [{"space": "asset_space", "externalId": "a0"}]
+        assert len(good_matches) == 2
+
+    def test_rule_matches_are_queued_on_the_writer(self):
+        targets = TargetStore()
+        targets.add("a1", "21-PT-1001", ["21-PT-1001"], ["r0_1001"])
+        entities = EntityStore()
+        entities.add("ts1", "21PT1001.PV", ["21PT1001.PV"], ["r0_1001"])
+        applied = []
+        writer = InstanceWriter(CogniteClientMock(), self.logger, apply=applied.extend)
+
+        apply_rule_mappings(CogniteClientMock(), self.config, self.logger, [], targets, entities, writer)
+        assert applied == []  # items are only written once a chunk is full or the writer is closed
+        writer.close()
+
+        assert [node.external_id for node in applied] == ["ts1"]
+
+    def test_only_match_keys_are_carried_between_stages(self):
+        targets = TargetStore()
+        targets.add("a1", "21-PT-1001", ["21-PT-1001"], ["r0_1001"])
+        targets.add("a2", "21-PT-1002", ["21-PT-1002"], ["r0_1002"])
+        entities = EntityStore()
+        entities.add("ts1", "21PT1001.PV", ["21PT1001.PV"], ["r0_1001"])
+        entities.add("ts2", "21PT1002.PV", ["21PT1002.PV"], ["r0_1002"])
+        keys, matched = {"a9_ts2"}, {"ts2"}  # ts2 was matched manually, its row is already written
+
+        rule_matches, count = apply_rule_mappings(
+            CogniteClientMock(), self.config, self.logger, [], targets, entities,
+            good_match_keys=keys, matched_entity_ids=matched,
+        )
+
+        assert (count, [m["entity_ext_id"] for m in rule_matches]) == (1, ["ts1"])
+        assert (keys, matched) == ({"a9_ts2", "a1_ts1"}, {"ts1", "ts2"})
+
+
+class TestSelectAndApplyMatches:
+    """Test suite for selecting and applying ML match results."""
+
+    def test_results_that_cannot_be_parsed_raise(self):
+        logger = MagicMock()
+        with pytest.raises(KeyError):
+            select_and_apply_matches(CogniteClientMock(), _config(), logger, [], [{"source": {}}])
+        logger.error.assert_called_once()
+
+    @staticmethod
+    def _result(entity: str, target: str, score: float) -> dict:
+        return {
+            "source": {"entity_ext_id": entity, "org_name": entity, "name": entity},
+            "matches": [{"score": score, "target": {"asset_ext_id": target, "org_name": target, "name": target}}],
+        }
+
+    def test_chunks_update_the_match_sets_in_place(self):
+        logger = CogniteFunctionLogger("WARNING")
+        good_matches = [{"entity_ext_id": "ts0", "asset_ext_id": "a0"}]
+        keys, matched = {"a0_ts0"}, {"ts0"}
+
+        result, bad, count = select_and_apply_matches(
+            CogniteClientMock(), _config(), logger, good_matches,
+            [self._result("ts0", "a1", 0.9), self._result("ts1", "a1", 0.9), self._result("ts2", "a2", 0.5)],
+            good_match_keys=keys, matched_entity_ids=matched,
+        )
+        assert result is good_matches
+        assert [m["entity_ext_id"] for m in good_matches] == ["ts0", "ts1"]
+        assert ([m["entity_ext_id"] for m in bad], count) == (["ts2"], 1)
+        assert (keys, matched) == ({"a0_ts0", "a1_ts1"}, {"ts0", "ts1"})
+
+        # The next chunk skips entities matched by earlier chunks
+        _, _, count = select_and_apply_matches(
+            CogniteClientMock(), _config(), logger, good_matches, [self._result("ts1", "a3", 0.95)],
+            good_match_keys=keys, matched_entity_ids=matched,
+        )
+        assert count == 0
+        assert len(good_matches) == 2
+
+
+class TestWriteMappingToRaw:
+    """Test suite for streaming the match results to the RAW good / bad tables."""
+
+    def setup_method(self):
+        self.logger = CogniteFunctionLogger("WARNING")
+        self.good = [{"entity_ext_id": "ts1", "asset_ext_id": "a1"}, {"entity_ext_id": "ts2", "asset_ext_id": "a2"}]
+        self.bad = [{"entity_ext_id": "ts3", "asset_ext_id": "_no_match_"}]
+
+    def _queued(self, uploader):
+        return [(table, row.key) for _db, table, row in (c.args for c in uploader.add_to_upload_queue.call_args_list)]
+
+    def test_incremental_run_upserts_and_removes_matched_entities_from_bad_table(self):
+        client, uploader = CogniteClientMock(), MagicMock()
+        write_mapping_to_raw(client, _config(), uploader, self.good, self.bad, self.logger)
+
+        assert self._queued(uploader) == [("good", "ts1"), ("good", "ts2"), ("bad", "ts3")]
+        db, table, keys = client.raw.rows.delete.call_args.args
+        assert (db, table, sorted(keys)) == ("db", "bad", ["ts1", "ts2"])
+
+    def test_queued_bad_rows_are_uploaded_before_the_delete(self):
+        """A BAD row queued by an earlier chunk must not be uploaded after its entity is matched"""
+        client, uploader = CogniteClientMock(), MagicMock()
+        calls = []
+        uploader.upload.side_effect = lambda: calls.append("upload")
+        client.raw.rows.delete.side_effect = lambda *args: calls.append("delete")
+
+        write_mapping_to_raw(client, _config(), uploader, [], [{"entity_ext_id": "ts1"}], self.logger)
+        write_mapping_to_raw(client, _config(), uploader, self.good, [], self.logger)
+
+        assert calls == ["upload", "delete"]
+
+    def test_run_all_and_debug(self):
+        config = _config()
+        config.parameters.run_all = True
+        client, uploader = CogniteClientMock(), MagicMock()
+        write_mapping_to_raw(client, config, uploader, self.good, self.bad, self.logger)
+        assert len(self._queued(uploader)) == 3
+        client.raw.rows.delete.assert_not_called()  # the tables were cleared at the start of the run
+
+        config.parameters.debug = True
+        uploader = MagicMock()
+        write_mapping_to_raw(client, config, uploader, self.good, self.bad, self.logger)
+        assert self._queued(uploader) == []
+
+
+class TestRunCheckpoint:
+    """Test suite for saving and resuming the run checkpoint in the state table."""
+
+    def setup_method(self):
+        self.logger = CogniteFunctionLogger("WARNING")
+        self.config = _config()
+
+    def test_checkpoint_is_resumed_until_the_run_is_done(self):
+        state = {}
+        client = _state_client(state)
+        writer = MagicMock()
+        writer.stats.failed_chunks = 0
+        save_checkpoint(client, self.config, self.logger, RunCheckpoint(config_key(self.config), watermark="ts9"), writer)
+
+        writer.drain.assert_called_once()  # pending writes go out before the checkpoint
+        resumed = read_checkpoint(client, self.config, self.logger)
+        assert resumed.watermark == "ts9"
+
+        save_checkpoint(client, self.config, self.logger, None)
+        assert state[STAT_STORE_RUN_CHECKPOINT] == ""
+        assert read_checkpoint(client, self.config, self.logger) is None
+
+    def test_checkpoint_is_not_advanced_past_failed_writes(self):
+        state = {}
+        client = _state_client(state)
+        save_checkpoint(client, self.config, self.logger, RunCheckpoint(config_key(self.config), watermark="ts1"))
+        writer = MagicMock()
+        writer.stats.failed_chunks = 1
+
+        save_checkpoint(client, self.config, self.logger, RunCheckpoint(config_key(self.config), watermark="ts9"), writer)
+
+        assert read_checkpoint(client, self.config, self.logger).watermark == "ts1"
+
+    def test_checkpoint_of_another_configuration_is_not_resumed(self):
+        state = {STAT_STORE_RUN_CHECKPOINT: RunCheckpoint("another configuration").dumps()}
+        assert read_checkpoint(_state_client(state), self.config, self.logger) is None
+
+
+class FakeRaw:
+    """In-memory RAW rows API, tables keyed by (db, table)."""
+
+    def __init__(self):
+        self.tables: dict[tuple[str, str], dict[str, dict]] = {}
+
+    def list(self, db_name=None, table_name=None, limit=25, **kwargs):
+        rows = self.tables.get((db_name, table_name), {})
+        return [SimpleNamespace(key=k, columns=v) for k, v in rows.items()]
+
+    def insert(self, db_name, table_name, row, ensure_parent=False):
+        rows = self.tables.setdefault((db_name, table_name), {})
+        if isinstance(row, dict):
+            rows.update(row)
+        else:
+            rows[row.key] = row.columns
+
+    def delete(self, db_name, table_name, key):
+        for k in key:
+            self.tables.get((db_name, table_name), {}).pop(k, None)
+
+
+class TestIncremental:
+    """Test suite for incremental (sync cursor) target and entity reads."""
+
+    def setup_method(self):
+        self.logger = CogniteFunctionLogger("WARNING")
+        self.config = _config()
+        self.config.data.target_view.filter_property = "tags"
+        self.config.data.target_view.filter_values = ["tag"]
+        self.raw = FakeRaw()
+        self.client = CogniteClientMock()
+        self.client.raw.rows = self.raw
+        self.client.raw.tables.delete.side_effect = lambda db, tables: [
+            self.raw.tables.pop((db, t), None) for t in tables
+        ]
+
+    def _node(self, view, external_id: str, deleted: bool = False, **properties) -> SimpleNamespace:
+        return SimpleNamespace(
+            space=view.instance_space,
+            external_id=external_id,
+            deleted_time=1 if deleted else None,
+            properties={view.as_view_id(): {"name": external_id.upper(), **properties}},
+        )
+
+    def _sync_targets(self, changes: list, **kwargs) -> list:
+        self.client.data_modeling.instances = FakeSync(changes, **kwargs)
+        self.targets_changed, state = sync_target_snapshot(self.client, self.config, self.logger)
+        # The cursor is stored by the caller once the run is done
+        self.raw.insert("db", "state", {STAT_STORE_TARGET_SYNC: {STAT_STORE_VALUE: state}})
+        return read_target_snapshot(self.client, self.config, self.logger)
+
+    def test_target_snapshot_follows_changes(self):
+        view = self.config.data.target_view
+        changes = [self._node(view, "b", tags=["tag"]), self._node(view, "a", tags="tag"), self._node(view, "c")]
+
+        targets = self._sync_targets(changes)
+        assert [(t["asset_ext_id"], t["name"]) for t in targets.records()] == [("a", "A"), ("b", "B")]
+
+        # Next run only sees the changes: "b" leaves the filter, "a" is deleted, "d" is new
+        changes += [self._node(view, "b"), self._node(view, "a", deleted=True), self._node(view, "d", tags=["tag"])]
+        targets = self._sync_targets(changes)
+        assert [t["asset_ext_id"] for t in targets.records()] == ["d"]
+        assert len(self.client.data_modeling.instances.queries) == 2
+        assert self.targets_changed == 3
+
+        self._sync_targets(changes)
+        assert self.targets_changed == 0
+
+    def test_expired_target_cursor_rebuilds_snapshot(self):
+        view = self.config.data.target_view
+        changes = [self._node(view, "a", tags="tag")]
+        self._sync_targets(changes)
+        self.raw.insert("db", self.config.parameters.raw_table_target_snapshot, {"stale": {"name": "X", "matchValues": ["X"]}})
+
+        targets = self._sync_targets(changes, expired=("1",))
+
+        assert [t["asset_ext_id"] for t in targets.records()] == ["a"]
+
+    def test_changed_entities_and_cursor(self):
+        view = self.config.data.entity_view
+        changes = [
+            self._node(view, "ts1", assets=None),
+            self._node(view, "ts2", assets=[{"space": "asset_space", "externalId": "a"}]),
+            self._node(view, "ts3", assets=None),
+            self._node(view, "ts3", deleted=True),
+        ]
+        self.client.data_modeling.instances = FakeSync(changes)
+
+        entities, state = sync_changed_entities(self.client, self.config, self.logger)
+
+        assert [e.external_id for e in entities] == ["ts1"]
+        # The cursor is stored by the caller once the entities are processed
+        assert STAT_STORE_ENTITY_SYNC not in self.raw.tables.get(("db", "state"), {})
+        self.raw.insert("db", "state", {STAT_STORE_ENTITY_SYNC: {STAT_STORE_VALUE: state}})
+        entities, _ = sync_changed_entities(self.client, self.config, self.logger)
+        assert entities == []
+        assert STAT_STORE_TARGET_SYNC not in self.raw.tables.get(("db", "state"), {})
+
+
+class TestIncrementalRun:
+    """Test suite for the entities an incremental run matches."""
+
+    def setup_method(self):
+        self.logger = CogniteFunctionLogger("WARNING")
+        self.config = _config()
+        self.config.parameters.incremental = True
+        self.state = {}
+
+    def _run(self, targets_changed: int, changed_entities: list) -> dict[str, MagicMock]:
+        calls = {}
+        with patch("pipeline.sync_target_snapshot", return_value=(targets_changed, "target cursor")), \
+                patch("pipeline.sync_changed_entities", return_value=(changed_entities, "entity cursor")), \
+                patch("pipeline.read_target_snapshot", return_value=_targets({"a1": "A1"})) as calls["targets"], \
+                patch("pipeline.get_new_entities", return_value=EntityStore()) as calls["unlinked"], \
+                patch("pipeline._build_entities", return_value=EntityStore()) as calls["changed"], \
+                patch("pipeline.read_manual_mappings", return_value=([], {})), \
+                patch("pipeline.read_rule_mappings", return_value=[]), \
+                patch("cognite.extractorutils.uploader.RawUploadQueue"):
+            entity_matching(_state_client(self.state), self.logger, {"ExtractionPipelineExtId": "ep"}, self.config)
+        return calls
+
+    def test_nothing_changed_skips_the_target_snapshot(self):
+        calls = self._run(0, [])
+
+        calls["targets"].assert_not_called()
+        assert (self.state[STAT_STORE_TARGET_SYNC], self.state[STAT_STORE_ENTITY_SYNC]) == ("target cursor", "entity cursor")
+
+    def test_changed_entities_only(self):
+        calls = self._run(0, [SimpleNamespace(external_id="ts1")])
+
+        calls["changed"].assert_called_once()
+        calls["unlinked"].assert_not_called()
+
+    def test_changed_targets_match_all_unlinked_entities(self):
+        """Entities left unmatched by earlier runs are evaluated against the new targets"""
+        calls = self._run(2, [])
+
+        calls["unlinked"].assert_called_once()
+        calls["changed"].assert_not_called()
+        assert self.state[STAT_STORE_TARGET_SYNC] == "target cursor"
+
+
+class TestExternalIdSplitPoints:
+    """Test suite for externalId range split points."""
+
+    def test_estimate_is_sorted_and_within_bounds(self):
+        boundaries = estimate_external_id_boundaries("asset:000001", "asset:600000", 8)
+        assert boundaries == sorted(set(boundaries))
+        assert all("asset:000001" < b <= "asset:600000" for b in boundaries)
+        assert all(ord(c) < 128 for b in boundaries for c in b)
+
+    def test_estimate_single_id(self):
+        assert estimate_external_id_boundaries("x", "x", 8) == []
+
+    def test_quantiles_skip_duplicates(self):
+        assert external_id_quantiles(["a", "b", "c", "d"], 2) == ["c"]
+        assert external_id_quantiles(["a", "a", "a", "b"], 4) == ["b"]
+
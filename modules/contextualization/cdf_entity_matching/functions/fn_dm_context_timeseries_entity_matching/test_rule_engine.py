@@ -0,0 +1,71 @@
+import re
+import sys
+from pathlib import Path
+
+# Add the current directory to the path so we can import the modules
+sys.path.append(str(Path(__file__).parent))
+
+from constants import COL_KEY_RULE_REGEXP_ENTITY, COL_KEY_RULE_REGEXP_TARGET, KEY_RULE
+from rule_engine import RuleSet, required_literal
+
+
+def _brute_force_keys(rules, name):
+    keys = []
+    for rule_key, pattern in rules:
+        match = pattern.search(name)
+        if match:
+            keys.append(rule_key + "_" + "".join(group for group in match.groups() if group))
+    return keys
+
+
+class TestRequiredLiteral:
+    """Test suite for literal extraction from rule patterns."""
+
+    def test_literal_runs_through_groups_and_anchors(self):
+        assert required_literal(re.compile(r"21(PT\d+)")) == "21PT"
+        assert required_literal(re.compile(r"^AB(C)?D")) == "AB"
+        assert required_literal(re.compile(r"[A-Z]{2}_(\d{3})_PV$")) == "_PV"
+
+    def test_mandatory_repeat_contributes_its_literal(self):
+        assert required_literal(re.compile(r"x(abc)+d")) == "abc"
+
+    def test_no_prefilter_for_case_insensitive_or_literal_free_patterns(self):
+        assert required_literal(re.compile(r"(?i)foo(\d)")) is None
+        assert required_literal(re.compile(r"^(\w+)$")) is None
+
+
+class TestRuleSet:
+    """Test suite for the prefiltered rule set."""
+
+    def test_keys_match_running_every_pattern(self):
+        rules = [
+            ("1", re.compile(r"PT-(\d+)")),
+            ("2", re.compile(r"^(\w)\w+-(\d+)$")),
+            ("3", re.compile(r"(?i)pt(\d)")),
+            ("4", re.compile(r"(\w+)_TT$")),
+            ("5", re.compile(r"PT")),
+            ("6", re.compile(r"^A(B)?C(\d)")),
+        ]
+        rule_set = RuleSet(rules)
+        names = ["PT-100", "xpt7", "FOO_TT", "AC5", "ABC9_TT", "nothing", "", "PT-PT-1", "A-1"]
+
+        assert rule_set.prefiltered_count == 5  # all but the case-insensitive rule
+        for name in names:
+            assert rule_set.keys(name) == _brute_force_keys(rules, name), name
+
+    def test_overlapping_literals_are_all_found(self):
+        rules = [("1", re.compile("abcd")), ("2", re.compile("bc")), ("3", re.compile("c"))]
+        assert RuleSet(rules).keys("xabcdx") == ["1_", "2_", "3_"]
+        assert RuleSet(rules).keys("xbcx") == ["2_", "3_"]
+
+    def test_from_rule_mappings_selects_side(self):
+        rule_mappings = [
+            {
+                KEY_RULE: "1",
+                COL_KEY_RULE_REGEXP_ENTITY: re.compile(r"TS_(\d+)"),
+                COL_KEY_RULE_REGEXP_TARGET: re.compile(r"A_(\d+)"),
+            }
+        ]
+        assert RuleSet.from_rule_mappings(rule_mappings, COL_KEY_RULE_REGEXP_ENTITY).keys("TS_42") == ["1_42"]
+        assert RuleSet.from_rule_mappings(rule_mappings, COL_KEY_RULE_REGEXP_TARGET).keys("TS_42") == []
+        assert len(RuleSet.from_rule_mappings(None, COL_KEY_RULE_REGEXP_TARGET)) == 0
@@ -0,0 +1,55 @@
+import sys
+import time
+from pathlib import Path
+
+# Add the current directory to the path so we can import the modules
+sys.path.append(str(Path(__file__).parent))
+
+from run_checkpoint import EntityWatermark, RunCheckpoint
+
+
+class TestEntityWatermark:
+    """Test suite for the entity watermark of a run checkpoint."""
+
+    def test_watermark_moves_over_the_done_prefix(self):
+        watermark = EntityWatermark(["ts3", "ts1", "ts2", "ts4"])
+        assert watermark.value is None
+
+        assert watermark.done(["ts2", "ts3"]) is None  # ts1 is not done yet
+        assert watermark.done(["ts1"]) == "ts3"
+        assert watermark.done(["unknown", "ts1"]) == "ts3"
+        assert watermark.done(["ts4"]) == "ts4"
+
+    def test_entity_is_done_when_all_its_sources_are(self):
+        watermark = EntityWatermark(["ts1", "ts1", "ts2"])
+        assert watermark.done(["ts1", "ts2"]) is None
+        assert watermark.done(["ts1"]) == "ts2"
+
+    def test_pending_entities(self):
+        watermark = EntityWatermark(["ts1", "ts2", "ts3", "ts3"])
+        watermark.done(["ts2", "ts3"])
+        assert watermark.pending == ["ts1", "ts3"]
+        watermark.done(["ts1", "ts3"])
+        assert watermark.pending == []
+
+
+class TestRunCheckpoint:
+    """Test suite for storing and resuming run checkpoints."""
+
+    def test_round_trip(self):
+        checkpoint = RunCheckpoint("key", "ts42")
+        loaded = RunCheckpoint.loads(checkpoint.dumps())
+        assert (loaded.config_key, loaded.watermark) == ("key", "ts42")
+        assert loaded.started_at == checkpoint.started_at
+
+    def test_only_same_configuration_and_recent_checkpoints_resume(self):
+        checkpoint = RunCheckpoint("key")
+        assert checkpoint.resumes("key")
+        assert not checkpoint.resumes("other key")
+        checkpoint.updated_at = time.time() - 3600
+        assert not checkpoint.resumes("key", max_age=60)
+
+    def test_missing_or_unreadable_checkpoint(self):
+        assert RunCheckpoint.loads("") is None
+        assert RunCheckpoint.loads("{not json") is None
+        assert RunCheckpoint.loads('{"watermark": "ts1"}') is None
@@ -0,0 +1,160 @@
+"""
+Synthetic assets and time series, and an in-memory stand-in for the parts of
+`CogniteClient` the entity matching and metadata update functions use.
+
+Data is deterministic for a given size: asset tags are ``<area>-<class>-<number>``
+(e.g. ``23-PT-10042``), in a three-level hierarchy (root, area, tag), and time
+series are named after the tags (``VAL_23-PT-10042:X.Value``), with a share of
+names that match no asset.
+"""
+
+import bisect
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any
+
+from cognite.client.data_classes.data_modeling import Node, NodeList
+
+TAG_CLASSES = ("PT", "TT", "FT", "LT", "PIC", "FIC", "KA", "HV", "PSV", "XV")
+AREAS = 90  # areas 10..99 per root
+ASSETS_PER_ROOT = 100_000
+UNMATCHED_TS_SHARE = 10  # every 10th time series matches no asset
+
+
+@dataclass(frozen=True)
+class SyntheticAsset:
+    external_id: str
+    name: str
+    parent: str | None
+    root: str
+
+
+def tag(index: int) -> str:
+    """Unique ``<area>-<class>-<number>`` tag for ``index`` (unique below 81M)."""
+    area = 10 + index % AREAS
+    tag_class = TAG_CLASSES[index // AREAS % len(TAG_CLASSES)]
+    number = 10000 + index // (AREAS * len(TAG_CLASSES)) % 90000
+    return f"{area}-{tag_class}-{number}"
+
+
+def asset_hierarchy(count: int) -> list[SyntheticAsset]:
+    """``count`` assets: roots, one asset per area under each root, and tag assets under the areas."""
+    num_roots = max(1, count // ASSETS_PER_ROOT)
+    assets = [SyntheticAsset(f"root_{r:03d}", f"Site {r}", None, f"root_{r:03d}") for r in range(num_roots)]
+    for r in range(num_roots):
+        for area in range(10, 10 + AREAS):
+            if len(assets) >= count:
+                return assets
+            assets.append(SyntheticAsset(f"area_{r:03d}_{area}", f"Area {area}", f"root_{r:03d}", f"root_{r:03d}"))
+    for i in range(count - len(assets)):
+        r = i % num_roots
+        name = tag(i)
+        assets.append(SyntheticAsset(f"asset_{i:08d}", name, f"area_{r:03d}_{name[:2]}", f"root_{r:03d}"))
+    return assets
+
+
+def timeseries_names(count: int, num_tags: int) -> list[tuple[str, str]]:
+    """``count`` (externalId, name) pairs, named after the first ``num_tags`` tags."""
+    names = []
+    for i in range(count):
+        if i % UNMATCHED_TS_SHARE == UNMATCHED_TS_SHARE - 1 or not num_tags:
+            names.append((f"ts_{i:08d}", f"SYS_{i}.Status"))
+        else:
+            names.append((f"ts_{i:08d}", f"VAL_{tag(i % num_tags)}:X.Value"))
+    return names
+
+
+def node_dump(space: str, external_id: str, view: tuple[str, str, str], properties: dict[str, Any]) -> dict[str, Any]:
+    """A node in the format of the DMS API responses (`Node.load`)."""
+    view_space, view_external_id, view_version = view
+    return {
+        "instanceType": "node",
+        "space": space,
+        "externalId": external_id,
+        "version": 1,
+        "lastUpdatedTime": 0,
+        "createdTime": 0,
+        "properties": {view_space: {f"{view_external_id}/{view_version}": properties}},
+    }
+
+
+def load_nodes(dumps: list[dict[str, Any]]) -> list[Node]:
+    return [Node.load(dump) for dump in dumps]
+
+
+class InMemoryInstances:
+    """`instances.list` (filters: ``and`` and ``range`` on node.externalId) and `instances.apply`."""
+
+    def __init__(self, nodes: list[dict[str, Any]]) -> None:
+        self.nodes = sorted(nodes, key=lambda node: node["externalId"])
+        self.external_ids = [node["externalId"] for node in self.nodes]
+        self.applied = 0
+        self.list_calls = 0
+
+    def _bounds(self, flt: dict[str, Any], low: int, high: int) -> tuple[int, int]:
+        if "and" in flt:
+            for sub_filter in flt["and"]:
+                low, high = self._bounds(sub_filter, low, high)
+            return low, high
+        if "range" in flt and flt["range"]["property"] == ["node", "externalId"]:
+            bounds = flt["range"]
+            if "gt" in bounds:
+                low = max(low, bisect.bisect_right(self.external_ids, bounds["gt"]))
+            if "gte" in bounds:
+                low = max(low, bisect.bisect_left(self.external_ids, bounds["gte"]))
+            if "lt" in bounds:
+                high = min(high, bisect.bisect_left(self.external_ids, bounds["lt"]))
+            return low, high
+        raise NotImplementedError(f"Filter not supported by the in-memory client: {flt}")
+
+    def list(self, space=None, sources=None, filter=None, sort=None, limit=25, **kwargs) -> NodeList:
+        self.list_calls += 1
+        low, high = self._bounds(filter.dump() if filter is not None else {"and": []}, 0, len(self.nodes))
+        selected = self.nodes[low:max(low, high)]
+        if sort is not None and sort.direction == "descending":
+            selected = selected[::-1]
+        if limit is not None and limit >= 0:
+            selected = selected[:limit]
+        return NodeList(load_nodes(selected))
+
+    def apply(self, items, **kwargs) -> None:
+        self.applied += len(items) if isinstance(items, list) else 1
+
+
+class InMemoryRows:
+    """RAW rows of all tables, by (db, table) and row key."""
+
+    def __init__(self) -> None:
+        self.tables: dict[tuple[str, str], dict[str, dict[str, Any]]] = {}
+
+    def list(self, db_name=None, table_name=None, limit=25, columns=None, **kwargs) -> list:
+        rows = self.tables.get((db_name, table_name), {})
+        return [SimpleNamespace(key=key, columns=columns) for key, columns in rows.items()]
+
+    def insert(self, db_name, table_name, row, **kwargs) -> None:
+        rows = row if isinstance(row, list) else [row]
+        table = self.tables.setdefault((db_name, table_name), {})
+        for item in rows:
+            table[item.key] = item.columns
+
+    def delete(self, db_name, table_name, key, **kwargs) -> None:
+        table = self.tables.get((db_name, table_name), {})
+        for row_key in [key] if isinstance(key, str) else key:
+            table.pop(row_key, None)
+
+
+def in_memory_client(nodes: list[dict[str, Any]]) -> SimpleNamespace:
+    """Stand-in for `CogniteClient` with the given nodes; only what the benchmarked code calls."""
+    rows = InMemoryRows()
+    return SimpleNamespace(
+        data_modeling=SimpleNamespace(instances=InMemoryInstances(nodes)),
+        raw=SimpleNamespace(
+            rows=rows,
+            databases=SimpleNamespace(create=lambda *args, **kwargs: None),
+            tables=SimpleNamespace(
+                create=lambda *args, **kwargs: None,
+                list=lambda *args, **kwargs: [SimpleNamespace(name=table) for _db, table in rows.tables],
+                delete=lambda db, tables, **kwargs: [rows.tables.pop((db, table), None) for table in tables],
+            ),
+        ),
+    )
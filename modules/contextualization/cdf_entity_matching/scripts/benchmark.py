@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks for the entity matching and metadata update functions.
+
+Runs the functions' code on synthetic assets and time series (see
+`_synthetic_data.py`) against an in-memory stand-in for `CogniteClient`, and
+reports throughput and peak memory per benchmark and scale as JSON:
+
+  get_all_targets       read and key all targets (entity matching)
+  rule_keys             rule keys of all asset names (entity matching `RuleSet`)
+  apply_rule_mappings   rule-based matching of time series to assets, writes included
+  metadata_timeseries   `OptimizedMetadataProcessor.process_timeseries_batch`, page by page
+  metadata_assets       `OptimizedMetadataProcessor.process_asset_batch`, page by page
+
+Every benchmark and scale runs in its own process, once for time and once for
+memory (`tracemalloc` peak of the allocations made by the benchmarked call; the
+setup is not counted). Time is measured without tracing.
+
+Run from the repository root, e.g.:
+
+  python modules/contextualization/cdf_entity_matching/scripts/benchmark.py --scales 10000,100000 -o bench.json
+  python modules/contextualization/cdf_entity_matching/scripts/benchmark.py --baseline bench.json
+
+With ``--baseline`` the results are compared with an earlier results file and the
+script exits with 1 if a benchmark got more than ``--max-regression`` slower.
+"""
+
+import argparse
+import gc
+import json
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+FUNCTIONS_DIR = SCRIPTS_DIR.parent / "functions"
+ENTITY_MATCHING_DIR = FUNCTIONS_DIR / "fn_dm_context_timeseries_entity_matching"
+METADATA_UPDATE_DIR = FUNCTIONS_DIR / "fn_dm_context_metadata_update"
+RESULTS_SCHEMA_VERSION = 1
+
+ASSET_VIEW = ("cdf_cdm", "CogniteAsset", "v1")
+TIMESERIES_VIEW = ("cdf_cdm", "CogniteTimeSeries", "v1")
+ASSET_SPACE = "asset_space"
+TIMESERIES_SPACE = "ts_space"
+
+# Rule mappings as `read_rule_mappings` returns them: (rule key, entity regex, target regex)
+RULES = (
+    ("tag", r"(\d{2})-([A-Z]{2,3})-(\d{4,5})", r"(\d{2})-([A-Z]{2,3})-(\d{4,5})"),
+    ("loop", r"(\d{2})-[FP](IC)-(\d{4,5})", r"(\d{2})-[FP](IC)-(\d{4,5})"),
+)
+
+Setup = Callable[[int], tuple[int, Callable[[], object]]]
+
+
+# ===== BENCHMARK SETUPS (run inside the worker process) =====
+
+def _logger():
+    from logger import CogniteFunctionLogger
+
+    return CogniteFunctionLogger("ERROR")
+
+
+def _entity_matching_config():
+    from config import Config, ConfigData, Parameters, ViewPropertyConfig
+
+    def view(view_id: tuple[str, str, str], instance_space: str) -> ViewPropertyConfig:
+        return ViewPropertyConfig(
+            schemaSpace=view_id[0], externalId=view_id[1], version=view_id[2],
+            instanceSpace=instance_space, searchProperty="aliases",
+        )
+
+    return Config(
+        parameters=Parameters(
+            debug=False, dmUpdate=True, runAll=False, removeOldLinks=False, rawDb="db", rawTableState="state",
+            rawTaleCtxGood="good", rawTaleCtxBad="bad", autoApprovalThreshold=0.85,
+        ),
+        data=ConfigData(entityView=view(TIMESERIES_VIEW, TIMESERIES_SPACE), targetView=view(ASSET_VIEW, ASSET_SPACE)),
+    )
+
+
+def _rule_mappings() -> list[dict[str, Any]]:
+    from constants import COL_KEY_RULE_REGEXP_ENTITY, COL_KEY_RULE_REGEXP_TARGET, KEY_RULE
+
+    return [
+        {KEY_RULE: key, COL_KEY_RULE_REGEXP_ENTITY: re.compile(entity), COL_KEY_RULE_REGEXP_TARGET: re.compile(target)}
+        for key, entity, target in RULES
+    ]
+
+
+def _asset_aliases(name: str) -> list[str]:
+    return [name, name.replace("-", "")]
+
+
+def setup_get_all_targets(scale: int) -> tuple[int, Callable[[], object]]:
+    from _synthetic_data import asset_hierarchy, in_memory_client, node_dump
+    from pipeline import get_all_targets
+
+    nodes = [
+        node_dump(ASSET_SPACE, asset.external_id, ASSET_VIEW, {"name": asset.name, "aliases": _asset_aliases(asset.name)})
+        for asset in asset_hierarchy(scale)
+    ]
+    client, logger, config, rules = in_memory_client(nodes), _logger(), _entity_matching_config(), _rule_mappings()
+    return scale, lambda: get_all_targets(client, logger, config, rules)
+
+
+def setup_rule_keys(scale: int) -> tuple[int, Callable[[], object]]:
+    from _synthetic_data import asset_hierarchy
+    from constants import COL_KEY_RULE_REGEXP_TARGET
+    from rule_engine import RuleSet
+
+    names = [asset.name for asset in asset_hierarchy(scale)]
+    rules = _rule_mappings()
+
+    def run() -> int:
+        rule_set = RuleSet.from_rule_mappings(rules, COL_KEY_RULE_REGEXP_TARGET)
+        return sum(len(rule_set.keys(name)) for name in names)
+
+    return scale, run
+
+
+def setup_apply_rule_mappings(scale: int) -> tuple[int, Callable[[], object]]:
+    from _synthetic_data import asset_hierarchy, in_memory_client, timeseries_names
+    from constants import COL_KEY_RULE_REGEXP_ENTITY, COL_KEY_RULE_REGEXP_TARGET
+    from instance_writer import InstanceWriter
+    from match_store import EntityStore, TargetStore
+    from pipeline import apply_rule_mappings
+    from rule_engine import RuleSet
+
+    rules = _rule_mappings()
+    target_rules = RuleSet.from_rule_mappings(rules, COL_KEY_RULE_REGEXP_TARGET)
+    entity_rules = RuleSet.from_rule_mappings(rules, COL_KEY_RULE_REGEXP_ENTITY)
+    assets = asset_hierarchy(scale)
+    targets = TargetStore()
+    for asset in assets:
+        targets.add(asset.external_id, asset.name, _asset_aliases(asset.name), target_rules.keys(asset.name))
+    entities = EntityStore()
+    num_tags = sum(1 for asset in assets if asset.external_id.startswith("asset_"))
+    for external_id, name in timeseries_names(scale, num_tags):
+        entities.add(external_id, name, [name], entity_rules.keys(name))
+    client, logger, config = in_memory_client([]), _logger(), _entity_matching_config()
+
+    def run() -> int:
+        with InstanceWriter(client, logger) as writer:
+            _good_matches, count = apply_rule_mappings(client, config, logger, [], targets, entities, writer)
+        return count
+
+    return scale, run
+
+
+def setup_metadata_timeseries(scale: int) -> tuple[int, Callable[[], object]]:
+    from _synthetic_data import load_nodes, node_dump, timeseries_names
+    from cognite.client.data_classes.data_modeling import ViewId
+    from constants import PAGE_SIZE
+    from metadata_optimizations import OptimizedMetadataProcessor
+
+    nodes = load_nodes([
+        node_dump(TIMESERIES_SPACE, external_id, TIMESERIES_VIEW, {"name": name, "aliases": []})
+        for external_id, name in timeseries_names(scale, scale)
+    ])
+    view_id, logger = ViewId(*TIMESERIES_VIEW), _logger()
+
+    def run() -> int:
+        processor = OptimizedMetadataProcessor(logger)
+        return sum(
+            update is not None
+            for start in range(0, len(nodes), PAGE_SIZE)
+            for update in processor.process_timeseries_batch(nodes[start:start + PAGE_SIZE], view_id, TIMESERIES_SPACE)
+        )
+
+    return scale, run
+
+
+def setup_metadata_assets(scale: int) -> tuple[int, Callable[[], object]]:
+    from _synthetic_data import asset_hierarchy, load_nodes, node_dump
+    from cognite.client.data_classes.data_modeling import ViewId
+    from constants import PAGE_SIZE
+    from metadata_optimizations import OptimizedMetadataProcessor
+
+    nodes = load_nodes([
+        node_dump(ASSET_SPACE, asset.external_id, ASSET_VIEW, {
+            "name": asset.name, "aliases": [], "tags": [],
+            "root": {"space": ASSET_SPACE, "externalId": asset.root},
+        })
+        for asset in asset_hierarchy(scale)
+    ])
+    view_id, logger = ViewId(*ASSET_VIEW), _logger()
+
+    def run() -> int:
+        processor = OptimizedMetadataProcessor(logger)
+        return sum(
+            update is not None
+            for start in range(0, len(nodes), PAGE_SIZE)
+            for update in processor.process_asset_batch(nodes[start:start + PAGE_SIZE], view_id, ASSET_SPACE)
+        )
+
+    return scale, run
+
+
+# name -> (function directory the code is imported from, setup)
+BENCHMARKS: dict[str, tuple[Path, Setup]] = {
+    "get_all_targets": (ENTITY_MATCHING_DIR, setup_get_all_targets),
+    "rule_keys": (ENTITY_MATCHING_DIR, setup_rule_keys),
+    "apply_rule_mappings": (ENTITY_MATCHING_DIR, setup_apply_rule_mappings),
+    "metadata_timeseries": (METADATA_UPDATE_DIR, setup_metadata_timeseries),
+    "metadata_assets": (METADATA_UPDATE_DIR, setup_metadata_assets),
+}
+
+
+def run_worker(name: str, scale: int, measure: str) -> dict[str, Any]:
+    """Set up and run one benchmark in this process; ``measure`` is "time" or "memory"."""
+    function_dir, setup = BENCHMARKS[name]
+    sys.path[:0] = [str(function_dir), str(SCRIPTS_DIR)]
+    items, run = setup(scale)
+    gc.collect()
+    if measure == "memory":
+        tracemalloc.start()
+        run()
+        _current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {"peak_memory_mb": round(peak / 2**20, 2)}
+    start = time.perf_counter()
+    run()
+    seconds = time.perf_counter() - start
+    return {"items": items, "seconds": round(seconds, 4), "items_per_second": round(items / seconds, 1) if seconds else None}
+
+
+# ===== RUNNER =====
+
+def _measure(name: str, scale: int, measure: str) -> dict[str, Any]:
+    """Run one measurement in a fresh process (separate imports, caches and memory)."""
+    with tempfile.NamedTemporaryFile(suffix=".json") as result_file:
+        process = subprocess.run(  # noqa: S603 - re-runs this script with fixed arguments
+            [sys.executable, __file__, "--worker", name, str(scale), measure, result_file.name],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=False,
+        )
+        if process.returncode != 0:
+            return {"error": process.stderr.strip().splitlines()[-1] if process.stderr.strip() else f"exit {process.returncode}"}
+        return json.loads(Path(result_file.name).read_text())
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=SCRIPTS_DIR, capture_output=True, text=True, check=True  # noqa: S607
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(names: list[str], scales: list[int], memory: bool = True) -> dict[str, Any]:
+    results = []
+    for name in names:
+        for scale in scales:
+            result: dict[str, Any] = {"benchmark": name, "scale": scale}
+            result.update(_measure(name, scale, "time"))
+            if memory and "error" not in result:
+                result.update(_measure(name, scale, "memory"))
+            results.append(result)
+            print(_format_result(result), file=sys.stderr)
+    return {
+        "schema_version": RESULTS_SCHEMA_VERSION,
+        "created": datetime.now(UTC).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def _format_result(result: dict[str, Any]) -> str:
+    label = f"{result['benchmark']:<22} {result['scale']:>9,}"
+    if "error" in result:
+        return f"{label}  ERROR: {result['error']}"
+    text = f"{label}  {result['seconds']:>9.3f}s  {result['items_per_second'] or 0:>12,.0f} items/s"
+    if "peak_memory_mb" in result:
+        text += f"  {result['peak_memory_mb']:>9.1f} MB peak"
+    return text
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], max_regression: float) -> list[str]:
+    """Benchmarks whose throughput dropped by more than ``max_regression`` (fraction) against ``baseline``."""
+    previous = {(r["benchmark"], r["scale"]): r for r in baseline.get("results", []) if "error" not in r}
+    regressions = []
+    for result in results["results"]:
+        before = previous.get((result["benchmark"], result["scale"]))
+        if before is None or "error" in result or not before.get("items_per_second"):
+            continue
+        speed = result["items_per_second"] / before["items_per_second"]
+        line = f"{result['benchmark']:<22} {result['scale']:>9,}  throughput x{speed:.2f}"
+        if result.get("peak_memory_mb") and before.get("peak_memory_mb"):
+            line += f"  peak memory x{result['peak_memory_mb'] / before['peak_memory_mb']:.2f}"
+        if speed < 1 - max_regression:
+            line += "  REGRESSION"
+            regressions.append(line)
+        print(line, file=sys.stderr)
+    return regressions
+
+
+def main() -> None:
+    if len(sys.argv) == 6 and sys.argv[1] == "--worker":
+        _flag, name, scale, measure, output = sys.argv[1:]
+        Path(output).write_text(json.dumps(run_worker(name, int(scale), measure)))
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--benchmarks", default=",".join(BENCHMARKS), help="comma-separated benchmark names")
+    parser.add_argument("--scales", default="10000,100000", help="comma-separated sizes (10000 to 5000000)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak memory measurement")
+    parser.add_argument("-o", "--output", type=Path, help="write the results JSON here (default: stdout)")
+    parser.add_argument("--baseline", type=Path, help="earlier results JSON to compare with")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed throughput drop vs baseline")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.benchmarks.split(",") if name.strip()]
+    unknown = sorted(set(names) - set(BENCHMARKS))
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)} (available: {', '.join(BENCHMARKS)})")
+    scales = [int(scale) for scale in args.scales.split(",") if scale.strip()]
+
+    results = run_benchmarks(names, scales, memory=not args.no_memory)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n")
+    else:
+        print(output)
+
+    failed = any("error" in result for result in results["results"])
+    if args.baseline and compare(results, json.loads(args.baseline.read_text()), args.max_regression):
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -49,8 +49,14 @@ Computes all quality metrics in a single function:
 Results are saved to a Cognite File as JSON for persistence.
 """
 
+import json
 import logging
 import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any
 
 from cognite.client import CogniteClient
 from cognite.client.data_classes.data_modeling import ViewId
@@ -58,29 +64,44 @@ from cognite.client.data_classes.data_modeling import ViewId
 # Import from metrics modules
 # Note: Using absolute import for compatibility with manual zip deployment to CDF
 from metrics import (
+    # Batch file format
+    BATCH_FORMAT_BINARY,
     # Config and constants
     DEFAULT_CONFIG,
     LOG_EVERY_N_BATCHES,
+    # Partitioned batch collection
+    PARTITION_MODE_EXTERNAL_ID,
+    PARTITION_MODE_OFFSET,
     # Accumulator
     CombinedAccumulator,
     # File annotation processors
     FileAnnotationAccumulator,
+    IncrementalState,
     # 3D model processors
     Model3DAccumulator,
+    PartitionPlan,
+    # Single-pass view fan-out
+    ViewScan,
+    build_range_filter,
     compute_3d_metrics,
     compute_asset_hierarchy_metrics,
     compute_equipment_metrics,
     compute_file_annotation_metrics,
     compute_file_metrics,
     compute_historical_gaps_batch,
+    compute_historical_gaps_cached,
     compute_maintenance_metrics,
     # Metric computers
     compute_ts_metrics,
     delete_batch_files,
     # Utilities
     format_elapsed,
+    get_accumulator_class,
     list_batch_files,
     load_and_merge_all_batches,
+    load_incremental_state,
+    load_partition_plan,
+    plan_partitions,
     process_3d_object_batch,
     process_annotation_batch,
     process_asset_3d_batch,
@@ -95,8 +116,11 @@ from metrics import (
     process_timeseries_batch,
     # Batch processing
     save_batch_file,
+    save_incremental_state,
     # Storage
     save_metrics_to_file,
+    save_partition_plan,
+    sync_views,
 )
 
 # ----------------------------------------------------
@@ -134,7 +158,9 @@ def _handle_aggregation(client: CogniteClient, config: dict, start_time: float)
     
     logger.info(f"Found {len(batch_files)} batch files to merge")
     
-    merged_acc, merged_m3d, merged_ann = load_and_merge_all_batches(client)
+    merged_acc, merged_m3d, merged_ann = load_and_merge_all_batches(
+        client, get_accumulator_class(config.get("accumulator_backend")), batch_files
+    )
     
     if not merged_acc:
         logger.error("Failed to merge batch files")
@@ -285,377 +311,509 @@ def _handle_aggregation(client: CogniteClient, config: dict, start_time: float)
     return all_metrics
 
 
-def _handle_batch_collection(client: CogniteClient, config: dict, start_time: float) -> dict:
+def _build_view_ids(config: dict) -> dict[str, ViewId]:
+    """Build the view IDs used by batch collection, keyed by entity type."""
+    return {
+        "ts": ViewId(
+            config["ts_view_space"],
+            config["ts_view_external_id"],
+            config["ts_view_version"]
+        ),
+        "assets": ViewId(
+            config["asset_view_space"],
+            config["asset_view_external_id"],
+            config["asset_view_version"]
+        ),
+        "equipment": ViewId(
+            config["equipment_view_space"],
+            config["equipment_view_external_id"],
+            config["equipment_view_version"]
+        ),
+        "notifications": ViewId(
+            config["notification_view_space"],
+            config["notification_view_external_id"],
+            config["notification_view_version"]
+        ),
+        "orders": ViewId(
+            config["maintenance_order_view_space"],
+            config["maintenance_order_view_external_id"],
+            config["maintenance_order_view_version"]
+        ),
+        "failure_notifications": ViewId(
+            config["failure_notification_view_space"],
+            config["failure_notification_view_external_id"],
+            config["failure_notification_view_version"]
+        ),
+        "annotations": ViewId(
+            config["annotation_view_space"],
+            config["annotation_view_external_id"],
+            config["annotation_view_version"],
+        ),
+        "3d_objects": ViewId(
+            config["object3d_view_space"],
+            config["object3d_view_external_id"],
+            config["object3d_view_version"],
+        ),
+        "files": ViewId(
+            config.get("file_view_space", "cdf_cdm"),
+            config.get("file_view_external_id", "CogniteFile"),
+            config.get("file_view_version", "v1"),
+        ),
+    }
+
+
+def _partition_views(config: dict) -> dict[str, tuple[ViewId, str]]:
+    """Views to partition for a batch run (view ID, instance type), honouring feature flags."""
+    views = _build_view_ids(config)
+    keys = ["ts", "assets", "equipment"]
+    if config.get("enable_maintenance_metrics", True):
+        keys += ["notifications", "orders", "failure_notifications"]
+    if config.get("enable_file_annotation_metrics", True):
+        keys.append("annotations")
+    if config.get("enable_3d_metrics", True):
+        keys.append("3d_objects")
+    if config.get("enable_file_metrics", True):
+        keys.append("files")
+    return {
+        key: (views[key], "edge" if key == "annotations" else "node")
+        for key in keys
+    }
+
+
+def _handle_partition_planning(client: CogniteClient, config: dict, start_time: float) -> dict:
     """
-    Batch collection mode: Process a subset of data and save intermediate results.
+    Planning mode: split every view into disjoint externalId ranges and save the plan.
+
+    Run before launching batches with ``partition_mode="external_id"``; the
+    batch calls can then run concurrently. The plan is saved after every view,
+    and a call that reaches ``plan_time_budget_seconds`` returns
+    ``"plan_incomplete"``; calling planning again continues the saved plan.
     """
-    batch_index = config.get("batch_index", 0)
     batch_size = config.get("batch_size", 200000)
+    views = _partition_views(config)
     
     logger.info("=" * 70)
-    logger.info(f"BATCH COLLECTION MODE: Batch {batch_index}")
-    logger.info(f"Processing up to {batch_size:,} instances per entity type")
+    logger.info(f"PARTITION PLANNING: {batch_size:,} instances per range")
     logger.info("=" * 70)
     
-    # Calculate offset based on batch index
-    offset = batch_index * batch_size
+    plan = load_partition_plan(client)
+    if plan is not None and (plan.is_complete or plan.mismatch(batch_size, list(views))):
+        plan = None
+    if plan is not None:
+        logger.info(f"Continuing saved plan: {len(plan.pending_views)} views left")
+    
+    budget = config.get("plan_time_budget_seconds", 480)
+    deadline = time.monotonic() + max(0.0, budget - (time.time() - start_time))
+    plan = plan_partitions(
+        client, views, batch_size,
+        plan=plan,
+        deadline=deadline,
+        on_progress=lambda p: save_partition_plan(client, p),
+    )
     
+    total_elapsed = time.time() - start_time
+    result = {
+        "status": "plan_complete" if plan.is_complete else "plan_incomplete",
+        "total_batches": plan.total_batches,
+        "batch_size": batch_size,
+        "instance_counts": plan.instance_counts,
+        "execution_time_seconds": round(total_elapsed, 2),
+    }
+    if plan.is_complete:
+        logger.info(f"PLAN COMPLETE in {format_elapsed(total_elapsed)}: {plan.total_batches} batches")
+    else:
+        result["pending_views"] = plan.pending_views
+        logger.info(f"PLAN INCOMPLETE after {format_elapsed(total_elapsed)}: "
+                    f"{len(plan.pending_views)} views left - call planning again to continue")
+    return result
+
+
+def _load_batch_plan(client: CogniteClient, config: dict) -> PartitionPlan:
+    """
+    Load the partition plan a partitioned batch call reads its ranges from.
+
+    Batch calls never plan themselves: concurrent calls would each build and
+    save their own plan. A missing, unfinished or mismatched plan fails the call.
+    """
+    plan = load_partition_plan(client)
+    if plan is None:
+        problem = "no partition plan has been saved"
+    elif not plan.is_complete:
+        problem = f"the partition plan is unfinished ({len(plan.pending_views)} views left)"
+    else:
+        problem = plan.mismatch(config.get("batch_size", 200000), list(_partition_views(config)))
+    if problem:
+        raise ValueError(
+            f"Cannot run a batch with partition_mode='{PARTITION_MODE_EXTERNAL_ID}': {problem}. "
+            "Call the function with plan_partitions=true (and the same batch_size and views) first."
+        )
+    return plan
+
+
+def _iter_batch_chunks(
+    client: CogniteClient,
+    view: ViewId,
+    view_key: str,
+    config: dict,
+    plan: PartitionPlan | None,
+    instance_type: str = "node",
+):
+    """
+    Yield the instance chunks owned by the current batch for one view.
+
+    With a partition plan, only the batch's externalId range is read.
+    Without one (offset mode), chunks before ``batch_index * batch_size``
+    are paged through and skipped.
+    """
     chunk_size = config["chunk_size"]
-    freshness_days = config["freshness_days"]
-    enable_gaps = config["enable_historical_gaps"]
-    enable_maintenance = config["enable_maintenance_metrics"]
-    gap_sample_rate = config["gap_sample_rate"]
-    gap_threshold_days = config["gap_threshold_days"]
-    gap_lookback = config["gap_lookback"]
-    
-    # Build view IDs
-    ts_view = ViewId(
-        config["ts_view_space"],
-        config["ts_view_external_id"],
-        config["ts_view_version"]
-    )
-    asset_view = ViewId(
-        config["asset_view_space"],
-        config["asset_view_external_id"],
-        config["asset_view_version"]
-    )
-    equipment_view = ViewId(
-        config["equipment_view_space"],
-        config["equipment_view_external_id"],
-        config["equipment_view_version"]
-    )
-    notification_view = ViewId(
-        config["notification_view_space"],
-        config["notification_view_external_id"],
-        config["notification_view_version"]
-    )
-    order_view = ViewId(
-        config["maintenance_order_view_space"],
-        config["maintenance_order_view_external_id"],
-        config["maintenance_order_view_version"]
-    )
-    failure_notification_view = ViewId(
-        config["failure_notification_view_space"],
-        config["failure_notification_view_external_id"],
-        config["failure_notification_view_version"]
-    )
+    batch_index = config.get("batch_index", 0)
+    batch_size = config.get("batch_size", 200000)
     
-    # Initialize accumulator
-    acc = CombinedAccumulator(freshness_days=freshness_days)
-    batch_counts = {"ts": 0, "assets": 0, "equipment": 0, "notifications": 0, "orders": 0}
+    if plan is not None:
+        id_range = plan.range_for(view_key, batch_index)
+        if id_range is None:
+            return
+        yield from client.data_modeling.instances(
+            chunk_size=chunk_size,
+            instance_type=instance_type,
+            sources=view,
+            filter=build_range_filter(instance_type, *id_range),
+        )
+        return
     
-    # Track how many instances we've skipped (for offset) and processed
+    offset = batch_index * batch_size
     instances_skipped = 0
     instances_processed = 0
-    
-    # ============================================================
-    # Process Time Series (with offset)
-    # ============================================================
-    logger.info(f"[Batch {batch_index}] Processing Time Series...")
-    
-    for ts_batch in client.data_modeling.instances(
+    for chunk in client.data_modeling.instances(
         chunk_size=chunk_size,
-        instance_type="node",
-        sources=ts_view,
+        instance_type=instance_type,
+        sources=view,
     ):
         # Skip batches until we reach our offset
-        batch_instance_count = len(ts_batch.data)
+        batch_instance_count = len(chunk.data)
         if instances_skipped + batch_instance_count <= offset:
             instances_skipped += batch_instance_count
             continue
         
-        batch_counts["ts"] += 1
-        process_timeseries_batch(ts_batch, ts_view, acc)
+        yield chunk
         instances_processed += batch_instance_count
         
-        # Historical gap analysis
-        if enable_gaps and batch_counts["ts"] % gap_sample_rate == 0:
-            compute_historical_gaps_batch(
-                ts_batch, client, acc,
-                gap_threshold_days=gap_threshold_days,
-                lookback=gap_lookback
-            )
-        
-        if batch_counts["ts"] % LOG_EVERY_N_BATCHES == 0:
-            logger.info(f"[TS] Batch {batch_counts['ts']:,} | Total: {acc.total_ts:,}")
-        
         if instances_processed >= batch_size:
-            logger.info(f"[TS] Reached batch limit ({batch_size:,})")
-            break
-    
-    logger.info(f"[Batch {batch_index}] TS collected: {acc.total_ts:,}")
-    
-    # Reset counters for assets
-    instances_skipped = 0
-    instances_processed = 0
-    
-    # ============================================================
-    # Process Assets (with offset)
-    # ============================================================
-    logger.info(f"[Batch {batch_index}] Processing Assets...")
-    
-    for asset_batch in client.data_modeling.instances(
-        chunk_size=chunk_size,
-        instance_type="node",
-        sources=asset_view,
-    ):
-        batch_instance_count = len(asset_batch.data)
-        if instances_skipped + batch_instance_count <= offset:
-            instances_skipped += batch_instance_count
-            continue
+            logger.info(f"[{view_key}] Reached batch limit ({batch_size:,})")
+            return
+
+
+# ----------------------------------------------------
+# CONCURRENT VIEW COLLECTORS
+# ----------------------------------------------------
+# Each collector reads one view into its own accumulator shard, so the
+# network-bound phases can run side by side on a bounded thread pool. Shards
+# are combined with the accumulators' merge_from methods once all are done.
+
+ChunkSource = Callable[[ViewId, str, str], Iterator]  # (view, view key, instance type) -> chunks
+
+
+@dataclass
+class CollectorShard:
+    """Accumulators written by a single collector."""
+    name: str
+    acc: CombinedAccumulator
+    model3d: Model3DAccumulator = field(default_factory=Model3DAccumulator)
+    annotations: FileAnnotationAccumulator = field(default_factory=FileAnnotationAccumulator)
+    chunks: int = 0
+    elapsed: float = 0.0
+
+
+@dataclass
+class CollectorContext:
+    """
+    Everything a collector needs besides its shard.
+
+    ``shards`` holds already collected shards (incremental mode) whose collectors
+    are skipped; ``on_collected`` is called with every shard that was collected.
+    ``gap_cache`` keeps per-series gap statistics between runs (incremental mode).
+    """
+    client: CogniteClient
+    config: dict
+    views: dict[str, ViewId]
+    chunks: ChunkSource
+    limits: dict[str, int | None]
+    start_time: float
+    shards: dict[str, CollectorShard] = field(default_factory=dict)
+    on_collected: Callable[[CollectorShard], None] | None = None
+    gap_cache: dict[tuple[str, str], list] | None = None
+
+
+@dataclass(frozen=True)
+class ViewCollector:
+    """A plain one-view collector: stream chunks into one shard accumulator until its limit."""
+    key: str
+    label: str
+    process: Callable[[Any, ViewId, Any], None]
+    shard_attr: str
+    total: Callable[[Any], int]
+    instance_type: str = "node"
+    optional: bool = True
+
+
+VIEW_COLLECTORS = {
+    "equipment": ViewCollector(
+        "equipment", "Equipment", process_equipment_batch, "acc",
+        lambda a: a.total_equipment, optional=False,
+    ),
+    "notifications": ViewCollector(
+        "notifications", "Notifications", process_notification_batch, "acc",
+        lambda a: a.total_notifications,
+    ),
+    "orders": ViewCollector(
+        "orders", "Orders", process_maintenance_order_batch, "acc",
+        lambda a: a.total_orders,
+    ),
+    "failure_notifications": ViewCollector(
+        "failure_notifications", "FailureNotif", process_failure_notification_batch, "acc",
+        lambda a: a.total_failure_notifications,
+    ),
+    "annotations": ViewCollector(
+        "annotations", "Annotations", process_annotation_batch, "annotations",
+        lambda a: a.unique_annotations, instance_type="edge",
+    ),
+    "3d_objects": ViewCollector(
+        "3d_objects", "3D", process_3d_object_batch, "model3d",
+        lambda a: a.total_3d_objects,
+    ),
+    "files": ViewCollector(
+        "files", "Files", process_file_batch, "acc",
+        lambda a: a.total_files,
+    ),
+}
+
+
+def _log_collector_progress(label: str, shard: CollectorShard, total: int, ctx: CollectorContext) -> None:
+    if shard.chunks % LOG_EVERY_N_BATCHES == 0:
+        elapsed = time.time() - ctx.start_time
+        logger.info(
+            f"[{label}] Batch {shard.chunks:,} | "
+            f"Total: {total:,} | "
+            f"Elapsed: {format_elapsed(elapsed)}"
+        )
+
+
+def _collect_timeseries(shard: CollectorShard, ctx: CollectorContext) -> None:
+    """Time series collector (with sampled historical gap analysis)."""
+    view = ctx.views["ts"]
+    acc = shard.acc
+    max_ts = ctx.limits.get("ts")
+    enable_gaps = ctx.config["enable_historical_gaps"]
+    gap_sample_rate = ctx.config["gap_sample_rate"]
+    
+    for ts_batch in ctx.chunks(view, "ts", "node"):
+        shard.chunks += 1
+        process_timeseries_batch(ts_batch, view, acc)
         
-        batch_counts["assets"] += 1
-        process_asset_batch(asset_batch, asset_view, acc)
-        instances_processed += batch_instance_count
+        # Debug: Log unit info after first batch
+        if shard.chunks == 1:
+            logger.info(f"[DEBUG] After 1st batch: sourceUnit={acc.has_source_unit}, targetUnit={acc.has_target_unit}, checked={acc.unit_checks}")
         
-        if batch_counts["assets"] % LOG_EVERY_N_BATCHES == 0:
-            logger.info(f"[Assets] Batch {batch_counts['assets']:,} | Total: {acc.total_assets:,}")
+        # Historical gap analysis: always analyze first batch + every Nth batch (default: all)
+        if enable_gaps and (shard.chunks == 1 or shard.chunks % gap_sample_rate == 0):
+            if ctx.gap_cache is not None:
+                compute_historical_gaps_cached(
+                    ts_batch, ctx.client, acc, ctx.gap_cache,
+                    gap_threshold_days=ctx.config["gap_threshold_days"],
+                    lookback=ctx.config["gap_lookback"],
+                    granularity=ctx.config.get("gap_granularity", "1d"),
+                    max_age_seconds=ctx.config.get("gap_refresh_days", 7) * 86400,
+                )
+            else:
+                compute_historical_gaps_batch(
+                    ts_batch, ctx.client, acc,
+                    gap_threshold_days=ctx.config["gap_threshold_days"],
+                    lookback=ctx.config["gap_lookback"],
+                    granularity=ctx.config.get("gap_granularity", "1d"),
+                )
+            logger.info(f"[Gaps] Analyzed: {acc.ts_analyzed_for_gaps} TS, gaps found: {acc.gap_count}")
         
-        if instances_processed >= batch_size:
-            logger.info(f"[Assets] Reached batch limit ({batch_size:,})")
+        _log_collector_progress("TS", shard, acc.total_ts, ctx)
+        
+        if max_ts is not None and acc.total_ts >= max_ts:
+            logger.info(f"🛑 Reached TS limit ({max_ts:,})")
             break
+
+
+def _collect_assets(shard: CollectorShard, ctx: CollectorContext) -> None:
+    """Asset collector: one scan feeds hierarchy/equipment data and 3D asset links."""
+    view = ctx.views["assets"]
+    max_assets = ctx.limits.get("assets")
+    max_asset_3d = ctx.limits.get("assets_3d")
+    
+    asset_scan = ViewScan(view)
+    asset_scan.register(
+        "Assets", process_asset_batch, shard.acc,
+        limit_reached=(lambda a: a.total_assets >= max_assets) if max_assets is not None else None,
+    )
+    if ctx.config.get("enable_3d_metrics", True):
+        asset_scan.register(
+            "3D", process_asset_3d_batch, shard.model3d,
+            limit_reached=(lambda a: a.total_assets_checked >= max_asset_3d) if max_asset_3d is not None else None,
+            optional=True,
+        )
     
-    logger.info(f"[Batch {batch_index}] Assets collected: {acc.total_assets:,}")
+    for asset_batch in ctx.chunks(view, "assets", "node"):
+        shard.chunks += 1
+        asset_scan.feed(asset_batch)
+        _log_collector_progress("Assets", shard, shard.acc.total_assets, ctx)
+        if asset_scan.done:
+            break
+
+
+def _collect_view(collector: ViewCollector, shard: CollectorShard, ctx: CollectorContext) -> None:
+    """Generic collector for views that feed a single accumulator."""
+    view = ctx.views[collector.key]
+    target = getattr(shard, collector.shard_attr)
+    limit = ctx.limits.get(collector.key)
+    try:
+        for chunk in ctx.chunks(view, collector.key, collector.instance_type):
+            shard.chunks += 1
+            collector.process(chunk, view, target)
+            _log_collector_progress(collector.label, shard, collector.total(target), ctx)
+            if limit is not None and collector.total(target) >= limit:
+                logger.info(f"🛑 Reached {collector.label} limit ({limit:,})")
+                break
+    except Exception as e:
+        if not collector.optional:
+            raise
+        logger.warning(f"[{collector.label}] Could not process {collector.key}: {e}")
+
+
+def _enabled_collectors(config: dict) -> list[tuple[str, Callable[[CollectorShard, CollectorContext], None]]]:
+    """Collectors for this run in merge order, honouring feature flags."""
+    keys = ["equipment"]
+    if config.get("enable_maintenance_metrics", True):
+        keys += ["notifications", "orders", "failure_notifications"]
+    if config.get("enable_file_annotation_metrics", True):
+        keys.append("annotations")
+    if config.get("enable_3d_metrics", True):
+        keys.append("3d_objects")
+    if config.get("enable_file_metrics", True):
+        keys.append("files")
+    return [("ts", _collect_timeseries), ("assets", _collect_assets)] + [
+        (key, partial(_collect_view, VIEW_COLLECTORS[key])) for key in keys
+    ]
+
+
+def _run_collectors(
+    ctx: CollectorContext,
+    acc: CombinedAccumulator,
+) -> tuple[CombinedAccumulator, Model3DAccumulator, FileAnnotationAccumulator, dict[str, int]]:
+    """
+    Run all enabled collectors on a bounded thread pool and merge their shards.
+
+    ``max_concurrent_collectors`` (config) bounds the number of views read at
+    the same time; 1 reproduces the sequential phase order.
+
+    Returns:
+        (merged CombinedAccumulator, merged Model3DAccumulator, merged FileAnnotationAccumulator, chunks per view)
+    """
+    collectors = _enabled_collectors(ctx.config)
+    max_workers = max(1, int(ctx.config.get("max_concurrent_collectors", 4)))
+    shards = {
+        name: ctx.shards.get(name) or CollectorShard(name, type(acc)(freshness_days=acc.freshness_days, now=acc.now))
+        for name, _ in collectors
+    }
+    to_collect = [(name, collect) for name, collect in collectors if name not in ctx.shards]
+    
+    logger.info(f"Collecting {len(to_collect)} views with up to {max_workers} concurrent collectors"
+                f"{f' ({len(collectors) - len(to_collect)} unchanged views reused)' if len(to_collect) < len(collectors) else ''}")
+    
+    def run(name: str, collect) -> None:
+        shard = shards[name]
+        started = time.time()
+        collect(shard, ctx)
+        shard.elapsed = time.time() - started
+        logger.info(f"✅ [{name}] {shard.chunks:,} chunks in {format_elapsed(shard.elapsed)}")
+        if ctx.on_collected is not None:
+            ctx.on_collected(shard)
+    
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cq-collector") as pool:
+        futures = {pool.submit(run, name, collect): name for name, collect in to_collect}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception:
+                logger.error(f"Collector '{futures[future]}' failed - cancelling remaining collectors")
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+    
+    # Merge shards in a fixed order so results do not depend on completion order
+    model3d_acc = Model3DAccumulator()
+    annotation_acc = FileAnnotationAccumulator()
+    chunk_counts: dict[str, int] = {}
+    for name, _ in collectors:
+        shard = shards.pop(name)
+        chunk_counts[name] = shard.chunks
+        acc.merge_from(shard.acc)
+        model3d_acc.merge_from(shard.model3d)
+        annotation_acc.merge_from(shard.annotations)
+    
+    return acc, model3d_acc, annotation_acc, chunk_counts
+
+
+def _handle_batch_collection(client: CogniteClient, config: dict, start_time: float) -> dict:
+    """
+    Batch collection mode: Process a subset of data and save intermediate results.
+
+    The subset is either an offset window (``partition_mode="offset"``) or the
+    batch's externalId range from the partition plan (``partition_mode="external_id"``).
+    """
+    batch_index = config.get("batch_index", 0)
+    batch_size = config.get("batch_size", 200000)
+    partition_mode = config.get("partition_mode", PARTITION_MODE_OFFSET)
     
-    # Reset counters for equipment
-    instances_skipped = 0
-    instances_processed = 0
+    logger.info("=" * 70)
+    logger.info(f"BATCH COLLECTION MODE: Batch {batch_index} ({partition_mode})")
+    logger.info(f"Processing up to {batch_size:,} instances per entity type")
+    logger.info("=" * 70)
     
-    # ============================================================
-    # Process Equipment (with offset)
-    # ============================================================
-    logger.info(f"[Batch {batch_index}] Processing Equipment...")
+    plan: PartitionPlan | None = None
+    if partition_mode == PARTITION_MODE_EXTERNAL_ID:
+        plan = _load_batch_plan(client, config)
+        if batch_index >= plan.total_batches:
+            logger.info(f"Batch {batch_index} is beyond the plan ({plan.total_batches} batches) - nothing to read")
     
-    for eq_batch in client.data_modeling.instances(
-        chunk_size=chunk_size,
-        instance_type="node",
-        sources=equipment_view,
-    ):
-        batch_instance_count = len(eq_batch.data)
-        if instances_skipped + batch_instance_count <= offset:
-            instances_skipped += batch_instance_count
-            continue
-        
-        batch_counts["equipment"] += 1
-        process_equipment_batch(eq_batch, equipment_view, acc)
-        instances_processed += batch_instance_count
-        
-        if batch_counts["equipment"] % LOG_EVERY_N_BATCHES == 0:
-            logger.info(f"[Equipment] Batch {batch_counts['equipment']:,} | Total: {acc.total_equipment:,}")
-        
-        if instances_processed >= batch_size:
-            logger.info(f"[Equipment] Reached batch limit ({batch_size:,})")
-            break
+    # Instance counts are bounded by the batch window; the remaining limits
+    # are the same as quick run (normal mode)
+    max_assets = config.get("max_assets", 150000)
+    ctx = CollectorContext(
+        client=client,
+        config=config,
+        views=_build_view_ids(config),
+        chunks=lambda view, key, instance_type: _iter_batch_chunks(
+            client, view, key, config, plan, instance_type
+        ),
+        limits={
+            "assets_3d": max_assets,
+            "annotations": config.get("max_annotations", 200000),
+            "3d_objects": config.get("max_3d_objects", 150000),
+            "files": config.get("max_files", 150000),
+        },
+        start_time=start_time,
+    )
+    accumulator_cls = get_accumulator_class(config.get("accumulator_backend"))
+    acc, model3d_acc, annotation_acc, batch_counts = _run_collectors(
+        ctx, accumulator_cls(freshness_days=config["freshness_days"])
+    )
     
+    logger.info(f"[Batch {batch_index}] TS collected: {acc.total_ts:,}")
+    logger.info(f"[Batch {batch_index}] Assets collected: {acc.total_assets:,}")
     logger.info(f"[Batch {batch_index}] Equipment collected: {acc.total_equipment:,}")
-    
-    # ============================================================
-    # Process Maintenance Data (with offset)
-    # ============================================================
-    if enable_maintenance:
-        # Reset counters
-        instances_skipped = 0
-        instances_processed = 0
-        
-        logger.info(f"[Batch {batch_index}] Processing Notifications...")
-        try:
-            for notif_batch in client.data_modeling.instances(
-                chunk_size=chunk_size,
-                instance_type="node",
-                sources=notification_view,
-            ):
-                batch_instance_count = len(notif_batch.data)
-                if instances_skipped + batch_instance_count <= offset:
-                    instances_skipped += batch_instance_count
-                    continue
-                
-                batch_counts["notifications"] += 1
-                process_notification_batch(notif_batch, notification_view, acc)
-                instances_processed += batch_instance_count
-                
-                if instances_processed >= batch_size:
-                    break
-        except Exception as e:
-            logger.warning(f"Could not process Notifications: {e}")
-        
+    if config["enable_maintenance_metrics"]:
         logger.info(f"[Batch {batch_index}] Notifications collected: {acc.total_notifications:,}")
-        
-        # Reset counters for orders
-        instances_skipped = 0
-        instances_processed = 0
-        
-        logger.info(f"[Batch {batch_index}] Processing Orders...")
-        try:
-            for order_batch in client.data_modeling.instances(
-                chunk_size=chunk_size,
-                instance_type="node",
-                sources=order_view,
-            ):
-                batch_instance_count = len(order_batch.data)
-                if instances_skipped + batch_instance_count <= offset:
-                    instances_skipped += batch_instance_count
-                    continue
-                
-                batch_counts["orders"] += 1
-                process_maintenance_order_batch(order_batch, order_view, acc)
-                instances_processed += batch_instance_count
-                
-                if instances_processed >= batch_size:
-                    break
-        except Exception as e:
-            logger.warning(f"Could not process Orders: {e}")
-        
         logger.info(f"[Batch {batch_index}] Orders collected: {acc.total_orders:,}")
-        
-        # Failure notifications (same offset/limit pattern as other entity types)
-        instances_skipped = 0
-        instances_processed = 0
-        logger.info(f"[Batch {batch_index}] Processing Failure Notifications...")
-        try:
-            for fn_batch in client.data_modeling.instances(
-                chunk_size=chunk_size,
-                instance_type="node",
-                sources=failure_notification_view,
-            ):
-                batch_instance_count = len(fn_batch.data)
-                if instances_skipped + batch_instance_count <= offset:
-                    instances_skipped += batch_instance_count
-                    continue
-                process_failure_notification_batch(fn_batch, failure_notification_view, acc)
-                instances_processed += batch_instance_count
-                if instances_processed >= batch_size:
-                    break
-        except Exception as e:
-            logger.warning(f"Could not process Failure Notifications: {e}")
-    
-    # Same feature flags and limits as quick run (normal mode)
-    enable_file_annotations = config.get("enable_file_annotation_metrics", True)
-    enable_3d = config.get("enable_3d_metrics", True)
-    enable_files = config.get("enable_file_metrics", True)
-    max_annotations = config.get("max_annotations", 200000)
-    max_3d_objects = config.get("max_3d_objects", 150000)
-    max_files = config.get("max_files", 150000)
-    max_assets = config.get("max_assets", 150000)
-
-    annotation_acc = FileAnnotationAccumulator()
-    model3d_acc = Model3DAccumulator()
-
-    annotation_view = ViewId(
-        config["annotation_view_space"],
-        config["annotation_view_external_id"],
-        config["annotation_view_version"],
-    )
-    object3d_view = ViewId(
-        config["object3d_view_space"],
-        config["object3d_view_external_id"],
-        config["object3d_view_version"],
-    )
-    file_view = ViewId(
-        config.get("file_view_space", "cdf_cdm"),
-        config.get("file_view_external_id", "CogniteFile"),
-        config.get("file_view_version", "v1"),
-    )
-
-    # ============================================================
-    # PHASE 5: File Annotations (same as quick run, with offset/limit)
-    # ============================================================
-    if enable_file_annotations:
-        logger.info(f"[Batch {batch_index}] Processing File Annotations (CDM)...")
-        instances_skipped = 0
-        instances_processed = 0
-        try:
-            for annot_batch in client.data_modeling.instances(
-                chunk_size=chunk_size,
-                instance_type="edge",
-                sources=annotation_view,
-            ):
-                batch_instance_count = len(annot_batch.data)
-                if instances_skipped + batch_instance_count <= offset:
-                    instances_skipped += batch_instance_count
-                    continue
-                process_annotation_batch(annot_batch, annotation_view, annotation_acc)
-                instances_processed += batch_instance_count
-                if annotation_acc.unique_annotations >= max_annotations:
-                    break
-                if instances_processed >= batch_size:
-                    break
-        except Exception as e:
-            logger.warning(f"[Annotations] Could not process annotations: {e}")
+    if config.get("enable_file_annotation_metrics", True):
         logger.info(f"[Batch {batch_index}] Annotations: {annotation_acc.unique_annotations:,}")
-
-    # ============================================================
-    # PHASE 6: 3D Model Contextualization (same as quick run, with offset/limit)
-    # ============================================================
-    if enable_3d:
-        logger.info(f"[Batch {batch_index}] Processing 3D Model Contextualization...")
-        instances_skipped = 0
-        instances_processed = 0
-        try:
-            for asset_batch in client.data_modeling.instances(
-                chunk_size=chunk_size,
-                instance_type="node",
-                sources=asset_view,
-            ):
-                batch_instance_count = len(asset_batch.data)
-                if instances_skipped + batch_instance_count <= offset:
-                    instances_skipped += batch_instance_count
-                    continue
-                process_asset_3d_batch(asset_batch, asset_view, model3d_acc)
-                instances_processed += batch_instance_count
-                if model3d_acc.total_assets_checked >= max_assets:
-                    break
-                if instances_processed >= batch_size:
-                    break
-        except Exception as e:
-            logger.warning(f"[3D] Could not process asset 3D links: {e}")
-
-        instances_skipped = 0
-        instances_processed = 0
-        try:
-            for obj_batch in client.data_modeling.instances(
-                chunk_size=chunk_size,
-                instance_type="node",
-                sources=object3d_view,
-            ):
-                batch_instance_count = len(obj_batch.data)
-                if instances_skipped + batch_instance_count <= offset:
-                    instances_skipped += batch_instance_count
-                    continue
-                process_3d_object_batch(obj_batch, object3d_view, model3d_acc)
-                instances_processed += batch_instance_count
-                if model3d_acc.total_3d_objects >= max_3d_objects:
-                    break
-                if instances_processed >= batch_size:
-                    break
-        except Exception as e:
-            logger.warning(f"[3D] Could not process 3D objects: {e}")
+    if config.get("enable_3d_metrics", True):
         logger.info(f"[Batch {batch_index}] 3D objects: {model3d_acc.total_3d_objects:,}")
-
-    # ============================================================
-    # PHASE 7: File Contextualization (same as quick run, with offset/limit)
-    # ============================================================
-    if enable_files:
-        logger.info(f"[Batch {batch_index}] Processing Files (CogniteFile)...")
-        instances_skipped = 0
-        instances_processed = 0
-        try:
-            for file_batch in client.data_modeling.instances(
-                chunk_size=chunk_size,
-                instance_type="node",
-                sources=file_view,
-            ):
-                batch_instance_count = len(file_batch.data)
-                if instances_skipped + batch_instance_count <= offset:
-                    instances_skipped += batch_instance_count
-                    continue
-                process_file_batch(file_batch, file_view, acc)
-                instances_processed += batch_instance_count
-                if acc.total_files >= max_files:
-                    break
-                if instances_processed >= batch_size:
-                    break
-        except Exception as e:
-            logger.warning(f"[Files] Could not process files: {e}")
+    if config.get("enable_file_metrics", True):
         logger.info(f"[Batch {batch_index}] Files: {acc.total_files:,}")
 
     # ============================================================
@@ -666,10 +824,14 @@ def _handle_batch_collection(client: CogniteClient, config: dict, start_time: fl
     batch_metadata = {
         "batch_index": batch_index,
         "batch_size": batch_size,
-        "offset": offset,
+        "partition_mode": partition_mode,
         "batches_processed": batch_counts,
         "execution_time_seconds": round(total_elapsed, 2),
     }
+    if plan is None:
+        batch_metadata["offset"] = batch_index * batch_size
+    else:
+        batch_metadata["total_batches"] = plan.total_batches
     
     save_batch_file(
         client,
@@ -678,6 +840,7 @@ def _handle_batch_collection(client: CogniteClient, config: dict, start_time: fl
         batch_metadata,
         model3d_accumulator=model3d_acc,
         file_annotation_accumulator=annotation_acc,
+        file_format=config.get("batch_file_format", BATCH_FORMAT_BINARY),
     )
     
     logger.info("=" * 70)
@@ -687,7 +850,7 @@ def _handle_batch_collection(client: CogniteClient, config: dict, start_time: fl
     logger.info(f"  Equipment: {acc.total_equipment:,}")
     logger.info("=" * 70)
     
-    return {
+    result = {
         "status": "batch_complete",
         "batch_index": batch_index,
         "batch_size": batch_size,
@@ -700,6 +863,92 @@ def _handle_batch_collection(client: CogniteClient, config: dict, start_time: fl
         },
         "execution_time_seconds": round(total_elapsed, 2),
     }
+    if plan is not None:
+        result["total_batches"] = plan.total_batches
+    return result
+
+
+# ----------------------------------------------------
+# INCREMENTAL MODE HELPERS
+# ----------------------------------------------------
+
+def _sync_incremental_state(
+    client: CogniteClient,
+    config: dict,
+    start_time: float,
+) -> tuple[IncrementalState, dict[str, dict]]:
+    """
+    Load the saved view state (unless rebuilding) and sync every enabled view into it.
+
+    The state is saved after every view, and syncing stops after
+    ``sync_time_budget_seconds`` so a long first backfill continues in the next call.
+    """
+    state = None
+    if config.get("incremental_full_rebuild", False):
+        logger.info("[Incremental] Full rebuild requested, re-syncing all views")
+    else:
+        state = load_incremental_state(client)
+        if state is None:
+            logger.info("[Incremental] No saved state, syncing all views from scratch")
+    if state is None:
+        state = IncrementalState()
+    budget = config.get("sync_time_budget_seconds", 420)
+    changes = sync_views(
+        client, state, _partition_views(config), config.get("sync_page_size", 1000),
+        deadline=time.monotonic() + max(0.0, budget - (time.time() - start_time)),
+        on_progress=lambda s: save_incremental_state(client, s),
+    )
+    return state, changes
+
+
+def _shard_fingerprint(config: dict) -> str:
+    """Config a saved collector shard depends on; a change makes every view re-collect."""
+    return json.dumps(
+        {k: v for k, v in config.items() if k.startswith(("max_", "enable_")) or k == "freshness_days"},
+        sort_keys=True,
+    )
+
+
+def _reusable_shards(state: IncrementalState, config: dict, accumulator_cls: type) -> dict[str, CollectorShard]:
+    """
+    Collector shards saved for views without changes since they were collected.
+
+    Time series are always re-collected: freshness and processing lag depend on the run time.
+    """
+    fingerprint = _shard_fingerprint(config)
+    shards = {}
+    for key, view_state in state.views.items():
+        saved = view_state.shard
+        if key == "ts" or not saved or saved.get("fingerprint") != fingerprint:
+            continue
+        shards[key] = CollectorShard(
+            key,
+            accumulator_cls.from_dict(saved["acc"]),
+            Model3DAccumulator.from_dict(saved["model3d"]),
+            FileAnnotationAccumulator.from_dict(saved["annotations"]),
+        )
+    return shards
+
+
+def _keep_shard(state: IncrementalState, config: dict, shard: CollectorShard) -> None:
+    """Save a freshly collected shard with its view state (not for time series, see _reusable_shards)."""
+    view_state = state.views.get(shard.name)
+    if view_state is None or shard.name == "ts":
+        return
+    view_state.shard = {
+        "fingerprint": _shard_fingerprint(config),
+        "acc": shard.acc.to_dict(),
+        "model3d": shard.model3d.to_dict(),
+        "annotations": shard.annotations.to_dict(),
+    }
+
+
+def _iter_view_state_chunks(state: IncrementalState, chunk_size: int, view: ViewId, key: str, instance_type: str):
+    """Replay one view's synced rows in place of reading the view."""
+    view_state = state.views.get(key)
+    if view_state is None:
+        return iter(())
+    return view_state.chunks(view, chunk_size)
 
 
 # ---------------------------------------------------------------------------
@@ -756,17 +1005,23 @@ def handle(data: dict, client: CogniteClient) -> dict:
     """
     Cognite Function entry point - Combined metrics computation.
 
-    Supports three modes:
-    1. Normal mode: Process all data in single run (default)
-    2. Batch collection mode: Process a subset and save intermediate data
-    3. Aggregation mode: Merge all batch files and compute final metrics
+    Supports four modes:
+    1. Normal mode: Process all data in single run (default); with
+       ``incremental`` only changed instances are read (DMS sync cursors)
+    2. Partition planning mode: Split views into externalId ranges for batches
+    3. Batch collection mode: Process a subset and save intermediate data
+    4. Aggregation mode: Merge all batch files and compute final metrics
 
     Args:
         data: Configuration overrides (optional)
             - batch_mode: bool - Enable batch processing
             - batch_index: int - Current batch index (0, 1, 2, ...)
             - batch_size: int - Instances per batch
+            - partition_mode: str - "offset" or "external_id" (disjoint ranges)
+            - plan_partitions: bool - Only build (or continue) the partition plan
             - is_aggregation: bool - Run aggregation phase
+            - incremental: bool - Sync changes into the saved view state
+            - incremental_full_rebuild: bool - Discard the saved state and re-sync all views
         client: CogniteClient instance
 
     Returns:
@@ -788,6 +1043,12 @@ def handle(data: dict, client: CogniteClient) -> dict:
     if is_aggregation:
         return _handle_aggregation(client, config, start_time)
     
+    # ============================================================
+    # PLANNING MODE: Split views into externalId ranges for batches
+    # ============================================================
+    if config.get("plan_partitions", False):
+        return _handle_partition_planning(client, config, start_time)
+    
     # ============================================================
     # BATCH MODE: Process subset and save intermediate data
     # ============================================================
@@ -812,9 +1073,6 @@ def handle(data: dict, client: CogniteClient) -> dict:
     enable_gaps = config["enable_historical_gaps"]
     enable_maintenance = config["enable_maintenance_metrics"]
     enable_file_annotations = config["enable_file_annotation_metrics"]
-    gap_sample_rate = config["gap_sample_rate"]
-    gap_threshold_days = config["gap_threshold_days"]
-    gap_lookback = config["gap_lookback"]
     file_external_id = config["file_external_id"]
     file_name = config["file_name"]
     
@@ -822,386 +1080,104 @@ def handle(data: dict, client: CogniteClient) -> dict:
     if enable_maintenance:
         logger.info(f"Maintenance Limits: Notifications={max_notif:,}, Orders={max_orders:,}")
     
-    # Build view IDs
-    ts_view = ViewId(
-        config["ts_view_space"],
-        config["ts_view_external_id"],
-        config["ts_view_version"]
-    )
-    asset_view = ViewId(
-        config["asset_view_space"],
-        config["asset_view_external_id"],
-        config["asset_view_version"]
-    )
-    equipment_view = ViewId(
-        config["equipment_view_space"],
-        config["equipment_view_external_id"],
-        config["equipment_view_version"]
-    )
-    
-    # RMDM v1 views for maintenance workflow
-    notification_view = ViewId(
-        config["notification_view_space"],
-        config["notification_view_external_id"],
-        config["notification_view_version"]
-    )
-    order_view = ViewId(
-        config["maintenance_order_view_space"],
-        config["maintenance_order_view_external_id"],
-        config["maintenance_order_view_version"]
-    )
-    failure_notification_view = ViewId(
-        config["failure_notification_view_space"],
-        config["failure_notification_view_external_id"],
-        config["failure_notification_view_version"]
-    )
-    
-    # CDM File Annotation view
-    annotation_view = ViewId(
-        config["annotation_view_space"],
-        config["annotation_view_external_id"],
-        config["annotation_view_version"]
-    )
-    
-    # Initialize accumulator
-    acc = CombinedAccumulator(freshness_days=freshness_days)
-    
-    batch_counts = {"ts": 0, "assets": 0, "equipment": 0, "notifications": 0, "orders": 0, "failure_notifications": 0, "annotations": 0}
-    
-    # ============================================================
-    # PHASE 1: Process Time Series
-    # ============================================================
-    logger.info("-" * 50)
-    logger.info("PHASE 1: Processing Time Series")
-    logger.info("-" * 50)
-    
-    phase1_start = time.time()
-    
-    for ts_batch in client.data_modeling.instances(
-        chunk_size=chunk_size,
-        instance_type="node",
-        sources=ts_view,
-    ):
-        batch_counts["ts"] += 1
-        process_timeseries_batch(ts_batch, ts_view, acc)
-        
-        # Debug: Log unit info after first batch
-        if batch_counts["ts"] == 1:
-            logger.info(f"[DEBUG] After 1st batch: sourceUnit={acc.has_source_unit}, targetUnit={acc.has_target_unit}, checked={acc.unit_checks}")
-        
-        # Historical gap analysis: always analyze first batch + every Nth batch
-        if enable_gaps and (batch_counts["ts"] == 1 or batch_counts["ts"] % gap_sample_rate == 0):
-            logger.info(f"[Gaps] Analyzing batch {batch_counts['ts']} for historical data completeness...")
-            compute_historical_gaps_batch(
-                ts_batch, client, acc,
-                gap_threshold_days=gap_threshold_days,
-                lookback=gap_lookback
-            )
-            logger.info(f"[Gaps] Analyzed: {acc.ts_analyzed_for_gaps} TS, gaps found: {acc.gap_count}")
-        
-        if batch_counts["ts"] % LOG_EVERY_N_BATCHES == 0:
-            elapsed = time.time() - start_time
-            logger.info(
-                f"[TS] Batch {batch_counts['ts']:,} | "
-                f"Total: {acc.total_ts:,} | "
-                f"Elapsed: {format_elapsed(elapsed)}"
-            )
-        
-        if acc.total_ts >= max_ts:
-            logger.info(f"🛑 Reached TS limit ({max_ts:,})")
-            break
-    
-    logger.info(f"✅ PHASE 1: {acc.total_ts:,} TS in {format_elapsed(time.time() - phase1_start)}")
+    max_3d_objects = config.get("max_3d_objects", 150000)
+    max_files = config.get("max_files", 150000)
+    enable_3d = config.get("enable_3d_metrics", True)
+    enable_files = config.get("enable_file_metrics", True)
     
     # ============================================================
-    # PHASE 2: Process Assets (shared data for TS, Hierarchy, EQ)
+    # PHASES 1-7: Collect all views (concurrently, one shard per view)
     # ============================================================
     logger.info("-" * 50)
-    logger.info("PHASE 2: Processing Assets (shared data)")
+    logger.info("PHASES 1-7: Collecting Time Series, Assets, Equipment, Maintenance, Annotations, 3D, Files")
     logger.info("-" * 50)
     
-    phase2_start = time.time()
-    
-    for asset_batch in client.data_modeling.instances(
-        chunk_size=chunk_size,
-        instance_type="node",
-        sources=asset_view,
-    ):
-        batch_counts["assets"] += 1
-        process_asset_batch(asset_batch, asset_view, acc)
-        
-        if batch_counts["assets"] % LOG_EVERY_N_BATCHES == 0:
-            elapsed = time.time() - start_time
-            logger.info(
-                f"[Assets] Batch {batch_counts['assets']:,} | "
-                f"Total: {acc.total_assets:,} | "
-                f"Elapsed: {format_elapsed(elapsed)}"
+    collect_start = time.time()
+    
+    accumulator_cls = get_accumulator_class(config.get("accumulator_backend"))
+    incremental_state = None
+    incremental_changes = None
+    if config.get("incremental", False):
+        incremental_state, incremental_changes = _sync_incremental_state(client, config, start_time)
+        pending = [
+            key for key, change in incremental_changes.items()
+            if not (change["caught_up"] and incremental_state.views[key].complete)
+        ]
+        if pending:
+            total_elapsed = time.time() - start_time
+            logger.info(f"SYNC INCOMPLETE after {format_elapsed(total_elapsed)}: {len(pending)} views left "
+                        "- the next call continues, metrics are computed once all views are synced")
+            return {
+                "status": "sync_incomplete",
+                "pending_views": pending,
+                "incremental": incremental_changes,
+                "execution_time_seconds": round(total_elapsed, 2),
+            }
+        chunks = partial(_iter_view_state_chunks, incremental_state, chunk_size)
+    else:
+        def chunks(view: ViewId, key: str, instance_type: str):
+            return client.data_modeling.instances(
+                chunk_size=chunk_size,
+                instance_type=instance_type,
+                sources=view,
             )
-        
-        if acc.total_assets >= max_assets:
-            logger.info(f"🛑 Reached Asset limit ({max_assets:,})")
-            break
-    
-    logger.info(f"✅ PHASE 2: {acc.total_assets:,} Assets in {format_elapsed(time.time() - phase2_start)}")
-    
-    # ============================================================
-    # PHASE 3: Process Equipment
-    # ============================================================
-    logger.info("-" * 50)
-    logger.info("PHASE 3: Processing Equipment")
-    logger.info("-" * 50)
     
-    phase3_start = time.time()
-    
-    for eq_batch in client.data_modeling.instances(
-        chunk_size=chunk_size,
-        instance_type="node",
-        sources=equipment_view,
-    ):
-        batch_counts["equipment"] += 1
-        process_equipment_batch(eq_batch, equipment_view, acc)
-        
-        if batch_counts["equipment"] % LOG_EVERY_N_BATCHES == 0:
-            elapsed = time.time() - start_time
-            logger.info(
-                f"[Equipment] Batch {batch_counts['equipment']:,} | "
-                f"Total: {acc.total_equipment:,} | "
-                f"Elapsed: {format_elapsed(elapsed)}"
-            )
-        
-        if acc.total_equipment >= max_eq:
-            logger.info(f"🛑 Reached Equipment limit ({max_eq:,})")
-            break
+    ctx = CollectorContext(
+        client=client,
+        config=config,
+        views=_build_view_ids(config),
+        chunks=chunks,
+        limits={
+            "ts": max_ts,
+            "assets": max_assets,
+            "assets_3d": max_assets,
+            "equipment": max_eq,
+            "notifications": max_notif,
+            "orders": max_orders,
+            "annotations": max_annotations,
+            "3d_objects": max_3d_objects,
+            "files": max_files,
+        },
+        start_time=start_time,
+    )
+    if incremental_state is not None:
+        ctx.shards = _reusable_shards(incremental_state, config, accumulator_cls)
+        ctx.on_collected = partial(_keep_shard, incremental_state, config)
+        ts_state = incremental_state.views.get("ts")
+        ctx.gap_cache = ts_state.gaps if ts_state is not None else None
+    acc, model3d_acc, annotation_acc, batch_counts = _run_collectors(
+        ctx, accumulator_cls(freshness_days=freshness_days)
+    )
     
-    logger.info(f"✅ PHASE 3: {acc.total_equipment:,} Equipment in {format_elapsed(time.time() - phase3_start)}")
+    logger.info(f"✅ PHASES 1-7: {acc.total_ts:,} TS, {acc.total_assets:,} Assets, "
+                f"{acc.total_equipment:,} Equipment in {format_elapsed(time.time() - collect_start)}")
     
-    # ============================================================
-    # PHASE 4: Process Maintenance Workflow Data (RMDM v1)
-    # ============================================================
     maintenance_metrics = {}
-    
     if enable_maintenance:
-        logger.info("-" * 50)
-        logger.info("PHASE 4: Processing Maintenance Workflow Data (RMDM v1)")
-        logger.info("-" * 50)
-        
-        phase4_start = time.time()
-        
-        # 4a. Process Notifications
-        logger.info("[Maintenance] Processing Notifications...")
-        try:
-            for notif_batch in client.data_modeling.instances(
-                chunk_size=chunk_size,
-                instance_type="node",
-                sources=notification_view,
-            ):
-                batch_counts["notifications"] += 1
-                process_notification_batch(notif_batch, notification_view, acc)
-                
-                if batch_counts["notifications"] % LOG_EVERY_N_BATCHES == 0:
-                    logger.info(f"[Notifications] Batch {batch_counts['notifications']:,} | Total: {acc.total_notifications:,}")
-                
-                if acc.total_notifications >= max_notif:
-                    logger.info(f"🛑 Reached Notification limit ({max_notif:,})")
-                    break
-        except Exception as e:
-            logger.warning(f"[Maintenance] Could not process Notifications: {e}")
-        
-        logger.info(f"[Maintenance] Notifications: {acc.total_notifications:,}")
-        
-        # 4b. Process Maintenance Orders
-        logger.info("[Maintenance] Processing Maintenance Orders...")
-        try:
-            for order_batch in client.data_modeling.instances(
-                chunk_size=chunk_size,
-                instance_type="node",
-                sources=order_view,
-            ):
-                batch_counts["orders"] += 1
-                process_maintenance_order_batch(order_batch, order_view, acc)
-                
-                if batch_counts["orders"] % LOG_EVERY_N_BATCHES == 0:
-                    logger.info(f"[Orders] Batch {batch_counts['orders']:,} | Total: {acc.total_orders:,}")
-                
-                if acc.total_orders >= max_orders:
-                    logger.info(f"🛑 Reached Order limit ({max_orders:,})")
-                    break
-        except Exception as e:
-            logger.warning(f"[Maintenance] Could not process Maintenance Orders: {e}")
-        
-        logger.info(f"[Maintenance] Orders: {acc.total_orders:,}")
-        
-        # 4c. Process Failure Notifications
-        logger.info("[Maintenance] Processing Failure Notifications...")
-        try:
-            for fn_batch in client.data_modeling.instances(
-                chunk_size=chunk_size,
-                instance_type="node",
-                sources=failure_notification_view,
-            ):
-                batch_counts["failure_notifications"] += 1
-                process_failure_notification_batch(fn_batch, failure_notification_view, acc)
-                
-                if batch_counts["failure_notifications"] % LOG_EVERY_N_BATCHES == 0:
-                    logger.info(f"[FailureNotif] Batch {batch_counts['failure_notifications']:,} | Total: {acc.total_failure_notifications:,}")
-        except Exception as e:
-            logger.warning(f"[Maintenance] Could not process Failure Notifications: {e}")
-        
-        logger.info(f"[Maintenance] Failure Notifications: {acc.total_failure_notifications:,}")
-        logger.info(f"✅ PHASE 4: Maintenance data processed in {format_elapsed(time.time() - phase4_start)}")
-        
-        # Compute maintenance metrics
+        logger.info(f"[Maintenance] Notifications: {acc.total_notifications:,}, Orders: {acc.total_orders:,}, "
+                    f"Failure Notifications: {acc.total_failure_notifications:,}")
         maintenance_metrics = compute_maintenance_metrics(acc)
     else:
         logger.info("[Maintenance] Skipped - disabled in config")
     
-    # ============================================================
-    # PHASE 5: Process File Annotations (CDM CogniteDiagramAnnotation)
-    # ============================================================
     file_annotation_metrics = {}
-    annotation_acc = FileAnnotationAccumulator()
-    
     if enable_file_annotations:
-        logger.info("-" * 50)
-        logger.info("PHASE 5: Processing File Annotations (CDM)")
-        logger.info("-" * 50)
-        
-        phase5_start = time.time()
-        
-        try:
-            for annot_batch in client.data_modeling.instances(
-                chunk_size=chunk_size,
-                instance_type="edge",
-                sources=annotation_view,
-            ):
-                batch_counts["annotations"] += 1
-                process_annotation_batch(annot_batch, annotation_view, annotation_acc)
-                
-                if batch_counts["annotations"] % LOG_EVERY_N_BATCHES == 0:
-                    logger.info(f"[Annotations] Batch {batch_counts['annotations']:,} | Total: {annotation_acc.unique_annotations:,}")
-                
-                if annotation_acc.unique_annotations >= max_annotations:
-                    logger.info(f"🛑 Reached Annotation limit ({max_annotations:,})")
-                    break
-        except Exception as e:
-            logger.warning(f"[Annotations] Could not process annotations: {e}")
-        
         logger.info(f"[Annotations] Total: {annotation_acc.unique_annotations:,}")
-        logger.info(f"✅ PHASE 5: Annotations processed in {format_elapsed(time.time() - phase5_start)}")
-        
-        # Compute file annotation metrics
         file_annotation_metrics = compute_file_annotation_metrics(annotation_acc)
     else:
         logger.info("[Annotations] Skipped - disabled in config")
     
-    # ============================================================
-    # PHASE 6: Process 3D Model Contextualization
-    # ============================================================
     model3d_metrics = {}
-    model3d_acc = Model3DAccumulator()
-    enable_3d = config.get("enable_3d_metrics", True)
-    max_3d_objects = config.get("max_3d_objects", 150000)
-    
     if enable_3d:
-        logger.info("-" * 50)
-        logger.info("PHASE 6: Processing 3D Model Contextualization")
-        logger.info("-" * 50)
-        
-        phase6_start = time.time()
-        
-        # Build 3D object view
-        object3d_view = ViewId(
-            config["object3d_view_space"],
-            config["object3d_view_external_id"],
-            config["object3d_view_version"]
-        )
-        
-        # 6a. Process assets for 3D links (reuse asset data already loaded)
-        logger.info("[3D] Checking assets for 3D object associations...")
-        try:
-            for asset_batch in client.data_modeling.instances(
-                chunk_size=chunk_size,
-                instance_type="node",
-                sources=asset_view,
-            ):
-                process_asset_3d_batch(asset_batch, asset_view, model3d_acc)
-                
-                if model3d_acc.total_assets_checked >= max_assets:
-                    break
-        except Exception as e:
-            logger.warning(f"[3D] Could not process asset 3D links: {e}")
-        
         logger.info(f"[3D] Assets with 3D: {model3d_acc.assets_with_3d:,} / {model3d_acc.total_assets_checked:,}")
-        
-        # 6b. Process 3D objects for bounding box completeness
-        logger.info("[3D] Processing 3D objects...")
-        try:
-            for obj_batch in client.data_modeling.instances(
-                chunk_size=chunk_size,
-                instance_type="node",
-                sources=object3d_view,
-            ):
-                batch_counts["3d_objects"] = batch_counts.get("3d_objects", 0) + 1
-                process_3d_object_batch(obj_batch, object3d_view, model3d_acc)
-                
-                if model3d_acc.total_3d_objects >= max_3d_objects:
-                    logger.info(f"🛑 Reached 3D Object limit ({max_3d_objects:,})")
-                    break
-        except Exception as e:
-            logger.warning(f"[3D] Could not process 3D objects: {e}")
-        
         logger.info(f"[3D] Total 3D objects: {model3d_acc.total_3d_objects:,}")
-        logger.info(f"✅ PHASE 6: 3D processing in {format_elapsed(time.time() - phase6_start)}")
-        
-        # Compute 3D metrics
         model3d_metrics = compute_3d_metrics(model3d_acc)
     else:
         logger.info("[3D] Skipped - disabled in config")
     
-    # ============================================================
-    # PHASE 7: Process File Contextualization
-    # ============================================================
     file_metrics = {}
-    enable_files = config.get("enable_file_metrics", True)
-    max_files = config.get("max_files", 150000)
-    
     if enable_files:
-        logger.info("-" * 50)
-        logger.info("PHASE 7: Processing File Contextualization")
-        logger.info("-" * 50)
-        
-        phase7_start = time.time()
-        
-        # Build file view
-        file_view = ViewId(
-            config.get("file_view_space", "cdf_cdm"),
-            config.get("file_view_external_id", "CogniteFile"),
-            config.get("file_view_version", "v1")
-        )
-        
-        # Process files
-        try:
-            for file_batch in client.data_modeling.instances(
-                chunk_size=chunk_size,
-                instance_type="node",
-                sources=file_view,
-            ):
-                batch_counts["files"] = batch_counts.get("files", 0) + 1
-                process_file_batch(file_batch, file_view, acc)
-                
-                if batch_counts["files"] % LOG_EVERY_N_BATCHES == 0:
-                    logger.info(f"[Files] Batch {batch_counts['files']:,} | Total: {acc.total_files:,}")
-                
-                if acc.total_files >= max_files:
-                    logger.info(f"🛑 Reached File limit ({max_files:,})")
-                    break
-        except Exception as e:
-            logger.warning(f"[Files] Could not process files: {e}")
-        
         logger.info(f"[Files] Total files: {acc.total_files:,}")
-        logger.info(f"✅ PHASE 7: File processing in {format_elapsed(time.time() - phase7_start)}")
-        
-        # Compute file metrics
         file_metrics = compute_file_metrics(acc)
     else:
         logger.info("[Files] Skipped - disabled in config")
@@ -1235,6 +1211,7 @@ def handle(data: dict, client: CogniteClient) -> dict:
             "computed_at": acc.now.isoformat(),
             "execution_time_seconds": round(total_elapsed, 2),
             "batches_processed": batch_counts,
+            "incremental": incremental_changes,
             "instance_counts": {
                 "timeseries": {
                     "total_instances": acc.total_ts_instances,
@@ -1322,6 +1299,9 @@ def handle(data: dict, client: CogniteClient) -> dict:
     
     # Save to Cognite Files
     save_metrics_to_file(client, all_metrics, file_external_id, file_name)
+    if incremental_state is not None:
+        # Cursors and rows were saved while syncing; this adds the collector shards and gap statistics
+        save_incremental_state(client, incremental_state)
     
     # Final summary
     logger.info("=" * 70)
@@ -3,26 +3,52 @@ Metrics Modules for Contextualization Quality Function.
 
 Exports all processing functions and metric computations organized by domain:
 - common: Shared utilities, data classes, and CombinedAccumulator
+- columnar: Interned, array-backed accumulator backend (ColumnarAccumulator)
 - timeseries: TS processing and metrics
 - asset_hierarchy: Asset processing and hierarchy metrics
 - equipment: Equipment processing and metrics
 - maintenance: Maintenance workflow processing and metrics (RMDM v1)
 - files: File contextualization processing and metrics (CogniteFile)
+- fanout: Single-pass view scans feeding several accumulators
+- partitions: externalId range planning for batch collection
+- incremental: Per-view state kept up to date with DMS sync cursors
+- batch_format: Binary, compressed batch-file encoding
 - storage: File storage utilities
 """
 
 from .asset_hierarchy import (
+    HierarchyAnalysis,
+    analyze_hierarchy,
     compute_asset_hierarchy_metrics,
     compute_depth_map,
     process_asset_batch,
 )
+from .batch_format import (
+    BATCH_FORMAT_BINARY,
+    BATCH_FORMAT_JSON,
+    BATCH_FORMAT_VERSION,
+    BatchFileReader,
+    decode_batch,
+    encode_batch,
+    is_binary_batch,
+)
+from .columnar import (
+    ACCUMULATOR_BACKEND_COLUMNAR,
+    ACCUMULATOR_BACKEND_DICT,
+    ACCUMULATOR_BACKENDS,
+    ColumnarAccumulator,
+    IdInterner,
+    get_accumulator_class,
+)
 from .common import (
     BATCH_FILE_PREFIX,
     # Config
     DEFAULT_CONFIG,
+    INCREMENTAL_STATE_FILE_EXTERNAL_ID,
     LOG_EVERY_N_BATCHES,
     METRICS_FILE_EXTERNAL_ID,
     METRICS_FILE_NAME,
+    PARTITION_PLAN_FILE_EXTERNAL_ID,
     TIMEOUT_SECONDS,
     TIMEOUT_WARNING_SECONDS,
     TYPE_MAPPINGS,
@@ -47,6 +73,10 @@ from .equipment import (
     compute_equipment_metrics,
     process_equipment_batch,
 )
+from .fanout import (
+    ScanConsumer,
+    ViewScan,
+)
 from .file_annotation import (
     AnnotationData,
     FileAnnotationAccumulator,
@@ -57,6 +87,15 @@ from .files import (
     compute_file_metrics,
     process_file_batch,
 )
+from .incremental import (
+    IncrementalState,
+    SyncCursorExpiredError,
+    ViewState,
+    build_sync_query,
+    is_cursor_expired_error,
+    sync_view,
+    sync_views,
+)
 from .maintenance import (
     compute_maintenance_metrics,
     get_direct_relation_id,
@@ -71,18 +110,34 @@ from .model_3d import (
     process_3d_object_batch,
     process_asset_3d_batch,
 )
+from .partitions import (
+    PARTITION_MODE_EXTERNAL_ID,
+    PARTITION_MODE_OFFSET,
+    PartitionPlan,
+    build_range_filter,
+    compute_partition_boundaries,
+    plan_partitions,
+)
 from .storage import (
     delete_batch_files,
     # Batch processing functions
     get_batch_file_external_id,
+    iter_batch_files,
     list_batch_files,
     load_and_merge_all_batches,
     load_batch_file,
+    load_incremental_state,
+    load_partition_plan,
     save_batch_file,
+    save_incremental_state,
     save_metrics_to_file,
+    save_partition_plan,
 )
 from .timeseries import (
+    GapStats,
     compute_historical_gaps_batch,
+    compute_historical_gaps_cached,
     compute_ts_metrics,
+    detect_gaps,
     process_timeseries_batch,
 )
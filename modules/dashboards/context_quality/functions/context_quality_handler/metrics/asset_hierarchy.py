@@ -2,6 +2,11 @@
 Asset processing and hierarchy metrics computation.
 """
 
+import logging
+from array import array
+from collections import Counter
+from collections.abc import Mapping
+from dataclasses import dataclass
 
 from cognite.client.data_classes.data_modeling import ViewId
 
@@ -12,6 +17,8 @@ from .common import (
     get_props,
 )
 
+logger = logging.getLogger(__name__)
+
 
 def process_asset_batch(
     asset_batch,
@@ -42,6 +49,7 @@ def process_asset_batch(
         # For TS metrics: critical asset tracking
         if props.get("criticality") == "critical":
             acc.critical_assets_total += 1
+            acc.critical_asset_ids.add(node_id)
             if node_id in acc.assets_with_ts:
                 acc.critical_assets_with_ts += 1
         
@@ -56,35 +64,135 @@ def process_asset_batch(
         acc.asset_type_map[node_id] = asset_type
 
 
+# ----------------------------------------------------
+# HIERARCHY ANALYSIS
+# ----------------------------------------------------
+NO_PARENT = -1  # Parent slot of a root (no parent reference)
+MISSING_PARENT = -2  # Parent slot of a node whose parent was not collected
+
+
+@dataclass
+class HierarchyAnalysis:
+    """
+    Per-node hierarchy properties, indexed like ``node_ids``.
+
+    Depth counts parent hops until a root or a parent outside the collected
+    assets (which counts as one hop). Nodes on a parent cycle get the cycle
+    length as depth, and nodes hanging below a cycle add their distance to it.
+    Subtree sizes and leaf counts include the node itself; for cycle nodes
+    they only cover the acyclic branches hanging off them.
+    """
+    node_ids: list[str]
+    parent: array  # Index into node_ids, NO_PARENT or MISSING_PARENT
+    depth: array
+    child_count: array
+    subtree_size: array
+    leaf_count: array
+    in_cycle: bytearray
+
+    def depth_map(self) -> dict[str, int]:
+        """Depth per node ID."""
+        return dict(zip(self.node_ids, self.depth, strict=True))
+
+    def orphan_ids(self) -> list[str]:
+        """Nodes with no parent reference and no children."""
+        return [
+            nid for nid, parent, children in zip(self.node_ids, self.parent, self.child_count, strict=True)
+            if parent == NO_PARENT and not children
+        ]
+
+    @property
+    def cycle_node_count(self) -> int:
+        return self.in_cycle.count(1)
+
+    @property
+    def missing_parent_count(self) -> int:
+        return self.parent.count(MISSING_PARENT)
+
+
+def analyze_hierarchy(parent_map: Mapping[str, str | None]) -> HierarchyAnalysis:
+    """
+    Analyze a parent map in O(N).
+
+    Node IDs are encoded as integer indexes into a parent array. Children are
+    counted once, then nodes are ordered leaves-first (Kahn's algorithm on
+    the child counts), which accumulates subtree sizes and leaf counts
+    bottom-up. Nodes that never reach the order are exactly the nodes on
+    parent cycles. Depths are then filled in parents-first by walking the
+    order in reverse.
+
+    Args:
+        parent_map: Node ID -> parent node ID (None for roots)
+
+    Returns:
+        HierarchyAnalysis for all nodes in ``parent_map``
+    """
+    node_ids: list[str] = []
+    parent_ids: list[str | None] = []
+    for nid, parent_id in parent_map.items():
+        node_ids.append(nid)
+        parent_ids.append(parent_id)
+    n = len(node_ids)
+    index = dict(zip(node_ids, range(n), strict=True))
+    get_index = index.get
+    parent = array("i", [get_index(p, MISSING_PARENT) if p else NO_PARENT for p in parent_ids])
+    del index, parent_ids
+
+    child_count = [0] * n
+    for p in parent:
+        if p >= 0:
+            child_count[p] += 1
+
+    # Leaves first: a node enters the order once all its children have
+    pending = child_count.copy()
+    subtree_size = [1] * n
+    leaf_count = [0 if c else 1 for c in child_count]
+    order = [i for i, c in enumerate(child_count) if not c]
+    for i in order:  # Grows while iterating
+        p = parent[i]
+        if p >= 0:
+            subtree_size[p] += subtree_size[i]
+            leaf_count[p] += leaf_count[i]
+            pending[p] -= 1
+            if not pending[p]:
+                order.append(p)
+
+    depth = [0] * n
+    in_cycle = bytearray(n)
+    if len(order) < n:
+        for i in range(n):
+            if pending[i] and not in_cycle[i]:
+                cycle = [i]
+                j = parent[i]
+                while j != i:
+                    cycle.append(j)
+                    j = parent[j]
+                for j in cycle:
+                    in_cycle[j] = 1
+                    depth[j] = len(cycle)
+
+    # Parents first: reverse of the leaves-first order (cycle depths are already set)
+    for i in reversed(order):
+        p = parent[i]
+        if p >= 0:
+            depth[i] = depth[p] + 1
+        elif p == MISSING_PARENT:
+            depth[i] = 1
+
+    return HierarchyAnalysis(
+        node_ids=node_ids,
+        parent=parent,
+        depth=array("i", depth),
+        child_count=array("i", child_count),
+        subtree_size=array("i", subtree_size),
+        leaf_count=array("i", leaf_count),
+        in_cycle=in_cycle,
+    )
+
+
 def compute_depth_map(parent_map: dict[str, str | None]) -> dict[str, int]:
     """Compute depth for each node in the hierarchy."""
-    depth_cache: dict[str, int] = {}
-
-    def get_depth(nid: str) -> int:
-        if nid in depth_cache:
-            return depth_cache[nid]
-        parent = parent_map.get(nid)
-        if not parent:
-            depth_cache[nid] = 0
-            return 0
-        visited = set()
-        cur = nid
-        d = 0
-        while True:
-            if cur in visited:
-                break
-            visited.add(cur)
-            parent = parent_map.get(cur)
-            if not parent:
-                break
-            d += 1
-            cur = parent
-        depth_cache[nid] = d
-        return d
-
-    for node_id in parent_map:
-        get_depth(node_id)
-    return depth_cache
+    return analyze_hierarchy(parent_map).depth_map()
 
 
 def compute_asset_hierarchy_metrics(acc: CombinedAccumulator) -> dict:
@@ -93,12 +201,12 @@ def compute_asset_hierarchy_metrics(acc: CombinedAccumulator) -> dict:
     assets_with_parents = sum(1 for v in acc.parent_of.values() if v)
     root_assets = total_assets - assets_with_parents
     
+    hierarchy = analyze_hierarchy(acc.parent_of)
+    if hierarchy.cycle_node_count:
+        logger.warning(f"[Hierarchy] {hierarchy.cycle_node_count:,} assets are on parent cycles")
+    
     # Orphans: no parent AND no children
-    orphan_ids = [
-        nid for nid, parent in acc.parent_of.items()
-        if parent is None and nid not in acc.children_count_map
-    ]
-    orphan_count = len(orphan_ids)
+    orphan_count = len(hierarchy.orphan_ids())
     orphan_rate = (orphan_count / total_assets * 100) if total_assets else 0.0
     
     # Hierarchy completion rate
@@ -106,10 +214,9 @@ def compute_asset_hierarchy_metrics(acc: CombinedAccumulator) -> dict:
     completion_rate = (assets_with_parents / non_root * 100) if non_root > 0 else 100.0
     
     # Depth metrics
-    depths_map = compute_depth_map(acc.parent_of)
-    depth_values = list(depths_map.values()) if depths_map else [0]
-    avg_depth = sum(depth_values) / len(depth_values) if depth_values else 0.0
-    max_depth = max(depth_values) if depth_values else 0
+    depth_values = hierarchy.depth or [0]
+    avg_depth = sum(depth_values) / len(depth_values)
+    max_depth = max(depth_values)
     
     # Breadth metrics
     children_values = list(acc.children_count_map.values()) if acc.children_count_map else [0]
@@ -122,9 +229,7 @@ def compute_asset_hierarchy_metrics(acc: CombinedAccumulator) -> dict:
     max_children = max(children_values) if children_values else 0
     
     # Distributions
-    depth_dist: dict[int, int] = {}
-    for d in depths_map.values():
-        depth_dist[d] = depth_dist.get(d, 0) + 1
+    depth_dist = Counter(hierarchy.depth)
     
     breadth_dist: dict[int, int] = {}
     for c in acc.children_count_map.values():
@@ -143,6 +248,10 @@ def compute_asset_hierarchy_metrics(acc: CombinedAccumulator) -> dict:
         "hierarchy_std_children": round(std_children, 2),
         "hierarchy_max_children": max_children,
         "hierarchy_parents_count": len(acc.children_count_map),
+        "hierarchy_leaf_count": sum(1 for c in hierarchy.child_count if not c),
+        "hierarchy_max_subtree_size": max(hierarchy.subtree_size, default=0),
+        "hierarchy_cycle_asset_count": hierarchy.cycle_node_count,
+        "hierarchy_missing_parent_count": hierarchy.missing_parent_count,
         "hierarchy_depth_distribution": dict(sorted(depth_dist.items())),
         "hierarchy_breadth_distribution": dict(sorted(breadth_dist.items())),
     }
@@ -0,0 +1,353 @@
+"""
+Binary batch-file format for batch collection mode.
+
+Batch files are dominated by externalId lists and ID-keyed maps, and the same
+ID shows up in many of them (``asset_ids_seen``, ``parent_of``,
+``assets_with_ts``, ...). The binary format stores every distinct string once
+in a shared string table and replaces ID lists/maps with integer code arrays:
+
+    b"CQB" | version (u8) | header length (u32 LE) | header JSON | sections
+
+The header holds the batch index, batch metadata, codec and a table of
+independently compressed sections:
+
+- ``strings``  shared string table
+- ``codes``    ``array("i")`` of string codes (-1 = None)
+- ``ints``     ``array("q")`` of integer map values
+- one JSON section per top-level key (e.g. ``accumulator``), where ID
+  lists, ID-keyed maps and lists of records are small references such as
+  ``{"$ids": [start, end]}`` into those columns
+
+Only maps with string keys are stored as columns; other maps stay inline and
+get JSON's key semantics, exactly like a JSON batch file. A plain one-key dict
+whose key looks like a reference is wrapped in ``{"$dict": ...}``.
+
+Readers only decompress what they touch: the header alone gives batch index
+and metadata, and each accumulator section is decoded on first access.
+
+Files not starting with the magic bytes are read as legacy JSON batch files.
+"""
+
+import json
+import logging
+import struct
+import sys
+import zlib
+from array import array
+from typing import Any
+
+try:
+    import zstandard
+except ImportError:  # Optional: zlib (stdlib) is used when zstandard is not installed
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# ----------------------------------------------------
+# CONSTANTS
+# ----------------------------------------------------
+BATCH_FORMAT_MAGIC = b"CQB"
+BATCH_FORMAT_VERSION = 1
+BATCH_FORMAT_BINARY = "binary"
+BATCH_FORMAT_JSON = "json"
+
+CODEC_ZLIB = "zlib"
+CODEC_ZSTD = "zstd"
+
+ZLIB_LEVEL = 1  # Sections are mostly small ints and short IDs: higher levels cost time, save little
+MIN_ENCODED_LENGTH = 8  # Shorter lists/maps stay inline in the JSON section
+
+_PREFIX = struct.Struct("<3sBI")  # magic, version, header length
+_NONE_CODE = -1
+_ID_LIST = "$ids"
+_ID_MAP = "$id_map"
+_COUNT_MAP = "$count_map"
+_ID_LIST_MAP = "$id_list_map"
+_RECORDS = "$records"
+_DICT = "$dict"
+
+
+# ----------------------------------------------------
+# COMPRESSION
+# ----------------------------------------------------
+
+def default_codec() -> str:
+    """zstd when the ``zstandard`` package is installed, zlib otherwise."""
+    return CODEC_ZSTD if zstandard is not None else CODEC_ZLIB
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ValueError("Codec 'zstd' requires the 'zstandard' package")
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if codec == CODEC_ZLIB:
+        return zlib.compress(data, ZLIB_LEVEL)
+    raise ValueError(f"Unknown batch file codec '{codec}'")
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ValueError("Batch file is zstd-compressed but 'zstandard' is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(data)
+    raise ValueError(f"Unknown batch file codec '{codec}'")
+
+
+# ----------------------------------------------------
+# ENCODING
+# ----------------------------------------------------
+
+def _is_record_list(values: list) -> bool:
+    """True for a list of dicts that all have the same (non-empty) string keys."""
+    if not isinstance(values[0], dict) or not values[0] or not all(type(k) is str for k in values[0]):
+        return False
+    keys = values[0].keys()
+    return all(isinstance(v, dict) and v.keys() == keys for v in values)
+
+
+class _Encoder:
+    """Replaces ID lists and ID-keyed maps with references into shared columns."""
+
+    def __init__(self) -> None:
+        # None is pre-seeded so it maps to the sentinel code without a branch per value
+        self.string_codes: dict[str | None, int] = {None: _NONE_CODE}
+        self.codes = array("i")
+        self.ints = array("q")
+
+    def _append_codes(self, values) -> list[int]:
+        string_codes = self.string_codes
+        for v in values:
+            if v not in string_codes:
+                string_codes[v] = len(string_codes) - 1
+        start = len(self.codes)
+        self.codes.extend(map(string_codes.__getitem__, values))
+        return [start, len(self.codes)]
+
+    def encode(self, value: Any) -> Any:
+        if isinstance(value, list):
+            if len(value) >= MIN_ENCODED_LENGTH:
+                if all(v is None or type(v) is str for v in value):
+                    return {_ID_LIST: self._append_codes(value)}
+                if _is_record_list(value):
+                    keys = list(value[0])
+                    return {_RECORDS: [keys, [self.encode([row[k] for row in value]) for k in keys]]}
+            return [self.encode(v) for v in value]
+        if isinstance(value, dict):
+            if len(value) >= MIN_ENCODED_LENGTH and all(type(k) is str for k in value):
+                values = value.values()
+                if all(v is None or type(v) is str for v in values):
+                    keys = self._append_codes(value.keys())
+                    self._append_codes(values)
+                    return {_ID_MAP: [keys[0], len(self.codes)]}
+                if all(type(v) is int for v in values):
+                    keys = self._append_codes(value.keys())
+                    self.ints.extend(values)
+                    return {_COUNT_MAP: [*keys, len(self.ints) - len(value)]}
+                if all(type(v) is list and all(x is None or type(x) is str for x in v) for v in values):
+                    keys = self._append_codes(value.keys())
+                    lengths_start = len(self.ints)
+                    self.ints.extend(map(len, values))
+                    flat = self._append_codes([x for v in values for x in v])
+                    return {_ID_LIST_MAP: [*keys, lengths_start, flat[0]]}
+            encoded = {k: self.encode(v) for k, v in value.items()}
+            if len(value) == 1 and str(next(iter(value))).startswith("$"):
+                return {_DICT: encoded}
+            return encoded
+        return value
+
+    @property
+    def string_count(self) -> int:
+        return len(self.string_codes) - 1
+
+    def string_table(self) -> tuple[str, bytes]:
+        strings = list(self.string_codes)[1:]
+        if any("\x00" in s for s in strings):
+            return "json", json.dumps(strings).encode("utf-8")
+        return "nul", "\x00".join(strings).encode("utf-8")
+
+
+def encode_batch(batch_data: dict, codec: str | None = None) -> bytes:
+    """
+    Encode a batch dict (as written by ``save_batch_file``) to the binary format.
+
+    Args:
+        batch_data: Batch dict with ``batch_index``, ``batch_metadata`` and accumulator dicts
+        codec: ``"zstd"`` or ``"zlib"`` (default: zstd when available)
+
+    Returns:
+        Encoded file content
+    """
+    codec = codec or default_codec()
+    encoder = _Encoder()
+    payload: dict[str, bytes] = {}
+    for key, value in batch_data.items():
+        if key in ("batch_index", "batch_metadata"):
+            continue
+        payload[key] = json.dumps(encoder.encode(value), separators=(",", ":"), default=str).encode("utf-8")
+
+    strings_encoding, payload["strings"] = encoder.string_table()
+    payload["codes"] = encoder.codes.tobytes()
+    payload["ints"] = encoder.ints.tobytes()
+
+    sections = []
+    blobs = []
+    offset = 0
+    for name, raw in payload.items():
+        blob = _compress(raw, codec)
+        sections.append({"name": name, "offset": offset, "length": len(blob), "raw_length": len(raw)})
+        blobs.append(blob)
+        offset += len(blob)
+
+    header = json.dumps(
+        {
+            "codec": codec,
+            "byteorder": sys.byteorder,
+            "strings_encoding": strings_encoding,
+            "string_count": encoder.string_count,
+            "batch_index": batch_data.get("batch_index"),
+            "batch_metadata": batch_data.get("batch_metadata") or {},
+            "sections": sections,
+        },
+        default=str,
+    ).encode("utf-8")
+    return b"".join([_PREFIX.pack(BATCH_FORMAT_MAGIC, BATCH_FORMAT_VERSION, len(header)), header, *blobs])
+
+
+# ----------------------------------------------------
+# DECODING
+# ----------------------------------------------------
+
+def is_binary_batch(raw: bytes) -> bool:
+    """True if the content starts with the binary batch-file magic bytes."""
+    return raw[: len(BATCH_FORMAT_MAGIC)] == BATCH_FORMAT_MAGIC
+
+
+class BatchFileReader:
+    """
+    Lazy reader for a binary batch file.
+
+    The header is parsed on construction; sections are decompressed and
+    decoded on first access and cached.
+    """
+
+    def __init__(self, raw: bytes) -> None:
+        magic, version, header_length = _PREFIX.unpack_from(raw)
+        if magic != BATCH_FORMAT_MAGIC:
+            raise ValueError("Not a binary batch file")
+        if version > BATCH_FORMAT_VERSION:
+            raise ValueError(f"Unsupported batch file version {version} (max {BATCH_FORMAT_VERSION})")
+        body_start = _PREFIX.size + header_length
+        self.version = version
+        self.header: dict = json.loads(raw[_PREFIX.size:body_start])
+        self._raw = memoryview(raw)[body_start:]
+        self._sections = {s["name"]: s for s in self.header["sections"]}
+        self._strings: list[str] | None = None
+        self._codes: array | None = None
+        self._ints: array | None = None
+        self._cache: dict[str, Any] = {}
+
+    @property
+    def batch_index(self) -> int | None:
+        return self.header.get("batch_index")
+
+    @property
+    def batch_metadata(self) -> dict:
+        return self.header.get("batch_metadata") or {}
+
+    def keys(self) -> list[str]:
+        """Top-level payload keys (e.g. ``accumulator``)."""
+        return [name for name in self._sections if name not in ("strings", "codes", "ints")]
+
+    def _section_bytes(self, name: str) -> bytes:
+        section = self._sections[name]
+        blob = self._raw[section["offset"]:section["offset"] + section["length"]]
+        return _decompress(bytes(blob), self.header["codec"])
+
+    def _column(self, name: str, typecode: str) -> array:
+        column = array(typecode)
+        column.frombytes(self._section_bytes(name))
+        if self.header.get("byteorder", sys.byteorder) != sys.byteorder:
+            column.byteswap()
+        return column
+
+    def _load_columns(self) -> None:
+        if self._strings is not None:
+            return
+        raw = self._section_bytes("strings").decode("utf-8")
+        count = self.header.get("string_count")
+        if self.header.get("strings_encoding") == "json":
+            self._strings = json.loads(raw)
+        elif count is None:
+            # Written before string_count: a table holding only "" reads as empty
+            self._strings = raw.split("\x00") if raw else []
+        else:
+            # "" is both an empty table and a table holding one empty string
+            self._strings = raw.split("\x00") if count else []
+        if count is not None and len(self._strings) != count:
+            raise ValueError(f"Corrupt string table: {len(self._strings)} strings, header says {count}")
+        self._strings.append(None)  # code -1 (_NONE_CODE) indexes the trailing None
+        self._codes = self._column("codes", "i")
+        self._ints = self._column("ints", "q")
+
+    def _strs(self, start: int, end: int) -> list[str | None]:
+        self._load_columns()
+        return list(map(self._strings.__getitem__, self._codes[start:end]))
+
+    def _decode(self, value: Any) -> Any:
+        if isinstance(value, list):
+            return [self._decode(v) for v in value]
+        if not isinstance(value, dict):
+            return value
+        if len(value) == 1:
+            key, ref = next(iter(value.items()))
+            if key == _ID_LIST:
+                return self._strs(*ref)
+            if key == _ID_MAP:
+                start, end = ref
+                mid = (start + end) // 2
+                return dict(zip(self._strs(start, mid), self._strs(mid, end), strict=True))
+            if key == _COUNT_MAP:
+                start, end, ints_start = ref
+                return dict(zip(self._strs(start, end), self._ints[ints_start:ints_start + end - start], strict=True))
+            if key == _ID_LIST_MAP:
+                start, end, lengths_start, flat_start = ref
+                lengths = self._ints[lengths_start:lengths_start + end - start]
+                flat = self._strs(flat_start, flat_start + sum(lengths))
+                result = {}
+                pos = 0
+                for map_key, length in zip(self._strs(start, end), lengths, strict=True):
+                    result[map_key] = flat[pos:pos + length]
+                    pos += length
+                return result
+            if key == _RECORDS:
+                keys, columns = ref
+                columns = [self._decode(c) for c in columns]
+                return [dict(zip(keys, row, strict=True)) for row in zip(*columns, strict=True)]
+            if key == _DICT:
+                return {k: self._decode(v) for k, v in ref.items()}
+        return {k: self._decode(v) for k, v in value.items()}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Decode one top-level payload key (cached)."""
+        if key not in self.keys():
+            return default
+        if key not in self._cache:
+            self._cache[key] = self._decode(json.loads(self._section_bytes(key)))
+        return self._cache[key]
+
+    def to_dict(self) -> dict:
+        """Decode the whole file to the same dict a JSON batch file holds."""
+        data = {"batch_index": self.batch_index, "batch_metadata": self.batch_metadata}
+        for key in self.keys():
+            data[key] = self.get(key)
+        return data
+
+
+def decode_batch(raw: bytes) -> dict:
+    """Decode batch file content in either format (binary or legacy JSON)."""
+    if is_binary_batch(raw):
+        return BatchFileReader(raw).to_dict()
+    return json.loads(raw.decode("utf-8"))
@@ -0,0 +1,472 @@
+"""
+Compact columnar backend for CombinedAccumulator.
+
+The default accumulator keeps a separate Python set/dict entry (and usually a
+separate string object) for every externalId in every structure: one asset ID
+can live in ``asset_ids_seen``, ``parent_of`` (as key and value),
+``children_count_map``, ``asset_type_map``, ``assets_with_ts`` and more.
+
+ColumnarAccumulator interns every externalId once into an integer code and
+stores the per-instance structures as flat columns indexed by that code:
+
+- ID sets       -> one byte per interned ID (``bytearray`` membership flags)
+- ID maps       -> ``array("i")`` of value codes
+- count maps    -> ``array("i")`` of counts
+- equipment     -> one ``array("i")`` column per EquipmentData field
+
+The columns implement the set/mapping/sequence protocols the processors and
+metric functions already use, so ``process_*_batch``, ``compute_*_metrics``,
+``to_dict``/``from_dict`` and ``merge_from`` work unchanged and both backends
+can be merged into each other.
+"""
+
+from abc import abstractmethod
+from array import array
+from collections.abc import ItemsView, Iterable, Iterator, MutableMapping, MutableSequence, MutableSet, ValuesView
+from itertools import compress, repeat
+from typing import Any
+
+from .common import CombinedAccumulator, EquipmentData
+
+# ----------------------------------------------------
+# CONSTANTS
+# ----------------------------------------------------
+ACCUMULATOR_BACKEND_DICT = "dict"
+ACCUMULATOR_BACKEND_COLUMNAR = "columnar"
+
+_ABSENT = -2  # Slot has no entry
+_NONE = -1  # Entry whose value is None
+
+
+# ----------------------------------------------------
+# INTERNING
+# ----------------------------------------------------
+
+class IdInterner:
+    """Maps each distinct string to a dense integer code (and back)."""
+    __slots__ = ("_codes", "_values")
+
+    def __init__(self) -> None:
+        self._codes: dict[str, int] = {}
+        self._values: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def code(self, value: str) -> int:
+        """Get the code for a value, interning it on first use."""
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self._values)
+            self._codes[value] = code
+            self._values.append(value)
+        return code
+
+    def lookup(self, value: str) -> int | None:
+        """Get the code for a value without interning it."""
+        return self._codes.get(value)
+
+    def value(self, code: int) -> str:
+        """Get the value for a code."""
+        return self._values[code]
+
+    def encode(self, value: str | None) -> int:
+        """Code for an optional value (None is stored as a sentinel)."""
+        return _NONE if value is None else self.code(value)
+
+    def decode(self, code: int) -> str | None:
+        """Inverse of ``encode``."""
+        return None if code == _NONE else self._values[code]
+
+
+def _grow(column: array, size: int, fill: int) -> None:
+    """Extend a code-indexed column so that ``size`` slots exist."""
+    if size > len(column):
+        column.extend(repeat(fill, size - len(column)))
+
+
+# ----------------------------------------------------
+# COLUMNS
+# ----------------------------------------------------
+
+class InternedIdSet(MutableSet):
+    """set[str] stored as one membership byte per interned ID."""
+
+    def __init__(self, interner: IdInterner, values: Iterable[str] = ()) -> None:
+        self._interner = interner
+        self._flags = bytearray()
+        self._size = 0
+        self.update(values)
+
+    @classmethod
+    def _from_iterable(cls, it: Iterable[str]) -> set[str]:
+        # Results of &, |, - are plain sets (no interner to attach them to)
+        return set(it)
+
+    def __contains__(self, value: object) -> bool:
+        code = self._interner.lookup(value)  # type: ignore[arg-type]
+        return code is not None and code < len(self._flags) and self._flags[code] == 1
+
+    def __iter__(self) -> Iterator[str]:
+        return compress(self._interner._values, self._flags)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._size} ids)"
+
+    def add(self, value: str) -> None:
+        code = self._interner.code(value)
+        if code >= len(self._flags):
+            self._flags.extend(bytes(code + 1 - len(self._flags)))
+        if not self._flags[code]:
+            self._flags[code] = 1
+            self._size += 1
+
+    def discard(self, value: str) -> None:
+        if value in self:
+            self._flags[self._interner.lookup(value)] = 0
+            self._size -= 1
+
+    def update(self, values: Iterable[str]) -> None:
+        """Add all values (same contract as ``set.update``)."""
+        for value in values:
+            self.add(value)
+
+    def intersection(self, *others: Iterable[str]) -> set[str]:
+        """Same contract as ``set.intersection`` (returns a plain set)."""
+        return {v for v in self if all(v in o for o in others)}
+
+    def union(self, *others: Iterable[str]) -> set[str]:
+        """Same contract as ``set.union`` (returns a plain set)."""
+        return set(self).union(*others)
+
+
+class _ArrayMap(MutableMapping):
+    """Base for mappings keyed by interned IDs with one int slot per code."""
+
+    def __init__(self, interner: IdInterner, items: Any = None) -> None:
+        self._interner = interner
+        self._slots = array("i")
+        self._size = 0
+        if items:
+            self.update(items)
+
+    @abstractmethod
+    def _encode(self, value: Any) -> int:
+        """Slot value stored for ``value``."""
+
+    @abstractmethod
+    def _decode(self, slot: int) -> Any:
+        """Inverse of ``_encode``."""
+
+    def _code_of(self, key: object) -> int | None:
+        code = self._interner.lookup(key)  # type: ignore[arg-type]
+        if code is None or code >= len(self._slots) or self._slots[code] == _ABSENT:
+            return None
+        return code
+
+    def __getitem__(self, key: str) -> Any:
+        code = self._code_of(key)
+        if code is None:
+            raise KeyError(key)
+        return self._decode(self._slots[code])
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        code = self._interner.code(key)
+        _grow(self._slots, code + 1, _ABSENT)
+        if self._slots[code] == _ABSENT:
+            self._size += 1
+        self._slots[code] = self._encode(value)
+
+    def __delitem__(self, key: str) -> None:
+        code = self._code_of(key)
+        if code is None:
+            raise KeyError(key)
+        self._slots[code] = _ABSENT
+        self._size -= 1
+
+    def __contains__(self, key: object) -> bool:
+        return self._code_of(key) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        values = self._interner._values
+        for code, slot in enumerate(self._slots):
+            if slot != _ABSENT:
+                yield values[code]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._size} entries)"
+
+    def _iter_items(self) -> Iterator[tuple[str, Any]]:
+        values, decode = self._interner._values, self._decode
+        for code, slot in enumerate(self._slots):
+            if slot != _ABSENT:
+                yield values[code], decode(slot)
+
+    def items(self) -> ItemsView:
+        return _ArrayMapItems(self)
+
+    def values(self) -> ValuesView:
+        return _ArrayMapValues(self)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Plain dict copy (for JSON storage)."""
+        return dict(self._iter_items())
+
+
+class _ArrayMapItems(ItemsView):
+    def __iter__(self) -> Iterator[tuple[str, Any]]:
+        return self._mapping._iter_items()
+
+
+class _ArrayMapValues(ValuesView):
+    def __iter__(self) -> Iterator[Any]:
+        decode = self._mapping._decode
+        return (decode(slot) for slot in self._mapping._slots if slot != _ABSENT)
+
+
+class InternedIdMap(_ArrayMap):
+    """dict[str, str | None] with keys and values interned (e.g. parent_of)."""
+
+    def _encode(self, value: str | None) -> int:
+        return self._interner.encode(value)
+
+    def _decode(self, slot: int) -> str | None:
+        return self._interner.decode(slot)
+
+
+class InternedCountMap(_ArrayMap):
+    """dict[str, int] of non-negative counts (e.g. children_count_map)."""
+
+    def _encode(self, value: int) -> int:
+        if value < 0:
+            raise ValueError(f"Counts must be non-negative, got {value}")
+        return value
+
+    def _decode(self, slot: int) -> int:
+        return slot
+
+
+class InternedIdList(MutableSequence):
+    """list[str] of interned IDs, stored as an array of codes."""
+
+    def __init__(self, interner: IdInterner, values: Iterable[str] = ()) -> None:
+        self._interner = interner
+        self._codes = array("i", (interner.code(v) for v in values))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._interner.value(c) for c in self._codes[index]]
+        return self._interner.value(self._codes[index])
+
+    def __setitem__(self, index: int, value: str) -> None:
+        self._codes[index] = self._interner.code(value)
+
+    def __delitem__(self, index: int) -> None:
+        del self._codes[index]
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def insert(self, index: int, value: str) -> None:
+        self._codes.insert(index, self._interner.code(value))
+
+    def __eq__(self, other: object) -> bool:
+        return list(self) == list(other) if isinstance(other, (list, InternedIdList)) else NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+class InternedIdListMap(MutableMapping):
+    """dict[str, list[str]] (e.g. assets_with_equipment) with interned keys and values."""
+
+    def __init__(self, interner: IdInterner, items: Any = None) -> None:
+        self._interner = interner
+        self._lists: dict[int, InternedIdList] = {}
+        if items:
+            self.update(items)
+
+    def __getitem__(self, key: str) -> InternedIdList:
+        code = self._interner.lookup(key)
+        if code is None or code not in self._lists:
+            raise KeyError(key)
+        return self._lists[code]
+
+    def __setitem__(self, key: str, value: Iterable[str]) -> None:
+        self._lists[self._interner.code(key)] = InternedIdList(self._interner, value)
+
+    def __delitem__(self, key: str) -> None:
+        code = self._interner.lookup(key)
+        if code is None or code not in self._lists:
+            raise KeyError(key)
+        del self._lists[code]
+
+    def __iter__(self) -> Iterator[str]:
+        return (self._interner.value(code) for code in self._lists)
+
+    def __len__(self) -> int:
+        return len(self._lists)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({len(self._lists)} entries)"
+
+    def setdefault(self, key: str, default: Iterable[str] = ()) -> InternedIdList:
+        # The stored list is a view over the codes, so return it rather than ``default``
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def to_dict(self) -> dict[str, list[str]]:
+        """Plain dict copy (for JSON storage)."""
+        return {k: list(v) for k, v in self.items()}
+
+
+class EquipmentColumns(MutableSequence):
+    """list[EquipmentData] stored as one code column per field."""
+
+    _FIELDS = ("equipment_id", "equipment_type", "asset_id", "serial_number", "manufacturer", "criticality")
+
+    def __init__(self, interner: IdInterner, values: Iterable[EquipmentData] = ()) -> None:
+        self._interner = interner
+        self._columns = {name: array("i") for name in self._FIELDS}
+        self.extend(values)
+
+    def _row(self, eq: EquipmentData) -> Iterator[tuple[array, int]]:
+        encode = self._interner.encode
+        return ((self._columns[name], encode(getattr(eq, name))) for name in self._FIELDS)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        decode = self._interner.decode
+        return EquipmentData(*(decode(self._columns[name][index]) for name in self._FIELDS))
+
+    def __iter__(self) -> Iterator[EquipmentData]:
+        decode = self._interner.decode
+        for row in zip(*self._columns.values(), strict=True):
+            yield EquipmentData(*(decode(c) for c in row))
+
+    def __setitem__(self, index: int, value: EquipmentData) -> None:
+        for column, code in self._row(value):
+            column[index] = code
+
+    def __delitem__(self, index: int) -> None:
+        for column in self._columns.values():
+            del column[index]
+
+    def __len__(self) -> int:
+        return len(self._columns["equipment_id"])
+
+    def insert(self, index: int, value: EquipmentData) -> None:
+        for column, code in self._row(value):
+            column.insert(index, code)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({len(self)} rows)"
+
+
+# ----------------------------------------------------
+# COLUMNAR ACCUMULATOR
+# ----------------------------------------------------
+
+# Accumulator field -> column type. Remaining fields (counters, duplicate ID
+# lists, small category maps, file/maintenance rows) keep their plain types.
+_COLUMNS: dict[str, type] = {
+    **dict.fromkeys(
+        (
+            "assets_with_ts",
+            "ts_ids_seen",
+            "asset_ids_seen",
+            "critical_asset_ids",
+            "equipment_ids_seen",
+            "notification_ids_seen",
+            "assets_with_notifications",
+            "equipment_with_notifications",
+            "order_ids_seen",
+            "assets_with_orders",
+            "equipment_with_orders",
+            "orders_with_notification",
+            "failure_notification_ids_seen",
+            "file_ids_seen",
+            "assets_with_files",
+        ),
+        InternedIdSet,
+    ),
+    "parent_of": InternedIdMap,
+    "asset_type_map": InternedIdMap,
+    "equipment_to_asset": InternedIdMap,
+    "children_count_map": InternedCountMap,
+    "assets_with_equipment": InternedIdListMap,
+    "equipment_list": EquipmentColumns,
+}
+
+
+class ColumnarAccumulator(CombinedAccumulator):
+    """
+    CombinedAccumulator whose ID-keyed structures share one interner and are stored as columns.
+
+    Any value assigned to a columnar field (by ``from_dict``, a processor or
+    ``merge_from``) is converted on assignment, so the accumulator never falls
+    back to per-ID Python objects.
+    """
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+        object.__setattr__(self, "interner", IdInterner())
+        for name in _COLUMNS:
+            setattr(self, name, getattr(self, name))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        column_type = _COLUMNS.get(name)
+        interner = self.__dict__.get("interner")
+        if (
+            column_type is not None
+            and interner is not None
+            and not (isinstance(value, column_type) and value._interner is interner)
+        ):
+            value = column_type(interner, value)
+        object.__setattr__(self, name, value)
+
+    @property
+    def interned_ids(self) -> int:
+        """Number of distinct strings held by the interner."""
+        return len(self.interner)
+
+    def to_dict(self) -> dict:
+        """Serialize to the same dict layout as CombinedAccumulator."""
+        data = super().to_dict()
+        for name, column_type in _COLUMNS.items():
+            if issubclass(column_type, (_ArrayMap, InternedIdListMap)):
+                data[name] = getattr(self, name).to_dict()
+        return data
+
+
+# ----------------------------------------------------
+# BACKEND SELECTION
+# ----------------------------------------------------
+
+ACCUMULATOR_BACKENDS: dict[str, type[CombinedAccumulator]] = {
+    ACCUMULATOR_BACKEND_DICT: CombinedAccumulator,
+    ACCUMULATOR_BACKEND_COLUMNAR: ColumnarAccumulator,
+}
+
+
+def get_accumulator_class(backend: str | None) -> type[CombinedAccumulator]:
+    """
+    Resolve the ``accumulator_backend`` config value to an accumulator class.
+
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    try:
+        return ACCUMULATOR_BACKENDS[backend or ACCUMULATOR_BACKEND_DICT]
+    except KeyError:
+        raise ValueError(
+            f"Unknown accumulator_backend '{backend}' (expected one of {sorted(ACCUMULATOR_BACKENDS)})"
+        ) from None
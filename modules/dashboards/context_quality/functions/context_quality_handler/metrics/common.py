@@ -17,9 +17,11 @@ TIMEOUT_SECONDS = 600
 # File storage config
 METRICS_FILE_EXTERNAL_ID = "contextualization_quality_metrics"
 METRICS_FILE_NAME = "contextualization_quality_metrics.json"
+INCREMENTAL_STATE_FILE_EXTERNAL_ID = "contextualization_quality_incremental_state"  # View state + sync cursors
 
 # Batch processing config
 BATCH_FILE_PREFIX = "cq_batch_"  # Batch files: cq_batch_0.json, cq_batch_1.json, etc.
+PARTITION_PLAN_FILE_EXTERNAL_ID = f"{BATCH_FILE_PREFIX}plan"  # Shared externalId ranges for a batch run
 
 
 # ----------------------------------------------------
@@ -74,12 +76,17 @@ DEFAULT_CONFIG = {
     "enable_file_annotation_metrics": True,  # Enable CDM file annotation metrics
     "enable_3d_metrics": True,  # Enable 3D model contextualization metrics
     "enable_file_metrics": True,  # Enable file contextualization metrics
+    # Concurrency
+    "max_concurrent_collectors": 4,  # Views read in parallel (1 = sequential phases)
+    # Memory
+    "accumulator_backend": "dict",  # "dict" (plain sets/dicts) or "columnar" (interned IDs, array columns)
     # TS specific
     "freshness_days": 30,
     "enable_historical_gaps": True,  # Enabled: analyzes time series for data gaps
-    "gap_sample_rate": 20,  # Analyze every Nth batch (balances accuracy vs performance)
+    "gap_sample_rate": 1,  # Analyze every Nth batch (1 = every time series)
     "gap_threshold_days": 7,  # Gaps longer than 7 days are considered significant
     "gap_lookback": "1000d-ago",  # Look back ~2.7 years for historical data
+    "gap_granularity": "1d",  # Count-aggregate bucket size used to detect gaps
     # File storage
     "file_external_id": METRICS_FILE_EXTERNAL_ID,
     "file_name": METRICS_FILE_NAME,
@@ -88,7 +95,17 @@ DEFAULT_CONFIG = {
     "batch_index": 0,     # Current batch index (0, 1, 2, ...)
     "batch_size": 200000, # Instances per batch
     "total_batches": None,  # Total number of batches (optional, for progress tracking)
+    "batch_file_format": "binary",  # "binary" (compressed, interned IDs) or "json"; both are read back
+    "partition_mode": "offset",  # "offset" (skip earlier batches) or "external_id" (disjoint ranges)
+    "plan_partitions": False,  # True to only build the externalId partition plan
+    "plan_time_budget_seconds": 480,  # Planning call saves its progress and stops after this long
     "is_aggregation": False,  # True for final aggregation run
+    # Incremental mode (normal mode only): sync changed instances since the last run
+    "incremental": False,  # Apply DMS sync deltas to the saved view state instead of rescanning views
+    "incremental_full_rebuild": False,  # Discard the saved view state and cursors, re-sync everything
+    "sync_page_size": 1000,  # Instances per sync request
+    "sync_time_budget_seconds": 420,  # Syncing saves its progress and stops after this long
+    "gap_refresh_days": 7,  # Re-fetch gap statistics of unchanged time series after this many days
 }
 
 # Equipment-Asset type mappings for consistency check
@@ -277,6 +294,7 @@ class CombinedAccumulator:
     # For TS metrics
     critical_assets_total: int = 0
     critical_assets_with_ts: int = 0
+    critical_asset_ids: set[str] = field(default_factory=set)  # Lets TS coverage be reconciled after merges
     # For hierarchy metrics
     parent_of: dict[str, str | None] = field(default_factory=dict)
     children_count_map: dict[str, int] = field(default_factory=dict)
@@ -444,6 +462,7 @@ class CombinedAccumulator:
             "asset_duplicate_ids": self.asset_duplicate_ids,
             "critical_assets_total": self.critical_assets_total,
             "critical_assets_with_ts": self.critical_assets_with_ts,
+            "critical_asset_ids": list(self.critical_asset_ids),
             "parent_of": self.parent_of,
             "children_count_map": self.children_count_map,
             "asset_type_map": self.asset_type_map,
@@ -566,6 +585,7 @@ class CombinedAccumulator:
         acc.asset_duplicate_ids = data.get("asset_duplicate_ids", [])
         acc.critical_assets_total = data.get("critical_assets_total", 0)
         acc.critical_assets_with_ts = data.get("critical_assets_with_ts", 0)
+        acc.critical_asset_ids = set(data.get("critical_asset_ids", []))
         acc.parent_of = data.get("parent_of", {})
         acc.children_count_map = data.get("children_count_map", {})
         acc.asset_type_map = data.get("asset_type_map", {})
@@ -677,6 +697,10 @@ class CombinedAccumulator:
         self.asset_duplicate_ids.extend(other.asset_duplicate_ids)
         self.critical_assets_total += other.critical_assets_total
         self.critical_assets_with_ts += other.critical_assets_with_ts
+        self.critical_asset_ids.update(other.critical_asset_ids)
+        if self.critical_asset_ids:
+            # TS and assets may come from different shards/batches: recount from IDs
+            self.critical_assets_with_ts = len(self.critical_asset_ids & self.assets_with_ts)
         self.parent_of.update(other.parent_of)
         # Merge children_count_map (sum counts for same asset)
         for asset_id, count in other.children_count_map.items():
@@ -691,7 +715,7 @@ class CombinedAccumulator:
             if asset_id in self.assets_with_equipment:
                 self.assets_with_equipment[asset_id].extend(eq_list)
             else:
-                self.assets_with_equipment[asset_id] = eq_list
+                self.assets_with_equipment[asset_id] = list(eq_list)
         self.total_equipment_instances += other.total_equipment_instances
         self.equipment_ids_seen.update(other.equipment_ids_seen)
         self.equipment_duplicate_ids.extend(other.equipment_duplicate_ids)
@@ -0,0 +1,78 @@
+"""
+Single-pass fan-out of view chunks to several accumulators.
+
+Several metric families read the same view (e.g. hierarchy/equipment data and
+3D links both come from the asset view). Instead of listing the view once per
+family, a ViewScan streams each chunk once and hands it to every registered
+processor. Adding a metric that needs the same view then costs no extra API calls.
+"""
+
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from cognite.client.data_classes.data_modeling import ViewId
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ScanConsumer:
+    """One processor registered on a ViewScan."""
+    name: str
+    process: Callable[[Any, ViewId, Any], None]
+    accumulator: Any
+    limit_reached: Callable[[Any], bool] | None = None
+    optional: bool = False
+    done: bool = False
+
+
+class ViewScan:
+    """
+    Streams chunks of one view to every registered (processor, accumulator) pair.
+
+    Consumers stop receiving chunks once their ``limit_reached`` check is true.
+    Failures in optional consumers are logged and only disable that consumer,
+    so e.g. a 3D processing error cannot break hierarchy metrics.
+    """
+
+    def __init__(self, view: ViewId) -> None:
+        self.view = view
+        self.consumers: list[ScanConsumer] = []
+
+    def register(
+        self,
+        name: str,
+        process: Callable[[Any, ViewId, Any], None],
+        accumulator: Any,
+        *,
+        limit_reached: Callable[[Any], bool] | None = None,
+        optional: bool = False,
+    ) -> None:
+        """Register a batch processor and the accumulator it writes into."""
+        self.consumers.append(
+            ScanConsumer(name, process, accumulator, limit_reached, optional)
+        )
+
+    @property
+    def done(self) -> bool:
+        """True when no consumer needs more chunks."""
+        return all(c.done for c in self.consumers)
+
+    def feed(self, chunk) -> None:
+        """Hand one chunk to every active consumer."""
+        for consumer in self.consumers:
+            if consumer.done:
+                continue
+            try:
+                consumer.process(chunk, self.view, consumer.accumulator)
+            except Exception as e:
+                if not consumer.optional:
+                    raise
+                logger.warning(f"[{consumer.name}] Could not process chunk, disabling: {e}")
+                consumer.done = True
+                continue
+            if consumer.limit_reached and consumer.limit_reached(consumer.accumulator):
+                logger.info(f"🛑 [{consumer.name}] Reached limit")
+                consumer.done = True
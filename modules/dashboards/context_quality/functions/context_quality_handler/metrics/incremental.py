@@ -0,0 +1,377 @@
+"""
+Incremental (delta) collection using DMS sync cursors.
+
+The accumulators only hold aggregates (counters, sums, ID sets), so an
+updated or deleted instance cannot be subtracted from them. Incremental mode
+therefore keeps, per view, the ``instances.sync`` cursor together with:
+
+- a compact row per instance, keyed by (space, externalId), holding only the
+  properties the collectors read (``VIEW_PROPERTIES``)
+- the view's collector state (its accumulator shard), which stays valid
+  until a row of the view changes
+- for time series, the historical gap statistics of each series
+
+Each run:
+
+1. Syncs every view from its cursor and applies created/updated instances
+   (upsert) and deleted instances (remove) to the rows. A changed row drops
+   the view's collector state.
+2. Reuses the collector state of unchanged views and rebuilds the others from
+   their rows, so metrics are computed exactly as in a full run. Gap
+   statistics are only fetched for series that changed since they were
+   cached (or whose cached result is older than ``gap_refresh_days``).
+3. Saves the state for the next run.
+
+Syncing stops at a deadline and the state is saved after every view, so a
+first backfill that does not fit in one call continues in the next one.
+"""
+
+import logging
+import time
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+
+from cognite.client import CogniteClient
+from cognite.client import data_modeling as dm
+from cognite.client.data_classes.data_modeling import ViewId
+from cognite.client.data_classes.data_modeling.query import (
+    EdgeResultSetExpression,
+    NodeResultSetExpression,
+    Query,
+    Select,
+    SourceSelector,
+)
+from cognite.client.exceptions import CogniteAPIError
+
+logger = logging.getLogger(__name__)
+
+# ----------------------------------------------------
+# CONSTANTS
+# ----------------------------------------------------
+INCREMENTAL_STATE_VERSION = 2
+SYNC_PAGE_SIZE = 1000  # DMS max page size for sync
+SYNC_RESULT_KEY = "instances"
+SYNC_CURSOR_MAX_AGE_SECONDS = 3 * 24 * 3600  # DMS keeps sync cursors for three days
+
+# Properties each collector reads, per view key. Only these are synced and kept.
+VIEW_PROPERTIES: dict[str, tuple[str, ...]] = {
+    "ts": ("assets", "unit", "sourceUnit"),
+    "assets": ("parent", "type", "assetClass", "criticality", "object3D", "technicalObjectAbcIndicator"),
+    "equipment": ("equipmentType", "asset", "serialNumber", "manufacturer", "criticality"),
+    "notifications": ("asset", "equipment", "maintenanceOrder", "status", "statusDescription"),
+    "orders": ("assets", "mainAsset", "equipment", "status", "statusDescription", "actualEndTime"),
+    "failure_notifications": ("failureMode", "failureMechanism", "failureCause"),
+    "annotations": ("status", "confidence", "startNodePageNumber"),
+    "3d_objects": (
+        "asset", "xMin", "xMax", "yMin", "yMax", "zMin", "zMax", "cadNodes", "images360", "pointCloudVolumes",
+    ),
+    "files": ("assets", "category", "mimeType", "directory", "isUploaded", "name", "description", "sourceId"),
+}
+
+_EXPIRED_CURSOR_MARKERS = ("expired", "too old", "no longer valid")
+
+
+class SyncCursorExpiredError(Exception):
+    """The saved sync cursor is no longer accepted by DMS; the view must be re-synced."""
+
+
+def view_signature(view: ViewId, properties: tuple[str, ...] | None = None) -> str:
+    """Stable string identifying a view and its synced properties (a change invalidates the state)."""
+    signature = f"{view.space}:{view.external_id}/{view.version}"
+    return f"{signature}[{','.join(properties)}]" if properties else signature
+
+
+def is_cursor_expired_error(error: CogniteAPIError) -> bool:
+    """True if DMS rejected a sync request because its cursor expired (not for other bad requests)."""
+    message = str(error.message or "").lower()
+    return error.code == 400 and "cursor" in message and any(m in message for m in _EXPIRED_CURSOR_MARKERS)
+
+
+# ----------------------------------------------------
+# STATE
+# ----------------------------------------------------
+
+class InstanceRow:
+    """Read-only stand-in for an SDK node/edge, with the attributes the collectors read."""
+    __slots__ = ("end_node", "external_id", "last_updated_time", "properties", "space", "start_node")
+
+    def __init__(self, row: dict, view: ViewId) -> None:
+        self.space = row["space"]
+        self.external_id = row["externalId"]
+        self.last_updated_time = row.get("lastUpdatedTime")
+        self.properties = {view: row.get("properties") or {}}
+        self.start_node = row.get("startNode")
+        self.end_node = row.get("endNode")
+
+
+def _row(instance, view: ViewId, instance_type: str) -> dict:
+    """Compact row for one synced instance: identity, last update and the view's properties."""
+    dump = instance.dump()
+    row = {
+        "space": dump["space"],
+        "externalId": dump["externalId"],
+        "lastUpdatedTime": dump.get("lastUpdatedTime"),
+        "properties": (dump.get("properties") or {}).get(view.space, {}).get(f"{view.external_id}/{view.version}", {}),
+    }
+    if instance_type == "edge":
+        row["startNode"] = dump.get("startNode")
+        row["endNode"] = dump.get("endNode")
+    return row
+
+
+@dataclass
+class ViewState:
+    """
+    Sync cursor, instance rows and collector state of one view.
+
+    ``complete`` is set once the view has been synced to the end from scratch;
+    until then the rows are a partial backfill. ``shard`` is the collector's
+    saved accumulator state and is dropped whenever a row changes. ``gaps``
+    holds per-series gap statistics (time series only), each tagged with the
+    series' ``lastUpdatedTime`` so an updated series is analyzed again.
+    """
+    signature: str
+    instance_type: str = "node"
+    cursor: str | None = None
+    cursor_at: float | None = None
+    complete: bool = False
+    rows: dict[tuple[str, str], dict] = field(default_factory=dict)
+    shard: dict | None = None
+    gaps: dict[tuple[str, str], list] = field(default_factory=dict)
+
+    def cursor_expired(self, now: float) -> bool:
+        """True if the saved cursor is older than DMS keeps sync cursors."""
+        return self.cursor is not None and (self.cursor_at is None or now - self.cursor_at > SYNC_CURSOR_MAX_AGE_SECONDS)
+
+    def restart(self) -> None:
+        """Forget cursor and rows so the view is synced from scratch (gap statistics are kept)."""
+        self.cursor = self.cursor_at = None
+        self.complete = False
+        self.rows = {}
+        self.shard = None
+
+    def apply(self, instances, view: ViewId) -> tuple[int, int]:
+        """
+        Apply one sync page to the rows.
+
+        Returns:
+            (upserted, deleted) instance counts
+        """
+        upserted = deleted = 0
+        for instance in instances:
+            key = (instance.space, instance.external_id)
+            if getattr(instance, "deleted_time", None):
+                self.gaps.pop(key, None)
+                if self.rows.pop(key, None) is not None:
+                    deleted += 1
+                continue
+            self.rows[key] = _row(instance, view, self.instance_type)
+            upserted += 1
+        if upserted or deleted:
+            self.shard = None
+        return upserted, deleted
+
+    def chunks(self, view: ViewId, chunk_size: int) -> Iterator[list[InstanceRow]]:
+        """Replay the rows as instance stand-ins, ``chunk_size`` at a time."""
+        rows = list(self.rows.values())
+        for start in range(0, len(rows), chunk_size):
+            yield [InstanceRow(row, view) for row in rows[start:start + chunk_size]]
+
+
+@dataclass
+class IncrementalState:
+    """Per-view sync state persisted between incremental runs."""
+    views: dict[str, ViewState] = field(default_factory=dict)
+    synced_at: str | None = None
+
+    def view_state_for(self, key: str, view: ViewId, instance_type: str) -> ViewState:
+        """Get the state for a view, starting over if the view configuration changed."""
+        signature = view_signature(view, VIEW_PROPERTIES.get(key))
+        state = self.views.get(key)
+        if state is None or state.signature != signature or state.instance_type != instance_type:
+            if state is not None:
+                logger.info(f"[Incremental] {key}: view changed ({state.signature} -> {signature}), re-syncing")
+            state = self.views[key] = ViewState(signature, instance_type)
+        return state
+
+    def header(self) -> dict:
+        """Cursors and view signatures (everything except rows and collector state)."""
+        return {
+            "version": INCREMENTAL_STATE_VERSION,
+            "synced_at": self.synced_at,
+            "views": {
+                key: {
+                    "signature": s.signature,
+                    "instance_type": s.instance_type,
+                    "cursor": s.cursor,
+                    "cursor_at": s.cursor_at,
+                    "complete": s.complete,
+                }
+                for key, s in self.views.items()
+            },
+        }
+
+    def sections(self) -> dict[str, dict]:
+        """Rows, collector state and gap statistics per view key."""
+        return {
+            key: {
+                "rows": list(s.rows.values()),
+                "shard": s.shard,
+                "gaps": [[*k, *v] for k, v in s.gaps.items()],
+            }
+            for key, s in self.views.items()
+        }
+
+    @classmethod
+    def from_parts(cls, header: dict, sections: dict[str, dict]) -> "IncrementalState":
+        """Rebuild the state from ``header()`` and ``sections()`` output."""
+        state = cls(synced_at=header.get("synced_at"))
+        for key, meta in (header.get("views") or {}).items():
+            section = sections.get(key) or {}
+            state.views[key] = ViewState(
+                meta["signature"],
+                meta.get("instance_type", "node"),
+                cursor=meta.get("cursor"),
+                cursor_at=meta.get("cursor_at"),
+                complete=meta.get("complete", False),
+                rows={(row["space"], row["externalId"]): row for row in section.get("rows") or []},
+                shard=section.get("shard"),
+                gaps={(g[0], g[1]): list(g[2:]) for g in section.get("gaps") or []},
+            )
+        return state
+
+
+# ----------------------------------------------------
+# SYNC
+# ----------------------------------------------------
+
+def build_sync_query(
+    view: ViewId,
+    instance_type: str = "node",
+    cursor: str | None = None,
+    page_size: int = SYNC_PAGE_SIZE,
+    properties: tuple[str, ...] | None = None,
+) -> Query:
+    """Sync query for all instances with data in ``view``, selecting ``properties`` (default: all)."""
+    expression_cls = EdgeResultSetExpression if instance_type == "edge" else NodeResultSetExpression
+    return Query(
+        with_={SYNC_RESULT_KEY: expression_cls(filter=dm.filters.HasData(views=[view]), limit=page_size)},
+        select={SYNC_RESULT_KEY: Select([SourceSelector(view, list(properties or ["*"]))])},
+        cursors={SYNC_RESULT_KEY: cursor},
+    )
+
+
+def sync_view(
+    client: CogniteClient,
+    view: ViewId,
+    view_state: ViewState,
+    page_size: int = SYNC_PAGE_SIZE,
+    properties: tuple[str, ...] | None = None,
+    deadline: float | None = None,
+) -> tuple[int, int, bool]:
+    """
+    Apply all changes since the view's cursor and advance the cursor.
+
+    Pages are requested until DMS returns an empty page or ``deadline``
+    (``time.monotonic()`` value) passes. The cursor always matches the rows, so
+    a sync stopped at the deadline continues from it. The cursor is only
+    advanced in memory; the caller persists it together with the rows.
+
+    Returns:
+        (upserted, deleted, caught up) where caught up is False if the deadline stopped the sync
+
+    Raises:
+        SyncCursorExpiredError: If DMS rejects the saved cursor as expired
+    """
+    query = build_sync_query(view, view_state.instance_type, view_state.cursor, page_size, properties)
+    upserted = deleted = 0
+    while True:
+        if deadline is not None and time.monotonic() >= deadline:
+            return upserted, deleted, False
+        try:
+            result = client.data_modeling.instances.sync(query)
+        except CogniteAPIError as e:
+            if view_state.cursor and is_cursor_expired_error(e):
+                raise SyncCursorExpiredError(e.message) from e
+            raise
+        page = result.get(SYNC_RESULT_KEY) or []
+        page_upserted, page_deleted = view_state.apply(page, view)
+        upserted += page_upserted
+        deleted += page_deleted
+        view_state.cursor = result.cursors.get(SYNC_RESULT_KEY, view_state.cursor)
+        view_state.cursor_at = time.time()
+        query.cursors = {SYNC_RESULT_KEY: view_state.cursor}
+        if not page:
+            if not view_state.complete:
+                # Backfill finished: drop gap statistics of series that no longer exist
+                view_state.complete = True
+                view_state.gaps = {k: v for k, v in view_state.gaps.items() if k in view_state.rows}
+            return upserted, deleted, True
+
+
+def sync_views(
+    client: CogniteClient,
+    state: IncrementalState,
+    views: dict[str, tuple[ViewId, str]],
+    page_size: int = SYNC_PAGE_SIZE,
+    deadline: float | None = None,
+    on_progress: Callable[[IncrementalState], None] | None = None,
+) -> dict[str, dict]:
+    """
+    Sync every view into the state, re-syncing from scratch when a cursor has expired.
+
+    Views not in ``views`` (e.g. disabled since the last run) are dropped from the state.
+
+    Args:
+        client: CogniteClient instance
+        state: State to update in place
+        views: Mapping of view key -> (view ID, instance type)
+        page_size: Instances per sync page
+        deadline: ``time.monotonic()`` value after which syncing stops
+        on_progress: Called with the state after each view (and when the deadline stops a view)
+
+    Returns:
+        Per view: upserted, deleted and total instance counts, whether it was a
+        full sync and whether it is caught up (views not reached before the
+        deadline are reported as not caught up)
+    """
+    for key in set(state.views) - set(views):
+        del state.views[key]
+
+    changes: dict[str, dict] = {}
+    stopped = False
+    for key, (view, instance_type) in views.items():
+        view_state = state.view_state_for(key, view, instance_type)
+        if stopped:
+            changes[key] = {"upserted": 0, "deleted": 0, "total": len(view_state.rows),
+                            "full_sync": not view_state.complete, "caught_up": False}
+            continue
+        if view_state.cursor_expired(time.time()):
+            logger.warning(f"[Incremental] {key}: sync cursor is older than DMS keeps it, re-syncing view")
+            view_state.restart()
+        full_sync = not view_state.complete
+        properties = VIEW_PROPERTIES.get(key)
+        try:
+            upserted, deleted, caught_up = sync_view(client, view, view_state, page_size, properties, deadline)
+        except SyncCursorExpiredError as e:
+            logger.warning(f"[Incremental] {key}: sync cursor expired, re-syncing view ({e})")
+            view_state.restart()
+            full_sync = True
+            upserted, deleted, caught_up = sync_view(client, view, view_state, page_size, properties, deadline)
+        changes[key] = {
+            "upserted": upserted,
+            "deleted": deleted,
+            "total": len(view_state.rows),
+            "full_sync": full_sync,
+            "caught_up": caught_up,
+        }
+        logger.info(f"[Incremental] {key}: +{upserted:,} / -{deleted:,} "
+                    f"({len(view_state.rows):,} instances{', full sync' if full_sync else ''}"
+                    f"{'' if caught_up else ', continuing in the next call'})")
+        state.synced_at = datetime.now(UTC).isoformat()
+        if on_progress is not None:
+            on_progress(state)
+        stopped = not caught_up
+
+    return changes
@@ -0,0 +1,261 @@
+"""
+Partition planning for batch collection mode.
+
+Instead of paging through every instance from the start and skipping
+``batch_index * batch_size`` of them, the planner splits each view into
+disjoint externalId ranges up front:
+
+    batch 0 -> [None, b1)   batch 1 -> [b1, b2)   ...   batch N -> [bN, None)
+
+Each batch call then reads only its own range with a server-side ``Range``
+filter, so the total read cost is linear in the number of instances and
+batches can run as concurrent function calls.
+
+Instances sharing an externalId (across spaces) always land in the same
+range, so duplicate detection stays correct inside a single batch.
+
+Planning is resumable: the scan position of an unfinished view is kept in
+the plan, so a planning call that runs out of time saves its progress and
+the next planning call continues where it stopped.
+"""
+
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+
+from cognite.client import CogniteClient
+from cognite.client import data_modeling as dm
+from cognite.client.data_classes.data_modeling import ViewId
+
+logger = logging.getLogger(__name__)
+
+# ----------------------------------------------------
+# CONSTANTS
+# ----------------------------------------------------
+PARTITION_PLAN_VERSION = 2
+PARTITION_MODE_OFFSET = "offset"
+PARTITION_MODE_EXTERNAL_ID = "external_id"
+PLAN_PAGE_SIZE = 1000  # DMS max page size for list
+
+
+# ----------------------------------------------------
+# PARTITION PLAN
+# ----------------------------------------------------
+
+@dataclass
+class PartitionPlan:
+    """
+    Disjoint externalId ranges per view, shared by all batch calls of a run.
+
+    ``boundaries[view_key]`` holds the sorted split points; batch ``k`` owns
+    ``[boundaries[k-1], boundaries[k])`` with open ends for the first and last batch.
+    ``views`` lists the view keys the plan was built for; ``scan_positions`` holds
+    the last scanned externalId of views whose scan is not finished yet.
+    """
+    batch_size: int
+    views: list[str] = field(default_factory=list)
+    boundaries: dict[str, list[str]] = field(default_factory=dict)
+    instance_counts: dict[str, int] = field(default_factory=dict)
+    scan_positions: dict[str, str] = field(default_factory=dict)
+    created_at: str = field(default_factory=lambda: datetime.now(UTC).isoformat())
+
+    @property
+    def pending_views(self) -> list[str]:
+        """View keys that are not fully scanned yet, in planning order."""
+        return [key for key in self.views if key not in self.boundaries or key in self.scan_positions]
+
+    @property
+    def is_complete(self) -> bool:
+        """True once every view of the plan has been scanned."""
+        return not self.pending_views
+
+    def mismatch(self, batch_size: int, view_keys: list[str]) -> str | None:
+        """
+        Describe why the plan cannot be used for a run, or None if it can.
+
+        A plan is only valid for the batch size and the set of views it was built for.
+        """
+        if self.batch_size != batch_size:
+            return f"plan was built for batch_size {self.batch_size:,}, run uses {batch_size:,}"
+        if sorted(self.views) != sorted(view_keys):
+            return f"plan was built for views {sorted(self.views)}, run uses {sorted(view_keys)}"
+        return None
+
+    @property
+    def total_batches(self) -> int:
+        """Number of batch calls needed to cover every view."""
+        if not self.boundaries:
+            return 1
+        return max(len(b) for b in self.boundaries.values()) + 1
+
+    def range_for(self, view_key: str, batch_index: int) -> tuple[str | None, str | None] | None:
+        """
+        Get the (lower inclusive, upper exclusive) externalId range for a batch.
+
+        Returns None when the view has fewer ranges than ``batch_index``,
+        meaning this batch has nothing to read for that view.
+        """
+        bounds = self.boundaries.get(view_key, [])
+        if batch_index > len(bounds):
+            return None
+        lower = bounds[batch_index - 1] if batch_index > 0 else None
+        upper = bounds[batch_index] if batch_index < len(bounds) else None
+        return lower, upper
+
+    def to_dict(self) -> dict:
+        """Serialize for batch storage."""
+        return {
+            "version": PARTITION_PLAN_VERSION,
+            "batch_size": self.batch_size,
+            "views": self.views,
+            "boundaries": self.boundaries,
+            "instance_counts": self.instance_counts,
+            "scan_positions": self.scan_positions,
+            "created_at": self.created_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PartitionPlan":
+        """Deserialize from batch storage."""
+        boundaries = {k: list(v) for k, v in (data.get("boundaries") or {}).items()}
+        return cls(
+            batch_size=data.get("batch_size", 0),
+            # Version 1 plans were always complete and list no views
+            views=list(data.get("views") or boundaries),
+            boundaries=boundaries,
+            instance_counts=dict(data.get("instance_counts") or {}),
+            scan_positions=dict(data.get("scan_positions") or {}),
+            created_at=data.get("created_at", ""),
+        )
+
+
+# ----------------------------------------------------
+# PLANNING
+# ----------------------------------------------------
+
+def build_range_filter(
+    instance_type: str,
+    lower: str | None,
+    upper: str | None,
+) -> dm.filters.Filter | None:
+    """Build the externalId range filter for one partition (None = unbounded view)."""
+    if lower is None and upper is None:
+        return None
+    return dm.filters.Range(
+        [instance_type, "externalId"],
+        gte=lower,
+        lt=upper,
+    )
+
+
+def compute_partition_boundaries(
+    client: CogniteClient,
+    view: ViewId,
+    batch_size: int,
+    instance_type: str = "node",
+    page_size: int = PLAN_PAGE_SIZE,
+    start_after: str | None = None,
+    scanned: int = 0,
+    deadline: float | None = None,
+) -> tuple[list[str], int, str | None]:
+    """
+    Scan a view's externalIds in sorted order and pick a split point every ``batch_size`` instances.
+
+    Only identifiers are read (no properties), using an externalId keyset cursor.
+    A scan stopped at ``deadline`` (``time.monotonic()`` value) is resumed by passing
+    the returned position as ``start_after`` together with the ``scanned`` count.
+
+    Returns:
+        (sorted boundary externalIds, number of instances scanned, scan position) where
+        the position is None once the view is fully scanned, else the last scanned
+        externalId ("" if the deadline passed before the first page)
+    """
+    has_data = dm.filters.HasData(views=[view])
+    sort = dm.InstanceSort([instance_type, "externalId"], direction="ascending")
+    boundaries: list[str] = []
+    last_external_id = start_after or ""
+
+    while True:
+        if deadline is not None and time.monotonic() >= deadline:
+            return boundaries, scanned, last_external_id
+        page_filter = has_data
+        if last_external_id:
+            page_filter = dm.filters.And(
+                has_data,
+                dm.filters.Range([instance_type, "externalId"], gt=last_external_id),
+            )
+        page = client.data_modeling.instances.list(
+            instance_type=instance_type,
+            filter=page_filter,
+            sort=sort,
+            limit=page_size,
+        )
+        if not page:
+            break
+
+        for instance in page:
+            if scanned and scanned % batch_size == 0:
+                boundaries.append(instance.external_id)
+            scanned += 1
+        last_external_id = page[-1].external_id
+
+        if len(page) < page_size:
+            break
+
+    return boundaries, scanned, None
+
+
+def plan_partitions(
+    client: CogniteClient,
+    views: dict[str, tuple[ViewId, str]],
+    batch_size: int,
+    plan: PartitionPlan | None = None,
+    deadline: float | None = None,
+    on_progress: Callable[[PartitionPlan], None] | None = None,
+) -> PartitionPlan:
+    """
+    Build (or continue) a partition plan for all views of a batch run.
+
+    Args:
+        client: CogniteClient instance
+        views: Mapping of view key -> (view ID, instance type)
+        batch_size: Instances per batch range
+        plan: Unfinished plan to continue (must match ``batch_size`` and ``views``)
+        deadline: ``time.monotonic()`` value after which planning stops; the
+            returned plan is then incomplete and can be passed back in
+        on_progress: Called with the plan after each view (or partial view) is scanned
+
+    Returns:
+        PartitionPlan covering every scanned view (views that fail to scan get a single range)
+    """
+    if plan is None:
+        plan = PartitionPlan(batch_size=batch_size, views=list(views))
+    for key in plan.pending_views:
+        view, instance_type = views[key]
+        try:
+            bounds, scanned, position = compute_partition_boundaries(
+                client, view, batch_size, instance_type,
+                start_after=plan.scan_positions.get(key),
+                scanned=plan.instance_counts.get(key, 0),
+                deadline=deadline,
+            )
+        except Exception as e:
+            logger.warning(f"[Plan] Could not partition {key} ({view.external_id}): {e}")
+            plan.boundaries[key], plan.instance_counts[key] = [], 0
+            plan.scan_positions.pop(key, None)
+        else:
+            plan.boundaries[key] = plan.boundaries.get(key, []) + bounds
+            plan.instance_counts[key] = scanned
+            if position is None:
+                plan.scan_positions.pop(key, None)
+                logger.info(f"[Plan] {key}: {scanned:,} instances -> {len(plan.boundaries[key]) + 1} ranges")
+            else:
+                plan.scan_positions[key] = position
+                logger.info(f"[Plan] {key}: stopped after {scanned:,} instances, continuing in the next call")
+        if on_progress is not None:
+            on_progress(plan)
+        if key in plan.scan_positions:
+            break
+    return plan
@@ -4,23 +4,48 @@ File storage utilities for metrics persistence.
 Supports both single-run mode and batch processing mode:
 - Single-run: save_metrics_to_file() saves final metrics
 - Batch mode: save_batch_file() saves intermediate accumulator data
-              load_batch_files() loads all batch files for aggregation
+              load_and_merge_all_batches() streams all batch files into one accumulator
               delete_batch_files() cleans up after aggregation
+- Batch files are written in the binary format from batch_format.py by
+              default; legacy JSON batch files are still read
+- Partitioned batches: save_partition_plan()/load_partition_plan() share the
+              externalId ranges every batch call reads
+- Incremental mode: save_incremental_state()/load_incremental_state() keep
+              per-view state and sync cursors between runs
 """
 
 import json
 import logging
 import os
 import tempfile
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 
 from cognite.client import CogniteClient
 
-from .common import BATCH_FILE_PREFIX, CombinedAccumulator
+from .batch_format import (
+    BATCH_FORMAT_BINARY,
+    BATCH_FORMAT_JSON,
+    BatchFileReader,
+    decode_batch,
+    encode_batch,
+    is_binary_batch,
+)
+from .common import (
+    BATCH_FILE_PREFIX,
+    INCREMENTAL_STATE_FILE_EXTERNAL_ID,
+    PARTITION_PLAN_FILE_EXTERNAL_ID,
+    CombinedAccumulator,
+)
 from .file_annotation import FileAnnotationAccumulator
+from .incremental import INCREMENTAL_STATE_VERSION, IncrementalState
 from .model_3d import Model3DAccumulator
+from .partitions import PartitionPlan
 
 logger = logging.getLogger(__name__)
 
+MAX_MISSING_BATCHES = 5  # Consecutive missing IDs that end index probing
+
 
 def save_metrics_to_file(
     client: CogniteClient,
@@ -71,6 +96,7 @@ def save_batch_file(
     *,
     model3d_accumulator: Model3DAccumulator | None = None,
     file_annotation_accumulator: FileAnnotationAccumulator | None = None,
+    file_format: str = BATCH_FORMAT_BINARY,
 ) -> None:
     """
     Save accumulator data to a batch file for later aggregation.
@@ -82,9 +108,13 @@ def save_batch_file(
         batch_metadata: Optional metadata about the batch
         model3d_accumulator: 3D metrics accumulator (same phases as quick run)
         file_annotation_accumulator: Diagram annotation accumulator (same phases as quick run)
+        file_format: "binary" (compressed, see batch_format.py) or "json"
     """
+    if file_format not in (BATCH_FORMAT_BINARY, BATCH_FORMAT_JSON):
+        raise ValueError(f"Unknown batch_file_format '{file_format}' (expected 'binary' or 'json')")
     file_external_id = get_batch_file_external_id(batch_index)
-    file_name = f"{file_external_id}.json"
+    binary = file_format == BATCH_FORMAT_BINARY
+    file_name = f"{file_external_id}.cqb" if binary else f"{file_external_id}.json"
     
     # Combine accumulator data with metadata
     batch_data = {
@@ -100,15 +130,20 @@ def save_batch_file(
     # Create temp file
     temp_path = os.path.join(tempfile.gettempdir(), file_name)
     
-    with open(temp_path, "w") as f:
-        json.dump(batch_data, f, indent=2, default=str)
+    if binary:
+        with open(temp_path, "wb") as f:
+            f.write(encode_batch(batch_data))
+    else:
+        with open(temp_path, "w") as f:
+            json.dump(batch_data, f, indent=2, default=str)
+    file_size = os.path.getsize(temp_path)
     
     # Upload with overwrite
     client.files.upload(
         path=temp_path,
         external_id=file_external_id,
         name=file_name,
-        mime_type="application/json",
+        mime_type="application/octet-stream" if binary else "application/json",
         overwrite=True
     )
     
@@ -119,46 +154,71 @@ def save_batch_file(
         # Metric collection is best-effort for optional storage checks.
         pass
     
-    logger.info(f"📁 Saved batch file: {file_external_id}")
+    logger.info(f"📁 Saved batch file: {file_external_id} ({file_format}, {file_size / 1e6:.1f} MB)")
+
+
+def _batch_index_of(file_external_id: str) -> int | None:
+    """Batch index encoded in a batch file external ID (None for e.g. the partition plan)."""
+    suffix = file_external_id[len(BATCH_FILE_PREFIX):]
+    return int(suffix) if file_external_id.startswith(BATCH_FILE_PREFIX) and suffix.isdigit() else None
+
+
+def _probe_batch_files(client: CogniteClient) -> list[str]:
+    """Check expected batch external IDs one by one until several in a row are missing."""
+    batch_files = []
+    missing_in_a_row = 0
+    i = 0
+    while missing_in_a_row < MAX_MISSING_BATCHES:
+        ext_id = get_batch_file_external_id(i)
+        try:
+            file_metadata = client.files.retrieve(external_id=ext_id)
+        except Exception:
+            file_metadata = None
+        if file_metadata:
+            batch_files.append(ext_id)
+            missing_in_a_row = 0
+        else:
+            # Tolerate a few gaps (e.g. a failed batch that will be retried)
+            missing_in_a_row += 1
+        i += 1
+    return batch_files
 
 
-def list_batch_files(client: CogniteClient, max_batches: int = 20) -> list[str]:
+def list_batch_files(client: CogniteClient) -> list[str]:
     """
-    List all batch files in CDF by checking for expected external IDs.
+    List all batch files in CDF.
     
-    This approach is more robust than listing all files and filtering,
-    as it directly checks for batch files by their expected external IDs.
+    Batch files are found with a server-side externalId prefix filter, so the
+    number of batches is not capped. If listing fails, expected external IDs
+    are probed by index until MAX_MISSING_BATCHES in a row are missing.
     
     Args:
         client: CogniteClient instance
-        max_batches: Maximum number of batches to check for (default 20)
     
     Returns:
         List of batch file external IDs that exist, sorted by batch index
     """
-    batch_files = []
-    
-    # Check for each expected batch file by external ID
-    for i in range(max_batches):
-        ext_id = get_batch_file_external_id(i)
-        try:
-            # Try to retrieve file metadata - if it exists, add to list
-            file_metadata = client.files.retrieve(external_id=ext_id)
-            if file_metadata:
-                batch_files.append(ext_id)
-                logger.info(f"Found batch file: {ext_id}")
-        except Exception:
-            # File doesn't exist - stop checking (batches are sequential)
-            # But continue checking a few more in case of gaps
-            continue
+    try:
+        files = client.files.list(external_id_prefix=BATCH_FILE_PREFIX, limit=None)
+        indexed = [
+            (index, f.external_id)
+            for f in files
+            if (index := _batch_index_of(f.external_id or "")) is not None
+        ]
+        batch_files = [ext_id for _, ext_id in sorted(indexed)]
+    except Exception as e:
+        logger.warning(f"Could not list batch files by prefix, probing by index: {e}")
+        batch_files = _probe_batch_files(client)
     
+    for ext_id in batch_files:
+        logger.info(f"Found batch file: {ext_id}")
     logger.info(f"Found {len(batch_files)} batch files")
     return batch_files
 
 
 def load_batch_file(client: CogniteClient, file_external_id: str) -> dict | None:
     """
-    Load a single batch file.
+    Load a single batch file (binary or legacy JSON format).
     
     Args:
         client: CogniteClient instance
@@ -169,77 +229,100 @@ def load_batch_file(client: CogniteClient, file_external_id: str) -> dict | None
     """
     try:
         file_bytes = client.files.download_bytes(external_id=file_external_id)
-        return json.loads(file_bytes.decode("utf-8"))
+        if not is_binary_batch(file_bytes):
+            logger.info(f"Reading legacy JSON batch file: {file_external_id}")
+        return decode_batch(file_bytes)
     except Exception as e:
         logger.error(f"Failed to load batch file {file_external_id}: {e}")
         return None
 
 
+def iter_batch_files(
+    client: CogniteClient,
+    batch_files: list[str],
+) -> Iterator[tuple[str, dict | None]]:
+    """
+    Yield (external ID, batch data) in order, downloading the next file in the background.
+    
+    While the caller merges batch k, batch k+1 is downloaded and decoded on a
+    single worker thread, so at most two batches are held at a time.
+    """
+    if not batch_files:
+        return
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="cq-batch-prefetch") as pool:
+        pending = pool.submit(load_batch_file, client, batch_files[0])
+        for i, file_ext_id in enumerate(batch_files):
+            batch_data = pending.result()
+            if i + 1 < len(batch_files):
+                pending = pool.submit(load_batch_file, client, batch_files[i + 1])
+            yield file_ext_id, batch_data
+            # Drop our reference so the caller's release frees the batch
+            batch_data = None
+
+
 def load_and_merge_all_batches(
     client: CogniteClient,
+    accumulator_cls: type[CombinedAccumulator] = CombinedAccumulator,
+    batch_files: list[str] | None = None,
 ) -> tuple[
     CombinedAccumulator | None,
     Model3DAccumulator,
     FileAnnotationAccumulator,
 ]:
     """
-    Load all batch files and merge into combined + 3D + annotation accumulators.
+    Stream all batch files into combined + 3D + annotation accumulators.
+    
+    Each batch is folded into the running accumulators and released before
+    the next one is merged, so memory stays around one batch plus the merged
+    result regardless of the number of batches.
+
+    Args:
+        client: CogniteClient instance
+        accumulator_cls: Accumulator backend to load batches into (e.g. ColumnarAccumulator)
+        batch_files: Batch file external IDs (default: list_batch_files)
 
     Returns:
         (merged CombinedAccumulator or None, merged Model3DAccumulator, merged FileAnnotationAccumulator)
     """
-    batch_files = list_batch_files(client)
+    if batch_files is None:
+        batch_files = list_batch_files(client)
     
     if not batch_files:
         logger.warning("No batch files found")
         return None, Model3DAccumulator(), FileAnnotationAccumulator()
     
-    logger.info(f"Found {len(batch_files)} batch files to merge")
+    logger.info(f"Streaming {len(batch_files)} batch files into the merged accumulator")
     
     merged_acc: CombinedAccumulator | None = None
-    merged_m3d: Model3DAccumulator | None = None
-    merged_ann: FileAnnotationAccumulator | None = None
+    merged_m3d = Model3DAccumulator()
+    merged_ann = FileAnnotationAccumulator()
     
-    for file_ext_id in batch_files:
-        logger.info(f"Loading batch file: {file_ext_id}")
-        batch_data = load_batch_file(client, file_ext_id)
-        
+    for file_ext_id, batch_data in iter_batch_files(client, batch_files):
         if not batch_data:
             logger.warning(f"Skipping empty/invalid batch file: {file_ext_id}")
             continue
         
-        acc_data = batch_data.get("accumulator", {})
-        batch_acc = CombinedAccumulator.from_dict(acc_data)
+        # Pop each part so its decoded dict is freed as soon as it is converted
+        batch_index = batch_data.get("batch_index", "?")
+        batch_acc = accumulator_cls.from_dict(batch_data.pop("accumulator", None) or {})
+        m3d_part = Model3DAccumulator.from_dict(batch_data.pop("model3d_accumulator", None) or {})
+        ann_part = FileAnnotationAccumulator.from_dict(batch_data.pop("file_annotation_accumulator", None) or {})
+        del batch_data
+        
+        logger.info(f"Merging batch {batch_index}: "
+                   f"assets={batch_acc.total_assets:,}, ts={batch_acc.total_ts:,}")
         
         if merged_acc is None:
             merged_acc = batch_acc
         else:
             merged_acc.merge_from(batch_acc)
-
-        m3d_part = Model3DAccumulator.from_dict(batch_data.get("model3d_accumulator") or {})
-        ann_part = FileAnnotationAccumulator.from_dict(
-            batch_data.get("file_annotation_accumulator") or {}
-        )
-        if merged_m3d is None:
-            merged_m3d = m3d_part
-        else:
-            merged_m3d.merge_from(m3d_part)
-        if merged_ann is None:
-            merged_ann = ann_part
-        else:
-            merged_ann.merge_from(ann_part)
-        
-        logger.info(f"Merged batch {batch_data.get('batch_index', '?')}: "
-                   f"assets={batch_acc.total_assets:,}, ts={batch_acc.total_ts:,}")
+        merged_m3d.merge_from(m3d_part)
+        merged_ann.merge_from(ann_part)
+        del batch_acc, m3d_part, ann_part
     
     if merged_acc is None:
         return None, Model3DAccumulator(), FileAnnotationAccumulator()
 
-    if merged_m3d is None:
-        merged_m3d = Model3DAccumulator()
-    if merged_ann is None:
-        merged_ann = FileAnnotationAccumulator()
-
     logger.info(f"✅ Merged all batches: "
                f"total_assets={merged_acc.total_assets:,}, "
                f"total_ts={merged_acc.total_ts:,}, "
@@ -248,15 +331,122 @@ def load_and_merge_all_batches(
     return merged_acc, merged_m3d, merged_ann
 
 
+def save_partition_plan(client: CogniteClient, plan: PartitionPlan) -> None:
+    """Save the partition plan so every batch call of the run reads the same ranges."""
+    file_name = f"{PARTITION_PLAN_FILE_EXTERNAL_ID}.json"
+    temp_path = os.path.join(tempfile.gettempdir(), file_name)
+    
+    with open(temp_path, "w") as f:
+        json.dump(plan.to_dict(), f)
+    
+    client.files.upload(
+        path=temp_path,
+        external_id=PARTITION_PLAN_FILE_EXTERNAL_ID,
+        name=file_name,
+        mime_type="application/json",
+        overwrite=True
+    )
+    
+    try:
+        os.remove(temp_path)
+    except Exception:
+        # Metric collection is best-effort for optional storage checks.
+        pass
+    
+    logger.info(f"📁 Saved partition plan: {plan.total_batches} batches")
+
+
+def load_partition_plan(client: CogniteClient) -> PartitionPlan | None:
+    """
+    Load the partition plan for the current batch run.
+    
+    Returns:
+        PartitionPlan or None if no plan has been saved
+    """
+    try:
+        file_bytes = client.files.download_bytes(external_id=PARTITION_PLAN_FILE_EXTERNAL_ID)
+    except Exception:
+        # No plan saved yet for this run.
+        return None
+    try:
+        return PartitionPlan.from_dict(json.loads(file_bytes.decode("utf-8")))
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable partition plan: {e}")
+        return None
+
+
+def save_incremental_state(client: CogniteClient, state: IncrementalState) -> None:
+    """
+    Save per-view state and sync cursors for the next incremental run.
+
+    Uses the binary batch-file format: cursors go in the header and each
+    view's rows, collector shard and gap statistics are its own compressed section.
+    """
+    file_name = f"{INCREMENTAL_STATE_FILE_EXTERNAL_ID}.cqb"
+    temp_path = os.path.join(tempfile.gettempdir(), file_name)
+    
+    with open(temp_path, "wb") as f:
+        f.write(encode_batch({"batch_metadata": state.header(), **state.sections()}))
+    file_size = os.path.getsize(temp_path)
+    
+    client.files.upload(
+        path=temp_path,
+        external_id=INCREMENTAL_STATE_FILE_EXTERNAL_ID,
+        name=file_name,
+        mime_type="application/octet-stream",
+        overwrite=True
+    )
+    
+    try:
+        os.remove(temp_path)
+    except Exception:
+        # Metric collection is best-effort for optional storage checks.
+        pass
+    
+    logger.info(f"📁 Saved incremental state: {len(state.views)} views ({file_size / 1e6:.1f} MB)")
+
+
+def load_incremental_state(client: CogniteClient) -> IncrementalState | None:
+    """
+    Load the incremental state saved by the previous run.
+    
+    Returns:
+        IncrementalState or None if there is no (readable) state
+    """
+    try:
+        file_bytes = client.files.download_bytes(external_id=INCREMENTAL_STATE_FILE_EXTERNAL_ID)
+    except Exception:
+        # No state saved yet: first incremental run.
+        return None
+    try:
+        reader = BatchFileReader(file_bytes)
+        header = reader.batch_metadata
+        if header.get("version") != INCREMENTAL_STATE_VERSION:
+            logger.warning(f"Ignoring incremental state with version {header.get('version')}")
+            return None
+        sections = {key: reader.get(key) for key in reader.keys()}  # noqa: SIM118 - reader is not a mapping
+        return IncrementalState.from_parts(header, sections)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable incremental state: {e}")
+        return None
+
+
 def delete_batch_files(client: CogniteClient) -> int:
     """
-    Delete all batch files after successful aggregation.
+    Delete all batch files (and the partition plan) after successful aggregation.
     
     Returns:
         Number of files deleted
     """
     batch_files = list_batch_files(client)
     
+    try:
+        if client.files.retrieve(external_id=PARTITION_PLAN_FILE_EXTERNAL_ID):
+            client.files.delete(external_id=PARTITION_PLAN_FILE_EXTERNAL_ID)
+            logger.info(f"🗑️ Deleted partition plan: {PARTITION_PLAN_FILE_EXTERNAL_ID}")
+    except Exception as e:
+        logger.warning(f"Failed to delete partition plan: {e}")
+    
     if not batch_files:
         return 0
     
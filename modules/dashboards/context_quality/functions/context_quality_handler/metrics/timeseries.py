@@ -2,6 +2,11 @@
 Time Series processing and metrics computation.
 """
 
+import time
+from collections.abc import Iterator
+from dataclasses import astuple, dataclass
+from itertools import pairwise
+
 from cognite.client import CogniteClient
 from cognite.client.data_classes.data_modeling import NodeId, ViewId
 
@@ -12,6 +17,13 @@ from .common import (
     normalize_timestamp,
 )
 
+try:
+    import numpy as np
+except ImportError:  # Optional: gap detection falls back to pure Python without numpy
+    np = None
+
+MS_PER_DAY = 24 * 3600 * 1000
+
 
 def process_timeseries_batch(
     ts_batch,
@@ -111,21 +123,160 @@ def process_timeseries_batch(
                 acc.lag_count += 1
 
 
+# ----------------------------------------------------
+# HISTORICAL GAP ANALYSIS
+# ----------------------------------------------------
+
+@dataclass
+class GapStats:
+    """Gap totals over a set of time series (only series with at least two data buckets count)."""
+    series_analyzed: int = 0
+    total_span_ms: int = 0
+    total_gap_ms: int = 0
+    gap_count: int = 0
+    longest_gap_ms: int = 0
+
+
+def detect_gaps(timestamps, offsets, gap_threshold_ms: int) -> GapStats:
+    """
+    Find gaps across many time series at once.
+
+    The series are passed as one flat, per-series sorted timestamp column
+    with ``offsets`` marking where each series starts (``offsets[-1]`` is
+    the total length), so no per-series Python loop is needed with numpy.
+
+    Args:
+        timestamps: Timestamps (ms) of all series, concatenated
+        offsets: Start index of each series in ``timestamps``, plus the end
+        gap_threshold_ms: Only gaps longer than this count
+
+    Returns:
+        GapStats summed over all series
+    """
+    if np is None:
+        return _detect_gaps_python(timestamps, offsets, gap_threshold_ms)
+    
+    ts = np.asarray(timestamps, dtype=np.int64)
+    off = np.asarray(offsets, dtype=np.int64)
+    if len(ts) < 2:
+        return GapStats()
+    
+    starts, ends = off[:-1], off[1:]
+    analyzed = (ends - starts) >= 2
+    span = ts[ends[analyzed] - 1] - ts[starts[analyzed]]
+    
+    # Differences between neighbours, ignoring the ones that cross into the next series
+    diffs = np.diff(ts)
+    within = np.ones(len(diffs), dtype=bool)
+    boundaries = off[1:-1] - 1
+    within[boundaries[(boundaries >= 0) & (boundaries < len(diffs))]] = False
+    gaps = diffs[within & (diffs > gap_threshold_ms)]
+    
+    return GapStats(
+        series_analyzed=int(analyzed.sum()),
+        total_span_ms=int(span.sum()),
+        total_gap_ms=int(gaps.sum()),
+        gap_count=len(gaps),
+        longest_gap_ms=int(gaps.max()) if len(gaps) else 0,
+    )
+
+
+def _detect_gaps_python(timestamps, offsets, gap_threshold_ms: int) -> GapStats:
+    stats = GapStats()
+    for start, end in pairwise(offsets):
+        if end - start < 2:
+            continue
+        series = timestamps[start:end]
+        stats.series_analyzed += 1
+        stats.total_span_ms += series[-1] - series[0]
+        for prev, cur in pairwise(series):
+            gap = cur - prev
+            if gap > gap_threshold_ms:
+                stats.total_gap_ms += gap
+                stats.gap_count += 1
+                stats.longest_gap_ms = max(stats.longest_gap_ms, gap)
+    return stats
+
+
+def _iter_data_buckets(
+    client: CogniteClient,
+    instance_ids: list[NodeId],
+    lookback: str,
+    granularity: str,
+) -> Iterator[tuple[NodeId | None, list | object]]:
+    """
+    Yield (instance ID, start times of the ``granularity`` buckets that hold data) per time series.
+
+    Only daily (by default) ``count`` aggregates are transferred, not raw
+    datapoints. Unknown series are skipped.
+    """
+    query = {
+        "instance_id": instance_ids,
+        "start": lookback,
+        "end": "now",
+        "aggregates": "count",
+        "granularity": granularity,
+        "ignore_unknown_ids": True,
+        "limit": None,
+    }
+    if np is not None:
+        for dps in client.time_series.data.retrieve_arrays(**query):
+            ts = dps.timestamp.astype("datetime64[ms]").astype(np.int64)
+            if dps.count is not None:
+                ts = ts[dps.count > 0]
+            yield getattr(dps, "instance_id", None), ts
+        return
+    
+    for dps in client.time_series.data.retrieve(**query):
+        counts = dps.count if dps.count is not None else [1] * len(dps.timestamp)
+        yield getattr(dps, "instance_id", None), [t for t, c in zip(dps.timestamp, counts, strict=True) if c]
+
+
+def _retrieve_data_buckets(
+    client: CogniteClient,
+    instance_ids: list[NodeId],
+    lookback: str,
+    granularity: str,
+) -> tuple[list, list[int]]:
+    """Bucket start times of all series as the flat timestamp column and offsets for detect_gaps."""
+    offsets = [0]
+    parts = []
+    for _, ts in _iter_data_buckets(client, instance_ids, lookback, granularity):
+        parts.append(ts)
+        offsets.append(offsets[-1] + len(ts))
+    if np is not None:
+        return (np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)), offsets
+    return [t for part in parts for t in part], offsets
+
+
+def _add_gap_stats(acc: CombinedAccumulator, stats: GapStats) -> None:
+    acc.ts_analyzed_for_gaps += stats.series_analyzed
+    acc.ts_with_data += stats.series_analyzed
+    acc.total_time_span_days += stats.total_span_ms / MS_PER_DAY
+    acc.total_gap_duration_days += stats.total_gap_ms / MS_PER_DAY
+    acc.gap_count += stats.gap_count
+    acc.longest_gap_days = max(acc.longest_gap_days, stats.longest_gap_ms / MS_PER_DAY)
+
+
 def compute_historical_gaps_batch(
     ts_batch,
     client: CogniteClient,
     acc: CombinedAccumulator,
     gap_threshold_days: int = 7,
     lookback: str = "1000d-ago",
+    granularity: str = "1d",
 ) -> None:
     """
     Compute historical data completeness for a batch of timeseries.
     
     For each time series:
-    1. Calculate total time span (first to last datapoint)
+    1. Calculate total time span (first to last bucket with data)
     2. Find gaps larger than threshold (e.g., 7 days without data)
     3. Sum gap durations to calculate data completeness
     
+    Data presence is read from ``count`` aggregates, so spans and gaps have
+    the resolution of ``granularity`` (one day by default).
+    
     Example: 1 year of data with a 1-month gap = (365-30)/365 = 91.8% complete
     """
     ts_instance_ids = []
@@ -137,58 +288,71 @@ def compute_historical_gaps_batch(
         return
 
     try:
-        df = client.time_series.data.retrieve_dataframe(
-            instance_id=ts_instance_ids,
-            start=lookback,
-            end="now",
-            column_names="external_id",
-            ignore_unknown_ids=True,
-        )
+        timestamps, offsets = _retrieve_data_buckets(client, ts_instance_ids, lookback, granularity)
     except Exception:
         # Skip this batch when time series data is unavailable.
         return
 
-    if df.empty:
-        return
+    _add_gap_stats(acc, detect_gaps(timestamps, offsets, gap_threshold_days * MS_PER_DAY))
 
-    gap_threshold_ms = gap_threshold_days * 24 * 3600 * 1000
-    ms_per_day = 24 * 3600 * 1000
 
-    for col in df.columns:
-        series = df[col].dropna()
-        if len(series) < 2:
-            continue
-        
-        acc.ts_analyzed_for_gaps += 1
-        acc.ts_with_data += 1
-        
-        timestamps = series.index.astype("int64") // 1_000_000  # Convert to ms
-        
-        # Calculate total time span (first to last datapoint)
-        first_ts = timestamps.min()
-        last_ts = timestamps.max()
-        time_span_ms = last_ts - first_ts
-        time_span_days = time_span_ms / ms_per_day
-        acc.total_time_span_days += time_span_days
-        
-        # Find gaps between consecutive datapoints
-        diffs = timestamps[1:] - timestamps[:-1]
-        
-        # Identify significant gaps (longer than threshold)
-        significant_gaps = diffs[diffs > gap_threshold_ms]
-        
-        if len(significant_gaps) > 0:
-            # Sum total gap duration for this TS
-            gap_duration_ms = significant_gaps.sum()
-            gap_duration_days = gap_duration_ms / ms_per_day
-            acc.total_gap_duration_days += gap_duration_days
-            acc.gap_count += len(significant_gaps)
-            
-            # Track longest gap
-            longest_gap_ms = significant_gaps.max()
-            longest_gap_days = longest_gap_ms / ms_per_day
-            if longest_gap_days > acc.longest_gap_days:
-                acc.longest_gap_days = longest_gap_days
+def compute_historical_gaps_cached(
+    ts_batch,
+    client: CogniteClient,
+    acc: CombinedAccumulator,
+    cache: dict[tuple[str, str], list],
+    gap_threshold_days: int = 7,
+    lookback: str = "1000d-ago",
+    granularity: str = "1d",
+    max_age_seconds: float | None = None,
+) -> int:
+    """
+    Same as compute_historical_gaps_batch, but with per-series results kept in ``cache``.
+
+    ``cache`` maps (space, externalId) to the series' GapStats fields followed by
+    the fetch time and the series' ``last_updated_time``. Only series without an
+    entry, with an entry for an older version of the series, or with an entry
+    older than ``max_age_seconds`` are fetched.
+
+    Returns:
+        Number of series whose data buckets were fetched
+    """
+    now = time.time()
+    versions = {}
+    for n in ts_batch:
+        if getattr(n, "space", None) and getattr(n, "external_id", None):
+            versions[(n.space, n.external_id)] = getattr(n, "last_updated_time", None)
+
+    stale = [
+        key for key, version in versions.items()
+        if (entry := cache.get(key)) is None
+        or entry[6] != version
+        or (max_age_seconds is not None and now - entry[5] > max_age_seconds)
+    ]
+    if stale:
+        try:
+            found = {
+                (instance_id.space, instance_id.external_id): ts
+                for instance_id, ts in _iter_data_buckets(
+                    client, [NodeId(*key) for key in stale], lookback, granularity
+                )
+                if instance_id is not None
+            }
+        except Exception:
+            # Keep the cached results and skip the rest when time series data is unavailable.
+            found = None
+        if found is not None:
+            threshold_ms = gap_threshold_days * MS_PER_DAY
+            for key in stale:
+                ts = found.get(key, [])
+                stats = detect_gaps(ts, [0, len(ts)], threshold_ms)
+                cache[key] = [*astuple(stats), now, versions[key]]
+    
+    for key in versions:
+        entry = cache.get(key)
+        if entry is not None:
+            _add_gap_stats(acc, GapStats(*entry[:5]))
+    return len(stale)
 
 
 def compute_ts_metrics(acc: CombinedAccumulator) -> dict:
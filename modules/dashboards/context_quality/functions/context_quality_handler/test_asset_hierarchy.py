@@ -0,0 +1,117 @@
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the current directory to the path so we can import the modules
+sys.path.append(str(Path(__file__).parent))
+
+from metrics import analyze_hierarchy, compute_depth_map
+
+
+def _walk_depth_map(parent_map: dict[str, str | None]) -> dict[str, int]:
+    """The previous per-node walk to the root, kept as the reference for depths."""
+    depths = {}
+    for nid in parent_map:
+        visited = set()
+        cur, d = nid, 0
+        while cur not in visited:
+            visited.add(cur)
+            parent = parent_map.get(cur)
+            if not parent:
+                break
+            d += 1
+            cur = parent
+        depths[nid] = d
+    return depths
+
+
+def _descendants(parent_map: dict[str, str | None], nid: str) -> set[str]:
+    """``nid`` and every node whose parent chain reaches it without passing through a cycle."""
+    found = {nid}
+    for other in parent_map:
+        seen = set()
+        cur = other
+        while cur in parent_map and cur not in seen:
+            if cur == nid:
+                found.add(other)
+                break
+            seen.add(cur)
+            cur = parent_map[cur]
+    return found
+
+
+def _random_hierarchy(seed: int, n: int = 300) -> dict[str, str | None]:
+    rng = random.Random(seed)
+    parent_map: dict[str, str | None] = {}
+    for i in range(n):
+        roll = rng.random()
+        if i == 0 or roll < 0.05:
+            parent_map[f"n{i}"] = None
+        elif roll < 0.1:
+            parent_map[f"n{i}"] = f"missing{i}"
+        else:
+            parent_map[f"n{i}"] = f"n{rng.randrange(i)}"
+    # Close a few cycles: point an ancestor back at its descendant
+    for _ in range(3):
+        start = f"n{rng.randrange(n)}"
+        chain = [start]
+        while (p := parent_map[chain[-1]]) in parent_map and p not in chain:
+            chain.append(p)
+        if len(chain) > 2:
+            parent_map[chain[-1]] = start
+    return parent_map
+
+
+class TestAnalyzeHierarchy:
+    """Test suite for the single-pass hierarchy analysis."""
+
+    def test_depths_roots_and_missing_parents(self):
+        analysis = analyze_hierarchy({"root": None, "a": "root", "b": "a", "c": "gone", "d": "c"})
+        assert analysis.depth_map() == {"root": 0, "a": 1, "b": 2, "c": 1, "d": 2}
+        assert analysis.missing_parent_count == 1
+        assert analysis.cycle_node_count == 0
+
+    def test_cycles(self):
+        analysis = analyze_hierarchy({"a": "b", "b": "c", "c": "a", "x": "a", "y": "x", "self": "self"})
+        assert analysis.depth_map() == {"a": 3, "b": 3, "c": 3, "x": 4, "y": 5, "self": 1}
+        assert analysis.cycle_node_count == 4
+        # Cycle nodes only count their acyclic branches
+        assert dict(zip(analysis.node_ids, analysis.subtree_size, strict=True))["a"] == 3
+
+    def test_orphans(self):
+        analysis = analyze_hierarchy({"lonely": None, "root": None, "child": "root", "dangling": "gone"})
+        assert analysis.orphan_ids() == ["lonely"]
+
+    def test_subtree_sizes_and_leaf_counts(self):
+        analysis = analyze_hierarchy({"r": None, "a": "r", "b": "r", "c": "a", "d": "a"})
+        by_id = {
+            nid: (children, size, leaves)
+            for nid, children, size, leaves in zip(
+                analysis.node_ids, analysis.child_count, analysis.subtree_size, analysis.leaf_count, strict=True
+            )
+        }
+        assert by_id == {"r": (2, 5, 3), "a": (2, 3, 2), "b": (0, 1, 1), "c": (0, 1, 1), "d": (0, 1, 1)}
+
+    def test_empty(self):
+        analysis = analyze_hierarchy({})
+        assert analysis.depth_map() == {}
+        assert analysis.orphan_ids() == []
+
+    @pytest.mark.parametrize("seed", range(10))
+    def test_matches_the_per_node_walk(self, seed):
+        parent_map = _random_hierarchy(seed)
+        analysis = analyze_hierarchy(parent_map)
+        assert compute_depth_map(parent_map) == _walk_depth_map(parent_map)
+
+        for nid, size, in_cycle in zip(analysis.node_ids, analysis.subtree_size, analysis.in_cycle, strict=True):
+            if not in_cycle:
+                assert size == len(_descendants(parent_map, nid))
+
+    def test_deep_chain(self):
+        n = 200_000
+        parent_map = {f"n{i}": f"n{i - 1}" if i else None for i in range(n)}
+        analysis = analyze_hierarchy(parent_map)
+        assert max(analysis.depth) == n - 1
+        assert analysis.subtree_size[0] == n
@@ -0,0 +1,141 @@
+import json
+import sys
+from datetime import UTC, datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Add the current directory to the path so we can import the modules
+sys.path.append(str(Path(__file__).parent))
+
+from cognite.client.data_classes.data_modeling import ViewId
+from metrics import CombinedAccumulator, process_asset_batch, process_equipment_batch
+from metrics.batch_format import (
+    CODEC_ZLIB,
+    MIN_ENCODED_LENGTH,
+    BatchFileReader,
+    decode_batch,
+    encode_batch,
+    is_binary_batch,
+)
+
+ASSET_VIEW = ViewId("cdf_cdm", "CogniteAsset", "v1")
+EQ_VIEW = ViewId("cdf_cdm", "CogniteEquipment", "v1")
+
+
+def _via_json(data: dict) -> dict:
+    """What a legacy JSON batch file gives back for ``data``."""
+    return json.loads(json.dumps(data, default=str))
+
+
+def _batch(**payload) -> dict:
+    return {"batch_index": 3, "batch_metadata": {"batch_size": 10}, **payload}
+
+
+def _accumulator_batch() -> dict:
+    acc = CombinedAccumulator(freshness_days=30, now=datetime(2026, 1, 1, tzinfo=UTC))
+    process_asset_batch(
+        [
+            SimpleNamespace(
+                external_id=f"asset_{i}",
+                properties={ASSET_VIEW: {"parent": {"externalId": f"asset_{i // 4}"} if i else None, "type": "PUMP"}},
+            )
+            for i in range(50)
+        ],
+        ASSET_VIEW, acc,
+    )
+    process_equipment_batch(
+        [
+            SimpleNamespace(external_id=f"eq_{i}", properties={EQ_VIEW: {"asset": {"externalId": f"asset_{i % 9}"}}})
+            for i in range(30)
+        ],
+        EQ_VIEW, acc,
+    )
+    return _batch(accumulator=acc.to_dict())
+
+
+class TestRoundTrip:
+    """Test suite for binary batch files decoding to the JSON batch-file content."""
+
+    @pytest.mark.parametrize("codec", [None, CODEC_ZLIB])
+    def test_accumulator_batch(self, codec):
+        data = _accumulator_batch()
+        raw = encode_batch(data, codec=codec)
+        assert is_binary_batch(raw)
+        assert decode_batch(raw) == _via_json(data)
+
+    def test_legacy_json_batch(self):
+        data = _accumulator_batch()
+        raw = json.dumps(data, indent=2, default=str).encode("utf-8")
+        assert not is_binary_batch(raw)
+        assert decode_batch(raw) == _via_json(data)
+
+    def test_reader_exposes_header_without_decoding_sections(self):
+        reader = BatchFileReader(encode_batch(_batch(accumulator={"total_assets": 1}, other=[1, 2])))
+        assert (reader.batch_index, reader.batch_metadata) == (3, {"batch_size": 10})
+        assert reader.keys() == ["accumulator", "other"]
+        assert reader.get("missing", "default") == "default"
+        assert reader.get("other") == [1, 2]
+
+    def test_newer_versions_are_rejected(self):
+        raw = bytearray(encode_batch(_batch()))
+        raw[3] = 99
+        with pytest.raises(ValueError, match="version 99"):
+            BatchFileReader(bytes(raw))
+
+
+class TestEdgeCases:
+    """Test suite for values the column encoding must not change."""
+
+    N = MIN_ENCODED_LENGTH
+
+    @pytest.mark.parametrize(
+        "value",
+        [
+            {i: f"id_{i}" for i in range(N)},  # int keys (JSON turns them into strings)
+            {i: i * 2 for i in range(N)},
+            {i: [f"id_{i}"] for i in range(N)},
+            {**{f"id_{i}": i for i in range(N)}, 1: 5},  # mixed keys
+            [{1: "a", 2: "b"}] * N,  # records with int keys
+        ],
+    )
+    def test_non_string_keys(self, value):
+        data = _batch(section=value)
+        assert decode_batch(encode_batch(data)) == _via_json(data)
+
+    @pytest.mark.parametrize(
+        "value",
+        [
+            [""] * N,  # string table holding only ""
+            ["", None] * N,
+            [None] * N,  # empty string table
+            {f"id_{i}": "" for i in range(N)},
+            ["a\x00b", *[f"id_{i}" for i in range(N)]],  # NUL forces the JSON string table
+            [],
+            {},
+        ],
+    )
+    def test_string_tables(self, value):
+        data = _batch(section=value)
+        assert decode_batch(encode_batch(data)) == _via_json(data)
+
+    @pytest.mark.parametrize(
+        "value",
+        [
+            {"$ids": [0, 3]},
+            {"$dict": {"a": 1}},
+            {"$count_map": "not a reference"},
+            [{"$records": 1}],
+        ],
+    )
+    def test_dicts_that_look_like_references(self, value):
+        data = _batch(section=value)
+        assert decode_batch(encode_batch(data)) == _via_json(data)
+
+    def test_corrupt_string_table_is_detected(self):
+        raw = encode_batch(_batch(section=[f"id_{i}" for i in range(self.N)]))
+        reader = BatchFileReader(raw)
+        reader.header["string_count"] += 1
+        with pytest.raises(ValueError, match="string table"):
+            reader.get("section")
@@ -0,0 +1,138 @@
+import sys
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+# Add the current directory to the path so we can import the modules
+sys.path.append(str(Path(__file__).parent))
+
+import handler
+from handler import CollectorContext, CollectorShard, _build_view_ids, _collect_assets, _collect_timeseries
+from metrics import DEFAULT_CONFIG, CombinedAccumulator, process_asset_batch, process_timeseries_batch
+
+NOW = datetime(2026, 1, 1, tzinfo=UTC)
+CONFIG = {**DEFAULT_CONFIG, "enable_historical_gaps": False}
+VIEWS = _build_view_ids(CONFIG)
+
+
+def _nodes(key: str, count: int = 24) -> list[SimpleNamespace]:
+    view = VIEWS[key]
+    props = {
+        "ts": lambda i: {"assets": [{"externalId": f"asset_{i % 10}"}], "unit": "degC" if i % 2 else None},
+        "assets": lambda i: {
+            "parent": {"externalId": f"asset_{i // 2}"} if i else None,
+            "criticality": "critical" if i % 3 == 0 else None,
+        },
+        "equipment": lambda i: {"asset": {"externalId": f"asset_{i}"} if i % 4 else None, "criticality": "high"},
+    }[key]
+    return [SimpleNamespace(external_id=f"{key}_{i}" if key != "assets" else f"asset_{i}", properties={view: props(i)})
+            for i in range(count)]
+
+
+def _chunks(view, key, instance_type, size: int = 5):
+    nodes = _nodes(key) if key in ("ts", "assets", "equipment") else []
+    for i in range(0, len(nodes), size):
+        time.sleep(0.001)  # let the collectors interleave
+        yield nodes[i:i + size]
+
+
+def _context(**config) -> CollectorContext:
+    return CollectorContext(
+        client=None, config={**CONFIG, **config}, views=VIEWS, chunks=_chunks,
+        limits={}, start_time=time.time(),
+    )
+
+
+def _normalized(data: dict) -> dict:
+    """``to_dict`` output with list order ignored (sets are stored as lists in no particular order)."""
+    return {key: sorted(value, key=repr) if isinstance(value, list) else value for key, value in data.items()}
+
+
+class TaggedAccumulator(CombinedAccumulator):
+    """Records the order in which shards are merged into it."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.tag = None
+        self.merged: list[str] = []
+
+    def merge_from(self, other):
+        self.merged.append(other.tag)
+        super().merge_from(other)
+
+
+def _sleeper(seconds: float):
+    def collect(shard: CollectorShard, ctx: CollectorContext) -> None:
+        time.sleep(seconds)
+        shard.acc.tag = shard.name
+    return collect
+
+
+class TestRunCollectors:
+    """Test suite for running collectors concurrently and merging their shards."""
+
+    def test_concurrency_does_not_change_the_result(self):
+        results = []
+        for workers in (1, 4):
+            acc, model3d, annotations, chunk_counts = handler._run_collectors(
+                _context(max_concurrent_collectors=workers), CombinedAccumulator(now=NOW)
+            )
+            results.append((_normalized(acc.to_dict()), _normalized(model3d.to_dict()),
+                            _normalized(annotations.to_dict()), chunk_counts))
+        assert results[0] == results[1]
+        assert results[0][3]["ts"] == 5
+        assert results[0][3]["assets"] == 5
+
+    def test_shards_are_merged_in_collector_order(self):
+        # Later collectors finish first, so completion order is the reverse of the merge order
+        collectors = [(name, _sleeper(0.02 * (3 - i))) for i, name in enumerate(["ts", "assets", "equipment", "files"])]
+        with patch.object(handler, "_enabled_collectors", return_value=collectors):
+            acc, _, _, chunk_counts = handler._run_collectors(
+                _context(max_concurrent_collectors=4), TaggedAccumulator(now=NOW)
+            )
+        assert acc.merged == ["ts", "assets", "equipment", "files"]
+        assert list(chunk_counts) == acc.merged
+
+    def test_critical_assets_with_ts_when_assets_merge_first(self):
+        collectors = [("assets", _collect_assets), ("ts", _collect_timeseries)]
+        with patch.object(handler, "_enabled_collectors", return_value=collectors):
+            acc, _, _, _ = handler._run_collectors(_context(), CombinedAccumulator(now=NOW))
+
+        expected = CombinedAccumulator(now=NOW)
+        for chunk in _chunks(VIEWS["ts"], "ts", "node"):
+            process_timeseries_batch(chunk, VIEWS["ts"], expected)
+        for chunk in _chunks(VIEWS["assets"], "assets", "node"):
+            process_asset_batch(chunk, VIEWS["assets"], expected)
+        # Critical assets 0, 3, 6 and 9 have time series
+        assert acc.critical_assets_with_ts == expected.critical_assets_with_ts == 4
+
+    def test_merge_from_recounts_critical_assets_with_ts(self):
+        asset_shard, ts_shard = CombinedAccumulator(now=NOW), CombinedAccumulator(now=NOW)
+        process_asset_batch(_nodes("assets"), VIEWS["assets"], asset_shard)
+        process_timeseries_batch(_nodes("ts"), VIEWS["ts"], ts_shard)
+        assert asset_shard.critical_assets_with_ts == 0
+
+        acc = CombinedAccumulator(now=NOW)
+        acc.merge_from(asset_shard)
+        acc.merge_from(ts_shard)
+        assert acc.critical_assets_with_ts == len(acc.critical_asset_ids & acc.assets_with_ts) == 4
+
+    def test_failing_collector_cancels_the_rest(self):
+        started = []
+
+        def fail(shard, ctx):
+            raise RuntimeError("view unavailable")
+
+        def record(shard, ctx):
+            started.append(shard.name)
+
+        collectors = [("ts", fail)] + [(f"queued_{i}", record) for i in range(5)]
+        with patch.object(handler, "_enabled_collectors", return_value=collectors), \
+                pytest.raises(RuntimeError, match="view unavailable"):
+            handler._run_collectors(_context(max_concurrent_collectors=1), CombinedAccumulator(now=NOW))
+        # The single worker may pick up the next collector before the rest are cancelled
+        assert len(started) <= 1
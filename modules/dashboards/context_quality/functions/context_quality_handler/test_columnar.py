@@ -0,0 +1,153 @@
+import sys
+import tracemalloc
+from datetime import UTC, datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Add the current directory to the path so we can import the modules
+sys.path.append(str(Path(__file__).parent))
+
+from cognite.client.data_classes.data_modeling import ViewId
+from metrics import (
+    CombinedAccumulator,
+    compute_asset_hierarchy_metrics,
+    compute_equipment_metrics,
+    compute_ts_metrics,
+    process_asset_batch,
+    process_equipment_batch,
+    process_timeseries_batch,
+)
+from metrics.columnar import ColumnarAccumulator, IdInterner, _ArrayMap, get_accumulator_class
+
+ASSET_VIEW = ViewId("cdf_cdm", "CogniteAsset", "v1")
+TS_VIEW = ViewId("cdf_cdm", "CogniteTimeSeries", "v1")
+EQ_VIEW = ViewId("cdf_cdm", "CogniteEquipment", "v1")
+NOW = datetime(2026, 1, 1, tzinfo=UTC)
+
+
+def _node(external_id: str, view: ViewId, **props) -> SimpleNamespace:
+    return SimpleNamespace(external_id=external_id, properties={view: props})
+
+
+def _assets(start: int, stop: int) -> list[SimpleNamespace]:
+    return [
+        _node(
+            f"asset_{i:05d}", ASSET_VIEW,
+            parent={"externalId": f"asset_{i // 3:05d}"} if i else None,
+            type="PUMP" if i % 2 else None,
+            criticality="critical" if i % 7 == 0 else None,
+        )
+        for i in range(start, stop)
+    ]
+
+
+def _timeseries(start: int, stop: int) -> list[SimpleNamespace]:
+    return [
+        _node(f"ts_{i:05d}", TS_VIEW, assets=[{"externalId": f"asset_{i % 40:05d}"}] if i % 4 else [], unit="bar")
+        for i in range(start, stop)
+    ]
+
+
+def _equipment(start: int, stop: int) -> list[SimpleNamespace]:
+    return [
+        _node(
+            f"eq_{i:05d}", EQ_VIEW,
+            asset={"externalId": f"asset_{i % 25:05d}"} if i % 3 else None,
+            equipmentType="PUMP", serialNumber=f"SN{i}" if i % 2 else None,
+        )
+        for i in range(start, stop)
+    ]
+
+
+def _collect(cls: type[CombinedAccumulator], start: int = 0, stop: int = 120) -> CombinedAccumulator:
+    acc = cls(freshness_days=30, now=NOW)
+    process_timeseries_batch(_timeseries(start, stop), TS_VIEW, acc)
+    # Duplicates and an asset seen again in a later chunk
+    process_asset_batch(_assets(start, stop) + _assets(start, start + 2), ASSET_VIEW, acc)
+    process_equipment_batch(_equipment(start, stop), EQ_VIEW, acc)
+    return acc
+
+
+def _normalized(data: dict) -> dict:
+    """``to_dict`` output with list order ignored (sets are stored as lists in no particular order)."""
+    return {key: sorted(value, key=repr) if isinstance(value, list) else value for key, value in data.items()}
+
+
+class TestColumnarMatchesDictBackend:
+    """Test suite for result parity between the accumulator backends."""
+
+    def test_to_dict_and_metrics_are_equal(self):
+        plain, columnar = _collect(CombinedAccumulator), _collect(ColumnarAccumulator)
+        assert _normalized(columnar.to_dict()) == _normalized(plain.to_dict())
+        assert compute_ts_metrics(columnar) == compute_ts_metrics(plain)
+        assert compute_asset_hierarchy_metrics(columnar) == compute_asset_hierarchy_metrics(plain)
+        assert compute_equipment_metrics(columnar) == compute_equipment_metrics(plain)
+
+    def test_from_dict_round_trip(self):
+        data = _collect(CombinedAccumulator).to_dict()
+        assert _normalized(ColumnarAccumulator.from_dict(data).to_dict()) == _normalized(data)
+
+    @pytest.mark.parametrize("target_cls", [CombinedAccumulator, ColumnarAccumulator])
+    @pytest.mark.parametrize("shard_cls", [CombinedAccumulator, ColumnarAccumulator])
+    def test_merge_from_is_backend_independent(self, target_cls, shard_cls):
+        expected = _collect(CombinedAccumulator, 0, 60)
+        expected.merge_from(_collect(CombinedAccumulator, 50, 120))
+
+        merged = _collect(target_cls, 0, 60)
+        merged.merge_from(_collect(shard_cls, 50, 120))
+        assert _normalized(merged.to_dict()) == _normalized(expected.to_dict())
+
+    def test_backend_selection(self):
+        assert get_accumulator_class(None) is CombinedAccumulator
+        assert get_accumulator_class("columnar") is ColumnarAccumulator
+        with pytest.raises(ValueError, match="accumulator_backend"):
+            get_accumulator_class("arrow")
+
+
+class TestColumns:
+    """Test suite for the interned column types."""
+
+    def test_array_map_requires_encode_and_decode(self):
+        with pytest.raises(TypeError):
+            _ArrayMap(IdInterner())
+
+    def test_columns_share_one_interner(self):
+        acc = _collect(ColumnarAccumulator)
+        interned = acc.interned_ids
+        acc.assets_with_files.add("asset_00001")
+        acc.parent_of["asset_00002"] = "asset_00001"
+        acc.children_count_map["asset_00001"] = 4
+        assert acc.interned_ids == interned
+        assert acc.parent_of.to_dict() == dict(acc.parent_of.items())
+
+    def test_count_map_rejects_negative_counts(self):
+        acc = ColumnarAccumulator(freshness_days=30, now=NOW)
+        with pytest.raises(ValueError, match="non-negative"):
+            acc.children_count_map["a"] = -1
+
+
+def _traced_size(build) -> int:
+    """Bytes still allocated by ``build()`` once it returns (the result is kept alive)."""
+    tracemalloc.start()
+    try:
+        result = build()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+def test_columnar_state_is_smaller_than_set_state():
+    assets = _assets(0, 30000)
+
+    def build(cls):
+        acc = cls(freshness_days=30, now=NOW)
+        process_asset_batch(assets, ASSET_VIEW, acc)
+        return acc
+
+    plain = _traced_size(lambda: build(CombinedAccumulator))
+    columnar = _traced_size(lambda: build(ColumnarAccumulator))
+    assert columnar < 0.8 * plain
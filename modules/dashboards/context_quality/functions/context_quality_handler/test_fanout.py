@@ -0,0 +1,111 @@
+import sys
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Add the current directory to the path so we can import the modules
+sys.path.append(str(Path(__file__).parent))
+
+from cognite.client.data_classes.data_modeling import ViewId
+from handler import CollectorContext, CollectorShard, _collect_assets
+from metrics import (
+    DEFAULT_CONFIG,
+    CombinedAccumulator,
+    Model3DAccumulator,
+    ViewScan,
+    process_asset_3d_batch,
+    process_asset_batch,
+)
+
+ASSET_VIEW = ViewId("cdf_cdm", "CogniteAsset", "v1")
+NOW = datetime(2026, 1, 1, tzinfo=UTC)
+
+
+def _chunks(size: int = 4, count: int = 5) -> list[list[SimpleNamespace]]:
+    nodes = [
+        SimpleNamespace(
+            external_id=f"asset_{i}",
+            properties={ASSET_VIEW: {
+                "parent": {"externalId": f"asset_{i // 2}"} if i else None,
+                "object3D": {"externalId": f"obj_{i}"} if i % 3 == 0 else None,
+                "criticality": "critical" if i % 5 == 0 else None,
+            }},
+        )
+        for i in range(size * count)
+    ]
+    return [nodes[i:i + size] for i in range(0, len(nodes), size)]
+
+
+def _fail(chunk, view, acc):
+    raise RuntimeError("broken chunk")
+
+
+class TestViewScan:
+    """Test suite for feeding one view scan to several accumulators."""
+
+    def test_every_consumer_sees_every_chunk(self):
+        acc, model3d = CombinedAccumulator(now=NOW), Model3DAccumulator()
+        scan = ViewScan(ASSET_VIEW)
+        scan.register("Assets", process_asset_batch, acc)
+        scan.register("3D", process_asset_3d_batch, model3d)
+        for chunk in _chunks():
+            scan.feed(chunk)
+
+        expected_acc, expected_3d = CombinedAccumulator(now=NOW), Model3DAccumulator()
+        for chunk in _chunks():
+            process_asset_batch(chunk, ASSET_VIEW, expected_acc)
+        for chunk in _chunks():
+            process_asset_3d_batch(chunk, ASSET_VIEW, expected_3d)
+        assert acc.to_dict() == expected_acc.to_dict()
+        assert model3d.to_dict() == expected_3d.to_dict()
+        assert not scan.done
+
+    def test_consumers_stop_at_their_own_limit(self):
+        acc, model3d = CombinedAccumulator(now=NOW), Model3DAccumulator()
+        scan = ViewScan(ASSET_VIEW)
+        scan.register("Assets", process_asset_batch, acc, limit_reached=lambda a: a.total_assets >= 8)
+        scan.register("3D", process_asset_3d_batch, model3d, limit_reached=lambda a: a.total_assets_checked >= 12)
+        fed = 0
+        for chunk in _chunks():
+            scan.feed(chunk)
+            fed += 1
+            if scan.done:
+                break
+        assert (fed, acc.total_assets, model3d.total_assets_checked) == (3, 8, 12)
+
+    def test_optional_consumer_failure_disables_only_that_consumer(self):
+        acc = CombinedAccumulator(now=NOW)
+        scan = ViewScan(ASSET_VIEW)
+        scan.register("Assets", process_asset_batch, acc)
+        scan.register("3D", _fail, Model3DAccumulator(), optional=True)
+        for chunk in _chunks():
+            scan.feed(chunk)
+        assert acc.total_assets == 20
+        assert [c.done for c in scan.consumers] == [False, True]
+
+    def test_required_consumer_failure_is_raised(self):
+        scan = ViewScan(ASSET_VIEW)
+        scan.register("Assets", _fail, CombinedAccumulator(now=NOW))
+        with pytest.raises(RuntimeError, match="broken chunk"):
+            scan.feed(_chunks()[0])
+
+
+def test_asset_collector_reads_the_view_once():
+    reads = []
+
+    def chunks(view, key, instance_type):
+        reads.append(key)
+        return iter(_chunks())
+
+    ctx = CollectorContext(
+        client=None, config=DEFAULT_CONFIG, views={"assets": ASSET_VIEW}, chunks=chunks,
+        limits={"assets": None, "assets_3d": None}, start_time=time.time(),
+    )
+    shard = CollectorShard("assets", CombinedAccumulator(now=NOW))
+    _collect_assets(shard, ctx)
+    assert reads == ["assets"]
+    assert (shard.chunks, shard.acc.total_assets, shard.model3d.total_assets_checked) == (5, 20, 20)
+    assert shard.model3d.assets_with_3d == 7
@@ -0,0 +1,334 @@
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+# Add the current directory to the path so we can import the modules
+sys.path.append(str(Path(__file__).parent))
+
+import handler
+from cognite.client.data_classes.data_modeling import Node, ViewId
+from cognite.client.exceptions import CogniteAPIError
+from metrics import (
+    DEFAULT_CONFIG,
+    INCREMENTAL_STATE_FILE_EXTERNAL_ID,
+    CombinedAccumulator,
+    IncrementalState,
+    ViewState,
+    compute_historical_gaps_cached,
+    is_cursor_expired_error,
+    load_incremental_state,
+    save_incremental_state,
+    sync_view,
+    sync_views,
+)
+from metrics.incremental import SYNC_CURSOR_MAX_AGE_SECONDS, SYNC_RESULT_KEY
+
+TS_VIEW = ViewId("cdf_cdm", "CogniteTimeSeries", "v1")
+ASSET_VIEW = ViewId("cdf_cdm", "CogniteAsset", "v1")
+EQ_VIEW = ViewId("cdf_cdm", "CogniteEquipment", "v1")
+VIEWS = {"ts": (TS_VIEW, "node"), "assets": (ASSET_VIEW, "node"), "equipment": (EQ_VIEW, "node")}
+DAY_MS = 24 * 3600 * 1000
+
+
+def _node(view: ViewId, external_id: str, updated: int = 1, deleted: bool = False, **props) -> Node:
+    return Node.load({
+        "instanceType": "node",
+        "space": "sp",
+        "externalId": external_id,
+        "version": updated,
+        "lastUpdatedTime": 1_700_000_000_000 + updated,
+        "createdTime": 1_700_000_000_000,
+        "deletedTime": 1_700_000_000_000 + updated if deleted else None,
+        "properties": {} if deleted else {view.space: {f"{view.external_id}/{view.version}": props}},
+    })
+
+
+class FakeSync:
+    """`instances.sync` over an append-only change log per view; the cursor is the log position."""
+
+    def __init__(self):
+        self.log: dict[ViewId, list[Node]] = {}
+        self.expired: set[str] = set()
+        self.error: CogniteAPIError | None = None
+        self.calls = 0
+
+    def add(self, view: ViewId, *nodes: Node) -> None:
+        self.log.setdefault(view, []).extend(nodes)
+
+    def sync(self, query):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        cursor = query.cursors.get(SYNC_RESULT_KEY)
+        if cursor in self.expired:
+            self.expired.discard(cursor)
+            raise CogniteAPIError("Cursor has expired, restart the sync without a cursor", code=400)
+        view = query.select[SYNC_RESULT_KEY].sources[0].source
+        limit = query.with_[SYNC_RESULT_KEY].limit
+        start = int(cursor) if cursor else 0
+        page = self.log.get(view, [])[start:start + limit]
+        return SimpleNamespace(
+            get=lambda key: page if key == SYNC_RESULT_KEY else None,
+            cursors={SYNC_RESULT_KEY: str(start + len(page))},
+        )
+
+
+class FakeDatapoints:
+    """`time_series.data.retrieve_arrays` with daily count buckets per series externalId."""
+
+    def __init__(self, days: dict[str, list[int]]):
+        self.days = days
+        self.requested: list[str] = []
+
+    def retrieve_arrays(self, instance_id, **kwargs):
+        self.requested.extend(i.external_id for i in instance_id)
+        return [
+            SimpleNamespace(
+                instance_id=i,
+                timestamp=np.array([d * DAY_MS for d in self.days[i.external_id]], dtype="datetime64[ms]"),
+                count=np.ones(len(self.days[i.external_id]), dtype=np.int64),
+            )
+            for i in instance_id
+            if i.external_id in self.days
+        ]
+
+
+class FakeFiles:
+    """`files` upload/download keyed by externalId."""
+
+    def __init__(self):
+        self.stored: dict[str, bytes] = {}
+
+    def upload(self, path, external_id, name, mime_type, overwrite):
+        with open(path, "rb") as f:
+            self.stored[external_id] = f.read()
+
+    def download_bytes(self, external_id):
+        if external_id not in self.stored:
+            raise FileNotFoundError(external_id)
+        return self.stored[external_id]
+
+
+def _client(days: dict[str, list[int]] | None = None) -> SimpleNamespace:
+    return SimpleNamespace(
+        data_modeling=SimpleNamespace(instances=FakeSync()),
+        time_series=SimpleNamespace(data=FakeDatapoints(days or {})),
+        files=FakeFiles(),
+    )
+
+
+def _config(**overrides) -> dict:
+    return {
+        **DEFAULT_CONFIG,
+        "incremental": True,
+        "enable_maintenance_metrics": False,
+        "enable_file_annotation_metrics": False,
+        "enable_3d_metrics": False,
+        "enable_file_metrics": False,
+        "chunk_size": 3,
+        "sync_page_size": 2,
+        **overrides,
+    }
+
+
+def _populate(client) -> None:
+    sync = client.data_modeling.instances
+    sync.add(ASSET_VIEW, *[
+        _node(ASSET_VIEW, f"a{i}", parent={"space": "sp", "externalId": f"a{i // 2}"} if i else None, type="PUMP")
+        for i in range(7)
+    ])
+    sync.add(TS_VIEW, *[
+        _node(TS_VIEW, f"t{i}", assets=[{"space": "sp", "externalId": f"a{i}"}] if i % 2 else [], unit="bar")
+        for i in range(5)
+    ])
+    sync.add(EQ_VIEW, *[_node(EQ_VIEW, f"e{i}", asset={"space": "sp", "externalId": f"a{i}"}) for i in range(3)])
+
+
+def _metrics(result: dict) -> dict:
+    return {key: value for key, value in result.items() if key != "metadata"}
+
+
+def _run(client, **overrides) -> dict:
+    with patch.object(handler, "_report_usage"):
+        return handler.handle(_config(**overrides), client)
+
+
+class TestViewState:
+    """Test suite for applying sync pages to a view's rows."""
+
+    def test_create_update_delete(self):
+        client = _client()
+        sync = client.data_modeling.instances
+        sync.add(ASSET_VIEW, _node(ASSET_VIEW, "a1", type="PUMP"), _node(ASSET_VIEW, "a2"))
+        state = ViewState("sig")
+        assert sync_view(client, ASSET_VIEW, state, page_size=1) == (2, 0, True)
+        assert state.complete
+
+        sync.add(ASSET_VIEW, _node(ASSET_VIEW, "a1", updated=2, type="VALVE"), _node(ASSET_VIEW, "a2", 3, deleted=True))
+        state.shard = {"saved": True}
+        assert sync_view(client, ASSET_VIEW, state) == (1, 1, True)
+        assert list(state.rows) == [("sp", "a1")]
+        assert state.rows[("sp", "a1")]["properties"] == {"type": "VALVE"}
+        assert state.shard is None
+
+        [[row]] = list(state.chunks(ASSET_VIEW, 10))
+        assert (row.external_id, row.properties) == ("a1", {ASSET_VIEW: {"type": "VALVE"}})
+
+    def test_no_changes_keeps_the_shard(self):
+        client = _client()
+        client.data_modeling.instances.add(ASSET_VIEW, _node(ASSET_VIEW, "a1"))
+        state = ViewState("sig")
+        sync_view(client, ASSET_VIEW, state)
+        state.shard = {"saved": True}
+        assert sync_view(client, ASSET_VIEW, state) == (0, 0, True)
+        assert state.shard == {"saved": True}
+
+    def test_state_round_trip(self):
+        client = _client()
+        _populate(client)
+        state = IncrementalState()
+        sync_views(client, state, VIEWS)
+        state.views["ts"].gaps[("sp", "t1")] = [1, 2, 3, 4, 5, 6.0, 7]
+        save_incremental_state(client, state)
+        assert load_incremental_state(client) == state
+
+
+class TestSyncViews:
+    """Test suite for budgeted syncing and expired cursors."""
+
+    def test_backfill_stops_at_the_deadline_and_resumes(self):
+        client = _client()
+        _populate(client)
+        saved = []
+        state = IncrementalState()
+        changes = sync_views(client, state, VIEWS, page_size=2, deadline=time.monotonic() - 1,
+                             on_progress=lambda s: saved.append(s.header()))
+        assert [c["caught_up"] for c in changes.values()] == [False, False, False]
+        assert len(saved) == 1
+        assert client.data_modeling.instances.calls == 0
+
+        changes = sync_views(client, state, VIEWS, page_size=2)
+        assert all(c["caught_up"] and c["full_sync"] for c in changes.values())
+        assert {key: c["total"] for key, c in changes.items()} == {"ts": 5, "assets": 7, "equipment": 3}
+
+    def test_expired_cursor_re_syncs_the_view(self):
+        client = _client()
+        _populate(client)
+        state = IncrementalState()
+        sync_views(client, state, VIEWS)
+        state.views["ts"].gaps[("sp", "t1")] = [0] * 7
+        client.data_modeling.instances.expired.add(state.views["ts"].cursor)
+
+        changes = sync_views(client, state, VIEWS)
+        assert changes["ts"]["full_sync"] and changes["ts"]["total"] == 5
+        assert not changes["assets"]["full_sync"]
+        assert ("sp", "t1") in state.views["ts"].gaps
+
+    def test_old_cursor_is_not_used(self):
+        client = _client()
+        _populate(client)
+        state = IncrementalState()
+        sync_views(client, state, VIEWS)
+        state.views["assets"].cursor_at -= SYNC_CURSOR_MAX_AGE_SECONDS + 1
+        changes = sync_views(client, state, VIEWS)
+        assert changes["assets"]["full_sync"] and changes["assets"]["total"] == 7
+        assert not changes["ts"]["full_sync"]
+
+    def test_other_bad_requests_are_raised(self):
+        client = _client()
+        _populate(client)
+        state = IncrementalState()
+        sync_views(client, state, VIEWS)
+        client.data_modeling.instances.error = CogniteAPIError("Invalid cursor format", code=400)
+        with pytest.raises(CogniteAPIError):
+            sync_views(client, state, VIEWS)
+
+    @pytest.mark.parametrize(
+        ("message", "code", "expected"),
+        [
+            ("Cursor has expired", 400, True),
+            ("The cursor is too old", 400, True),
+            ("Invalid cursor", 400, False),
+            ("Cursor has expired", 500, False),
+            ("Query expired", 400, False),
+        ],
+    )
+    def test_expired_cursor_detection(self, message, code, expected):
+        assert is_cursor_expired_error(CogniteAPIError(message, code=code)) is expected
+
+
+class TestHistoricalGapCache:
+    """Test suite for per-series gap statistics kept between runs."""
+
+    def test_only_new_changed_or_old_entries_are_fetched(self):
+        client = _client({"t1": [0, 1, 20, 21], "t2": [0, 30]})
+        batch = [_node(TS_VIEW, "t1"), _node(TS_VIEW, "t2")]
+        cache: dict = {}
+        acc = CombinedAccumulator()
+        assert compute_historical_gaps_cached(batch, client, acc, cache) == 2
+        assert (acc.ts_analyzed_for_gaps, acc.gap_count, acc.longest_gap_days) == (2, 2, 30)
+
+        acc = CombinedAccumulator()
+        assert compute_historical_gaps_cached(batch, client, acc, cache) == 0
+        assert (acc.ts_analyzed_for_gaps, acc.gap_count) == (2, 2)
+
+        batch[1] = _node(TS_VIEW, "t2", updated=2)
+        assert compute_historical_gaps_cached(batch, client, CombinedAccumulator(), cache) == 1
+        assert client.time_series.data.requested == ["t1", "t2", "t2"]
+
+        cache[("sp", "t1")][5] -= 100
+        assert compute_historical_gaps_cached(batch, client, CombinedAccumulator(), cache, max_age_seconds=50) == 1
+
+
+class TestIncrementalHandler:
+    """Test suite for incremental runs of the handler."""
+
+    def test_first_backfill_is_resumed_across_calls(self):
+        client = _client()
+        _populate(client)
+        result = _run(client, sync_time_budget_seconds=0)
+        assert result["status"] == "sync_incomplete"
+        assert result["pending_views"] == ["ts", "assets", "equipment"]
+        assert INCREMENTAL_STATE_FILE_EXTERNAL_ID in client.files.stored
+
+        result = _run(client)
+        assert result["metadata"]["instance_counts"]["assets"]["unique"] == 7
+
+    def test_changes_match_a_full_rebuild(self):
+        days = {f"t{i}": [0, 1, 2 + 10 * i] for i in range(6)}
+        client = _client(days)
+        _populate(client)
+        _run(client)
+
+        sync = client.data_modeling.instances
+        sync.add(ASSET_VIEW, _node(ASSET_VIEW, "a7", parent={"space": "sp", "externalId": "a3"}))
+        sync.add(ASSET_VIEW, _node(ASSET_VIEW, "a6", updated=2, deleted=True))
+        sync.add(TS_VIEW, _node(TS_VIEW, "t5", assets=[{"space": "sp", "externalId": "a7"}]))
+        sync.add(TS_VIEW, _node(TS_VIEW, "t0", updated=2, assets=[{"space": "sp", "externalId": "a1"}], unit="bar"))
+        client.time_series.data.requested.clear()
+
+        incremental = _run(client)
+        assert sorted(client.time_series.data.requested) == ["t0", "t5"]
+        assert incremental["metadata"]["incremental"]["assets"] == {
+            "upserted": 1, "deleted": 1, "total": 7, "full_sync": False, "caught_up": True,
+        }
+
+        rebuilt = _run(client, incremental_full_rebuild=True)
+        assert _metrics(incremental) == _metrics(rebuilt)
+        assert incremental["metadata"]["instance_counts"] == rebuilt["metadata"]["instance_counts"]
+
+    def test_unchanged_views_reuse_their_collector_state(self):
+        client = _client()
+        _populate(client)
+        first = _run(client)
+        collected = []
+        original = handler._collect_assets
+        with patch.object(handler, "_collect_assets", side_effect=lambda *a: (collected.append(1), original(*a))):
+            second = _run(client)
+        assert collected == []
+        assert _metrics(second) == _metrics(first)
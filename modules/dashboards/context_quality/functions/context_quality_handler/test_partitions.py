@@ -0,0 +1,223 @@
+import json
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Add the current directory to the path so we can import the modules
+sys.path.append(str(Path(__file__).parent))
+
+from cognite.client.data_classes.data_modeling import ViewId
+from handler import _handle_partition_planning, _load_batch_plan, _partition_views
+from metrics import DEFAULT_CONFIG
+from metrics.partitions import (
+    PartitionPlan,
+    build_range_filter,
+    compute_partition_boundaries,
+    plan_partitions,
+)
+
+VIEW = ViewId("cdf_cdm", "CogniteAsset", "v1")
+
+
+def _range_lower(dumped) -> str | None:
+    """The exclusive lower bound of the keyset filter in a dumped filter, if any."""
+    if isinstance(dumped, dict):
+        if "range" in dumped:
+            return dumped["range"].get("gt")
+        for value in dumped.values():
+            found = _range_lower(value)
+            if found is not None:
+                return found
+    if isinstance(dumped, list):
+        for value in dumped:
+            found = _range_lower(value)
+            if found is not None:
+                return found
+    return None
+
+
+class FakeInstances:
+    """`instances.list` over sorted externalIds per view, honouring the keyset filter."""
+
+    def __init__(self, ids_by_view: dict[str, list[str]]):
+        self.ids_by_view = {view: sorted(ids) for view, ids in ids_by_view.items()}
+        self.calls = 0
+
+    def list(self, instance_type, filter, sort, limit):
+        self.calls += 1
+        dumped = filter.dump()
+        view = dumped["hasData"][0]["externalId"] if "hasData" in dumped else dumped["and"][0]["hasData"][0]["externalId"]
+        lower = _range_lower(dumped)
+        ids = [i for i in self.ids_by_view.get(view, []) if lower is None or i > lower]
+        return [SimpleNamespace(external_id=i) for i in ids[:limit]]
+
+
+class FakeFiles:
+    """`files` upload/download of the partition plan, keyed by externalId."""
+
+    def __init__(self):
+        self.stored: dict[str, bytes] = {}
+        self.uploads = 0
+
+    def upload(self, path, external_id, name, mime_type, overwrite):
+        with open(path, "rb") as f:
+            self.stored[external_id] = f.read()
+        self.uploads += 1
+
+    def download_bytes(self, external_id):
+        if external_id not in self.stored:
+            raise FileNotFoundError(external_id)
+        return self.stored[external_id]
+
+
+def _client(ids_by_view: dict[str, list[str]]) -> SimpleNamespace:
+    return SimpleNamespace(
+        data_modeling=SimpleNamespace(instances=FakeInstances(ids_by_view)),
+        files=FakeFiles(),
+    )
+
+
+def _ids(n: int, prefix: str = "a") -> list[str]:
+    return [f"{prefix}{i:05d}" for i in range(n)]
+
+
+def _config(**overrides) -> dict:
+    return {
+        **DEFAULT_CONFIG,
+        "enable_maintenance_metrics": False,
+        "enable_file_annotation_metrics": False,
+        "enable_3d_metrics": False,
+        "enable_file_metrics": False,
+        "batch_size": 4,
+        **overrides,
+    }
+
+
+class TestPartitionPlan:
+    """Test suite for partition plan ranges and serialization."""
+
+    def test_ranges_cover_every_batch_without_overlap(self):
+        plan = PartitionPlan(batch_size=2, views=["ts"], boundaries={"ts": ["c", "e"]})
+        assert plan.total_batches == 3
+        assert plan.range_for("ts", 0) == (None, "c")
+        assert plan.range_for("ts", 1) == ("c", "e")
+        assert plan.range_for("ts", 2) == ("e", None)
+        assert plan.range_for("ts", 3) is None
+        assert plan.range_for("assets", 0) == (None, None)
+
+    def test_range_filter(self):
+        assert build_range_filter("node", None, None) is None
+        dumped = build_range_filter("node", "c", "e").dump()
+        assert dumped["range"]["gte"] == "c"
+        assert dumped["range"]["lt"] == "e"
+
+    def test_round_trip(self):
+        plan = PartitionPlan(
+            batch_size=2, views=["ts", "assets"], boundaries={"ts": ["c"]},
+            instance_counts={"ts": 3, "assets": 1000}, scan_positions={"assets": "x"},
+        )
+        loaded = PartitionPlan.from_dict(json.loads(json.dumps(plan.to_dict())))
+        assert loaded == plan
+        assert loaded.pending_views == ["assets"]
+
+    def test_version_1_plans_are_complete(self):
+        loaded = PartitionPlan.from_dict({"version": 1, "batch_size": 2, "boundaries": {"ts": ["c"], "assets": []}})
+        assert loaded.views == ["ts", "assets"]
+        assert loaded.is_complete
+
+    def test_mismatch(self):
+        plan = PartitionPlan(batch_size=2, views=["ts", "assets"])
+        assert plan.mismatch(2, ["assets", "ts"]) is None
+        assert "batch_size" in plan.mismatch(3, ["ts", "assets"])
+        assert "views" in plan.mismatch(2, ["ts"])
+
+
+class TestComputeBoundaries:
+    """Test suite for the externalId keyset scan."""
+
+    def test_split_point_every_batch_size_instances(self):
+        client = _client({"CogniteAsset": _ids(10)})
+        bounds, scanned, position = compute_partition_boundaries(client, VIEW, 4, page_size=3)
+        assert bounds == ["a00004", "a00008"]
+        assert scanned == 10
+        assert position is None
+
+    def test_scan_stops_at_deadline_and_resumes(self):
+        client = _client({"CogniteAsset": _ids(10)})
+        stopped = compute_partition_boundaries(client, VIEW, 4, page_size=3, deadline=time.monotonic() - 1)
+        assert stopped == ([], 0, "")
+
+        # Continue after the first two pages (six instances scanned, split at a00004 already taken)
+        bounds, scanned, position = compute_partition_boundaries(
+            client, VIEW, 4, page_size=3, start_after="a00005", scanned=6,
+        )
+        assert bounds == ["a00008"]
+        assert (scanned, position) == (10, None)
+
+
+class TestPlanPartitions:
+    """Test suite for building and continuing a partition plan."""
+
+    VIEWS = {"ts": (ViewId("cdf_cdm", "CogniteTimeSeries", "v1"), "node"), "assets": (VIEW, "node")}
+
+    def test_plan_covers_all_views_and_reports_progress(self):
+        client = _client({"CogniteTimeSeries": _ids(5, "t"), "CogniteAsset": _ids(9)})
+        progress = []
+        plan = plan_partitions(client, self.VIEWS, 4, on_progress=lambda p: progress.append(list(p.pending_views)))
+        assert plan.is_complete
+        assert plan.boundaries == {"ts": ["t00004"], "assets": ["a00004", "a00008"]}
+        assert plan.instance_counts == {"ts": 5, "assets": 9}
+        assert progress == [["assets"], []]
+
+    def test_plan_stops_at_deadline_and_continues(self):
+        client = _client({"CogniteTimeSeries": _ids(5, "t"), "CogniteAsset": _ids(9)})
+        plan = plan_partitions(client, self.VIEWS, 4, deadline=time.monotonic() - 1)
+        assert plan.pending_views == ["ts", "assets"]
+        assert plan.scan_positions == {"ts": ""}
+
+        plan = plan_partitions(client, self.VIEWS, 4, plan=plan)
+        assert plan.is_complete
+        assert plan.boundaries == {"ts": ["t00004"], "assets": ["a00004", "a00008"]}
+
+
+class TestHandlerPlanning:
+    """Test suite for the planning call and the plan a batch call reads."""
+
+    def test_planning_call_saves_a_plan_batches_accept(self):
+        client = _client({"CogniteTimeSeries": _ids(5, "t"), "CogniteAsset": _ids(9), "CogniteEquipment": []})
+        config = _config()
+        result = _handle_partition_planning(client, config, time.time())
+        assert result["status"] == "plan_complete"
+        assert result["total_batches"] == 3
+        assert client.files.uploads == len(_partition_views(config))
+        assert _load_batch_plan(client, config).boundaries["assets"] == ["a00004", "a00008"]
+
+    def test_planning_call_out_of_time_is_continued(self):
+        client = _client({"CogniteTimeSeries": _ids(5, "t"), "CogniteAsset": _ids(9), "CogniteEquipment": []})
+        config = _config(plan_time_budget_seconds=0)
+        result = _handle_partition_planning(client, config, time.time())
+        assert result["status"] == "plan_incomplete"
+        assert result["pending_views"] == ["ts", "assets", "equipment"]
+        with pytest.raises(ValueError, match="unfinished"):
+            _load_batch_plan(client, config)
+
+        result = _handle_partition_planning(client, _config(), time.time())
+        assert result["status"] == "plan_complete"
+
+    def test_batch_call_does_not_build_a_missing_plan(self):
+        client = _client({"CogniteAsset": _ids(9)})
+        with pytest.raises(ValueError, match="no partition plan"):
+            _load_batch_plan(client, _config())
+        assert client.data_modeling.instances.calls == 0
+        assert client.files.uploads == 0
+
+    def test_batch_call_rejects_a_plan_for_other_settings(self):
+        client = _client({"CogniteTimeSeries": [], "CogniteAsset": [], "CogniteEquipment": []})
+        _handle_partition_planning(client, _config(), time.time())
+        with pytest.raises(ValueError, match="batch_size"):
+            _load_batch_plan(client, _config(batch_size=8))
+        with pytest.raises(ValueError, match="views"):
+            _load_batch_plan(client, _config(enable_file_metrics=True))
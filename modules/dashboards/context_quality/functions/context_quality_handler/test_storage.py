@@ -0,0 +1,158 @@
+import sys
+from datetime import UTC, datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Add the current directory to the path so we can import the modules
+sys.path.append(str(Path(__file__).parent))
+
+from cognite.client.data_classes.data_modeling import ViewId
+from metrics import (
+    BATCH_FORMAT_BINARY,
+    BATCH_FORMAT_JSON,
+    CombinedAccumulator,
+    Model3DAccumulator,
+    list_batch_files,
+    load_and_merge_all_batches,
+    process_asset_3d_batch,
+    process_asset_batch,
+    save_batch_file,
+)
+from metrics.columnar import ColumnarAccumulator
+from metrics.storage import iter_batch_files
+
+ASSET_VIEW = ViewId("cdf_cdm", "CogniteAsset", "v1")
+NOW = datetime(2026, 1, 1, tzinfo=UTC)
+
+
+class FakeFiles:
+    """`files` API over an in-memory store, recording downloads."""
+
+    def __init__(self, listing_fails: bool = False):
+        self.stored: dict[str, bytes] = {}
+        self.downloads: list[str] = []
+        self.listing_fails = listing_fails
+
+    def upload(self, path, external_id, name, mime_type, overwrite):
+        with open(path, "rb") as f:
+            self.stored[external_id] = f.read()
+
+    def download_bytes(self, external_id):
+        self.downloads.append(external_id)
+        return self.stored[external_id]
+
+    def list(self, external_id_prefix, limit):
+        if self.listing_fails:
+            raise RuntimeError("listing unavailable")
+        return [SimpleNamespace(external_id=x) for x in self.stored if x.startswith(external_id_prefix)]
+
+    def retrieve(self, external_id):
+        return SimpleNamespace(external_id=external_id) if external_id in self.stored else None
+
+
+def _assets(batch: int, size: int = 6) -> list[SimpleNamespace]:
+    start = batch * (size - 1)  # overlapping batches, so merging has duplicates to resolve
+    return [
+        SimpleNamespace(
+            external_id=f"asset_{i}",
+            properties={ASSET_VIEW: {
+                "parent": {"externalId": f"asset_{i // 2}"} if i else None,
+                "object3D": {"externalId": f"obj_{i}"} if i % 4 == 0 else None,
+            }},
+        )
+        for i in range(start, start + size)
+    ]
+
+
+def _save_batches(client, count: int, file_format: str = BATCH_FORMAT_BINARY) -> None:
+    for batch in range(count):
+        acc, model3d = CombinedAccumulator(now=NOW), Model3DAccumulator()
+        process_asset_batch(_assets(batch), ASSET_VIEW, acc)
+        process_asset_3d_batch(_assets(batch), ASSET_VIEW, model3d)
+        save_batch_file(client, acc, batch, model3d_accumulator=model3d,
+                        file_format=BATCH_FORMAT_JSON if batch % 2 and file_format == "mixed" else BATCH_FORMAT_BINARY)
+
+
+def _expected(batches) -> tuple[CombinedAccumulator, Model3DAccumulator]:
+    acc, model3d = None, Model3DAccumulator()
+    for batch in batches:
+        part, part_3d = CombinedAccumulator(now=NOW), Model3DAccumulator()
+        process_asset_batch(_assets(batch), ASSET_VIEW, part)
+        process_asset_3d_batch(_assets(batch), ASSET_VIEW, part_3d)
+        if acc is None:
+            acc = part
+        else:
+            acc.merge_from(part)
+        model3d.merge_from(part_3d)
+    return acc, model3d
+
+
+def _normalized(data: dict) -> dict:
+    """``to_dict`` output with list order ignored (sets are stored as lists in no particular order)."""
+    return {key: sorted(value, key=repr) if isinstance(value, list) else value for key, value in data.items()}
+
+
+def _client(**kwargs) -> SimpleNamespace:
+    return SimpleNamespace(files=FakeFiles(**kwargs))
+
+
+class TestListBatchFiles:
+    """Test suite for batch file discovery."""
+
+    def test_all_batches_in_index_order(self):
+        client = _client()
+        for i in (0, 2, 10, 25, 9, 1):
+            client.files.stored[f"cq_batch_{i}"] = b"{}"
+        client.files.stored["cq_batch_plan"] = b"{}"
+        assert list_batch_files(client) == [f"cq_batch_{i}" for i in (0, 1, 2, 9, 10, 25)]
+
+    def test_probing_when_listing_fails(self):
+        client = _client(listing_fails=True)
+        for i in (0, 1, 3, 12):
+            client.files.stored[f"cq_batch_{i}"] = b"{}"
+        assert list_batch_files(client) == ["cq_batch_0", "cq_batch_1", "cq_batch_3"]
+
+
+class TestStreamingMerge:
+    """Test suite for folding batch files into one accumulator."""
+
+    @pytest.mark.parametrize("file_format", [BATCH_FORMAT_BINARY, "mixed"])
+    def test_merge_matches_in_memory_merge(self, file_format):
+        client = _client()
+        _save_batches(client, 25, file_format)
+        acc, model3d, _ = load_and_merge_all_batches(client)
+        expected_acc, expected_3d = _expected(range(25))
+        assert _normalized(acc.to_dict()) == _normalized(expected_acc.to_dict())
+        assert _normalized(model3d.to_dict()) == _normalized(expected_3d.to_dict())
+
+    def test_columnar_backend(self):
+        client = _client()
+        _save_batches(client, 4)
+        acc, _, _ = load_and_merge_all_batches(client, ColumnarAccumulator)
+        assert isinstance(acc, ColumnarAccumulator)
+        assert acc.total_assets == _expected(range(4))[0].total_assets
+
+    def test_unreadable_batches_are_skipped(self):
+        client = _client()
+        _save_batches(client, 3)
+        client.files.stored["cq_batch_1"] = b"not a batch file"
+        acc, _, _ = load_and_merge_all_batches(client)
+        assert _normalized(acc.to_dict()) == _normalized(_expected([0, 2])[0].to_dict())
+
+    def test_no_batches(self):
+        acc, model3d, _ = load_and_merge_all_batches(_client())
+        assert acc is None
+        assert model3d.total_assets_checked == 0
+
+    def test_prefetches_at_most_one_batch_ahead(self):
+        client = _client()
+        _save_batches(client, 5)
+        names = list_batch_files(client)
+        ahead = []
+        for i, (name, data) in enumerate(iter_batch_files(client, names)):
+            assert name == names[i] and data["batch_index"] == i
+            ahead.append(len(client.files.downloads) - (i + 1))
+        assert max(ahead) <= 1
+        assert client.files.downloads == names
@@ -0,0 +1,151 @@
+import random
+import sys
+from itertools import pairwise
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+# Add the current directory to the path so we can import the modules
+sys.path.append(str(Path(__file__).parent))
+
+from cognite.client.data_classes.data_modeling import NodeId
+from metrics import CombinedAccumulator, GapStats, compute_historical_gaps_batch, detect_gaps
+from metrics import timeseries as timeseries_module
+
+DAY_MS = 24 * 3600 * 1000
+
+
+def _series_gaps(series: list[list[int]], threshold_ms: int) -> GapStats:
+    """Gap totals computed one series at a time, as the reference."""
+    stats = GapStats()
+    for ts in series:
+        if len(ts) < 2:
+            continue
+        stats.series_analyzed += 1
+        stats.total_span_ms += ts[-1] - ts[0]
+        for gap in (b - a for a, b in pairwise(ts)):
+            if gap > threshold_ms:
+                stats.total_gap_ms += gap
+                stats.gap_count += 1
+                stats.longest_gap_ms = max(stats.longest_gap_ms, gap)
+    return stats
+
+
+def _flatten(series: list[list[int]]) -> tuple[list[int], list[int]]:
+    timestamps, offsets = [], [0]
+    for ts in series:
+        timestamps.extend(ts)
+        offsets.append(len(timestamps))
+    return timestamps, offsets
+
+
+def _random_series(seed: int) -> list[list[int]]:
+    rng = random.Random(seed)
+    series = []
+    for _ in range(rng.randrange(1, 40)):
+        days = sorted(rng.sample(range(400), rng.choice([0, 1, 2, 5, 30, 120])))
+        series.append([d * DAY_MS for d in days])
+    return series
+
+
+@pytest.fixture(params=["numpy", "python"])
+def gap_backend(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(timeseries_module, "np", None)
+    return request.param
+
+
+class TestDetectGaps:
+    """Test suite for the vectorized gap detector and its pure-Python fallback."""
+
+    @pytest.mark.parametrize("seed", range(20))
+    def test_matches_per_series_loop(self, seed, gap_backend):
+        series = _random_series(seed)
+        timestamps, offsets = _flatten(series)
+        assert detect_gaps(timestamps, offsets, 7 * DAY_MS) == _series_gaps(series, 7 * DAY_MS)
+
+    def test_gaps_do_not_cross_series(self, gap_backend):
+        # Series 2 starts long after series 1 ends; that step is not a gap
+        timestamps, offsets = _flatten([[0, DAY_MS], [], [100 * DAY_MS], [200 * DAY_MS, 210 * DAY_MS]])
+        assert detect_gaps(timestamps, offsets, 7 * DAY_MS) == GapStats(
+            series_analyzed=2, total_span_ms=11 * DAY_MS, total_gap_ms=10 * DAY_MS,
+            gap_count=1, longest_gap_ms=10 * DAY_MS,
+        )
+
+    def test_threshold_is_exclusive(self, gap_backend):
+        stats = detect_gaps([0, 7 * DAY_MS], [0, 2], 7 * DAY_MS)
+        assert (stats.series_analyzed, stats.gap_count) == (1, 0)
+
+    @pytest.mark.parametrize("series", [[], [[]], [[5]], [[], [5], []]])
+    def test_nothing_to_analyze(self, series, gap_backend):
+        assert detect_gaps(*_flatten(series), DAY_MS) == GapStats()
+
+
+class FakeDatapoints:
+    """`time_series.data` returning daily count buckets (numpy and list variants)."""
+
+    def __init__(self, days: dict[str, list[int]]):
+        self.days = days
+        self.queries: list[dict] = []
+
+    def _buckets(self, instance_id):
+        for node_id in instance_id:
+            if node_id.external_id in self.days:
+                days = self.days[node_id.external_id]
+                yield node_id, [d * DAY_MS for d in days], [0 if d % 10 == 9 else 1 for d in days]
+
+    def retrieve_arrays(self, instance_id, **query):
+        self.queries.append(query)
+        return [
+            SimpleNamespace(
+                instance_id=node_id,
+                timestamp=np.array(ts, dtype="datetime64[ms]"),
+                count=np.array(counts, dtype=np.int64),
+            )
+            for node_id, ts, counts in self._buckets(instance_id)
+        ]
+
+    def retrieve(self, instance_id, **query):
+        self.queries.append(query)
+        return [
+            SimpleNamespace(instance_id=node_id, timestamp=ts, count=counts)
+            for node_id, ts, counts in self._buckets(instance_id)
+        ]
+
+
+def test_historical_gaps_use_count_aggregates(gap_backend):
+    days = {"t1": [0, 1, 2, 30, 31], "t2": [5, 9, 40], "t3": [3]}
+    client = SimpleNamespace(time_series=SimpleNamespace(data=FakeDatapoints(days)))
+    batch = [SimpleNamespace(space="sp", external_id=xid) for xid in ("t1", "t2", "t3", "unknown")]
+    acc = CombinedAccumulator()
+    compute_historical_gaps_batch(batch, client, acc, gap_threshold_days=7)
+
+    [query] = client.time_series.data.queries
+    assert (query["aggregates"], query["granularity"], query["ignore_unknown_ids"]) == ("count", "1d", True)
+    # Day 9 has a zero count, so t2 holds data on days 5 and 40 only
+    expected = _series_gaps([[d * DAY_MS for d in days["t1"]], [5 * DAY_MS, 40 * DAY_MS]], 7 * DAY_MS)
+    assert acc.ts_analyzed_for_gaps == expected.series_analyzed == 2
+    assert acc.gap_count == expected.gap_count
+    assert acc.total_gap_duration_days == expected.total_gap_ms / DAY_MS
+    assert acc.longest_gap_days == 35
+
+
+def test_historical_gaps_skip_unavailable_data():
+    def fail(**query):
+        raise RuntimeError("no access")
+
+    client = SimpleNamespace(time_series=SimpleNamespace(data=SimpleNamespace(retrieve_arrays=fail)))
+    acc = CombinedAccumulator()
+    compute_historical_gaps_batch([SimpleNamespace(space="sp", external_id="t1")], client, acc)
+    assert acc.ts_analyzed_for_gaps == 0
+
+
+def test_node_ids_are_requested():
+    data = FakeDatapoints({})
+    seen = []
+    data.retrieve_arrays = lambda instance_id, **query: seen.extend(instance_id) or []
+    client = SimpleNamespace(time_series=SimpleNamespace(data=data))
+    compute_historical_gaps_batch([SimpleNamespace(space="sp", external_id="t1")], client, CombinedAccumulator())
+    assert seen == [NodeId("sp", "t1")]
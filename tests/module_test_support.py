@@ -13,10 +13,14 @@ _FLAT_MODULE_NAMES = (
     "logger",
     "metadata_optimizations",
     "pipeline_optimizations",
+    "incremental_sync",
+    "test_incremental_sync",
+    "metrics",
 )
 
 _MODULE_TEST_PATH_MARKERS = (
     "modules/contextualization/",
+    "modules/dashboards/",
 )
 
 
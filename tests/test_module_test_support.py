@@ -17,6 +17,11 @@ def test_is_module_function_test_file_matches_contextualization_tests() -> None:
     assert is_module_function_test_file(path)
 
 
+def test_is_module_function_test_file_matches_dashboard_tests() -> None:
+    path = Path("modules/dashboards/context_quality/functions/context_quality_handler/test_partitions.py")
+    assert is_module_function_test_file(path)
+
+
 def test_is_module_function_test_file_ignores_root_tests() -> None:
     assert not is_module_function_test_file(Path("tests/test_foundation_setup_wizard.py"))
 